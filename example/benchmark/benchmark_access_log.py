@@ -0,0 +1,87 @@
+"""Benchmark of AccessProcessor at 20k RPS, the event loop lag of the logger(file handler) vs the access log pipeline"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import List
+
+from rap.common.utils import constant
+from rap.server.model import Request, Response, ServerContext
+from rap.server.plugin.processor.access import AccessLog, AccessProcessor
+
+RPS: int = 20000
+SECOND: int = 2
+TICK: float = 0.01
+
+
+class _Conn(object):
+    peer_tuple: tuple = ("127.0.0.1", 50000)
+
+
+async def run(name: str, processor: AccessProcessor) -> None:
+    context: ServerContext = ServerContext()
+    context.correlation_id = 1
+    context.conn = _Conn()
+    request: Request = Request(constant.MSG_REQUEST, 1, {"target": "example/default/demo"}, {"param": []}, context)
+    response: Response = Response(msg_type=constant.MSG_RESPONSE, context=context)
+    response.header["host"] = ("127.0.0.1", 9000)
+
+    loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+    lag_list: List[float] = []
+    is_running: bool = True
+
+    async def monitor_lag() -> None:
+        while is_running:
+            start_time: float = loop.time()
+            await asyncio.sleep(0.005)
+            lag_list.append(loop.time() - start_time - 0.005)
+
+    monitor_future: asyncio.Future = asyncio.ensure_future(monitor_lag())
+    cpu_cost: float = 0.0
+    for _ in range(int(SECOND / TICK)):
+        start_time: float = time.process_time()
+        for _ in range(int(RPS * TICK)):
+            processor.process_request(request)
+            processor.process_response(response)
+        cpu_cost += time.process_time() - start_time
+        await asyncio.sleep(TICK)
+    is_running = False
+    await monitor_future
+    lag_list.sort()
+    print(
+        "%-30s %8.3f us/rpc, loop lag p99 %6.2f ms max %6.2f ms"
+        % (
+            name,
+            cpu_cost / (RPS * SECOND) * 1e6,
+            lag_list[int(len(lag_list) * 0.99)] * 1000,
+            lag_list[-1] * 1000,
+        )
+    )
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as dir_path:
+        handler: logging.FileHandler = logging.FileHandler(os.path.join(dir_path, "logger.log"))
+        access_logger: logging.Logger = logging.getLogger("rap.server.plugin.processor.access")
+        access_logger.addHandler(handler)
+        access_logger.setLevel(logging.INFO)
+        access_logger.propagate = False
+        await run("logger(file handler)", AccessProcessor())
+        access_logger.removeHandler(handler)
+        handler.close()
+
+        for name, serializer, sample_rate in (
+            ("access log(json)", "json", 1.0),
+            ("access log(msgpack)", "msgpack", 1.0),
+            ("access log(json, 1% sample)", "json", 0.01),
+        ):
+            access_log: AccessLog = AccessLog(os.path.join(dir_path, name), serializer=serializer)
+            access_log.start()
+            await run(name, AccessProcessor(access_log, success_sample_rate=sample_rate))
+            access_log.stop()
+            print("%-30s drop %s entries" % ("", access_log.drop_cnt))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""Benchmark of the conn admission, admit cost and the reconnect storm with the accept rate limit"""
+import asyncio
+import time
+
+from rap.server import Server
+from rap.server.admission import AdmissionController
+
+NUM_CALLS: int = 1000000
+CONN_NUM: int = 2000
+
+
+def bench_admit() -> None:
+    controller: AdmissionController = AdmissionController(
+        max_conn=NUM_CALLS * 2, ip_max_conn=NUM_CALLS * 2, accept_rate=NUM_CALLS * 2, ip_accept_rate=NUM_CALLS * 2
+    )
+    ip_list: list = [f"10.0.{i % 256}.{i // 256 % 256}" for i in range(1024)]
+    start_time: float = time.perf_counter()
+    for index in range(NUM_CALLS):
+        ip: str = ip_list[index & 1023]
+        controller.admit(ip)
+        controller.release(ip)
+    cost: float = time.perf_counter() - start_time
+    print("%-40s %8.3f us/call" % ("admit and release", cost / NUM_CALLS * 1000000))
+
+
+async def bench_conn_storm(name: str, controller: AdmissionController) -> None:
+    server: Server = Server("example", admission_controller=controller)
+    await server.create_server()
+
+    async def _conn() -> None:
+        _, writer = await asyncio.open_connection("localhost", 9000)
+        writer.close()
+
+    try:
+        start_time: float = time.perf_counter()
+        for _ in range(CONN_NUM // 100):
+            await asyncio.gather(*[_conn() for _ in range(100)])
+        await asyncio.sleep(0.1)
+        cost: float = time.perf_counter() - start_time
+        print("%-40s %8.0f conn/sec, %s" % (name, CONN_NUM / cost, controller.to_dict()["reject_cnt"]))
+    finally:
+        await server.shutdown()
+
+
+async def main() -> None:
+    await bench_conn_storm("conn storm(no limit)", AdmissionController())
+    await bench_conn_storm("conn storm(ip accept rate 100/s)", AdmissionController(ip_accept_rate=100))
+
+
+if __name__ == "__main__":
+    bench_admit()
+    asyncio.run(main())
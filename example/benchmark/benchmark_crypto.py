@@ -0,0 +1,44 @@
+"""Throughput and size benchmark of the crypto mode(cbc: json+hex, gcm: msgpack+binary)
+
+The gcm mode is much faster when `cryptography` is installed(reuse the key schedule),
+ with pycryptodome only, a new gcm cipher is created for each message.
+"""
+import asyncio
+import time
+from typing import Any, List
+
+from rap.common.crypto import AESGCM, Crypto, GcmCrypto
+
+NUM_CALLS: int = 20000
+body_list: List[Any] = [
+    {"body": {"param": [1, 2]}, "timestamp": 1600000000, "nonce": "7000000000000000000"},
+    {"body": {"param": ["a" * 1024]}, "timestamp": 1600000000, "nonce": "7000000000000000000"},
+    {"body": {"param": [list(range(1000))]}, "timestamp": 1600000000, "nonce": "7000000000000000000"},
+]
+
+
+def run(crypto: Crypto, body: Any) -> None:
+    start_time: float = time.perf_counter()
+    for _ in range(NUM_CALLS):
+        encrypt_byte: bytes = crypto.encrypt_object(body)
+    encrypt_cost: float = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for _ in range(NUM_CALLS):
+        crypto.decrypt_object(encrypt_byte)
+    decrypt_cost: float = time.perf_counter() - start_time
+    print(
+        "%-4s encrypt %10.0f msgs/sec  decrypt %10.0f msgs/sec  size %8d bytes"
+        % (crypto.mode, NUM_CALLS / encrypt_cost, NUM_CALLS / decrypt_cost, len(encrypt_byte))
+    )
+
+
+async def main() -> None:
+    print(f"gcm backend: {'cryptography' if AESGCM is not None else 'pycryptodome'}")
+    for body in body_list:
+        print(f"body: {str(body)[:60]}...")
+        for crypto in (Crypto("keyskeyskeyskeys"), GcmCrypto("keyskeyskeyskeys")):
+            run(crypto, body)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""Microbenchmark of the dispatch overhead per call(param check, return value check, func model lookup)"""
+import timeit
+from typing import Optional
+
+from rap.common.types import is_type
+from rap.common.utils import constant, param_handle
+from rap.server.model import Request, ServerContext
+from rap.server.registry import FuncModel, RegistryManager
+
+NUM_CALLS: int = 100000
+
+
+def demo(a: int, b: str, c: Optional[dict] = None) -> int:
+    return a
+
+
+def gen_request() -> Request:
+    context: ServerContext = ServerContext()
+    context.correlation_id = 1
+    return Request(constant.MSG_REQUEST, 1, {"target": "example/default/demo"}, {"param": [1, "2", {}]}, context)
+
+
+def run(name: str, stmt: str, namespace: dict) -> None:
+    cost: float = timeit.timeit(stmt, globals=namespace, number=NUM_CALLS)
+    print("%-40s %8.3f us/call" % (name, cost / NUM_CALLS * 1000000))
+
+
+if __name__ == "__main__":
+    request: Request = gen_request()
+    param: list = request.body["param"]
+    for check_type in (True, False):
+        registry: RegistryManager = RegistryManager(check_type=check_type)
+        registry.register(demo)
+        func_model: FuncModel = registry.get_func_model(request, constant.NORMAL_TYPE)
+        namespace: dict = {
+            "param_handle": param_handle,
+            "is_type": is_type,
+            "gen_key": RegistryManager.gen_key,
+            "registry": registry,
+            "func_model": func_model,
+            "request": request,
+            "param": param,
+            "NORMAL_TYPE": constant.NORMAL_TYPE,
+        }
+        print(f"check_type: {check_type}")
+        if check_type:
+            run("raw param_handle", "param_handle(func_model.func_sig, param, {})", namespace)
+            run("raw return is_type", "is_type(func_model.return_type, int)", namespace)
+            run(
+                "raw get func model",
+                "registry.func_dict[gen_key(*request.target.split('/')[1:], NORMAL_TYPE)]",
+                namespace,
+            )
+        run("compiled param_handle", "func_model.param_handle(param)", namespace)
+        run("compiled return check", "func_model.check_return_type(1)", namespace)
+        run("target index get func model", "registry.get_func_model(request, NORMAL_TYPE)", namespace)
+        run("parse request", "gen_request()", {"gen_request": gen_request})
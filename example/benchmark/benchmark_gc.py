@@ -0,0 +1,78 @@
+"""Benchmark of the tail latency of the request with and without the gc controller(freeze and threshold).
+
+The server holds a large number of long-lived objects(e.g. cache) like a real service, without freezing them,
+ every full collection traverses them and the pause shows up as the p999 spike.
+"""
+import asyncio
+import gc
+import time
+from typing import Dict, List, Optional
+
+from rap.client import Client
+from rap.common.gc_controller import GCController
+from rap.server import Server
+
+NUM_CALLS: int = 20000
+NUM_LONG_LIVED_OBJECT: int = 500000
+
+
+def demo(a: int, b: int) -> int:
+    return a + b
+
+
+def get_percentile(cost_list: List[float], percentile: float) -> float:
+    return cost_list[min(int(len(cost_list) * percentile / 100), len(cost_list) - 1)] * 1000
+
+
+async def bench(name: str, gc_controller: Optional[GCController]) -> None:
+    # The container objects are tracked by gc
+    long_lived_dict: Dict[int, List[int]] = {i: [i] for i in range(NUM_LONG_LIVED_OBJECT)}
+    server: Server = Server("example", gc_controller=gc_controller)
+    server.register(demo, is_private=False)
+    await server.create_server()
+    client: Client = Client("example", [{"ip": "localhost", "port": "9000"}])
+    await client.start()
+    try:
+        for _ in range(100):
+            await client.invoke_by_name("demo", [1, 2])
+        cost_list: List[float] = []
+        gen2_collect_cnt: int = gc.get_stats()[2]["collections"]
+        for _ in range(NUM_CALLS):
+            start_time: float = time.perf_counter()
+            await client.invoke_by_name("demo", [1, 2])
+            cost_list.append(time.perf_counter() - start_time)
+        gen2_collect_cnt = gc.get_stats()[2]["collections"] - gen2_collect_cnt
+        cost_list.sort()
+        print(
+            "%-40s p50:%8.3fms p99:%8.3fms p999:%8.3fms max:%8.3fms gen2 collect:%d"
+            % (
+                name,
+                get_percentile(cost_list, 50),
+                get_percentile(cost_list, 99),
+                get_percentile(cost_list, 99.9),
+                cost_list[-1] * 1000,
+                gen2_collect_cnt,
+            )
+        )
+        if gc_controller:
+            for generation, stats_dict in sorted(gc_controller.to_dict()["pause"].items()):
+                print(
+                    "  %-6s pause p50:%8.3fms p99:%8.3fms max:%8.3fms"
+                    % (generation, stats_dict["p50"], stats_dict["p99"], stats_dict["max"])
+                )
+    finally:
+        await client.stop()
+        await server.shutdown()
+        del long_lived_dict
+        gc.collect()
+
+
+async def main() -> None:
+    await bench("request(gc default)", None)
+    await bench("request(gc freeze)", GCController())
+    await bench("request(gc freeze and threshold)", GCController(threshold=(10000, 20, 20)))
+    await bench("request(gc freeze and auto tune)", GCController(auto_tune=True))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""Benchmark of the ip filter, CIDR lookup with 10k networks and the conn storm with the local rule set"""
+import asyncio
+import ipaddress
+import logging
+import random
+import time
+from typing import List
+
+from aredis import StrictRedis  # type: ignore
+
+from rap.common.ip_network import IpNetworkSet
+from rap.server import Server
+from rap.server.plugin.middleware.conn.ip_filter import IpFilterMiddleware
+
+NETWORK_NUM: int = 10000
+NUM_CALLS: int = 100000
+CONN_NUM: int = 2000
+
+
+def bench_lookup() -> None:
+    network_list: List[str] = [
+        f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.0/{random.choice([8, 16, 24])}"
+        for _ in range(NETWORK_NUM)
+    ]
+    ip_list: List[str] = [
+        f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(0, 255)}"
+        for _ in range(NUM_CALLS)
+    ]
+    ip_network_set: IpNetworkSet = IpNetworkSet(network_list)
+    start_time: float = time.perf_counter()
+    for ip in ip_list:
+        _ = ip in ip_network_set
+    cost: float = time.perf_counter() - start_time
+    print("%-40s %8.3f us/call" % ("IpNetworkSet(prefix table)", cost / NUM_CALLS * 1000000))
+
+    ip_network_list: list = [ipaddress.ip_network(network, strict=False) for network in network_list]
+    start_time = time.perf_counter()
+    for ip in ip_list[: NUM_CALLS // 100]:
+        ip_address = ipaddress.ip_address(ip)
+        _ = any(ip_address in ip_network for ip_network in ip_network_list)
+    cost = time.perf_counter() - start_time
+    print("%-40s %8.3f us/call" % ("linear scan of networks", cost / (NUM_CALLS // 100) * 1000000))
+    host_cnt: int = sum(ip_network.num_addresses for ip_network in ip_network_list)
+    print("%-40s %8s networks, %s hosts if expanded" % ("rule", len(ip_network_set), host_cnt))
+
+
+async def bench_conn_storm() -> None:
+    # The redis is not required, the rule is loaded locally when redis is unavailable
+    logging.getLogger("rap.server.plugin.middleware.conn.ip_filter").setLevel(logging.ERROR)
+    middleware: IpFilterMiddleware = IpFilterMiddleware(
+        StrictRedis.from_url("redis://localhost"),
+        block_ip_list=[f"10.{i // 256}.{i % 256}.0/24" for i in range(NETWORK_NUM)],
+    )
+    server: Server = Server("example", middleware_list=[middleware])
+    await server.create_server()
+
+    async def _conn() -> None:
+        _, writer = await asyncio.open_connection("localhost", 9000)
+        writer.close()
+
+    try:
+        start_time: float = time.perf_counter()
+        for _ in range(CONN_NUM // 100):
+            await asyncio.gather(*[_conn() for _ in range(100)])
+        cost: float = time.perf_counter() - start_time
+        print("%-40s %8.0f conn/sec" % ("conn storm", CONN_NUM / cost))
+    finally:
+        await server.shutdown()
+
+
+if __name__ == "__main__":
+    bench_lookup()
+    asyncio.run(bench_conn_storm())
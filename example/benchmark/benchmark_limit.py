@@ -0,0 +1,47 @@
+"""Microbenchmark of LimitProcessor rule matching with 100 rules(rule func vs static match)"""
+import asyncio
+import time
+from typing import Callable, List, Tuple, Union
+
+from rap.common.utils import constant
+from rap.server.model import Request, ServerContext
+from rap.server.plugin.processor import limit
+
+RULE_NUM: int = 100
+NUM_CALLS: int = 100000
+
+
+def gen_rule_func(func_name: str) -> limit.RULE_FUNC_TYPE:
+    def match_request(request: Request) -> limit.RULE_FUNC_RETURN_TYPE:
+        if request.func_name == func_name:
+            return request.func_name, False
+        return None, False
+
+    return match_request
+
+
+async def run(name: str, rule_list: List[Tuple[Union[limit.Match, limit.RULE_FUNC_TYPE], limit.Rule]]) -> None:
+    limit_processor: limit.LimitProcessor = limit.LimitProcessor(limit.MemoryTokenBucketBackend(), rule_list)
+    context: ServerContext = ServerContext()
+    context.correlation_id = 1
+    # match the last rule
+    request: Request = Request(
+        constant.MSG_REQUEST, 1, {"target": f"example/default/demo_{RULE_NUM - 1}"}, {"param": []}, context
+    )
+    fn: Callable = limit_processor.process_request
+    start_time: float = time.perf_counter()
+    for _ in range(NUM_CALLS):
+        await fn(request)
+    cost: float = time.perf_counter() - start_time
+    print("%-40s %8.3f us/call" % (name, cost / NUM_CALLS * 1000000))
+
+
+async def main() -> None:
+    rule: limit.Rule = limit.Rule(second=1, gen_token=NUM_CALLS * 10, max_token=NUM_CALLS * 10)
+    print(f"rule num: {RULE_NUM}")
+    await run("rule func(linear scan)", [(gen_rule_func(f"demo_{i}"), rule) for i in range(RULE_NUM)])
+    await run("static match(target index)", [(limit.Match(func_name=f"demo_{i}"), rule) for i in range(RULE_NUM)])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""Microbenchmark of WindowStatistics, increments/sec and snapshot cost at 10k metrics"""
+import asyncio
+import random
+import time
+from typing import List
+
+from rap.common.collect_statistics import Counter, Gauge, Metric, WindowStatistics
+
+METRIC_NUM: int = 10000
+NUM_CALLS: int = 1000000
+
+
+async def main() -> None:
+    window_statistics: WindowStatistics = WindowStatistics(max_interval=60)
+    gauge_list: List[Gauge] = [Gauge(f"gauge_{i}", diff=10) for i in range(METRIC_NUM // 2)]
+    counter_list: List[Counter] = [Counter(f"counter_{i}") for i in range(METRIC_NUM // 2)]
+    metric_list: List[Metric] = gauge_list + counter_list  # type: ignore
+    for metric in metric_list:
+        window_statistics.registry_metric(metric)
+
+    index_list: List[int] = [random.randint(0, METRIC_NUM // 2 - 1) for _ in range(NUM_CALLS)]
+    start_time: float = time.perf_counter()
+    for index in index_list:
+        gauge_list[index].increment()
+    cost: float = time.perf_counter() - start_time
+    print("%-40s %12.0f ops/sec" % ("gauge increment", NUM_CALLS / cost))
+
+    start_time = time.perf_counter()
+    for index in index_list:
+        counter_list[index].increment()
+    cost = time.perf_counter() - start_time
+    print("%-40s %12.0f ops/sec" % ("counter increment", NUM_CALLS / cost))
+
+    start_time = time.perf_counter()
+    for index in index_list[: NUM_CALLS // 10]:
+        window_statistics.set_gauge_value(f"gauge_{index}", -1, 10)
+    cost = time.perf_counter() - start_time
+    print("%-40s %12.0f ops/sec" % ("set_gauge_value by key", NUM_CALLS // 10 / cost))
+
+    start_time = time.perf_counter()
+    statistics_dict: dict = {metric.name: metric.get_value() for metric in metric_list}
+    cost = time.perf_counter() - start_time
+    print("%-40s %12.3f ms(%s metrics)" % ("snapshot", cost * 1000, len(statistics_dict)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
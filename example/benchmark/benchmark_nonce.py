@@ -0,0 +1,65 @@
+"""Memory and speed benchmark of the nonce store(replay protection) at high message rates"""
+import asyncio
+import itertools
+import time
+import tracemalloc
+from typing import Callable, Union
+
+from rap.common.cache import ExpireCache
+from rap.common.nonce_filter import NonceBloomFilter, NonceSetFilter
+
+MSG_RATE: int = 10000  # msgs/sec, the memory of ExpireCache and NonceSetFilter grows linearly with it
+NONCE_TIMEOUT: int = 120
+SECONDS: int = 130  # Simulated running time, longer than the nonce timeout
+# The nonce is like the snowflake id(can not call the snowflake when mock time)
+nonce_counter: "itertools.count[int]" = itertools.count(7000000000000000000)
+
+
+def feed(store: Union[ExpireCache, NonceSetFilter, NonceBloomFilter]) -> float:
+    """Simulate receiving the msgs for `SECONDS` seconds, return the cost of the store"""
+    now: float = 1600000000.0
+    real_time: Callable[[], float] = time.time
+    time.time = lambda: now  # type: ignore
+    cost: float = 0.0
+    try:
+        for second in range(SECONDS):
+            now = 1600000000.0 + second
+            nonce_list: list = [str(next(nonce_counter)) for _ in range(MSG_RATE)]
+            start_time: float = time.perf_counter()
+            if isinstance(store, ExpireCache):
+                store.remove_expire_key()
+                for nonce in nonce_list:
+                    if nonce not in store:
+                        store.add(nonce, NONCE_TIMEOUT)
+            else:
+                for nonce in nonce_list:
+                    store.add(nonce)
+            cost += time.perf_counter() - start_time
+    finally:
+        time.time = real_time  # type: ignore
+    return cost
+
+
+def run(name: str, create_store: Callable[[], Union[ExpireCache, NonceSetFilter, NonceBloomFilter]]) -> None:
+    # tracemalloc slows down the allocation, so the speed and the memory are measured separately
+    cost: float = feed(create_store())
+    tracemalloc.start()
+    feed(create_store())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("%-24s %10.0f msgs/sec  peak memory %8.2f MB" % (name, SECONDS * MSG_RATE / cost, peak / 1024 / 1024))
+
+
+async def main() -> None:
+    print(f"{MSG_RATE} msgs/sec, nonce timeout: {NONCE_TIMEOUT}s, run {SECONDS}s")
+    run("ExpireCache", lambda: ExpireCache())
+    run("NonceSetFilter", lambda: NonceSetFilter(ttl=NONCE_TIMEOUT))
+    run(
+        "NonceBloomFilter",
+        # capacity is the number of msgs per bucket time(ttl / (bucket_cnt - 1))
+        lambda: NonceBloomFilter(ttl=NONCE_TIMEOUT, capacity=MSG_RATE * NONCE_TIMEOUT // 3, error_rate=0.0001),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
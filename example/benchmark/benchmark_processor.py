@@ -0,0 +1,92 @@
+"""Microbenchmark of the processor overhead per call(process request and process response)"""
+import asyncio
+import time
+from typing import Callable, List, Set
+
+from rap.common.processor import HOOK_FN_LIST, ProcessorChain
+from rap.common.utils import constant
+from rap.server.model import Request, Response, ServerContext
+from rap.server.plugin.processor.base import BaseProcessor
+
+NUM_CALLS: int = 100000
+
+
+class NoopProcessor(BaseProcessor):
+    """only inherit the no-op hook"""
+
+
+class RequestProcessor(BaseProcessor):
+    async def process_request(self, request: Request) -> Request:
+        return request
+
+
+class ResponseProcessor(BaseProcessor):
+    async def process_response(self, response: Response) -> Response:
+        return response
+
+
+class SyncResponseProcessor(BaseProcessor):
+    def process_response(self, response: Response) -> Response:  # type: ignore
+        return response
+
+
+class ChannelProcessor(BaseProcessor):
+    msg_type_set: Set[int] = {constant.CHANNEL_REQUEST, constant.CHANNEL_RESPONSE}
+
+    async def process_request(self, request: Request) -> Request:
+        return request
+
+    async def process_response(self, response: Response) -> Response:
+        return response
+
+
+processor_list: List[BaseProcessor] = [
+    NoopProcessor(),
+    NoopProcessor(),
+    RequestProcessor(),
+    ResponseProcessor(),
+    ChannelProcessor(),
+    ChannelProcessor(),
+]
+sync_processor_list: List[BaseProcessor] = processor_list[:3] + [SyncResponseProcessor()] + processor_list[4:]
+
+
+async def raw_processor(request: Request, response: Response) -> None:
+    for processor in processor_list:
+        request = await processor.process_request(request)
+    for processor in reversed(processor_list):
+        response = await processor.process_response(response)  # type: ignore
+
+
+async def chain_processor(request: Request, response: Response, processor_chain: ProcessorChain) -> None:
+    request_hook_list: HOOK_FN_LIST = processor_chain.get_request_hook_list(request.msg_type)
+    for hook, is_coroutine_func in request_hook_list:
+        request = await hook(request) if is_coroutine_func else hook(request)
+    response_hook_list: HOOK_FN_LIST = processor_chain.get_response_hook_list(response.msg_type)
+    for hook, is_coroutine_func in response_hook_list:
+        response = await hook(response) if is_coroutine_func else hook(response)
+
+
+async def run(name: str, fn: Callable) -> None:
+    start_time: float = time.perf_counter()
+    for _ in range(NUM_CALLS):
+        await fn()
+    cost: float = time.perf_counter() - start_time
+    print("%-40s %8.3f us/call" % (name, cost / NUM_CALLS * 1000000))
+
+
+async def main() -> None:
+    context: ServerContext = ServerContext()
+    context.correlation_id = 1
+    request: Request = Request(constant.MSG_REQUEST, 1, {"target": "example/default/demo"}, {"param": []}, context)
+    response: Response = Response(context=context)
+    processor_chain: ProcessorChain = ProcessorChain(BaseProcessor, processor_list)
+    sync_processor_chain: ProcessorChain = ProcessorChain(BaseProcessor, sync_processor_list)
+    print(f"processor num: {len(processor_list)}")
+    await run("loop every processor", lambda: raw_processor(request, response))
+    await run("compiled processor chain", lambda: chain_processor(request, response, processor_chain))
+    await run("compiled chain with sync hook", lambda: chain_processor(request, response, sync_processor_chain))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
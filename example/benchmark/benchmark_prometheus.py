@@ -0,0 +1,66 @@
+"""Microbenchmark of PrometheusProcessor request/response hooks, prometheus_client labels vs pre-bound accumulators"""
+import time
+from typing import List
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram  # type: ignore
+
+from rap.common.utils import constant
+from rap.server import Server
+from rap.server.model import Request, Response, ServerContext
+from rap.server.plugin.processor.prometheus import PrometheusProcessor, label_list
+
+NUM_CALLS: int = 100000
+
+
+def bench_labels(request: Request, response: Response) -> None:
+    """The hooks before pre-binding, call `labels()` of prometheus_client for each msg"""
+    registry: CollectorRegistry = CollectorRegistry()
+    request_count: Counter = Counter("request", "", label_list + ["msg_type"], registry=registry)
+    response_count: Counter = Counter("response", "", label_list + ["msg_type", "status_code"], registry=registry)
+    msg_request_count: Counter = Counter("msg_request", "", label_list, registry=registry)
+    msg_response_count: Counter = Counter("msg_response", "", label_list + ["status_code"], registry=registry)
+    msg_request_in_progress: Gauge = Gauge("msg_request_in_progress", "", label_list, registry=registry)
+    msg_request_time: Histogram = Histogram("msg_request_time", "", label_list, registry=registry)
+    start_time: float = time.perf_counter()
+    for _ in range(NUM_CALLS):
+        label_value_list: List[str] = ["example", "host", request.target, request.group]
+        request_count.labels(*label_value_list, request.msg_type).inc()
+        msg_request_count.labels(*label_value_list).inc()
+        msg_request_in_progress.labels(*label_value_list).inc()
+        request.context.start_time = time.time()
+        label_value_list = ["example", "host", response.target, request.group]
+        response_count.labels(*label_value_list, response.msg_type, response.status_code).inc()
+        msg_response_count.labels(*label_value_list, response.status_code).inc()
+        msg_request_in_progress.labels(*label_value_list).dec()
+        msg_request_time.labels(*label_value_list).observe(time.time() - response.context.start_time)
+    cost: float = time.perf_counter() - start_time
+    print("%-40s %8.3f us/msg" % ("prometheus_client labels", cost / NUM_CALLS * 1000000))
+
+
+def bench_processor(request: Request, response: Response) -> None:
+    processor: PrometheusProcessor = PrometheusProcessor(expose_mode="registry", registry=CollectorRegistry())
+    processor.app = Server("example")
+    start_time: float = time.perf_counter()
+    for _ in range(NUM_CALLS):
+        processor.process_request(request)
+        processor.process_response(response)
+    cost: float = time.perf_counter() - start_time
+    print("%-40s %8.3f us/msg" % ("pre-bound accumulator", cost / NUM_CALLS * 1000000))
+
+    start_time = time.perf_counter()
+    metric_cnt: int = len(list(processor.collect()))
+    cost = time.perf_counter() - start_time
+    print("%-40s %8.3f us(%s metrics)" % ("collect", cost * 1000000, metric_cnt))
+
+
+def main() -> None:
+    context: ServerContext = ServerContext()
+    context.correlation_id = 1
+    request: Request = Request(constant.MSG_REQUEST, 1, {"target": "example/default/demo"}, {"param": []}, context)
+    response: Response = Response(msg_type=constant.MSG_RESPONSE, context=context)
+    bench_labels(request, response)
+    bench_processor(request, response)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark of the request with and without the stage timing, and print the cost of each stage"""
+import asyncio
+import time
+
+from rap.client import Client
+from rap.server import Server
+
+NUM_CALLS: int = 10000
+
+
+def demo(a: int, b: int) -> int:
+    return a + b
+
+
+async def bench(name: str, stage_timing: bool) -> None:
+    server: Server = Server("example", stage_timing=stage_timing, server_timing_header=stage_timing)
+    server.register(demo, is_private=False)
+    await server.create_server()
+    client: Client = Client("example", [{"ip": "localhost", "port": "9000"}], stage_timing=stage_timing)
+    await client.start()
+    try:
+        for _ in range(100):
+            await client.invoke_by_name("demo", [1, 2])
+        start_time: float = time.perf_counter()
+        for _ in range(NUM_CALLS):
+            await client.invoke_by_name("demo", [1, 2])
+        cost: float = time.perf_counter() - start_time
+        print("%-40s %8.3f us/call" % (name, cost / NUM_CALLS * 1000000))
+        if stage_timing:
+            for side, stage_dict in (
+                ("server", await client.invoke_by_name("stage_timing", ["example/default/demo"], group="registry")),
+                ("client", client.histogram_store.to_stage_dict("example/default/demo")),
+            ):
+                for stage, stats_dict in stage_dict["example/default/demo"].items():
+                    print("  %-6s %-20s p50:%8.3fms p99:%8.3fms" % (side, stage, stats_dict["p50"], stats_dict["p99"]))
+    finally:
+        await client.stop()
+        await server.shutdown()
+
+
+async def main() -> None:
+    await bench("request(stage timing off)", False)
+    await bench("request(stage timing on)", True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Benchmark of StatsdProcessor at 20k RPS(simulated for 5 seconds), packets/sec and CPU of per-metric packets
+ vs aggregated multi-metric packets"""
+import socket
+import time
+
+from aio_statsd import StatsdClient
+
+from rap.common.utils import constant
+from rap.server import Server
+from rap.server.model import Request, Response, ServerContext
+from rap.server.plugin.processor.statsd import StatsdProcessor
+
+RPS: int = 20000
+SECOND: int = 5
+
+
+class UdpStatsdClient(StatsdClient):
+    """Send the packet to the udp socket directly and count the packets"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.sock: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.packet_cnt: int = 0
+
+    @property
+    def is_closed(self) -> bool:
+        return False
+
+    def send(self, msg: str) -> None:
+        self.sock.sendto(msg.encode(), ("127.0.0.1", 8125))
+        self.packet_cnt += 1
+
+
+def gen_msg(host: str) -> tuple:
+    context: ServerContext = ServerContext()
+    context.correlation_id = 1
+    request: Request = Request(
+        constant.MSG_REQUEST, 1, {"target": "example/default/demo", "host": host}, {"param": []}, context
+    )
+    response: Response = Response(msg_type=constant.MSG_RESPONSE, context=context)
+    return request, response
+
+
+def bench_per_metric() -> None:
+    """The hooks before aggregation, send a packet for each metric change"""
+    statsd_client: UdpStatsdClient = UdpStatsdClient()
+    namespace: str = "rap.server.example"
+    msg_list: list = [gen_msg(f"127.0.0.{i % 100}") for i in range(100)]
+    start_time: float = time.process_time()
+    for index in range(RPS * SECOND):
+        request, response = msg_list[index % 100]
+        statsd_client.increment(f"{namespace}.request", 1)
+        statsd_client.increment(f"{namespace}.msg", 1)
+        statsd_client.increment(f"{namespace}.msg.process", 1)
+        statsd_client.sets(f"{namespace}.online.{request.header['host']}", 1)
+        statsd_client.decrement(f"{namespace}.msg.process", 1)
+    cost: float = time.process_time() - start_time
+    print(
+        "%-20s %8.0f packets/sec %8.3f us/rpc %6.1f%% cpu at %s rps"
+        % ("per metric packet", statsd_client.packet_cnt / SECOND, cost / RPS / SECOND * 1e6, cost / SECOND * 100, RPS)
+    )
+
+
+def bench_aggregation() -> None:
+    statsd_client: UdpStatsdClient = UdpStatsdClient()
+    processor: StatsdProcessor = StatsdProcessor(statsd_client, namespace="rap.server.example")
+    processor.app = Server("example")
+    msg_list: list = [gen_msg(f"127.0.0.{i % 100}") for i in range(100)]
+    start_time: float = time.process_time()
+    for index in range(RPS * SECOND):
+        request, response = msg_list[index % 100]
+        processor.process_request(request)
+        processor.process_response(response)
+        if index % RPS == RPS - 1:
+            # flush every second
+            processor.flush()
+    cost: float = time.process_time() - start_time
+    print(
+        "%-20s %8.0f packets/sec %8.3f us/rpc %6.1f%% cpu at %s rps"
+        % ("aggregation", statsd_client.packet_cnt / SECOND, cost / RPS / SECOND * 1e6, cost / SECOND * 100, RPS)
+    )
+
+
+if __name__ == "__main__":
+    bench_per_metric()
+    bench_aggregation()
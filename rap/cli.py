@@ -8,17 +8,27 @@ from rap.client.processor import CryptoProcessor
 from rap.common.utils import constant
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
+    # `-h` is the server host, the help is `--help`
+    parser = argparse.ArgumentParser(conflict_handler="resolve")
     parser.add_argument("-h", "--server_host", help="server host", default="localhost")
     parser.add_argument("-p", "--server_port", help="server port", default="9000")
     parser.add_argument("-S", "--server_name", help="server name")
     parser.add_argument("-s", "--secret_key", default=None, help="transport server secret key")
-    parser.add_argument("-m", "--mode", help="`d` display func list, `r` run func", choices=["d", "r"])
+    parser.add_argument(
+        "-m", "--mode", help="`d` display func list, `r` run func, `p` profile server", choices=["d", "r", "p"]
+    )
     parser.add_argument("-k", "--key", help="secret key")
 
     parser.add_argument("-n", "--name", help="func name")
     parser.add_argument("-a", "--arg", help="func param", default=tuple())
     parser.add_argument("-g", "--group", help="func group", default=constant.DEFAULT_GROUP)
+
+    parser.add_argument("--seconds", help="profile seconds, must < server run timeout", type=float, default=5.0)
+    parser.add_argument("--frequency", help="profile samples per second", type=int, default=100)
+    parser.add_argument(
+        "--output", help="profile output, `collapsed` stacks or `top` func", choices=["collapsed", "top"], default="top"
+    )
+    parser.add_argument("--top_n", help="profile top func num", type=int, default=20)
     args, unknown = parser.parse_known_args()
     server_name: str = args.server_name
     server_host: str = args.server_host
@@ -54,5 +64,17 @@ if __name__ == "__main__":
         # print_table(display_table_list)
     elif mode == "r" and func_name:
         print(loop.run_until_complete(client.invoke_by_name(func_name, arg_param=arg_list, group=group)))
+    elif mode == "p":
+        # The collapsed stacks can be rendered by flamegraph.pl or speedscope
+        result: Union[str, list] = loop.run_until_complete(
+            client.invoke_by_name(
+                "profile", arg_param=[args.seconds, args.frequency, args.output, args.top_n], group="registry"
+            )
+        )
+        if isinstance(result, str):
+            print(result)
+        else:
+            for func_dict in result:
+                print(f"{func_dict['self']:>8} {func_dict['total']:>8}  {func_dict['func']}")
 
     loop.run_until_complete(client.stop())
@@ -2,20 +2,25 @@ import asyncio
 import inspect
 import sys
 from functools import wraps
-from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Sequence, Type, TypeVar
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
 
 from rap.client.endpoint import BalanceEnum, BaseEndpoint, LocalEndpoint
+from rap.client.endpoint.base import Picker
 from rap.client.model import Response
 from rap.client.processor.base import BaseProcessor
 from rap.client.transport.async_iterator import AsyncIteratorCall
 from rap.client.types import CLIENT_EVENT_FN
-from rap.common.cache import Cache
+from rap.common.cache import Cache, ExpireCache
 from rap.common.channel import UserChannel
-from rap.common.collect_statistics import WindowStatistics
+from rap.common.collect_statistics import HistogramStore, StageTimer, WindowStatistics
+from rap.common.gc_controller import GCController
+from rap.common.loop_monitor import LoopMonitor
+from rap.common.processor import ProcessorChain
+from rap.common.slow_request import SlowRequestRecorder
 from rap.common.types import T_ParamSpec as P
 from rap.common.types import T_ReturnType as R_T
-from rap.common.types import is_type
-from rap.common.utils import EventEnum, param_handle
+from rap.common.types import gen_type_check_fn
+from rap.common.utils import EventEnum, gen_param_handle
 
 __all__ = ["BaseClient", "Client"]
 CHANNEL_F = Callable[[UserChannel], Awaitable[None]]
@@ -35,6 +40,11 @@ class BaseClient:
         ws_max_interval: Optional[int] = None,
         ws_statistics_interval: Optional[int] = None,
         through_deadline: bool = False,
+        check_type: bool = True,
+        stage_timing: bool = False,
+        loop_monitor: Optional[LoopMonitor] = None,
+        gc_controller: Optional[GCController] = None,
+        slow_request_recorder: Optional[SlowRequestRecorder] = None,
     ):
         """
         :param server_name: server name
@@ -43,17 +53,33 @@ class BaseClient:
         :param ws_max_interval: WindowStatistics Window capacity
         :param ws_statistics_interval: WindowStatistics Statistical data interval from window
         :param through_deadline: enable through deadline to server
+        :param check_type: Whether to check the param type and return value type of the registered func
+        :param stage_timing: Record the cost of each stage(pick, semaphore, processor, encode, drain, response_wait,
+          response_processor) of the request to the histogram store, query by `histogram_store.to_stage_dict`
+        :param loop_monitor: Monitor the event loop lag, the task count and the slow callbacks, and publish them to
+          the window statistics
+        :param gc_controller: Freeze the objects after the start, record the gc pause of each generation and
+          tune the gc threshold
+        :param slow_request_recorder: Record the request whose duration exceeds the threshold,
+          enable `stage_timing` to record the stage timings and the queueing time
         """
         self.server_name: str = server_name
         self._processor_list: List[BaseProcessor] = []
+        self._processor_chain: ProcessorChain = ProcessorChain(BaseProcessor)
         self._through_deadline: bool = through_deadline
+        self._check_type: bool = check_type
+        self._stage_timing: bool = stage_timing
         self._event_dict: Dict[EventEnum, List[CLIENT_EVENT_FN]] = {
             value: [] for value in EventEnum.__members__.values()
         }
-        self._cache: Cache = Cache(interval=cache_interval)
+        self._cache: Cache = ExpireCache(interval=cache_interval)
         self._window_statistics: WindowStatistics = WindowStatistics(
             interval=ws_min_interval, max_interval=ws_max_interval, statistics_interval=ws_statistics_interval
         )
+        self._histogram_store: HistogramStore = HistogramStore()
+        self._loop_monitor: Optional[LoopMonitor] = loop_monitor
+        self._gc_controller: Optional[GCController] = gc_controller
+        self._slow_request_recorder: Optional[SlowRequestRecorder] = slow_request_recorder
 
     @property
     def cache(self) -> Cache:
@@ -63,6 +89,23 @@ class BaseClient:
     def window_statistics(self) -> WindowStatistics:
         return self._window_statistics
 
+    @property
+    def loop_monitor(self) -> Optional[LoopMonitor]:
+        return self._loop_monitor
+
+    @property
+    def gc_controller(self) -> Optional[GCController]:
+        return self._gc_controller
+
+    @property
+    def slow_request_recorder(self) -> Optional[SlowRequestRecorder]:
+        return self._slow_request_recorder
+
+    @property
+    def histogram_store(self) -> HistogramStore:
+        """The latency histogram of each target and transport(server ip:port)"""
+        return self._histogram_store
+
     @property
     def through_deadline(self) -> bool:
         return self._through_deadline
@@ -77,6 +120,12 @@ class BaseClient:
             if asyncio.iscoroutine(ret):
                 await ret  # type: ignore
         await self.endpoint.stop()
+        if self._loop_monitor:
+            self._loop_monitor.stop()
+        if self._gc_controller:
+            self._gc_controller.stop()
+        if self._slow_request_recorder:
+            self._slow_request_recorder.stop()
         for handler in self._event_dict[EventEnum.after_end]:
             ret: Any = handler(self)  # type: ignore
             if asyncio.iscoroutine(ret):
@@ -88,11 +137,19 @@ class BaseClient:
             ret: Any = handler(self)  # type: ignore
             if asyncio.iscoroutine(ret):
                 await ret  # type: ignore
+        if self._loop_monitor:
+            self._loop_monitor.start(self._window_statistics)
+        if self._gc_controller:
+            self._gc_controller.start(self._window_statistics)
+        if self._slow_request_recorder:
+            self._slow_request_recorder.start(self._histogram_store)
         await self.endpoint.start()
         for handler in self._event_dict[EventEnum.after_start]:
             ret: Any = handler(self)  # type: ignore
             if asyncio.iscoroutine(ret):
                 await ret  # type: ignore
+        if self._gc_controller:
+            self._gc_controller.freeze()
 
     def _check_run(self) -> None:
         if not self.is_close:
@@ -115,11 +172,16 @@ class BaseClient:
             for event_type, handle in processor.event_dict.items():
                 self._event_dict[event_type].extend(handle)
         self._processor_list.extend(processor_list)
+        self._processor_chain.reload(self._processor_list)
 
     @property
     def processor_list(self) -> List[BaseProcessor]:
         return self._processor_list
 
+    @property
+    def processor_chain(self) -> ProcessorChain:
+        return self._processor_chain
+
     ####################
     # wrapper func api #
     ####################
@@ -138,6 +200,12 @@ class BaseClient:
 
         if not inspect.iscoroutinefunction(func):
             raise TypeError(f"func:{func.__name__} must coroutine function")
+        param_handle: Callable[[Sequence[Any], Dict[str, Any]], Tuple[Any, ...]] = gen_param_handle(
+            func_sig, check_type=self._check_type
+        )
+        return_type_check: Callable[[Any], bool] = (
+            gen_type_check_fn(return_type) if self._check_type else lambda value: True
+        )
 
         @wraps(func)  # type: ignore
         async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R_T:  # type: ignore
@@ -149,12 +217,12 @@ class BaseClient:
             _is_private = _kwargs.pop("is_private", is_private)
             result: Any = await self.invoke_by_name(
                 name,
-                arg_param=param_handle(func_sig, _args, _kwargs),
+                arg_param=param_handle(_args, _kwargs),
                 group=group,
                 header=_header,
                 is_private=_is_private,
             )
-            if not is_type(return_type, type(result)):
+            if not return_type_check(result):
                 raise RuntimeError(f"{func} return type is {return_type}, but result type is {type(result)}")
             return result
 
@@ -175,6 +243,12 @@ class BaseClient:
 
         if not inspect.isasyncgenfunction(func):
             raise TypeError(f"func:{func.__name__} must async gen function")
+        param_handle: Callable[[Sequence[Any], Dict[str, Any]], Tuple[Any, ...]] = gen_param_handle(
+            func_sig, check_type=self._check_type
+        )
+        return_type_check: Callable[[Any], bool] = (
+            gen_type_check_fn(return_type) if self._check_type else lambda value: True
+        )
 
         @wraps(func)  # type: ignore
         async def wrapper(*args: P.args, **kwargs: P.kwargs) -> AsyncGenerator[R_T, None]:  # type: ignore
@@ -188,11 +262,11 @@ class BaseClient:
                 async for result in AsyncIteratorCall(
                     name,
                     transport,
-                    param_handle(func_sig, _args, _kwargs),
+                    param_handle(_args, _kwargs),
                     group=group,
                     header=_header,
                 ):
-                    if not is_type(return_type, type(result)):
+                    if not return_type_check(result):
                         raise RuntimeError(f"{func} return type is {return_type}, but result type is {type(result)}")
                     yield result
 
@@ -229,8 +303,8 @@ class BaseClient:
 
     def register_gen_func(
         self, name: str = "", group: Optional[str] = None
-    ) -> Callable[[Callable[P, R_T]], Callable[P, AsyncGenerator[R_T]]]:  # type: ignore
-        def wrapper(func: Callable[P, R_T]) -> Callable[P, AsyncGenerator[R_T]]:  # type: ignore
+    ) -> Callable[[Callable[P, R_T]], Callable[P, AsyncGenerator[R_T, None]]]:  # type: ignore
+        def wrapper(func: Callable[P, R_T]) -> Callable[P, AsyncGenerator[R_T, None]]:  # type: ignore
             return self._wrapper_gen_func(func, group=group, name=name)
 
         return wrapper
@@ -287,8 +361,16 @@ class BaseClient:
         :param header: request header
         :param is_private: If the value is True, it will get transport for its own use only. default False
         """
-        async with self.endpoint.picker(is_private=is_private) as transport:
-            return await transport.request(name, arg_param, group=group, header=header)
+        if not self._stage_timing:
+            async with self.endpoint.picker(is_private=is_private) as transport:
+                return await transport.request(name, arg_param, group=group, header=header)
+
+        stage_timer: StageTimer = StageTimer()
+        picker: Picker = self.endpoint.picker(is_private=is_private)
+        stage_timer.mark("pick")
+        async with picker as transport:
+            stage_timer.mark("semaphore")
+            return await transport.request(name, arg_param, group=group, header=header, stage_timer=stage_timer)
 
     async def invoke_by_name(
         self,
@@ -330,7 +412,7 @@ class BaseClient:
         header: Optional[dict] = None,
         group: Optional[str] = None,
         is_private: bool = False,
-    ) -> Callable[P, AsyncGenerator[R_T]]:  # type: ignore
+    ) -> Callable[P, AsyncGenerator[R_T, None]]:  # type: ignore
         """Python-specific generator invoke
         :param func: python func
         :param group: func's group, default value is `default`
@@ -419,6 +501,11 @@ class Client(BaseClient):
         ping_fail_cnt: Optional[int] = None,
         max_pool_size: Optional[int] = None,
         min_poll_size: Optional[int] = None,
+        check_type: bool = True,
+        stage_timing: bool = False,
+        loop_monitor: Optional[LoopMonitor] = None,
+        gc_controller: Optional[GCController] = None,
+        slow_request_recorder: Optional[SlowRequestRecorder] = None,
     ):
         """
         server_name: server name
@@ -429,6 +516,11 @@ class Client(BaseClient):
           weight: select this transport weight
           e.g.  [{"ip": "localhost", "port": "9000", weight: 10}]
         keep_alive_timeout: read msg from transport timeout
+        check_type: Whether to check the param type and return value type of the registered func
+        stage_timing: Whether to record the cost of each stage of the request
+        loop_monitor: Monitor the event loop lag, the task count and the slow callbacks
+        gc_controller: Freeze the objects after the start, record the gc pause and tune the gc threshold
+        slow_request_recorder: Record the request whose duration exceeds the threshold
         """
 
         super().__init__(
@@ -438,6 +530,11 @@ class Client(BaseClient):
             ws_max_interval=ws_max_interval,
             ws_statistics_interval=ws_statistics_interval,
             through_deadline=through_deadline,
+            check_type=check_type,
+            stage_timing=stage_timing,
+            loop_monitor=loop_monitor,
+            gc_controller=gc_controller,
+            slow_request_recorder=slow_request_recorder,
         )
         self.endpoint = LocalEndpoint(
             conn_list,
@@ -1,12 +1,13 @@
 from types import TracebackType
 from typing import TYPE_CHECKING, Any, Optional
 
+from rap.common.collect_statistics import StageTimer
 from rap.common.conn import Connection
 from rap.common.event import Event
 from rap.common.msg import BaseMsgProtocol
 from rap.common.state import Context
 from rap.common.types import MSG_TYPE, SERVER_BASE_MSG_TYPE
-from rap.common.utils import constant
+from rap.common.utils import constant, parse_target
 
 if TYPE_CHECKING:
     from rap.client.core import BaseClient
@@ -31,6 +32,8 @@ class Request(BaseMsgProtocol):
         self.body: Any = body
         self.header = header or {}
         self.context: Context = context
+        # Record the cost of each stage of the msg request, None is disabled
+        self.stage_timer: Optional[StageTimer] = None
         if target:
             self.target = target
 
@@ -83,7 +86,7 @@ class Response(BaseMsgProtocol):
             raise ValueError(f"Can not found target from {self.correlation_id} request")
 
         self.status_code: int = self.header.get("status_code", 0)
-        _, group, func_name = self.target.split("/")
+        _, group, func_name = parse_target(self.target)
         self.group: str = group
         self.func_name: str = func_name
 
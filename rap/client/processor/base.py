@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 from rap.client.model import Request, Response
 from rap.client.types import CLIENT_EVENT_FN
@@ -14,10 +14,13 @@ class BaseProcessor(object):
         It needs to be loaded before the client is started.
         The client will automatically register the corresponding event callback when it is loaded.
         After the client is started, it will assign itself to the corresponding `app` property
+        The client only calls the hooks overridden by the processor, and the hook can be a sync func.
     """
 
     app: "BaseClient"
     event_dict: Dict["EventEnum", List[CLIENT_EVENT_FN]] = {}
+    # The msg types(request and response) handled by the processor, None is all msg types
+    msg_type_set: Optional[Set[int]] = None
 
     async def process_request(self, request: Request) -> Request:
         return request
@@ -1,3 +1,5 @@
+from typing import Set
+
 from rap.client.model import Request, Response
 from rap.common.channel import UserChannel
 from rap.common.context import Context as _Context
@@ -13,6 +15,8 @@ class Context(_Context):
 
 
 class ContextProcessor(BaseProcessor):
+    msg_type_set: Set[int] = {constant.MSG_REQUEST, constant.CHANNEL_REQUEST, constant.MSG_RESPONSE}
+
     def __init__(self) -> None:
         self._context: Context = Context()
 
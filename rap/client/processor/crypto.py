@@ -1,12 +1,13 @@
 import logging
 import random
 import time
-from typing import Optional
+from typing import Optional, Type
 
 from rap.client.model import Request, Response
 from rap.client.processor.base import BaseProcessor
-from rap.common.crypto import Crypto
+from rap.common.crypto import Crypto, get_crypto_class
 from rap.common.exceptions import CryptoError
+from rap.common.nonce_filter import BaseNonceFilter, NonceSetFilter
 from rap.common.snowflake import async_get_snowflake_id
 from rap.common.utils import constant, gen_random_time_id
 
@@ -15,6 +16,7 @@ logger: logging.Logger = logging.getLogger(__name__)
 
 class BaseCryptoProcessor(BaseProcessor):
     _nonce_timeout: int = 60
+    _nonce_filter: BaseNonceFilter
 
     def _body_handle(self, body: dict) -> None:
         """Check if the message has timed out or has been received"""
@@ -24,11 +26,8 @@ class BaseCryptoProcessor(BaseProcessor):
         nonce: str = body.get("nonce", "")
         if not nonce:
             raise CryptoError("nonce param error")
-        nonce = f"{self.__class__.__name__}:{nonce}"
-        if nonce in self.app.cache:
+        if not self._nonce_filter.add(nonce):
             raise CryptoError("nonce param error")
-        else:
-            self.app.cache.add(nonce, self._nonce_timeout)
 
 
 class AutoCryptoProcessor(BaseCryptoProcessor):
@@ -37,12 +36,21 @@ class AutoCryptoProcessor(BaseCryptoProcessor):
     The auto-negotiation key of this mode is in plain text, which may be attacked
     """
 
-    def __init__(self, nonce_timeout: Optional[int] = None):
+    def __init__(
+        self,
+        nonce_timeout: Optional[int] = None,
+        nonce_filter: Optional[BaseNonceFilter] = None,
+        crypto_mode: str = Crypto.mode,
+    ):
         """
         nonce_time: Cache nonce time, each message has a nonce field, and the value of each message is different,
             which is used to prevent message re-attack.
+        nonce_filter: Store the nonce of the received message, default is `NonceSetFilter`
+        crypto_mode: cbc(json+hex, compatible with the old server) or gcm(msgpack+binary, with integrity check)
         """
+        self._crypto_class: Type[Crypto] = get_crypto_class(crypto_mode)
         self._nonce_timeout: int = nonce_timeout or BaseCryptoProcessor._nonce_timeout
+        self._nonce_filter = nonce_filter if nonce_filter is not None else NonceSetFilter(ttl=self._nonce_timeout)
 
     async def process_request(self, request: Request) -> Request:
         assert request.context.conn is not None, "Not found transport from request"
@@ -51,7 +59,9 @@ class AutoCryptoProcessor(BaseCryptoProcessor):
             crypto_id: str = str(await async_get_snowflake_id())
             request.body["crypto_id"] = crypto_id
             request.body["crypto_key"] = crypto_key
-            request.context.conn.state.crypto = Crypto(crypto_key)
+            if self._crypto_class.mode != Crypto.mode:
+                request.body["crypto_mode"] = self._crypto_class.mode
+            request.context.conn.state.crypto = self._crypto_class(crypto_key)
             check_id: int = random.randint(0, 999999)
             request.body["check_id"] = request.context.conn.state.crypto.encrypt_object(check_id)
             request.context.check_id = check_id
@@ -87,24 +97,36 @@ class AutoCryptoProcessor(BaseCryptoProcessor):
 class CryptoProcessor(BaseCryptoProcessor):
     """Provide symmetric encryption and prevent message replay attacks"""
 
-    def __init__(self, crypto_key_id: str, crypto_key: str, nonce_timeout: Optional[int] = None):
+    def __init__(
+        self,
+        crypto_key_id: str,
+        crypto_key: str,
+        nonce_timeout: Optional[int] = None,
+        nonce_filter: Optional[BaseNonceFilter] = None,
+        crypto_mode: str = Crypto.mode,
+    ):
         """
         crypto_key_id: crypto_key id, Client and server identify crypto_key by id
         crypto_key: crypto key, Encrypt and decrypt messages
         nonce_time: Cache nonce time, each message has a nonce field, and the value of each message is different,
             which is used to prevent message re-attack.
+        nonce_filter: Store the nonce of the received message, default is `NonceSetFilter`
+        crypto_mode: cbc(json+hex, compatible with the old server) or gcm(msgpack+binary, with integrity check)
         """
         self._crypto_id: str = crypto_key_id
         self._crypto_key: str = crypto_key
         self._nonce_timeout: int = nonce_timeout or 60
+        self._nonce_filter = nonce_filter if nonce_filter is not None else NonceSetFilter(ttl=self._nonce_timeout)
 
-        self._crypto: "Crypto" = Crypto(self._crypto_key)
+        self._crypto: "Crypto" = get_crypto_class(crypto_mode)(self._crypto_key)
 
     async def process_request(self, request: Request) -> Request:
         if request.msg_type == constant.CLIENT_EVENT and request.target.endswith(constant.DECLARE):
             # Tell the server that the key will be used for encrypted communication
             request.body["crypto_id"] = self._crypto_id
             request.body["check_body"] = self._crypto.encrypt_object(self._crypto_id)
+            if self._crypto.mode != Crypto.mode:
+                request.body["crypto_mode"] = self._crypto.mode
         elif request.msg_type in (constant.MSG_REQUEST, constant.CHANNEL_REQUEST):
             request.body = {
                 "body": request.body,
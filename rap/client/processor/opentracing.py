@@ -1,3 +1,4 @@
+import time
 from typing import Optional, Tuple
 
 from jaeger_client.span_context import SpanContext
@@ -8,15 +9,36 @@ from opentracing.propagation import Format
 from opentracing.scope import Scope
 
 from rap.client.model import BaseMsgProtocol, Request, Response
+from rap.common.trace_sampler import BaseTraceSampler, sample_trace
 from rap.common.utils import constant
 
 from .base import BaseProcessor
 
 
 class TracingProcessor(BaseProcessor):
-    def __init__(self, tracer: Tracer, scope_cache_timeout: Optional[float] = None):
+    def __init__(
+        self,
+        tracer: Tracer,
+        scope_cache_timeout: Optional[float] = None,
+        sampler: Optional[BaseTraceSampler] = None,
+        trace_error: bool = False,
+        trace_slow_time: Optional[float] = None,
+    ):
+        """
+        :param tracer: jaeger tracer
+        :param scope_cache_timeout: scope cache timeout
+        :param sampler: Decide whether to sample the trace at the edge, None is always sampled.
+            The span is not created for the unsampled trace, and the decision is propagated to the server
+        :param trace_error: Create the span for the error request of the unsampled trace
+        :param trace_slow_time: Create the span for the request of the unsampled trace that cost more than
+            this time(seconds)
+        """
         self._tracer: Tracer = tracer
         self._scope_cache_timeout: float = scope_cache_timeout or 60.0
+        self._sampler: Optional[BaseTraceSampler] = sampler
+        self._trace_error: bool = trace_error
+        self._trace_slow_time: Optional[float] = trace_slow_time
+        self._is_trigger: bool = trace_error or trace_slow_time is not None
 
     def _create_scope(self, msg: BaseMsgProtocol, finish_on_close: bool = True) -> Scope:
         span_ctx: Optional[SpanContext] = None
@@ -39,18 +61,57 @@ class TracingProcessor(BaseProcessor):
             scope.close()
         return scope
 
+    def _trigger_span(self, response: Response, exc: Optional[Exception] = None) -> None:
+        """Create the span of the unsampled trace when the request is error or slow"""
+        start_time: Optional[float] = response.context.get_value("trace_start_time", None)
+        if start_time is None:
+            return
+        status_code: int = response.status_code
+        is_error: bool = exc is not None or status_code >= 400
+        if not (self._trace_error and is_error) and not (
+            self._trace_slow_time is not None and time.time() - start_time >= self._trace_slow_time
+        ):
+            return
+        span = self._tracer.start_span(
+            str(response.target),
+            start_time=start_time,
+            tags={
+                tags.SAMPLING_PRIORITY: 1,
+                tags.SPAN_KIND: tags.SPAN_KIND_RPC_CLIENT,
+                tags.PEER_SERVICE: self.app.server_name,
+                "correlation_id": response.correlation_id,
+                "msg_type": response.msg_type,
+                "status_code": status_code,
+            },
+            ignore_active_span=True,
+        )
+        if exc is not None:
+            span._on_error(span, type(exc), exc, response.tb)  # type: ignore
+        else:
+            span.set_tag(tags.ERROR, is_error)
+        span.finish()
+
     async def process_request(self, request: Request) -> Request:
         if request.msg_type is constant.MSG_REQUEST and not request.context.get_value("scope", None):
-            request.context.scope = self._create_scope(request)
+            if sample_trace(request.header, request.target, self._sampler):
+                request.context.scope = self._create_scope(request)
+            elif self._is_trigger:
+                request.context.trace_start_time = time.time()
         elif request.msg_type is constant.CHANNEL_REQUEST and not request.context.get_value("span", None):
-            # A channel is a continuous activity that may involve the interaction of multiple coroutines
-            request.context.span = self._create_scope(request, finish_on_close=False).span
-            request.context.user_channel.add_done_callback(lambda f: request.context.span.finish())
+            if request.context.get_value("trace_is_sample", None) is None:
+                request.context.trace_is_sample = sample_trace(request.header, request.target, self._sampler)
+            if request.context.trace_is_sample:
+                # A channel is a continuous activity that may involve the interaction of multiple coroutines
+                request.context.span = self._create_scope(request, finish_on_close=False).span
+                request.context.user_channel.add_done_callback(lambda f: request.context.span.finish())
         return request
 
     async def process_response(self, response: Response) -> Response:
         if response.msg_type is constant.MSG_RESPONSE:
-            scope: Scope = response.context.scope
+            scope: Optional[Scope] = response.context.get_value("scope", None)
+            if scope is None:
+                self._trigger_span(response)
+                return response
             status_code: int = response.status_code
             scope.span.set_tag("status_code", status_code)
             scope.span.set_tag(tags.ERROR, status_code >= 400)
@@ -64,4 +125,6 @@ class TracingProcessor(BaseProcessor):
             scope.span.set_tag("status_code", status_code)
             scope.span._on_error(scope.span, type(exc), exc, response.tb)  # type: ignore
             scope.close()
+        elif response.msg_type is constant.MSG_RESPONSE:
+            self._trigger_span(response, exc)
         return response, exc
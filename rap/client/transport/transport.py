@@ -23,8 +23,10 @@ from rap.common.asyncio_helper import (
     get_event_loop,
     safe_del_future,
 )
+from rap.common.collect_statistics import StageTimer
 from rap.common.conn import CloseConnException, Connection
 from rap.common.exceptions import IgnoreNextProcessor, RPCError
+from rap.common.processor import HOOK_FN_LIST
 from rap.common.types import SERVER_BASE_MSG_TYPE
 from rap.common.utils import constant
 
@@ -74,6 +76,7 @@ class Transport(object):
             weight = 0
         self.host: str = host
         self.port: int = port
+        self._transport_key: str = f"{host}:{port}"
         self.weight: int = weight
         self._ssl_crt_path: Optional[str] = ssl_crt_path
         self.score: float = 10.0
@@ -147,9 +150,10 @@ class Transport(object):
         If this response is accompanied by an exception, handle the exception directly and throw it.
         """
         if not exc:
+            hook_list: HOOK_FN_LIST = self.app.processor_chain.get_response_hook_list(response.msg_type)
             try:
-                for processor in reversed(self.app.processor_list):
-                    response = await processor.process_response(response)
+                for hook, is_coroutine_func in hook_list:
+                    response = await hook(response) if is_coroutine_func else hook(response)
             except IgnoreNextProcessor:
                 pass
             except Exception as e:
@@ -158,15 +162,18 @@ class Transport(object):
                 response.tb = sys.exc_info()[2]
         if exc:
             # why mypy not support ????
-            for processor in reversed(self.app.processor_list):
+            for hook, is_coroutine_func in self.app.processor_chain.get_exc_hook_list(response.msg_type):
                 raw_response: Response = response
                 try:
-                    response, exc = await processor.process_exc(response, exc)  # type: ignore
+                    if is_coroutine_func:
+                        response, exc = await hook(response, exc)  # type: ignore
+                    else:
+                        response, exc = hook(response, exc)
                 except IgnoreNextProcessor:
                     break
                 except Exception as e:
                     logger.exception(
-                        f"processor:{processor.__class__.__name__} handle response:{response.correlation_id} error:{e}"
+                        f"processor hook:{hook.__qualname__} handle response:{response.correlation_id} error:{e}"
                     )
                     response = raw_response
             raise exc  # type: ignore
@@ -379,7 +386,11 @@ class Transport(object):
                 [response_future],
                 not_cancel_future_list=[self._conn.conn_future],
             )
+            if request.stage_timer is not None:
+                request.stage_timer.mark("response_wait")
             response = await self.process_response(response, exc)
+            if request.stage_timer is not None:
+                request.stage_timer.mark("response_processor")
             return response
         finally:
             pop_future: Optional[asyncio.Future] = self._resp_future_dict.pop(request.correlation_id, None)
@@ -403,13 +414,36 @@ class Transport(object):
         if not request.header.get("request_id"):
             request.header["request_id"] = str(uuid4())
 
-        for processor in self.app.processor_list:
-            await processor.process_request(request)
-        await self._conn.write(request.to_msg())
+        for hook, is_coroutine_func in self.app.processor_chain.get_request_hook_list(request.msg_type):
+            if is_coroutine_func:
+                await hook(request)
+            else:
+                hook(request)
+        if request.stage_timer is not None:
+            request.stage_timer.mark("processor")
+        await self._conn.write(request.to_msg(), request.stage_timer)
 
     ######################
     # one by one request #
     ######################
+    def _record_slow_request(
+        self, request: Request, response: Optional[Response], exc: Optional[BaseException], duration: float
+    ) -> None:
+        exc_info: Optional[str] = None
+        if exc is not None:
+            exc_info = f"{type(exc).__name__}: {exc}"
+        elif response is not None and isinstance(response.body, dict) and "exc_info" in response.body:
+            exc_info = f"{response.body.get('exc', '')}: {response.body['exc_info']}"
+        self.app.slow_request_recorder.record(  # type: ignore
+            request.target,
+            duration,
+            param=request.body.get("param", None),
+            peer=self._transport_key,
+            stage_timer=request.stage_timer,
+            queue_stage_tuple=("pick", "semaphore"),
+            exc_info=exc_info,
+        )
+
     async def request(
         self,
         func_name: str,
@@ -417,6 +451,7 @@ class Transport(object):
         call_id: Optional[int] = None,
         group: Optional[str] = None,
         header: Optional[dict] = None,
+        stage_timer: Optional[StageTimer] = None,
     ) -> Response:
         """msg request handle
         :param func_name: rpc func name
@@ -424,6 +459,7 @@ class Transport(object):
         :param call_id: server gen func next id
         :param group: func's group
         :param header: request header
+        :param stage_timer: Record the cost of each stage of the request, None is disabled
         """
         group = group or constant.DEFAULT_GROUP
         call_id = call_id or -1
@@ -437,7 +473,23 @@ class Transport(object):
             )
             if header:
                 request.header.update(header)
-            response: Response = await self._base_request(request)
+            request.stage_timer = stage_timer
+            start_time: float = time.time()
+            request_exc: Optional[BaseException] = None
+            try:
+                response: Response = await self._base_request(request)
+            except BaseException as e:
+                request_exc = e
+                raise
+            finally:
+                now: float = time.time()
+                duration: float = now - start_time
+                self.app.histogram_store.observe("target", request.target, duration, now)
+                self.app.histogram_store.observe("transport", self._transport_key, duration, now)
+                if stage_timer is not None:
+                    stage_timer.observe(self.app.histogram_store, request.target, now)
+                if self.app.slow_request_recorder and self.app.slow_request_recorder.is_slow(request.target, duration):
+                    self._record_slow_request(request, None if request_exc else response, request_exc, duration)
         if response.msg_type != constant.MSG_RESPONSE:
             raise RPCError(f"response num must:{constant.MSG_RESPONSE} not {response.msg_type}")
         if "exc" in response.body:
@@ -1,8 +1,11 @@
+import heapq
 import logging
+import sys
 import time
+from collections import OrderedDict
 from dataclasses import MISSING
-from threading import Lock
-from typing import Any, Dict, Generator, Optional, Tuple
+from threading import Lock, RLock
+from typing import Any, Dict, Generator, List, Optional, Tuple
 
 from .asyncio_helper import get_event_loop
 
@@ -96,6 +99,10 @@ class Cache(object):
         for key in self._dict.keys():
             yield key, self._dict[key][1]
 
+    def __len__(self) -> int:
+        """The number of the entries, include the expired entries that have not been removed"""
+        return len(self._dict)
+
     def __contains__(self, key: Any) -> bool:
         """check key in cache"""
         if key not in self._dict:
@@ -154,3 +161,214 @@ class ThreadCache(Cache):
             if value is not MISSING:
                 self._dict[key] = (expire, value)
             return value
+
+
+class ExpireCache(Cache):
+    """Cache with accurate expiration and optional size bound, API compatible with `Cache`
+
+    - The expiration time of keys is indexed by a min-heap(the key that is updated leaves a stale heap entry,
+       it is skipped when popped, and the heap is rebuilt when there are too many stale entries),
+       so the expired keys are cleaned up in O(log n) no matter what order they were inserted and updated.
+    - The expired key is not returned by `get` even if it has not been cleaned up.
+    - When `max_entries` or `max_bytes` is exceeded, the least recently used key is evicted.
+    """
+
+    def __init__(
+        self, interval: Optional[float] = None, max_entries: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> None:
+        """
+        :param interval: The maximum interval of clean up expired keys
+        :param max_entries: The maximum number of keys, default not limit
+        :param max_bytes: The maximum bytes(estimated by `sys.getsizeof` of key and value) of keys, default not limit
+        """
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError("max_entries must > 0")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes must > 0")
+        super(ExpireCache, self).__init__(interval=interval)
+        self._dict: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._heap_seq: int = 0
+        self._max_entries: Optional[int] = max_entries
+        self._max_bytes: Optional[int] = max_bytes
+        self._size_dict: Dict[Any, int] = {}
+        self._bytes: int = 0
+
+        self.hit_cnt: int = 0
+        self.miss_cnt: int = 0
+        self.eviction_cnt: int = 0
+        self.expire_cnt: int = 0
+
+    def _is_expire(self, expire: float) -> bool:
+        return expire != self._no_expire_value and expire < time.time()
+
+    def _add(self, key: Any, expire: float, value: Any = None) -> None:
+        if expire != self._no_expire_value:
+            expire = time.time() + expire
+            # The seq avoids comparing the keys when the expire is the same
+            self._heap_seq += 1
+            heapq.heappush(self._heap, (expire, self._heap_seq, key))
+            if len(self._heap) > 2 * len(self._dict) + 64:
+                self._rebuild_heap()
+        self._dict[key] = (expire, value)
+        self._dict.move_to_end(key)
+        if self._max_bytes is not None:
+            size: int = sys.getsizeof(key) + sys.getsizeof(value)
+            self._bytes += size - self._size_dict.get(key, 0)
+            self._size_dict[key] = size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._dict and (
+            (self._max_entries is not None and len(self._dict) > self._max_entries)
+            or (self._max_bytes is not None and self._bytes > self._max_bytes)
+        ):
+            key, _ = self._dict.popitem(last=False)
+            self._remove_size(key)
+            self.eviction_cnt += 1
+
+    def _remove_size(self, key: Any) -> None:
+        if self._max_bytes is not None:
+            self._bytes -= self._size_dict.pop(key, 0)
+
+    def _rebuild_heap(self) -> None:
+        """drop the stale heap entries"""
+        self._heap = [item for item in self._heap if self._dict.get(item[2], (None,))[0] == item[0]]
+        heapq.heapify(self._heap)
+
+    def _get(self, key: Any, default: Any = MISSING) -> Tuple[float, Any]:
+        try:
+            expire, value = self._dict[key]
+        except KeyError:
+            expire = -1
+            value = MISSING
+        else:
+            if self._is_expire(expire):
+                self.pop(key)
+                self.expire_cnt += 1
+                value = MISSING
+        if value is MISSING:
+            self.miss_cnt += 1
+            if default is MISSING:
+                raise KeyError(key)
+            return -1, default
+        self.hit_cnt += 1
+        self._dict.move_to_end(key)
+        return expire, value
+
+    def update_expire(self, key: Any, expire: float) -> bool:
+        if key not in self:
+            return False
+        _, value = self._dict[key]
+        self._add(key, expire, value)
+        return True
+
+    def get_and_update_expire(self, key: Any, expire: float, default: Any = MISSING) -> Any:
+        try:
+            _, value = self._get(key)
+        except KeyError as e:
+            if default is MISSING:
+                raise e
+            return default
+        self._add(key, expire, value)
+        return value
+
+    def pop(self, key: Any, default: Any = MISSING) -> Any:
+        value: Any = super(ExpireCache, self).pop(key, default)
+        self._remove_size(key)
+        return value
+
+    def items(self) -> Generator[Tuple[Any, Any], None, None]:
+        for key, (expire, value) in list(self._dict.items()):
+            if not self._is_expire(expire):
+                yield key, value
+
+    def __contains__(self, key: Any) -> bool:
+        try:
+            expire, _ = self._dict[key]
+        except KeyError:
+            return False
+        if self._is_expire(expire):
+            self.pop(key)
+            self.expire_cnt += 1
+            return False
+        return True
+
+    def remove_expire_key(self) -> int:
+        """Clean up all expired keys, return the number of keys cleaned up"""
+        now: float = time.time()
+        clean_cnt: int = 0
+        while self._heap and self._heap[0][0] < now:
+            expire, _, key = heapq.heappop(self._heap)
+            item: Optional[Tuple[float, Any]] = self._dict.get(key, None)
+            if item is not None and item[0] == expire:
+                self.pop(key)
+                clean_cnt += 1
+        self.expire_cnt += clean_cnt
+        return clean_cnt
+
+    def _auto_remove(self) -> None:
+        clean_cnt: int = self.remove_expire_key()
+        next_call_interval: float = self._interval
+        if self._heap:
+            # wake up in time for the next expired key, but not too frequently
+            next_call_interval = min(max(self._heap[0][0] - time.time(), 0.1), self._interval)
+        logger.debug(
+            f"{self.__class__.__name__} auto remove key length:{len(self._dict)}, clean cnt:{clean_cnt},"
+            f"until the next call:{next_call_interval}"
+        )
+        get_event_loop().call_later(next_call_interval, self._auto_remove)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._dict),
+            "bytes": self._bytes if self._max_bytes is not None else None,
+            "max_entries": self._max_entries,
+            "max_bytes": self._max_bytes,
+            "hit": self.hit_cnt,
+            "miss": self.miss_cnt,
+            "eviction": self.eviction_cnt,
+            "expire": self.expire_cnt,
+        }
+
+
+class ThreadExpireCache(ExpireCache):
+    def __init__(
+        self, interval: Optional[float] = None, max_entries: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> None:
+        # The expired key is removed while reading, so the lock needs to be reentrant
+        self._look: RLock = RLock()
+        super(ThreadExpireCache, self).__init__(interval=interval, max_entries=max_entries, max_bytes=max_bytes)
+
+    def _add(self, key: Any, expire: float, value: Any = None) -> None:
+        with self._look:
+            super(ThreadExpireCache, self)._add(key, expire, value)
+
+    def _get(self, key: Any, default: Any = MISSING) -> Tuple[float, Any]:
+        with self._look:
+            return super(ThreadExpireCache, self)._get(key, default)
+
+    def update_expire(self, key: Any, expire: float) -> bool:
+        with self._look:
+            return super(ThreadExpireCache, self).update_expire(key, expire)
+
+    def get_and_update_expire(self, key: Any, expire: float, default: Any = MISSING) -> Any:
+        with self._look:
+            return super(ThreadExpireCache, self).get_and_update_expire(key, expire, default)
+
+    def pop(self, key: Any, default: Any = MISSING) -> Any:
+        with self._look:
+            return super(ThreadExpireCache, self).pop(key, default)
+
+    def items(self) -> Generator[Tuple[Any, Any], None, None]:
+        with self._look:
+            item_list: List[Tuple[Any, Any]] = list(super(ThreadExpireCache, self).items())
+        yield from item_list
+
+    def __contains__(self, key: Any) -> bool:
+        with self._look:
+            return super(ThreadExpireCache, self).__contains__(key)
+
+    def remove_expire_key(self) -> int:
+        with self._look:
+            return super(ThreadExpireCache, self).remove_expire_key()
@@ -1,12 +1,16 @@
 import asyncio
+import bisect
 import logging
+import math
 import time
+from array import array
+from collections import OrderedDict
 from functools import partial
-from threading import Lock
-from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from threading import RLock
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 from rap.common.asyncio_helper import get_event_loop
-from rap.common.cache import Cache
+from rap.common.cache import Cache, ExpireCache
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -23,6 +27,10 @@ class Metric(object):
         self.name: str = self.gen_metric_name(name)
         self.metric_cache_name: str = self.gen_metric_cache_name(name)
         self.diff: int = 0
+        self.expire: float = -1
+        # Set by `WindowStatistics.registry_metric`, the slot is the index of the metric in the ring buffer
+        self.slot: int = -1
+        self._window_statistics: Optional["WindowStatistics"] = None
 
     @classmethod
     def gen_metric_name(cls, name: str) -> str:
@@ -32,14 +40,20 @@ class Metric(object):
     def gen_metric_cache_name(cls, name: str) -> str:
         return f"metric_{cls.prefix}_{name}"
 
-    def set_value(self, *args: Any, **kwargs: Any) -> None:
+    @property
+    def window_statistics(self) -> "WindowStatistics":
+        if self._window_statistics is None:
+            raise RuntimeError(f"{self.name} not registry to {WindowStatistics.__name__}")
+        return self._window_statistics
+
+    def set_value(self, value: float) -> None:
         raise RuntimeError("Not Implemented")
 
     def get_value(self) -> float:
         raise RuntimeError("Not Implemented")
 
     def get_statistics_value(self) -> float:
-        raise RuntimeError("Not Implemented")
+        return self.window_statistics.get_statistics_value(self.name)
 
 
 class Counter(Metric):
@@ -52,6 +66,12 @@ class Counter(Metric):
 
     prefix: str = "counter"
 
+    def set_value(self, value: float, is_cover: bool = True) -> None:
+        self.window_statistics._set_counter_value(self, value, is_cover=is_cover)
+
+    def get_value(self) -> float:
+        return self.window_statistics._get_counter_value(self)
+
     def increment(self, value: float = 1.0) -> None:
         self.set_value(value, is_cover=False)
 
@@ -74,6 +94,12 @@ class Gauge(Metric):
         super().__init__(name)
         self.diff = diff
 
+    def set_value(self, value: float = 1.0) -> None:
+        self.window_statistics._set_gauge_value(self, value)
+
+    def get_value(self) -> float:
+        return self.window_statistics._get_gauge_value(self, self.diff)
+
     def increment(self, value: float = 1.0) -> None:
         self.set_value(value)
 
@@ -81,8 +107,291 @@ class Gauge(Metric):
         self.set_value(-value)
 
 
+class BucketHistogram(object):
+    """
+    inherit from prometheus doc
+    A histogram samples observations (usually things like request durations or response sizes)
+     and counts them in configurable buckets. It also provides a sum of all observed values.
+
+    Use it when the bucket boundaries are meaningful to the reader(e.g. the batch size is a power of 2) and the
+     cumulative bucket count is exported like prometheus. Use `LogLinearHistogram` when the percentile of
+     the value(e.g. latency) is needed and the range of the value is unknown.
+    """
+
+    def __init__(self, name: str, bucket_list: Sequence[float]):
+        self.name: str = name
+        self.bucket_list: List[float] = sorted(bucket_list)
+        self.bucket_cnt_list: List[int] = [0 for _ in range(len(self.bucket_list) + 1)]  # The last is +Inf
+        self.sum: float = 0.0
+        self.cnt: int = 0
+
+    def observe(self, value: float) -> None:
+        self.bucket_cnt_list[bisect.bisect_left(self.bucket_list, value)] += 1
+        self.sum += value
+        self.cnt += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """return cumulative bucket count, sum and count, like prometheus"""
+        bucket_dict: Dict[str, int] = {}
+        cumulative_cnt: int = 0
+        for le, cnt in zip(self.bucket_list + [float("inf")], self.bucket_cnt_list):
+            cumulative_cnt += cnt
+            bucket_dict[str(le)] = cumulative_cnt
+        return {"bucket": bucket_dict, "sum": self.sum, "count": self.cnt}
+
+
+class LogLinearHistogram(object):
+    """HDR-style histogram with fixed memory, used to calculate the percentile of the value(see `BucketHistogram`).
+    The values less than `2 ** sub_bucket_bits` are recorded exactly, and the larger values are recorded in
+     log-linear buckets(each power of 2 range is divided into `2 ** (sub_bucket_bits - 1)` linear sub buckets),
+     so the relative error of the value is less than `1 / 2 ** (sub_bucket_bits - 1)`.
+    The histograms with the same config can be merged.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 5, max_value: int = 2 ** 32):
+        """
+        :param sub_bucket_bits: The precision of the histogram, default is 5(relative error < 6.25%)
+        :param max_value: The maximum value that can be recorded, the value greater than it is recorded as it
+        """
+        if sub_bucket_bits < 2:
+            raise ValueError("sub_bucket_bits must >= 2")
+        self._sub_bucket_bits: int = sub_bucket_bits
+        self._sub_bucket_cnt: int = 1 << sub_bucket_bits
+        self._half_sub_bucket_cnt: int = self._sub_bucket_cnt >> 1
+        self.max_value: int = max_value
+        self.bucket_cnt: int = self.get_index(max_value) + 1
+        self.cnt_array: array = array("L", bytes(array("L").itemsize * self.bucket_cnt))
+        self.cnt: int = 0
+        self.sum: int = 0
+        self.min: int = 0
+        self.max: int = 0
+
+    def get_index(self, value: int) -> int:
+        if value < self._sub_bucket_cnt:
+            return value
+        exponent: int = value.bit_length() - self._sub_bucket_bits
+        return self._half_sub_bucket_cnt * exponent + (value >> exponent)
+
+    def get_value(self, index: int) -> int:
+        """return the highest value of the bucket"""
+        if index < self._sub_bucket_cnt:
+            return index
+        exponent, sub_index = divmod(index - self._sub_bucket_cnt, self._half_sub_bucket_cnt)
+        exponent += 1
+        return ((sub_index + self._half_sub_bucket_cnt + 1) << exponent) - 1
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            value = 0
+        elif value > self.max_value:
+            value = self.max_value
+        self.cnt_array[self.get_index(value)] += 1
+        if not self.cnt or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.cnt += 1
+        self.sum += value
+
+    def merge(self, other: "LogLinearHistogram") -> None:
+        if other.bucket_cnt != self.bucket_cnt or other._sub_bucket_bits != self._sub_bucket_bits:
+            raise ValueError("Can not merge histograms with different config")
+        if not other.cnt:
+            return
+        cnt_array: array = self.cnt_array
+        for index, cnt in enumerate(other.cnt_array):
+            if cnt:
+                cnt_array[index] += cnt
+        if not self.cnt or other.min < self.min:
+            self.min = other.min
+        if other.max > self.max:
+            self.max = other.max
+        self.cnt += other.cnt
+        self.sum += other.sum
+
+    def reset(self) -> None:
+        self.cnt_array[:] = array("L", bytes(self.cnt_array.itemsize * self.bucket_cnt))
+        self.cnt = self.sum = self.min = self.max = 0
+
+    def get_percentile_list(self, percentile_list: Sequence[float]) -> List[int]:
+        """return the values of the percentiles(0-100), the percentile list must be sorted"""
+        if not self.cnt:
+            return [0 for _ in percentile_list]
+        result_list: List[int] = []
+        target_list: List[int] = [max(1, math.ceil(percentile / 100 * self.cnt)) for percentile in percentile_list]
+        cumulative_cnt: int = 0
+        target_index: int = 0
+        for index, cnt in enumerate(self.cnt_array):
+            if not cnt:
+                continue
+            cumulative_cnt += cnt
+            while target_index < len(target_list) and cumulative_cnt >= target_list[target_index]:
+                result_list.append(min(self.get_value(index), self.max))
+                target_index += 1
+            if target_index == len(target_list):
+                break
+        return result_list
+
+    def get_percentile(self, percentile: float) -> int:
+        return self.get_percentile_list([percentile])[0]
+
+
+class WindowLogLinearHistogram(object):
+    """The sliding window of `LogLinearHistogram`, the window is divided into `slice_cnt` slices,
+    the oldest slice is cleared when the window slides"""
+
+    def __init__(self, window: float = 60, slice_cnt: int = 6, sub_bucket_bits: int = 5, max_value: int = 2 ** 32):
+        """
+        :param window: window time(seconds)
+        :param slice_cnt: the number of the slices in the window
+        :param sub_bucket_bits: see `LogLinearHistogram`
+        :param max_value: see `LogLinearHistogram`
+        """
+        self._slice_time: float = window / slice_cnt
+        self._slice_cnt: int = slice_cnt
+        self._slice_list: List[LogLinearHistogram] = [
+            LogLinearHistogram(sub_bucket_bits=sub_bucket_bits, max_value=max_value) for _ in range(slice_cnt)
+        ]
+        self._slice_index: int = -1
+        self._sub_bucket_bits: int = sub_bucket_bits
+        self._max_value: int = max_value
+
+    def _get_slice(self, now: float) -> LogLinearHistogram:
+        slice_index: int = int(now // self._slice_time)
+        if slice_index > self._slice_index:
+            for index in range(max(self._slice_index + 1, slice_index - self._slice_cnt + 1), slice_index + 1):
+                self._slice_list[index % self._slice_cnt].reset()
+            self._slice_index = slice_index
+        return self._slice_list[self._slice_index % self._slice_cnt]
+
+    def record(self, value: int, now: Optional[float] = None) -> None:
+        self._get_slice(now or time.time()).record(value)
+
+    def snapshot(self, now: Optional[float] = None) -> LogLinearHistogram:
+        """return the histogram merged by all slices in the window"""
+        self._get_slice(now or time.time())
+        histogram: LogLinearHistogram = LogLinearHistogram(
+            sub_bucket_bits=self._sub_bucket_bits, max_value=self._max_value
+        )
+        for slice_histogram in self._slice_list:
+            histogram.merge(slice_histogram)
+        return histogram
+
+
+class StageTimer(object):
+    """Record the cost of the sequential stages of a request,
+    the cost of a stage is the time from the previous mark(or the start time) to its mark"""
+
+    __slots__ = ("_timestamp", "stage_list")
+
+    # The histogram group of the stage is `stage.{stage name}`, the key is the target
+    group_prefix: str = "stage."
+
+    def __init__(self, start_time: Optional[float] = None) -> None:
+        """
+        :param start_time: The timestamp when the first stage starts, default now
+        """
+        self._timestamp: float = start_time or time.time()
+        self.stage_list: List[Tuple[str, float]] = []
+
+    def mark(self, stage: str) -> None:
+        """mark the end of the stage, the next stage starts now"""
+        now: float = time.time()
+        self.stage_list.append((stage, now - self._timestamp))
+        self._timestamp = now
+
+    def observe(self, histogram_store: "HistogramStore", key: str, now: Optional[float] = None) -> None:
+        """Record the cost of each stage to the histogram store"""
+        for stage, cost in self.stage_list:
+            histogram_store.observe(self.group_prefix + stage, key, cost, now)
+
+    def to_header(self) -> str:
+        """Convert the stages to the `server-timing` header value, e.g. `processor;dur=0.012, func;dur=1.231`(ms)"""
+        return ", ".join(f"{stage};dur={cost * 1000:.3f}" for stage, cost in self.stage_list)
+
+
+class HistogramStore(object):
+    """Store the latency histograms by group(e.g. target, transport) and key, the latency unit is microsecond"""
+
+    percentile_dict: Dict[str, float] = {"p50": 50, "p90": 90, "p99": 99, "p999": 99.9}
+
+    def __init__(
+        self, window: float = 60, slice_cnt: int = 6, sub_bucket_bits: int = 5, max_key_cnt: int = 1024
+    ) -> None:
+        """
+        :param window: window time(seconds) of histogram
+        :param slice_cnt: the number of the slices in the window
+        :param sub_bucket_bits: The precision of the histogram, see `LogLinearHistogram`
+        :param max_key_cnt: The maximum number of histograms of each group, the earliest created one is dropped
+        """
+        self._window: float = window
+        self._slice_cnt: int = slice_cnt
+        self._sub_bucket_bits: int = sub_bucket_bits
+        self._max_key_cnt: int = max_key_cnt
+        self._group_dict: Dict[str, "OrderedDict[str, WindowLogLinearHistogram]"] = {}
+
+    def get_histogram(self, group: str, key: str) -> WindowLogLinearHistogram:
+        try:
+            return self._group_dict[group][key]
+        except KeyError:
+            pass
+        histogram_dict: "OrderedDict[str, WindowLogLinearHistogram]" = self._group_dict.setdefault(group, OrderedDict())
+        if len(histogram_dict) >= self._max_key_cnt:
+            histogram_dict.popitem(last=False)
+        histogram: WindowLogLinearHistogram = WindowLogLinearHistogram(
+            window=self._window, slice_cnt=self._slice_cnt, sub_bucket_bits=self._sub_bucket_bits
+        )
+        histogram_dict[key] = histogram
+        return histogram
+
+    def observe(self, group: str, key: str, latency: float, now: Optional[float] = None) -> None:
+        """
+        :param group: histogram group, e.g. target, transport
+        :param key: histogram key
+        :param latency: latency(seconds)
+        :param now: now timestamp
+        """
+        self.get_histogram(group, key).record(int(latency * 1000000), now)
+
+    def get_stats(self, group: str, key: str) -> Dict[str, float]:
+        """return the count, mean, min, max and percentiles(p50/p90/p99/p999) of the latency(ms) in the window"""
+        histogram: LogLinearHistogram = self.get_histogram(group, key).snapshot()
+        stats_dict: Dict[str, float] = {
+            "count": histogram.cnt,
+            "mean": histogram.sum / histogram.cnt / 1000 if histogram.cnt else 0.0,
+            "min": histogram.min / 1000,
+            "max": histogram.max / 1000,
+        }
+        value_list: List[int] = histogram.get_percentile_list(list(self.percentile_dict.values()))
+        for key, value in zip(self.percentile_dict.keys(), value_list):
+            stats_dict[key] = value / 1000
+        return stats_dict
+
+    def to_dict(self, group: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+        group_list: List[str] = [group] if group else list(self._group_dict.keys())
+        return {
+            group: {key: self.get_stats(group, key) for key in list(self._group_dict.get(group, {}).keys())}
+            for group in group_list
+        }
+
+    def to_stage_dict(self, key: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """return the stats of the stages(recorded by `StageTimer`) group by key(e.g. target) and stage"""
+        stage_dict: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for group in list(self._group_dict.keys()):
+            if not group.startswith(StageTimer.group_prefix):
+                continue
+            stage: str = group[len(StageTimer.group_prefix) :]
+            key_list: List[str] = [key] if key else list(self._group_dict[group].keys())
+            for _key in key_list:
+                if _key in self._group_dict[group]:
+                    stage_dict.setdefault(_key, {})[stage] = self.get_stats(group, _key)
+        return stage_dict
+
+
 class WindowStatistics(object):
-    """Collect data using time sliding window principle"""
+    """Collect data using time sliding window principle,
+    the metric data is stored in the array-backed ring buffer, and the update of metric is O(1)
+    """
 
     def __init__(
         self,
@@ -122,11 +431,30 @@ class WindowStatistics(object):
         self._statistics_callback_set: Set[Callable[[dict], None]] = statistics_callback_set or set()
         self._statistics_callback_priority_set: Set[Callable[[dict], None]] = statistics_callback_priority_set or set()
         self._statistics_callback_wait_cnt: int = statistics_callback_wait_cnt
-        self._metric_cache: Cache = metric_cache or Cache()
+        self._metric_cache: Cache = metric_cache or ExpireCache()
+        self._counter_expire: int = self._max_interval + 5
+
+        # The data of metrics are stored in preallocated arrays, each metric has an integer slot:
+        #  gauge bucket value(one bucket per second):
+        #   `_gauge_bucket_array[slot * _gauge_bucket_len + (second % _gauge_bucket_len)]`
+        #  The window value of gauge(sum of the last `diff` seconds, not include the current second)
+        #   is maintained incrementally in `_gauge_window_value_array`
+        self._gauge_bucket_len: int = self._max_interval + 5
+        self._slot_capacity: int = 0
+        self._free_slot_list: List[int] = []
+        self._slot_metric_list: List[Optional[Metric]] = []
+        self._name_slot_dict: Dict[str, int] = {}
+        self._gauge_bucket_array: array = array("d")
+        self._gauge_window_value_array: array = array("d")
+        self._gauge_window_second_array: array = array("q")
+        self._counter_value_array: array = array("d")
+        self._counter_second_array: array = array("q")
+        self._zero_slot_array: array = array("d")
+        self._zero_bucket_array: array = array("d", bytes(8 * self._gauge_bucket_len))
+        self._grow_slot(64)
 
-        self._gauge_bucket_len: int = (self._max_interval // self._interval) + 5
-        self._gauge_bucket_list: List[Dict[str, float]] = [{"cnt": -1} for _ in range(self._gauge_bucket_len)]
         self._start_timestamp: int = int(time.time())
+        self._now_second: int = 0
         self._loop_timestamp: float = 0.0
         self._is_closed: bool = True
         self._loop: Optional[asyncio.AbstractEventLoop] = None
@@ -135,6 +463,61 @@ class WindowStatistics(object):
 
         self.statistics_dict: Dict[str, float] = {}
 
+    ###############
+    # ring buffer #
+    ###############
+    def _grow_slot(self, capacity: int) -> None:
+        grow_cnt: int = capacity - self._slot_capacity
+        self._gauge_bucket_array.extend(array("d", bytes(8 * grow_cnt * self._gauge_bucket_len)))
+        self._gauge_window_value_array.extend(array("d", bytes(8 * grow_cnt)))
+        self._gauge_window_second_array.extend(array("q", [-1]) * grow_cnt)
+        self._counter_value_array.extend(array("d", bytes(8 * grow_cnt)))
+        self._counter_second_array.extend(array("q", [-1]) * grow_cnt)
+        self._slot_metric_list.extend([None] * grow_cnt)
+        self._zero_slot_array = array("d", bytes(8 * capacity))
+        self._slot_capacity = capacity
+
+    def _alloc_slot(self, metric: Metric) -> int:
+        slot: Optional[int] = self._name_slot_dict.get(metric.name, None)
+        if slot is None:
+            if self._free_slot_list:
+                slot = self._free_slot_list.pop()
+            else:
+                slot = len(self._name_slot_dict)
+                if slot >= self._slot_capacity:
+                    self._grow_slot(self._slot_capacity * 2)
+            self._name_slot_dict[metric.name] = slot
+        # If the metric of the same name is registered again(e.g. expired), it inherits the data of the slot
+        self._slot_metric_list[slot] = metric
+        return slot
+
+    def _free_slot(self, slot: int) -> None:
+        metric: Optional[Metric] = self._slot_metric_list[slot]
+        if metric is None:
+            return
+        self._slot_metric_list[slot] = None
+        self._name_slot_dict.pop(metric.name, None)
+        metric.slot = -1
+        bucket_len: int = self._gauge_bucket_len
+        self._gauge_bucket_array[slot * bucket_len : (slot + 1) * bucket_len] = self._zero_bucket_array
+        self._gauge_window_value_array[slot] = 0.0
+        self._gauge_window_second_array[slot] = -1
+        self._counter_value_array[slot] = 0.0
+        self._counter_second_array[slot] = -1
+        self._free_slot_list.append(slot)
+
+    def _get_now_second(self) -> int:
+        """return the seconds since start, and clear the bucket of the new second"""
+        now_second: int = int(time.time()) - self._start_timestamp
+        if now_second != self._now_second:
+            # clear the buckets of the seconds between the last second and now second
+            bucket_len: int = self._gauge_bucket_len
+            zero_slot_array: array = self._zero_slot_array
+            for second in range(max(self._now_second + 1, now_second - bucket_len + 1), now_second + 1):
+                self._gauge_bucket_array[second % bucket_len :: bucket_len] = zero_slot_array
+            self._now_second = now_second
+        return now_second
+
     ##########
     # Metric #
     ##########
@@ -144,93 +527,120 @@ class WindowStatistics(object):
             cache_value: Optional[Metric] = self._metric_cache.get(key, None)
             if cache_value and cache_value is not metric:
                 raise ValueError("different metric")
+        if isinstance(metric, Gauge) and not metric.diff <= self._max_interval:
+            raise ValueError(f"metric.{metric.name}.diff > {self._max_interval}")
 
         if not expire:
             expire = -1
         self._metric_cache.add(key, expire, metric)
-        if isinstance(metric, Gauge):
-            if not metric.diff <= self._max_interval:
-                raise ValueError(f"metric.{metric.name}.diff > {self._max_interval}")
-            get_value_fn: Callable = partial(self.get_gauge_value, metric.raw_name, diff=metric.diff)
-            set_value_fn: Callable = partial(self._set_gauge_value, metric.name)
-        else:
-            get_value_fn = partial(self.get_counter_value, metric.raw_name)
-            set_value_fn = partial(self._set_counter_value, metric.name)
-
-        setattr(metric, "_temp_get_value", metric.get_value)
-        setattr(metric, "_temp_set_value", metric.set_value)
-        setattr(metric, "_temp_get_statistics_value", metric.get_statistics_value)
-        setattr(metric, metric.get_value.__name__, get_value_fn)
-        setattr(metric, metric.set_value.__name__, set_value_fn)
-        setattr(metric, metric.get_statistics_value.__name__, partial(self.get_statistics_value, metric.name))
+        metric.expire = expire
+        metric.slot = self._alloc_slot(metric)
+        metric._window_statistics = self
 
     def drop_metric(self, key: str) -> None:
         metric: Optional[Metric] = self._metric_cache.pop(key)
         if metric:
-            setattr(metric, metric.get_statistics_value.__name__, getattr(metric, "_temp_get_statistics_value"))
-            setattr(metric, metric.get_value.__name__, getattr(metric, "_temp_get_value"))
-            setattr(metric, metric.set_value.__name__, getattr(metric, "_temp_set_value"))
+            if metric.slot >= 0 and self._slot_metric_list[metric.slot] is metric:
+                self._free_slot(metric.slot)
+            metric.slot = -1
+            metric._window_statistics = None
+
+    def _get_slot(self, metric: Metric) -> int:
+        slot: int = metric.slot
+        if slot < 0:
+            # The slot of the expired metric has been reclaimed, registry again
+            self.registry_metric(metric, metric.expire)
+            slot = metric.slot
+        return slot
+
+    def _check_metric(self, metric: Metric) -> None:
+        assert metric.metric_cache_name in self._metric_cache, KeyError(metric.raw_name)
+
+    def _get_metric(self, metric_cache_name: str) -> Metric:
+        assert metric_cache_name in self._metric_cache, KeyError(metric_cache_name)
+        return self._metric_cache.get(metric_cache_name)
+
+    def get_statistics_value(self, key: str) -> float:
+        return self.statistics_dict.get(key, 0.0)
 
     ################
     # gauge metric #
     ################
-    def get_statistics_value(self, key: str) -> float:
-        return self.statistics_dict.get(key, 0.0)
+    def _set_gauge_value(self, metric: Metric, value: float = 1) -> None:
+        now_second: int = self._get_now_second()
+        bucket_len: int = self._gauge_bucket_len
+        self._gauge_bucket_array[self._get_slot(metric) * bucket_len + now_second % bucket_len] += value
 
-    def _get_now_info(self) -> Tuple[int, int]:
-        """return now timestamp's (Quotient, remainder)"""
-        now_timestamp: int = int(time.time())
-        diff: int = now_timestamp - self._start_timestamp
-        return divmod(diff, self._gauge_bucket_len)
-
-    def _set_gauge_value(self, key: str, value: float = 1) -> None:
-        cnt, index = self._get_now_info()
-        bucket: dict = self._gauge_bucket_list[index]
-        bucket["cnt"] = cnt
-        if key not in bucket:
-            bucket[key] = value
+    def _get_gauge_value(self, metric: Metric, diff: int) -> float:
+        self._check_metric(metric)
+        assert diff <= self._max_interval, ValueError(f"diff must <={self._max_interval}")
+        slot: int = self._get_slot(metric)
+        now_second: int = self._get_now_second()
+        bucket_len: int = self._gauge_bucket_len
+        offset: int = slot * bucket_len
+        bucket_array: array = self._gauge_bucket_array
+        if diff != metric.diff:
+            return sum(bucket_array[offset + second % bucket_len] for second in range(now_second - diff, now_second))
+
+        window_second: int = self._gauge_window_second_array[slot]
+        if window_second == now_second:
+            return self._gauge_window_value_array[slot]
+        move_second: int = now_second - window_second
+        if window_second < 0 or move_second >= diff or move_second + diff >= bucket_len:
+            # the window has moved too far(the buckets leaving the window may have been cleared), recalculate it
+            value: float = sum(
+                bucket_array[offset + second % bucket_len] for second in range(now_second - diff, now_second)
+            )
         else:
-            bucket[key] += value
+            # Incrementally update the window value by the seconds that enter and leave the window
+            value = self._gauge_window_value_array[slot]
+            for second in range(window_second, now_second):
+                value += bucket_array[offset + second % bucket_len]
+                value -= bucket_array[offset + (second - diff) % bucket_len]
+        self._gauge_window_value_array[slot] = value
+        self._gauge_window_second_array[slot] = now_second
+        return value
 
     def set_gauge_value(self, key: str, expire: float, diff: int = 1, value: float = 1) -> None:
         cache_key: str = Gauge.gen_metric_cache_name(key)
         if cache_key not in self._metric_cache:
             self.registry_metric(Gauge(key, diff=diff), expire)
-        self._set_gauge_value(Gauge.gen_metric_name(key), value)
+        self._set_gauge_value(self._metric_cache.get(cache_key), value)
 
     def get_gauge_value(self, key: str, diff: int = 0) -> float:
-        cache_key: str = Gauge.gen_metric_cache_name(key)
-        assert cache_key in self._metric_cache, KeyError(key)
-        assert diff <= self._max_interval, ValueError(f"diff must <={self._max_interval}")
-        cnt, index = self._get_now_info()
-        value: float = 0.0
-        for i in range(diff):
-            bucket: dict = self._gauge_bucket_list[index - i - 1]
-            if bucket["cnt"] < cnt:
-                continue
-            value += bucket.get(Gauge.gen_metric_name(key), 0.0)
-        return value
+        return self._get_gauge_value(self._get_metric(Gauge.gen_metric_cache_name(key)), diff)
 
     ################
     # count metric #
     ################
-    def _set_counter_value(self, key: str, value: float, is_cover: bool = True) -> None:
-        assert value > 0, ValueError("counter value must > 0")
+    def _set_counter_value(self, metric: Metric, value: float, is_cover: bool = True) -> None:
+        slot: int = self._get_slot(metric)
+        now_second: int = int(time.time()) - self._start_timestamp
         if is_cover:
-            self._metric_cache.add(key, self._max_interval + 5, value)
+            assert value >= 0, ValueError("counter value must >= 0")
+            self._counter_value_array[slot] = value
+        elif now_second - self._counter_second_array[slot] > self._counter_expire:
+            # The counter value has expired
+            self._counter_value_array[slot] = value
         else:
-            self._metric_cache.add(key, self._max_interval + 5, self.get_counter_value(key) + value)
+            self._counter_value_array[slot] += value
+        self._counter_second_array[slot] = now_second
+
+    def _get_counter_value(self, metric: Metric) -> float:
+        self._check_metric(metric)
+        slot: int = self._get_slot(metric)
+        if int(time.time()) - self._start_timestamp - self._counter_second_array[slot] > self._counter_expire:
+            return 0.0
+        return self._counter_value_array[slot]
 
     def set_counter_value(self, key: str, expire: float, value: float = 1, is_cover: bool = True) -> None:
         cache_key: str = Counter.gen_metric_cache_name(key)
         if cache_key not in self._metric_cache:
             self.registry_metric(Counter(key), expire)
-        self._set_counter_value(Counter.gen_metric_name(key), value, is_cover=is_cover)
+        self._set_counter_value(self._metric_cache.get(cache_key), value, is_cover=is_cover)
 
     def get_counter_value(self, key: str) -> float:
-        key = Counter.gen_metric_name(key)
-        assert key in self._metric_cache, KeyError(key)
-        return self._metric_cache.get(key, 0.0)
+        return self._get_counter_value(self._get_metric(Counter.gen_metric_cache_name(key)))
 
     #######################
     # statistics callback #
@@ -245,6 +655,10 @@ class WindowStatistics(object):
         for key, metric in self._metric_cache.items():
             if isinstance(metric, Metric):
                 self.statistics_dict[metric.name] = metric.get_value()
+        # reclaim the slot of the expired metric
+        for slot, metric in enumerate(self._slot_metric_list):
+            if metric and metric.metric_cache_name not in self._metric_cache:
+                self._free_slot(slot)
 
         async def _safe_run_callback(fn: Callable, dict_param: Dict) -> None:
             if asyncio.iscoroutinefunction(fn):
@@ -348,13 +762,42 @@ class ThreadWindowStatistics(WindowStatistics):
             statistics_callback_wait_cnt=statistics_callback_wait_cnt,
             metric_cache=metric_cache,
         )
-        self._gauge_look: Lock = Lock()
-        self._counter_look: Lock = Lock()
+        # The ring buffer is shared by all metrics and grows when a metric is registered(also in `_get_slot`),
+        #  so the read and write of the metrics use the same reentrant lock
+        self._lock: RLock = RLock()
+
+    def registry_metric(self, metric: Metric, expire: Optional[float] = None) -> None:
+        with self._lock:
+            super().registry_metric(metric, expire)
+
+    def drop_metric(self, key: str) -> None:
+        with self._lock:
+            super().drop_metric(key)
+
+    def _free_slot(self, slot: int) -> None:
+        with self._lock:
+            super()._free_slot(slot)
+
+    def _get_now_second(self) -> int:
+        with self._lock:
+            return super()._get_now_second()
+
+    def _get_slot(self, metric: Metric) -> int:
+        with self._lock:
+            return super()._get_slot(metric)
+
+    def _set_counter_value(self, metric: Metric, value: float, is_cover: bool = True) -> None:
+        with self._lock:
+            super()._set_counter_value(metric, value, is_cover)
+
+    def _get_counter_value(self, metric: Metric) -> float:
+        with self._lock:
+            return super()._get_counter_value(metric)
 
-    def _set_counter_value(self, key: str, value: float, is_cover: bool = True) -> None:
-        with self._counter_look:
-            super()._set_counter_value(key, value, is_cover)
+    def _set_gauge_value(self, metric: Metric, value: float = 1) -> None:
+        with self._lock:
+            super()._set_gauge_value(metric, value)
 
-    def _set_gauge_value(self, key: str, value: float = 1) -> None:
-        with self._gauge_look:
-            super(ThreadWindowStatistics, self)._set_gauge_value(key, value)
+    def _get_gauge_value(self, metric: Metric, diff: int) -> float:
+        with self._lock:
+            return super()._get_gauge_value(metric, diff)
@@ -3,7 +3,7 @@ import logging
 import random
 import ssl
 import time
-from typing import Any, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Optional, Tuple
 
 import msgpack
 
@@ -12,6 +12,9 @@ from rap.common.state import State
 from rap.common.types import READER_TYPE, UNPACKER_TYPE, WRITER_TYPE
 from rap.common.utils import constant
 
+if TYPE_CHECKING:
+    from rap.common.collect_statistics import StageTimer
+
 __all__ = ["Connection", "ServerConnection", "CloseConnException"]
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -32,6 +35,9 @@ class BaseConnection:
         if "use_list" not in self._unpack_param:
             self._unpack_param["use_list"] = False
         self._unpacker: UNPACKER_TYPE = msgpack.Unpacker(**self._unpack_param)
+        self._read_offset: int = 0
+        # The size(bytes) of the last msg read from the conn
+        self.last_read_size: int = 0
         self._reader: Optional[READER_TYPE] = None
         self._writer: Optional[WRITER_TYPE] = None
         self._max_msg_id: int = 65535
@@ -52,12 +58,28 @@ class BaseConnection:
         except asyncio.TimeoutError:
             pass
 
-    async def write(self, data: tuple) -> None:
+    async def write(self, data: tuple, stage_timer: Optional["StageTimer"] = None) -> None:
+        """
+        :param data: msg
+        :param stage_timer: If not None, mark the `encode` and `drain` stages
+        """
         if not self._writer or self._is_closed:
             raise ConnectionError("connection has not been created")
         logger.debug("write %s to %s", data, self.peer_tuple)
-        self._writer.write(msgpack.packb(data, **self._pack_param))
-        await self._writer.drain()
+        if stage_timer is None:
+            self._writer.write(msgpack.packb(data, **self._pack_param))
+            await self._writer.drain()
+        else:
+            buf: bytes = msgpack.packb(data, **self._pack_param)
+            stage_timer.mark("encode")
+            self._writer.write(buf)
+            await self._writer.drain()
+            stage_timer.mark("drain")
+
+    def _update_read_size(self) -> None:
+        read_offset: int = self._unpacker.tell()
+        self.last_read_size = read_offset - self._read_offset
+        self._read_offset = read_offset
 
     async def read(self) -> Any:
         if not self._reader or self._is_closed:
@@ -65,6 +87,7 @@ class BaseConnection:
         try:
             try:
                 data: Any = next(self._unpacker)
+                self._update_read_size()
                 logger.debug("read %s from %s", data, self.peer_tuple)
                 return data
             except StopIteration:
@@ -77,6 +100,7 @@ class BaseConnection:
                 self._unpacker.feed(data)
                 try:
                     data = next(self._unpacker)
+                    self._update_read_size()
                     logger.debug("read %s from %s", data, self.peer_tuple)
                     return data
                 except StopIteration:
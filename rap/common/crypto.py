@@ -3,15 +3,28 @@ try:
 except ModuleNotFoundError:
     import json as _json  # type: ignore
 
+import os
 from binascii import a2b_hex, b2a_hex
-from typing import Any
+from typing import Any, Dict, Optional, Type
 
+import msgpack
 from Crypto.Cipher import AES
 
+AESGCM: Optional[Type[Any]]
+try:
+    # The AESGCM of cryptography keeps the key schedule, it is much faster than creating a new pycryptodome cipher
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM  # type: ignore
+except ModuleNotFoundError:
+    AESGCM = None
+
+__all__ = ["Crypto", "GcmCrypto", "get_crypto_class"]
+
 
 class Crypto(object):
     """Use aes encryption"""
 
+    mode: str = "cbc"
+
     def __init__(self, key: str):
         if len(key) != 16:
             raise ValueError(f"The length of the key must be 16, key content:{key}")
@@ -21,18 +34,19 @@ class Crypto(object):
 
     def encrypt(self, raw_data: str) -> bytes:
         """encrypt str to bytes"""
-        new_crypto: "AES.AESCipher" = AES.new(self.key, self._mode, self.key)
-        count: int = len(raw_data)
+        new_crypto: "AES.AESCipher" = AES.new(self.key.encode(), self._mode, self.key.encode())
+        raw_byte: bytes = raw_data.encode()
+        count: int = len(raw_byte)
         salt: int = 0
         if count % self._length != 0:
             salt = self._length - (count % self._length)
-        raw_data = raw_data + ("\0" * salt)
-        encrypt_str: bytes = new_crypto.encrypt(raw_data)
+        raw_byte = raw_byte + (b"\0" * salt)
+        encrypt_str: bytes = new_crypto.encrypt(raw_byte)
         return b2a_hex(encrypt_str)
 
     def decrypt(self, raw_byte: bytes) -> str:
         """decrypt bytes to str"""
-        new_crypto: "AES.AESCipher" = AES.new(self.key, self._mode, self.key)
+        new_crypto: "AES.AESCipher" = AES.new(self.key.encode(), self._mode, self.key.encode())
         decrypt_pt: str = new_crypto.decrypt(a2b_hex(raw_byte)).decode()
         return decrypt_pt.rstrip("\0")
 
@@ -41,3 +55,82 @@ class Crypto(object):
 
     def decrypt_object(self, raw_byte: bytes) -> Any:
         return _json.loads(self.decrypt(raw_byte))
+
+
+class GcmCrypto(Crypto):
+    """Use aes-gcm encryption, the object is encoded by msgpack, and the encrypted data is binary(not hex).
+
+    The encrypted data is `nonce(12 bytes) + cipher text + tag(16 bytes)`, each message uses a random nonce,
+     and the tag is verified when decrypting, so the tampered message can not be decrypted.
+    If `cryptography` is installed(extra `crypto-fast`), its AESGCM(reuse the key schedule) is used,
+     otherwise use pycryptodome(extra `crypto`), the encrypted data of them is the same.
+    """
+
+    mode: str = "gcm"
+    _nonce_length: int = 12
+    _tag_length: int = 16
+
+    def __init__(self, key: str):
+        check_gcm_support()
+        super(GcmCrypto, self).__init__(key)
+        self._key_bytes: bytes = key.encode()
+        self._mode = AES.MODE_GCM
+        self._aes_gcm: Optional[Any] = AESGCM(self._key_bytes) if AESGCM is not None else None
+
+    def encrypt_bytes(self, raw_data: bytes) -> bytes:
+        nonce: bytes = os.urandom(self._nonce_length)
+        if self._aes_gcm is not None:
+            # The result of cryptography is `cipher text + tag`
+            return nonce + self._aes_gcm.encrypt(nonce, raw_data, None)
+        cipher: Any = AES.new(self._key_bytes, self._mode, nonce=nonce)  # type: ignore
+        cipher_text, tag = cipher.encrypt_and_digest(raw_data)
+        return nonce + cipher_text + tag
+
+    def decrypt_bytes(self, raw_byte: bytes) -> bytes:
+        if len(raw_byte) < self._nonce_length + self._tag_length:
+            raise ValueError("The length of the encrypted data is too short")
+        nonce: bytes = raw_byte[: self._nonce_length]
+        if self._aes_gcm is not None:
+            try:
+                return self._aes_gcm.decrypt(nonce, raw_byte[self._nonce_length :], None)
+            except Exception as e:
+                raise ValueError("MAC check failed") from e
+        return AES.new(self._key_bytes, self._mode, nonce=nonce).decrypt_and_verify(  # type: ignore
+            raw_byte[self._nonce_length : -self._tag_length], raw_byte[-self._tag_length :]
+        )
+
+    def encrypt(self, raw_data: str) -> bytes:
+        """encrypt str to bytes"""
+        return self.encrypt_bytes(raw_data.encode())
+
+    def decrypt(self, raw_byte: bytes) -> str:
+        """decrypt bytes to str"""
+        return self.decrypt_bytes(raw_byte).decode()
+
+    def encrypt_object(self, _object: Any) -> bytes:
+        return self.encrypt_bytes(msgpack.packb(_object))
+
+    def decrypt_object(self, raw_byte: bytes) -> Any:
+        return msgpack.unpackb(self.decrypt_bytes(raw_byte))
+
+
+def check_gcm_support() -> None:
+    """The `Crypto` module of pycrypto has no aes-gcm, only pycryptodome(or cryptography) supports it"""
+    if AESGCM is None and not hasattr(AES, "MODE_GCM"):
+        raise ImportError(
+            "Crypto mode gcm requires pycryptodome or cryptography, please install `rap[crypto]` instead of pycrypto"
+        )
+
+
+_crypto_class_dict: Dict[str, Type[Crypto]] = {crypto_class.mode: crypto_class for crypto_class in (Crypto, GcmCrypto)}
+
+
+def get_crypto_class(mode: str) -> Type[Crypto]:
+    """get crypto class by mode name(cbc or gcm)"""
+    try:
+        crypto_class: Type[Crypto] = _crypto_class_dict[mode]
+    except KeyError:
+        raise ValueError(f"Not support crypto mode:{mode}")
+    if crypto_class is GcmCrypto:
+        check_gcm_support()
+    return crypto_class
@@ -73,5 +73,10 @@ class ChannelError(BaseRapError):
     message: str = "Channel Error"
 
 
+class OverloadError(BaseRapError):
+    status_code: int = 509
+    message: str = "Server overload, please try again later"
+
+
 class IgnoreNextProcessor(Exception):
     pass
@@ -0,0 +1,201 @@
+import asyncio
+import gc
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from rap.common.asyncio_helper import get_event_loop
+from rap.common.collect_statistics import Gauge, HistogramStore, WindowStatistics
+
+__all__ = ["GCController"]
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class GCController(object):
+    """Reduce and observe the pause of the garbage collector.
+
+    - freeze: After the startup hooks, collect once and move all the surviving objects(modules, funcs, caches...)
+       to the permanent generation by `gc.freeze`, so the full collection no longer traverses them.
+    - pause: Record the pause of each collection by `gc.callbacks` into the histogram of its generation,
+       and publish the collection count and the pause(ms) of each generation to `WindowStatistics`.
+    - threshold: Set the threshold of `gc.set_threshold`, and if `auto_tune` is True, adjust the threshold of the
+       generation 0 every `interval`: halve it when the pause exceeds `max_pause`, double it when the
+       collections are more frequent than `max_collect_per_second`.
+
+    Note: gc is process-wide, only one controller should be started in a process.
+    """
+
+    group: str = "gc"
+
+    def __init__(
+        self,
+        freeze: bool = True,
+        threshold: Optional[Tuple[int, int, int]] = None,
+        auto_tune: bool = False,
+        max_pause: float = 0.005,
+        max_collect_per_second: float = 10,
+        min_threshold: int = 700,
+        max_threshold: int = 100000,
+        interval: float = 1.0,
+        window: float = 60,
+        diff: int = 10,
+        prefix: str = "gc",
+    ) -> None:
+        """
+        :param freeze: Whether to freeze the objects after the startup hooks(only support python 3.7+)
+        :param threshold: The threshold of `gc.set_threshold`, if None, use the current threshold
+        :param auto_tune: Whether to adjust the threshold of the generation 0 automatically
+        :param max_pause: The maximum pause(seconds) of the generation 0 collection in an interval
+        :param max_collect_per_second: The maximum number of the generation 0 collections per second
+        :param min_threshold: The minimum threshold of the generation 0 when auto tuning
+        :param max_threshold: The maximum threshold of the generation 0 when auto tuning
+        :param interval: The interval(seconds) to publish the metrics and tune the threshold
+        :param window: The window time(seconds) of the pause histogram
+        :param diff: how many windows are a time period for the metrics
+        :param prefix: metric name prefix
+        """
+        if auto_tune and min_threshold > max_threshold:
+            raise ValueError("min_threshold must <= max_threshold")
+        self._freeze: bool = freeze
+        self._threshold: Optional[Tuple[int, int, int]] = threshold
+        self._auto_tune: bool = auto_tune
+        self._max_pause: float = max_pause
+        self._max_collect_per_second: float = max_collect_per_second
+        self._min_threshold: int = min_threshold
+        self._max_threshold: int = max_threshold
+        self._interval: float = interval
+
+        self._origin_threshold: Optional[Tuple[int, int, int]] = None
+        self._is_freeze: bool = False
+        # The collection before freezing is a startup cost, not recorded as the pause
+        self._is_freezing: bool = False
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._window_statistics: Optional[WindowStatistics] = None
+        self._collect_start_time: float = 0.0
+        # The collection count and pause at the last interval, and the maximum pause of the generation 0 in the interval
+        self._last_collect_cnt_list: List[int] = [0, 0, 0]
+        self._last_pause_list: List[float] = [0.0, 0.0, 0.0]
+        self._interval_max_pause: float = 0.0
+
+        self.histogram_store: HistogramStore = HistogramStore(window=window)
+        self.collect_cnt_list: List[int] = [0, 0, 0]
+        self.pause_list: List[float] = [0.0, 0.0, 0.0]
+        self.collected_cnt: int = 0
+        self.freeze_cnt: int = 0
+        self.collect_cnt_gauge_list: List[Gauge] = [
+            Gauge(f"{prefix}_gen{generation}_collect_cnt", diff=diff) for generation in range(3)
+        ]
+        self.pause_gauge_list: List[Gauge] = [
+            Gauge(f"{prefix}_gen{generation}_pause", diff=diff) for generation in range(3)
+        ]
+
+    @property
+    def is_running(self) -> bool:
+        return self._handle is not None
+
+    ##############
+    # life cycle #
+    ##############
+    def start(self, window_statistics: Optional[WindowStatistics] = None) -> None:
+        """Set the threshold, and start recording the pause of the collections
+        :param window_statistics: publish the metrics to it, if None, only update the attributes of the controller
+        """
+        if self._handle is not None:
+            return
+        if window_statistics is not None:
+            for metric in (*self.collect_cnt_gauge_list, *self.pause_gauge_list):
+                window_statistics.registry_metric(metric)
+        self._window_statistics = window_statistics
+        self._origin_threshold = gc.get_threshold()
+        if self._threshold:
+            gc.set_threshold(*self._threshold)
+        gc.callbacks.append(self._gc_callback)
+        self._handle = get_event_loop().call_later(self._interval, self._run)
+
+    def freeze(self) -> None:
+        """Called after the startup hooks, move the surviving objects to the permanent generation"""
+        if not self._freeze or self._is_freeze or not hasattr(gc, "freeze"):
+            return
+        self._is_freezing = True
+        try:
+            gc.collect()
+        finally:
+            self._is_freezing = False
+        gc.freeze()
+        self._is_freeze = True
+        self.freeze_cnt = gc.get_freeze_count()
+        logger.info(f"gc freeze {self.freeze_cnt} objects")
+
+    def stop(self) -> None:
+        """Stop recording and restore the threshold, the frozen objects are moved back to the oldest generation"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._gc_callback in gc.callbacks:
+            gc.callbacks.remove(self._gc_callback)
+        if self._origin_threshold:
+            gc.set_threshold(*self._origin_threshold)
+            self._origin_threshold = None
+        if self._is_freeze:
+            gc.unfreeze()
+            self._is_freeze = False
+
+    #########
+    # pause #
+    #########
+    def _gc_callback(self, phase: str, info: Dict[str, int]) -> None:
+        if self._is_freezing:
+            return
+        if phase == "start":
+            self._collect_start_time = time.perf_counter()
+            return
+        pause: float = time.perf_counter() - self._collect_start_time
+        generation: int = info["generation"]
+        self.histogram_store.observe(self.group, f"gen{generation}", pause)
+        self.collect_cnt_list[generation] += 1
+        self.pause_list[generation] += pause
+        self.collected_cnt += info["collected"]
+        if generation == 0 and pause > self._interval_max_pause:
+            self._interval_max_pause = pause
+
+    def _run(self) -> None:
+        collect_cnt_list: List[int] = self.collect_cnt_list.copy()
+        pause_list: List[float] = self.pause_list.copy()
+        if self._window_statistics is not None:
+            for generation in range(3):
+                collect_cnt: int = collect_cnt_list[generation] - self._last_collect_cnt_list[generation]
+                if collect_cnt:
+                    self.collect_cnt_gauge_list[generation].increment(collect_cnt)
+                    self.pause_gauge_list[generation].increment(
+                        (pause_list[generation] - self._last_pause_list[generation]) * 1000
+                    )
+        if self._auto_tune:
+            self._tune((collect_cnt_list[0] - self._last_collect_cnt_list[0]) / self._interval)
+        self._last_collect_cnt_list = collect_cnt_list
+        self._last_pause_list = pause_list
+        self._interval_max_pause = 0.0
+        self._handle = get_event_loop().call_later(self._interval, self._run)
+
+    #############
+    # threshold #
+    #############
+    def _tune(self, collect_per_second: float) -> None:
+        threshold0, threshold1, threshold2 = gc.get_threshold()
+        new_threshold0: int = threshold0
+        if self._interval_max_pause > self._max_pause:
+            new_threshold0 = max(threshold0 // 2, self._min_threshold)
+        elif collect_per_second > self._max_collect_per_second:
+            new_threshold0 = min(threshold0 * 2, self._max_threshold)
+        if new_threshold0 != threshold0:
+            logger.debug(f"gc threshold0 {threshold0} -> {new_threshold0}")
+            gc.set_threshold(new_threshold0, threshold1, threshold2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """return the threshold, the collection count, the pause(ms) histogram of each generation"""
+        return {
+            "threshold": gc.get_threshold(),
+            "freeze_cnt": self.freeze_cnt,
+            "collected_cnt": self.collected_cnt,
+            "collect_cnt": self.collect_cnt_list,
+            "pause": self.histogram_store.to_dict(self.group)[self.group],
+        }
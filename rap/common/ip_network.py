@@ -0,0 +1,125 @@
+import ipaddress
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+__all__ = ["IpNetworkSet", "normalize_ip_network"]
+
+_IpAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+_IpNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def normalize_ip_network(ip: str) -> str:
+    """Normalize the ip or the network(the host bits are ignored), the value that is not ip(e.g. localhost) is returned
+
+    >>> normalize_ip_network('192.168.0.1/16')
+    '192.168.0.0/16'
+    >>> normalize_ip_network('192.168.0.1')
+    '192.168.0.1'
+    """
+    try:
+        ip_network: _IpNetwork = ipaddress.ip_network(ip, strict=False)
+    except ValueError:
+        return ip
+    if ip_network.prefixlen == ip_network.max_prefixlen:
+        return str(ip_network.network_address)
+    return str(ip_network)
+
+
+class IpNetworkSet(object):
+    """The set of ip networks(IPv4 and IPv6), check whether an ip is in any network without expanding the network.
+
+    The networks are stored in the prefix tables of each prefix length(like a level-compressed prefix trie,
+     each level is a hash table), the lookup only checks the prefix lengths in use, O(the number of the lengths).
+    The value that is not ip(e.g. localhost) is matched exactly.
+    """
+
+    def __init__(self, ip_list: Optional[Iterable[str]] = None) -> None:
+        # version -> prefix length -> network prefix(the network address int shifted right by the host bits)
+        self._prefix_dict: Dict[int, Dict[int, Set[int]]] = {4: {}, 6: {}}
+        # version -> (prefix length, host bits) list, sorted by prefix length
+        self._prefix_len_dict: Dict[int, List[Tuple[int, int]]] = {4: [], 6: []}
+        self._name_set: Set[str] = set()
+        self._network_set: Set[str] = set()
+        for ip in ip_list or []:
+            self.add(ip)
+
+    @staticmethod
+    def _parse(ip: str) -> Optional[_IpNetwork]:
+        try:
+            return ipaddress.ip_network(ip, strict=False)
+        except ValueError:
+            return None
+
+    def _reload_prefix_len(self, version: int) -> None:
+        max_prefix_len: int = 32 if version == 4 else 128
+        self._prefix_len_dict[version] = [
+            (prefix_len, max_prefix_len - prefix_len) for prefix_len in sorted(self._prefix_dict[version].keys())
+        ]
+
+    def add(self, ip: str) -> None:
+        ip = normalize_ip_network(ip)
+        if ip in self._network_set:
+            return
+        self._network_set.add(ip)
+        ip_network: Optional[_IpNetwork] = self._parse(ip)
+        if ip_network is None:
+            self._name_set.add(ip)
+            return
+        prefix_dict: Dict[int, Set[int]] = self._prefix_dict[ip_network.version]
+        if ip_network.prefixlen not in prefix_dict:
+            prefix_dict[ip_network.prefixlen] = set()
+            self._reload_prefix_len(ip_network.version)
+        prefix_dict[ip_network.prefixlen].add(self._get_prefix(ip_network))
+
+    def remove(self, ip: str) -> None:
+        ip = normalize_ip_network(ip)
+        if ip not in self._network_set:
+            return
+        self._network_set.remove(ip)
+        ip_network: Optional[_IpNetwork] = self._parse(ip)
+        if ip_network is None:
+            self._name_set.discard(ip)
+            return
+        prefix_dict: Dict[int, Set[int]] = self._prefix_dict[ip_network.version]
+        prefix_set: Set[int] = prefix_dict[ip_network.prefixlen]
+        prefix_set.discard(self._get_prefix(ip_network))
+        if not prefix_set:
+            del prefix_dict[ip_network.prefixlen]
+            self._reload_prefix_len(ip_network.version)
+
+    def clear(self) -> None:
+        for version in (4, 6):
+            self._prefix_dict[version].clear()
+            self._prefix_len_dict[version] = []
+        self._name_set.clear()
+        self._network_set.clear()
+
+    @staticmethod
+    def _get_prefix(ip_network: _IpNetwork) -> int:
+        return int(ip_network.network_address) >> (ip_network.max_prefixlen - ip_network.prefixlen)
+
+    def __contains__(self, ip: str) -> bool:
+        if ip in self._name_set:
+            return True
+        try:
+            ip_address: _IpAddress = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        if ip_address.version == 6 and ip_address.ipv4_mapped is not None:  # type: ignore
+            # e.g. ::ffff:127.0.0.1
+            if self._contains(6, int(ip_address)):
+                return True
+            ip_address = ip_address.ipv4_mapped  # type: ignore
+        return self._contains(ip_address.version, int(ip_address))
+
+    def _contains(self, version: int, ip_int: int) -> bool:
+        prefix_dict: Dict[int, Set[int]] = self._prefix_dict[version]
+        for prefix_len, host_bits in self._prefix_len_dict[version]:
+            if (ip_int >> host_bits) in prefix_dict[prefix_len]:
+                return True
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._network_set))
+
+    def __len__(self) -> int:
+        return len(self._network_set)
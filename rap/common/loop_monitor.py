@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional
+
+from rap.common.asyncio_helper import current_task, get_event_loop
+from rap.common.collect_statistics import Counter, Gauge, LogLinearHistogram, WindowLogLinearHistogram, WindowStatistics
+
+__all__ = ["LoopMonitor"]
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class LoopMonitor(object):
+    """Monitor the health of the event loop.
+
+    The scheduling lag is measured by a periodic timer(`loop.call_at`): the difference between the time the timer
+     is expected to run and the time it actually runs. The lag is recorded into a sliding window histogram, and the
+     lag percentiles(ms) in the window and the number of the asyncio tasks are published to `WindowStatistics`
+     as metrics.
+
+    If `slow_callback_time` is set, a watchdog thread checks whether the timer is overdue by more than
+     `slow_callback_time`, which means a callback is blocking the event loop, and captures the stack of the event loop
+     thread and the running task. Unlike the asyncio debug mode, it does not time each callback, the cost of the
+     event loop is only the periodic timer.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        publish_interval: float = 1.0,
+        slow_callback_time: Optional[float] = 0.1,
+        max_slow_callback_cnt: int = 32,
+        max_stack_depth: int = 32,
+        window: float = 60,
+        diff: int = 10,
+        prefix: str = "loop",
+    ) -> None:
+        """
+        :param interval: The interval(seconds) of the lag timer
+        :param publish_interval: The interval(seconds) to publish the lag percentiles and the task count to metrics
+        :param slow_callback_time: Capture the callback that blocks the event loop longer than this value(seconds),
+          if None, do not start the watchdog thread
+        :param max_slow_callback_cnt: The maximum number of the captured slow callbacks, the earliest one is dropped
+        :param max_stack_depth: The maximum depth of the captured stack
+        :param window: The window time(seconds) of the lag histogram
+        :param diff: how many windows are a time period for the slow callback count metric
+        :param prefix: metric name prefix
+        """
+        self._interval: float = interval
+        self._publish_interval: float = publish_interval
+        self._slow_callback_time: Optional[float] = slow_callback_time
+        self._max_stack_depth: int = max_stack_depth
+        self._histogram: WindowLogLinearHistogram = WindowLogLinearHistogram(window=window)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._expected_time: float = 0.0
+        self._publish_time: float = 0.0
+        self._watchdog_thread: Optional[threading.Thread] = None
+        self._watchdog_stop_event: threading.Event = threading.Event()
+        # The slow callback captured by the watchdog thread, its duration is updated when the timer runs
+        self._slow_callback: Optional[Dict[str, Any]] = None
+        self._window_statistics: Optional[WindowStatistics] = None
+
+        self.lag: float = 0.0
+        self.lag_p50: float = 0.0
+        self.lag_p99: float = 0.0
+        self.lag_max: float = 0.0
+        self.task_cnt: int = 0
+        self.slow_callback_cnt: int = 0
+        self.slow_callback_deque: Deque[Dict[str, Any]] = deque(maxlen=max_slow_callback_cnt)
+
+        self.lag_p50_counter: Counter = Counter(f"{prefix}_lag_p50")
+        self.lag_p99_counter: Counter = Counter(f"{prefix}_lag_p99")
+        self.lag_max_counter: Counter = Counter(f"{prefix}_lag_max")
+        self.task_cnt_counter: Counter = Counter(f"{prefix}_task_cnt")
+        self.slow_callback_cnt_gauge: Gauge = Gauge(f"{prefix}_slow_callback_cnt", diff=diff)
+
+    @property
+    def is_running(self) -> bool:
+        return self._handle is not None
+
+    ##############
+    # life cycle #
+    ##############
+    def start(self, window_statistics: Optional[WindowStatistics] = None) -> None:
+        """start monitoring the running event loop
+        :param window_statistics: publish the metrics to it, if None, only update the attributes of the monitor
+        """
+        if self._handle is not None:
+            return
+        if window_statistics is not None:
+            for metric in (
+                self.lag_p50_counter,
+                self.lag_p99_counter,
+                self.lag_max_counter,
+                self.task_cnt_counter,
+                self.slow_callback_cnt_gauge,
+            ):
+                window_statistics.registry_metric(metric)
+        self._window_statistics = window_statistics
+        self._loop = get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._publish_time = self._loop.time()
+        self._expected_time = self._publish_time + self._interval
+        self._handle = self._loop.call_at(self._expected_time, self._check_lag)
+        if self._slow_callback_time is not None:
+            self._watchdog_stop_event.clear()
+            self._watchdog_thread = threading.Thread(
+                target=self._watch, name=f"{self.__class__.__name__}Watchdog", daemon=True
+            )
+            self._watchdog_thread.start()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._watchdog_thread is not None:
+            self._watchdog_stop_event.set()
+            self._watchdog_thread.join()
+            self._watchdog_thread = None
+
+    #######
+    # lag #
+    #######
+    def _check_lag(self) -> None:
+        loop: asyncio.AbstractEventLoop = self._loop  # type: ignore
+        now: float = loop.time()
+        lag: float = max(now - self._expected_time, 0.0)
+        # Update the expected time first, so the watchdog thread does not capture the finished blocking again
+        self._expected_time = now + self._interval
+        self.lag = lag
+        self._histogram.record(int(lag * 1000000))
+        slow_callback: Optional[Dict[str, Any]] = self._slow_callback
+        if slow_callback is not None:
+            self._slow_callback = None
+            slow_callback["duration"] = lag
+        if self._slow_callback_time is not None and lag >= self._slow_callback_time:
+            self.slow_callback_cnt += 1
+            if self._window_statistics is not None:
+                self.slow_callback_cnt_gauge.increment()
+        if now - self._publish_time >= self._publish_interval:
+            self._publish(now)
+        self._handle = loop.call_at(self._expected_time, self._check_lag)
+
+    def _publish(self, now: float) -> None:
+        self._publish_time = now
+        histogram: LogLinearHistogram = self._histogram.snapshot()
+        p50, p99 = histogram.get_percentile_list((50, 99))
+        self.lag_p50 = p50 / 1000000
+        self.lag_p99 = p99 / 1000000
+        self.lag_max = histogram.max / 1000000
+        self.task_cnt = len(asyncio.all_tasks(self._loop))
+        if self._window_statistics is not None:
+            self.lag_p50_counter.set_value(self.lag_p50 * 1000)
+            self.lag_p99_counter.set_value(self.lag_p99 * 1000)
+            self.lag_max_counter.set_value(self.lag_max * 1000)
+            self.task_cnt_counter.set_value(self.task_cnt)
+
+    #################
+    # slow callback #
+    #################
+    def _get_stack(self, frame: Optional[FrameType]) -> List[str]:
+        stack: List[str] = []
+        while frame is not None and len(stack) < self._max_stack_depth:
+            stack.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _capture_slow_callback(self, duration: float) -> None:
+        task: Optional[asyncio.Task] = current_task(self._loop)
+        task_name: Optional[str] = None
+        if task is not None:
+            coro: Any = task._coro  # type: ignore
+            task_name = getattr(coro, "__qualname__", repr(coro))
+        slow_callback: Dict[str, Any] = {
+            "timestamp": time.time(),
+            "duration": duration,
+            "task": task_name,
+            "stack": self._get_stack(sys._current_frames().get(self._loop_thread_id)),  # type: ignore
+        }
+        self._slow_callback = slow_callback
+        self.slow_callback_deque.append(slow_callback)
+        logger.warning(f"event loop is blocked for {duration:.3f}s, task:{task_name}")
+
+    def _watch(self) -> None:
+        slow_callback_time: float = self._slow_callback_time  # type: ignore
+        loop: asyncio.AbstractEventLoop = self._loop  # type: ignore
+        while not self._watchdog_stop_event.wait(slow_callback_time / 2):
+            # Only capture once per blocking, the timer resets it
+            if self._slow_callback is not None:
+                continue
+            duration: float = loop.time() - self._expected_time
+            if duration < slow_callback_time:
+                continue
+            try:
+                self._capture_slow_callback(duration)
+            except Exception as e:
+                logger.debug(f"capture slow callback error:{e}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """return the lag(ms) stats, the task count and the captured slow callbacks(the duration unit is second)"""
+        return {
+            "lag": self.lag * 1000,
+            "lag_p50": self.lag_p50 * 1000,
+            "lag_p99": self.lag_p99 * 1000,
+            "lag_max": self.lag_max * 1000,
+            "task_cnt": self.task_cnt,
+            "slow_callback_cnt": self.slow_callback_cnt,
+            "slow_callback_list": list(self.slow_callback_deque),
+        }
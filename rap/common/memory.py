@@ -0,0 +1,140 @@
+import gc
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+
+__all__ = ["MemoryTracer", "get_object_cnt_dict"]
+
+STAT_TYPE = Dict[str, Union[str, int, List[str]]]
+
+
+def get_object_cnt_dict(module_prefix: str = "rap.", top_n: int = 20) -> Dict[str, int]:
+    """Count the alive objects(tracked by gc) whose class is defined in the module, e.g. `Request`, `Channel`.
+    Note: It traverses all objects tracked by gc, only used to diagnose"""
+    cnt_dict: Dict[str, int] = {}
+    for obj in gc.get_objects():
+        cls: type = type(obj)
+        # The `__module__` of some classes is a descriptor, e.g. the metaclass
+        module: Any = getattr(cls, "__module__", None)
+        if isinstance(module, str) and module.startswith(module_prefix):
+            name: str = f"{module}.{cls.__qualname__}"
+            cnt_dict[name] = cnt_dict.get(name, 0) + 1
+    return dict(sorted(cnt_dict.items(), key=lambda item: item[1], reverse=True)[:top_n])
+
+
+class MemoryTracer(object):
+    """Trace the memory allocation by `tracemalloc`, take named snapshots and return the top allocation sites
+    or the diff between two snapshots, used to find the memory leak without restarting the process.
+
+    Note: tracemalloc slows down the allocation and uses extra memory, stop it after diagnosing
+    """
+
+    def __init__(self, max_snapshot_cnt: int = 8) -> None:
+        """
+        :param max_snapshot_cnt: The maximum number of the snapshots, the earliest taken one is dropped
+        """
+        self._max_snapshot_cnt: int = max_snapshot_cnt
+        self._snapshot_dict: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        # Only stop the tracemalloc started by self(e.g. not started by `PYTHONTRACEMALLOC`)
+        self._is_start_by_self: bool = False
+
+    def start(self, frame_cnt: int = 1) -> bool:
+        """start tracing, return False if it is already tracing
+        :param frame_cnt: The number of the frames of the traceback of the allocation
+        """
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frame_cnt)
+        self._is_start_by_self = True
+        return True
+
+    def stop(self) -> bool:
+        """stop tracing and clear the snapshots, return False if it is not started by self"""
+        self._snapshot_dict.clear()
+        if not self._is_start_by_self:
+            return False
+        self._is_start_by_self = False
+        tracemalloc.stop()
+        return True
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing, please start it first")
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+
+    def take_snapshot(self, name: str) -> Dict[str, int]:
+        """take the snapshot and save it by the name, return the total size and count of the traced memory"""
+        snapshot: tracemalloc.Snapshot = self._take_snapshot()
+        self._snapshot_dict.pop(name, None)
+        if len(self._snapshot_dict) >= self._max_snapshot_cnt:
+            self._snapshot_dict.popitem(last=False)
+        self._snapshot_dict[name] = snapshot
+        statistic_list: List[tracemalloc.Statistic] = snapshot.statistics("filename")
+        return {
+            "size": sum(statistic.size for statistic in statistic_list),
+            "count": sum(statistic.count for statistic in statistic_list),
+        }
+
+    def _get_snapshot(self, name: Optional[str]) -> tracemalloc.Snapshot:
+        if name is None:
+            return self._take_snapshot()
+        try:
+            return self._snapshot_dict[name]
+        except KeyError:
+            raise KeyError(f"Not found snapshot:{name}")
+
+    @staticmethod
+    def _format_traceback(traceback: tracemalloc.Traceback) -> List[str]:
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+    def top(self, name: Optional[str] = None, key_type: str = "lineno", top_n: int = 20) -> List[STAT_TYPE]:
+        """return the top N allocation sites of the snapshot
+        :param name: snapshot name, if None, take a temporary snapshot now
+        :param key_type: group the allocation by `filename`, `lineno` or `traceback`
+        :param top_n: The number of the allocation sites
+        """
+        return [
+            {
+                "traceback": self._format_traceback(statistic.traceback),
+                "size": statistic.size,
+                "count": statistic.count,
+            }
+            for statistic in self._get_snapshot(name).statistics(key_type)[:top_n]
+        ]
+
+    def diff(
+        self, old_name: str, new_name: Optional[str] = None, key_type: str = "lineno", top_n: int = 20
+    ) -> List[STAT_TYPE]:
+        """return the top N allocation sites sorted by the size growth from the old snapshot to the new snapshot
+        :param old_name: old snapshot name
+        :param new_name: new snapshot name, if None, take a temporary snapshot now
+        :param key_type: group the allocation by `filename`, `lineno` or `traceback`
+        :param top_n: The number of the allocation sites
+        """
+        old_snapshot: tracemalloc.Snapshot = self._get_snapshot(old_name)
+        return [
+            {
+                "traceback": self._format_traceback(statistic.traceback),
+                "size": statistic.size,
+                "size_diff": statistic.size_diff,
+                "count": statistic.count,
+                "count_diff": statistic.count_diff,
+            }
+            for statistic in self._get_snapshot(new_name).compare_to(old_snapshot, key_type)[:top_n]
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        current_size, peak_size = tracemalloc.get_traced_memory()
+        return {
+            "is_tracing": tracemalloc.is_tracing(),
+            "current_size": current_size,
+            "peak_size": peak_size,
+            "tracemalloc_size": tracemalloc.get_tracemalloc_memory(),
+            "snapshot_list": list(self._snapshot_dict.keys()),
+        }
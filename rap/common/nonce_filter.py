@@ -0,0 +1,189 @@
+import math
+import time
+from typing import Any, Hashable, List, Optional, Set
+
+__all__ = ["BaseNonceFilter", "NonceSetFilter", "NonceBloomFilter"]
+
+
+class BaseNonceFilter(object):
+    """Record the nonce of the received messages to prevent message replay attacks.
+
+    The nonces are stored in `bucket_cnt` buckets, each bucket stores the nonces received in `ttl / (bucket_cnt - 1)`
+     seconds. When the bucket time is over, the oldest bucket is cleared and reused as the current bucket,
+     so a nonce is kept for at least `ttl` seconds, and the expired nonces are dropped in O(1) without scanning keys.
+    """
+
+    def __init__(self, ttl: float = 120, bucket_cnt: int = 4) -> None:
+        """
+        :param ttl: The minimum time(seconds) that the nonce is kept
+        :param bucket_cnt: The number of the buckets, the nonce is kept up to `ttl * bucket_cnt / (bucket_cnt - 1)`
+        """
+        if ttl <= 0:
+            raise ValueError("ttl must > 0")
+        if bucket_cnt < 2:
+            raise ValueError("bucket_cnt must >= 2")
+        self._bucket_cnt: int = bucket_cnt
+        self._bucket_time: float = ttl / (bucket_cnt - 1)
+        self._bucket_list: List[Any] = [self._create_bucket() for _ in range(bucket_cnt)]
+        self._index: int = 0
+        self._next_rotate_timestamp: float = time.time() + self._bucket_time
+
+    @property
+    def ttl(self) -> float:
+        return self._bucket_time * (self._bucket_cnt - 1)
+
+    def set_ttl(self, ttl: float) -> None:
+        """Change the ttl, it takes effect from the next bucket, the recorded nonces are not dropped"""
+        if ttl <= 0:
+            raise ValueError("ttl must > 0")
+        self._bucket_time = ttl / (self._bucket_cnt - 1)
+
+    def _create_bucket(self) -> Any:
+        raise NotImplementedError
+
+    def _clear_bucket(self, bucket: Any) -> None:
+        raise NotImplementedError
+
+    def _bucket_contains(self, bucket: Any, nonce: Hashable) -> bool:
+        raise NotImplementedError
+
+    def _bucket_add(self, bucket: Any, nonce: Hashable) -> None:
+        raise NotImplementedError
+
+    def _rotate(self) -> None:
+        now: float = time.time()
+        if now < self._next_rotate_timestamp:
+            return
+        rotate_cnt: int = int((now - self._next_rotate_timestamp) // self._bucket_time) + 1
+        for _ in range(min(rotate_cnt, self._bucket_cnt)):
+            self._index = (self._index + 1) % self._bucket_cnt
+            self._clear_bucket(self._bucket_list[self._index])
+        self._next_rotate_timestamp += rotate_cnt * self._bucket_time
+
+    def __contains__(self, nonce: Hashable) -> bool:
+        self._rotate()
+        for bucket in self._bucket_list:
+            if self._bucket_contains(bucket, nonce):
+                return True
+        return False
+
+    def add(self, nonce: Hashable) -> bool:
+        """Record the nonce, return False if the nonce has been recorded(the message is replayed)"""
+        if nonce in self:
+            return False
+        self._bucket_add(self._bucket_list[self._index], nonce)
+        return True
+
+
+class NonceSetFilter(BaseNonceFilter):
+    """Each bucket is a set, there is no false positive, the memory grows with the message rate.
+
+    The number of recorded nonces is capped by `max_nonce_cnt`, when the filter is full, the new nonce is rejected
+     until the oldest bucket expires(drop the recorded nonce would allow the message to be replayed).
+    Use `NonceBloomFilter` if the message rate may exceed `max_nonce_cnt / ttl`.
+    """
+
+    def __init__(self, ttl: float = 120, bucket_cnt: int = 4, max_nonce_cnt: int = 1000000) -> None:
+        """
+        :param ttl: see `BaseNonceFilter`
+        :param bucket_cnt: see `BaseNonceFilter`
+        :param max_nonce_cnt: The maximum number of nonces recorded in all buckets
+        """
+        if max_nonce_cnt <= 0:
+            raise ValueError("max_nonce_cnt must > 0")
+        self._max_nonce_cnt: int = max_nonce_cnt
+        self._nonce_cnt: int = 0
+        super(NonceSetFilter, self).__init__(ttl=ttl, bucket_cnt=bucket_cnt)
+
+    def _create_bucket(self) -> Set[Hashable]:
+        return set()
+
+    def _clear_bucket(self, bucket: Set[Hashable]) -> None:
+        self._nonce_cnt -= len(bucket)
+        bucket.clear()
+
+    def _bucket_contains(self, bucket: Set[Hashable], nonce: Hashable) -> bool:
+        return nonce in bucket
+
+    def _bucket_add(self, bucket: Set[Hashable], nonce: Hashable) -> None:
+        bucket.add(nonce)
+        self._nonce_cnt += 1
+
+    def add(self, nonce: Hashable) -> bool:
+        """Record the nonce, return False if the nonce has been recorded or the filter is full"""
+        if nonce in self or self._nonce_cnt >= self._max_nonce_cnt:
+            return False
+        self._bucket_add(self._bucket_list[self._index], nonce)
+        return True
+
+
+class NonceBloomFilter(BaseNonceFilter):
+    """Each bucket is a Bloom filter, the memory is fixed(by `capacity` and `error_rate`).
+
+    A new nonce may be regarded as recorded(false positive), the probability is less than `error_rate`
+     when each bucket receives no more than `capacity` nonces.
+    It is slower than `NonceSetFilter` in CPython, use it when the memory of the nonce set is unacceptable.
+    """
+
+    def __init__(
+        self, ttl: float = 120, bucket_cnt: int = 4, capacity: int = 1000000, error_rate: float = 0.0001
+    ) -> None:
+        """
+        :param ttl: see `BaseNonceFilter`
+        :param bucket_cnt: see `BaseNonceFilter`
+        :param capacity: The maximum number of nonces received in a bucket time(`ttl / (bucket_cnt - 1)`)
+        :param error_rate: The false positive rate of the filter
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must > 0")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must in (0, 1)")
+        # A lookup checks all buckets, so the error rate of each bucket is `error_rate / bucket_cnt`
+        bucket_error_rate: float = error_rate / bucket_cnt
+        self.bit_cnt: int = max(8, int(math.ceil(-capacity * math.log(bucket_error_rate) / (math.log(2) ** 2))))
+        self.hash_cnt: int = max(1, int(round(self.bit_cnt / capacity * math.log(2))))
+        self._hash_range: range = range(self.hash_cnt)
+        self._zero_bytes: bytes = bytes((self.bit_cnt + 7) // 8)
+        super(NonceBloomFilter, self).__init__(ttl=ttl, bucket_cnt=bucket_cnt)
+
+    def _create_bucket(self) -> bytearray:
+        return bytearray(self._zero_bytes)
+
+    def _clear_bucket(self, bucket: bytearray) -> None:
+        bucket[:] = self._zero_bytes
+
+    def _get_bit_index_list(self, nonce: Hashable) -> List[int]:
+        # Double hashing, the k index are gen by two hash of the str(the hash of str is SipHash with random seed,
+        #  the filter is only used in the process, so it does not need to be stable across processes)
+        key: str = str(nonce)
+        bit_cnt: int = self.bit_cnt
+        hash_1: int = hash(key) % bit_cnt
+        hash_2: int = (hash((key, bit_cnt)) % bit_cnt) | 1
+        return [(hash_1 + i * hash_2) % bit_cnt for i in self._hash_range]
+
+    def _bucket_contains(self, bucket: bytearray, nonce: Hashable, bit_index_list: Optional[List[int]] = None) -> bool:
+        for bit_index in bit_index_list or self._get_bit_index_list(nonce):
+            if not bucket[bit_index >> 3] & (1 << (bit_index & 7)):
+                return False
+        return True
+
+    def _bucket_add(self, bucket: bytearray, nonce: Hashable, bit_index_list: Optional[List[int]] = None) -> None:
+        for bit_index in bit_index_list or self._get_bit_index_list(nonce):
+            bucket[bit_index >> 3] |= 1 << (bit_index & 7)
+
+    def __contains__(self, nonce: Hashable) -> bool:
+        self._rotate()
+        bit_index_list: List[int] = self._get_bit_index_list(nonce)
+        for bucket in self._bucket_list:
+            if self._bucket_contains(bucket, nonce, bit_index_list):
+                return True
+        return False
+
+    def add(self, nonce: Hashable) -> bool:
+        self._rotate()
+        bit_index_list: List[int] = self._get_bit_index_list(nonce)
+        for bucket in self._bucket_list:
+            if self._bucket_contains(bucket, nonce, bit_index_list):
+                return False
+        self._bucket_add(self._bucket_list[self._index], nonce, bit_index_list)
+        return True
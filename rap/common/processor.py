@@ -0,0 +1,71 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Type
+
+from rap.common.utils import constant
+
+__all__ = ["ProcessorChain", "HOOK_FN_LIST"]
+# (hook func, is coroutine func)
+HOOK_FN_LIST = List[Tuple[Callable, bool]]
+_msg_type_list: List[int] = [
+    constant.SERVER_ERROR_RESPONSE,
+    constant.MSG_REQUEST,
+    constant.MSG_RESPONSE,
+    constant.CHANNEL_REQUEST,
+    constant.CHANNEL_RESPONSE,
+    constant.CLIENT_EVENT,
+    constant.SERVER_EVENT,
+]
+
+
+class ProcessorChain(object):
+    """Precompute the hook list of the processors for each msg type.
+
+    The hook that is not overridden(still the no-op hook of the base processor class),
+     and the processor that does not handle the msg type(see `BaseProcessor.msg_type_set`) are skipped,
+     so the call does not need to create and await a no-op coroutine for each processor.
+    The hook can be a sync func, it is called directly without creating a coroutine.
+    """
+
+    def __init__(self, base_processor_class: Type, processor_list: Optional[Sequence[Any]] = None) -> None:
+        """
+        :param base_processor_class: the base processor class, its hooks are regarded as no-op hooks
+        :param processor_list: processor list, the order of the process request hook is the order of the list,
+            and the order of the process response(and exc) hook is reversed
+        """
+        self._base_processor_class: Type = base_processor_class
+        self.request_hook_dict: Dict[Optional[int], HOOK_FN_LIST] = {}
+        self.response_hook_dict: Dict[Optional[int], HOOK_FN_LIST] = {}
+        self.exc_hook_dict: Dict[Optional[int], HOOK_FN_LIST] = {}
+        self.reload(processor_list or [])
+
+    def _gen_hook_dict(self, processor_list: Sequence[Any], hook_name: str) -> Dict[Optional[int], HOOK_FN_LIST]:
+        base_hook: Callable = getattr(self._base_processor_class, hook_name)
+        # key None is the hook list of the msg type that is not in `_msg_type_list`
+        hook_dict: Dict[Optional[int], HOOK_FN_LIST] = {msg_type: [] for msg_type in _msg_type_list}
+        hook_dict[None] = []
+        for processor in processor_list:
+            hook: Callable = getattr(processor, hook_name)
+            if getattr(hook, "__func__", hook) is base_hook:
+                continue
+            is_coroutine_func: bool = asyncio.iscoroutinefunction(hook)
+            msg_type_set: Optional[Set[int]] = getattr(processor, "msg_type_set", None)
+            for msg_type, hook_list in hook_dict.items():
+                if msg_type_set is None or msg_type in msg_type_set:
+                    hook_list.append((hook, is_coroutine_func))
+        return hook_dict
+
+    def reload(self, processor_list: Sequence[Any]) -> None:
+        """recompute the hook list, the object that references the chain will use the new hook list"""
+        reversed_processor_list: List[Any] = list(reversed(processor_list))
+        self.request_hook_dict = self._gen_hook_dict(processor_list, "process_request")
+        self.response_hook_dict = self._gen_hook_dict(reversed_processor_list, "process_response")
+        self.exc_hook_dict = self._gen_hook_dict(reversed_processor_list, "process_exc")
+
+    def get_request_hook_list(self, msg_type: int) -> HOOK_FN_LIST:
+        return self.request_hook_dict.get(msg_type, self.request_hook_dict[None])
+
+    def get_response_hook_list(self, msg_type: int) -> HOOK_FN_LIST:
+        return self.response_hook_dict.get(msg_type, self.response_hook_dict[None])
+
+    def get_exc_hook_list(self, msg_type: int) -> HOOK_FN_LIST:
+        return self.exc_hook_dict.get(msg_type, self.exc_hook_dict[None])
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from types import CodeType, FrameType
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+__all__ = ["SamplingProfiler"]
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def _get_code_name(code: CodeType) -> str:
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler(object):
+    """Wall-clock stack sampler, sample the stack of each thread(`sys._current_frames()`) and the suspended
+    asyncio tasks of the event loop in a background thread, like py-spy but without attaching to the process.
+
+    The overhead is bounded by the maximum frequency and the maximum overhead ratio: if a sample costs `t` seconds,
+     the sampler waits at least `t / max_overhead` seconds before the next sample.
+    Only one profile can run at a time.
+    """
+
+    def __init__(
+        self,
+        max_seconds: float = 60.0,
+        max_frequency: int = 1000,
+        max_overhead: float = 0.05,
+        max_depth: int = 128,
+    ) -> None:
+        """
+        :param max_seconds: The maximum duration(seconds) of a profile
+        :param max_frequency: The maximum number of samples per second
+        :param max_overhead: The maximum ratio of the time spent in sampling, e.g. 0.05 is 5%
+        :param max_depth: The maximum depth of the sampled stack, the frames outside it are dropped
+        """
+        self._max_seconds: float = max_seconds
+        self._max_frequency: int = max_frequency
+        self._max_overhead: float = max_overhead
+        self._max_depth: int = max_depth
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    #########
+    # stack #
+    #########
+    def _get_frame_stack(self, frame: Optional[FrameType]) -> List[str]:
+        stack: List[str] = []
+        while frame is not None and len(stack) < self._max_depth:
+            stack.append(_get_code_name(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _get_task_stack(self, task: "asyncio.Task") -> List[str]:
+        """The await chain of the suspended task, from the outermost coroutine to the innermost"""
+        stack: List[str] = []
+        coro: Any = task._coro  # type: ignore
+        while coro is not None and len(stack) < self._max_depth:
+            frame: Optional[FrameType] = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is None:
+                break
+            stack.append(_get_code_name(frame.f_code))
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        return stack
+
+    def _sample(self, loop: Optional[asyncio.AbstractEventLoop], stack_cnt_dict: Dict[Tuple[str, ...], int]) -> None:
+        sampler_thread_id: int = threading.get_ident()
+        thread_name_dict: Dict[Optional[int], str] = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler_thread_id:
+                continue
+            stack: Tuple[str, ...] = (
+                f"thread:{thread_name_dict.get(thread_id, thread_id)}",
+                *self._get_frame_stack(frame),
+            )
+            stack_cnt_dict[stack] = stack_cnt_dict.get(stack, 0) + 1
+        if loop is None:
+            return
+        # The running task is sampled by the thread stack, only the suspended tasks are sampled here
+        for task in asyncio.all_tasks(loop):
+            if getattr(task._coro, "cr_running", False):  # type: ignore
+                continue
+            task_stack: List[str] = self._get_task_stack(task)
+            if not task_stack:
+                continue
+            stack = ("task", *task_stack)
+            stack_cnt_dict[stack] = stack_cnt_dict.get(stack, 0) + 1
+
+    def _run(
+        self,
+        seconds: float,
+        frequency: int,
+        loop: Optional[asyncio.AbstractEventLoop],
+        stack_cnt_dict: Dict[Tuple[str, ...], int],
+        stop_event: Optional[threading.Event] = None,
+    ) -> int:
+        interval: float = 1 / frequency
+        sample_cnt: int = 0
+        end_time: float = time.perf_counter() + seconds
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            start_time: float = time.perf_counter()
+            if start_time >= end_time:
+                break
+            try:
+                self._sample(loop, stack_cnt_dict)
+                sample_cnt += 1
+            except RuntimeError as e:
+                # e.g. the set of the tasks changed size during iteration
+                logger.debug(f"profiler sample error:{e}")
+            cost: float = time.perf_counter() - start_time
+            stop_event.wait(max(interval - cost, cost / self._max_overhead - cost, 0))
+        return sample_cnt
+
+    ##########
+    # output #
+    ##########
+    @staticmethod
+    def to_collapsed(stack_cnt_dict: Dict[Tuple[str, ...], int]) -> str:
+        """Convert to the collapsed stack text, one stack per line(`frame;frame;frame count`), used by flamegraph"""
+        return "\n".join(
+            f"{';'.join(stack)} {cnt}"
+            for stack, cnt in sorted(stack_cnt_dict.items(), key=lambda item: item[1], reverse=True)
+        )
+
+    @staticmethod
+    def to_top(stack_cnt_dict: Dict[Tuple[str, ...], int], top_n: int = 20) -> List[Dict[str, Union[str, int]]]:
+        """Return the top N functions sorted by the self count(the function is on the top of the stack),
+        the total count is the number of the stacks that contain the function"""
+        self_cnt_dict: Dict[str, int] = {}
+        total_cnt_dict: Dict[str, int] = {}
+        for stack, cnt in stack_cnt_dict.items():
+            # The first item is the thread or task label
+            if len(stack) < 2:
+                continue
+            self_cnt_dict[stack[-1]] = self_cnt_dict.get(stack[-1], 0) + cnt
+            for func_name in set(stack[1:]):
+                total_cnt_dict[func_name] = total_cnt_dict.get(func_name, 0) + cnt
+        func_name_list: List[str] = sorted(
+            total_cnt_dict.keys(), key=lambda key: (self_cnt_dict.get(key, 0), total_cnt_dict[key]), reverse=True
+        )
+        return [
+            {"func": func_name, "self": self_cnt_dict.get(func_name, 0), "total": total_cnt_dict[func_name]}
+            for func_name in func_name_list[:top_n]
+        ]
+
+    async def profile(
+        self,
+        seconds: float = 5.0,
+        frequency: int = 100,
+        output: str = "collapsed",
+        top_n: int = 20,
+    ) -> Union[str, List[Dict[str, Union[str, int]]]]:
+        """Sample the stacks of the threads and the asyncio tasks for a while
+        :param seconds: The duration(seconds) of the profile, up to `max_seconds`.
+          If the caller is cancelled(e.g. the call times out), the sampling stops and the next profile can start
+        :param frequency: The number of samples per second, up to `max_frequency`
+        :param output: `collapsed`(flamegraph-ready text) or `top`(the top N functions table)
+        :param top_n: The number of the functions of the `top` output
+        """
+        if output not in ("collapsed", "top"):
+            raise ValueError(f"Not support output:{output}")
+        if seconds <= 0 or frequency <= 0:
+            raise ValueError("seconds and frequency must > 0")
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("profiler is running")
+        try:
+            loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+            stack_cnt_dict: Dict[Tuple[str, ...], int] = {}
+            future: asyncio.Future = loop.create_future()
+            stop_event: threading.Event = threading.Event()
+
+            def _run() -> None:
+                exc: Optional[Exception] = None
+                try:
+                    self._run(
+                        min(seconds, self._max_seconds),
+                        min(frequency, self._max_frequency),
+                        loop,
+                        stack_cnt_dict,
+                        stop_event,
+                    )
+                except Exception as e:
+                    exc = e
+                # Even if the caller is cancelled, the next profile can only start after the sampler exits
+                self._lock.release()
+
+                def _set_result() -> None:
+                    if future.done():
+                        return
+                    if exc is not None:
+                        future.set_exception(exc)
+                    else:
+                        future.set_result(None)
+
+                loop.call_soon_threadsafe(_set_result)
+
+            threading.Thread(target=_run, name=f"{self.__class__.__name__}Sampler", daemon=True).start()
+        except Exception:
+            self._lock.release()
+            raise
+        try:
+            await future
+        except asyncio.CancelledError:
+            stop_event.set()
+            raise
+        if output == "top":
+            return self.to_top(stack_cnt_dict, top_n)
+        return self.to_collapsed(stack_cnt_dict)
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+import msgpack
+
+from rap.common.asyncio_helper import get_event_loop
+from rap.common.collect_statistics import HistogramStore, StageTimer
+
+__all__ = ["SlowRequestRecorder"]
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class SlowRequestRecorder(object):
+    """Record the request whose duration exceeds the threshold into a bounded ring, the aggregate metrics hide the
+    individual outliers.
+
+    The threshold of a target is `threshold`, or `max(threshold, p99 * p99_multiple)` if `p99_multiple` is set and
+     the target has enough samples in the latency histogram, the thresholds are refreshed every `refresh_interval`.
+    The fast path is only a dict lookup and a comparison, the entry is only built when the threshold is exceeded.
+    The stage timings and the queueing time are only recorded when the stage timing is enabled.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 1.0,
+        p99_multiple: Optional[float] = None,
+        min_sample_cnt: int = 100,
+        refresh_interval: float = 10.0,
+        max_record_cnt: int = 128,
+        is_log: bool = False,
+    ) -> None:
+        """
+        :param threshold: The absolute threshold(seconds), it is also the minimum threshold when `p99_multiple` is set
+        :param p99_multiple: If set, the threshold of the target is a multiple of the p99 latency of the target
+        :param min_sample_cnt: The minimum number of the samples of the target to use the p99 threshold
+        :param refresh_interval: The interval(seconds) to refresh the p99 threshold of each target
+        :param max_record_cnt: The maximum number of the slow requests in the ring, the earliest one is dropped
+        :param is_log: Whether to log the slow request by the logger in a background thread
+        """
+        self._threshold: float = threshold
+        self._p99_multiple: Optional[float] = p99_multiple
+        self._min_sample_cnt: int = min_sample_cnt
+        self._refresh_interval: float = refresh_interval
+        self._is_log: bool = is_log
+
+        self._threshold_dict: Dict[str, float] = {}
+        self._histogram_store: Optional[HistogramStore] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._log_queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._log_thread: Optional[threading.Thread] = None
+
+        self.record_cnt: int = 0
+        self.record_deque: Deque[Dict[str, Any]] = deque(maxlen=max_record_cnt)
+
+    ##############
+    # life cycle #
+    ##############
+    def start(self, histogram_store: HistogramStore) -> None:
+        """
+        :param histogram_store: The latency histogram of the targets, used by the p99 threshold
+        """
+        self._histogram_store = histogram_store
+        if self._p99_multiple is not None and self._handle is None:
+            self._handle = get_event_loop().call_later(self._refresh_interval, self._refresh)
+        if self._is_log and self._log_thread is None:
+            self._log_thread = threading.Thread(target=self._log, name=f"{self.__class__.__name__}Log", daemon=True)
+            self._log_thread.start()
+
+    def stop(self) -> None:
+        """Stop refreshing the threshold, and stop the log thread after logging the pending slow requests"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._log_thread is not None:
+            self._log_queue.put(None)
+            self._log_thread.join()
+            self._log_thread = None
+
+    #############
+    # threshold #
+    #############
+    def _refresh(self) -> None:
+        threshold_dict: Dict[str, float] = {}
+        for target, stats_dict in self._histogram_store.to_dict("target")["target"].items():  # type: ignore
+            if stats_dict["count"] >= self._min_sample_cnt:
+                # The unit of the stats is ms
+                threshold_dict[target] = max(
+                    self._threshold, stats_dict["p99"] / 1000 * self._p99_multiple  # type: ignore
+                )
+        self._threshold_dict = threshold_dict
+        self._handle = get_event_loop().call_later(self._refresh_interval, self._refresh)
+
+    def get_threshold(self, target: str) -> float:
+        return self._threshold_dict.get(target, self._threshold)
+
+    def is_slow(self, target: str, duration: float) -> bool:
+        return duration >= self._threshold_dict.get(target, self._threshold)
+
+    ##########
+    # record #
+    ##########
+    def record(
+        self,
+        target: str,
+        duration: float,
+        param: Any = None,
+        peer: Any = None,
+        stage_timer: Optional[StageTimer] = None,
+        queue_stage_tuple: Sequence[str] = (),
+        exc_info: Optional[str] = None,
+    ) -> None:
+        """Record the slow request, only called when `is_slow` is True
+        :param target: request target
+        :param duration: request duration(seconds)
+        :param param: request param, record the size of its msgpack encoding
+        :param peer: the address of the peer
+        :param stage_timer: the stage timer of the request
+        :param queue_stage_tuple: The stages that are counted as the queueing time
+        :param exc_info: The exception info of the request
+        """
+        try:
+            param_size: int = len(msgpack.packb(param))
+        except Exception:
+            param_size = -1
+        stage_dict: Dict[str, float] = dict(stage_timer.stage_list) if stage_timer is not None else {}
+        entry: Dict[str, Any] = {
+            "timestamp": time.time(),
+            "target": target,
+            "duration": duration,
+            "threshold": self.get_threshold(target),
+            "param_size": param_size,
+            "peer": peer,
+            "queue_time": sum(stage_dict.get(stage, 0.0) for stage in queue_stage_tuple) if stage_dict else None,
+            "stage": stage_dict,
+            "exc_info": exc_info,
+        }
+        self.record_cnt += 1
+        self.record_deque.append(entry)
+        if self._log_thread is not None:
+            self._log_queue.put(entry)
+
+    def _log(self) -> None:
+        while True:
+            entry: Optional[Dict[str, Any]] = self._log_queue.get()
+            if entry is None:
+                break
+            try:
+                logger.warning(f"slow request: {json.dumps(entry, default=str)}")
+            except Exception as e:
+                logger.error(f"log slow request error:{e}")
+
+    def get_record_list(self, target: Optional[str] = None) -> List[Dict[str, Any]]:
+        """return the slow requests(the unit of the time is second), the latest one is the last
+        :param target: request target, default all
+        """
+        return [entry for entry in self.record_deque if target is None or entry["target"] == target]
@@ -0,0 +1,82 @@
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+__all__ = [
+    "TRACE_SAMPLE_HEADER",
+    "BaseTraceSampler",
+    "RateTraceSampler",
+    "RateLimitTraceSampler",
+    "sample_trace",
+    "trace_sample_context",
+]
+
+# The header that carries the sampling decision of the trace, 1 is sampled, 0 is not sampled
+TRACE_SAMPLE_HEADER: str = "X-rap-sampled"
+# The sampling decision of the trace that the server is handling, the client in the same context inherits it
+trace_sample_context: ContextVar[Optional[bool]] = ContextVar("trace_sample_context", default=None)
+
+
+class BaseTraceSampler(object):
+    """Decide whether to sample the trace, it is only called once per trace at the edge(the first processor that
+    handles the trace), and the decision is propagated to the downstream by the `TRACE_SAMPLE_HEADER` header"""
+
+    def is_sample(self, target: str) -> bool:
+        raise NotImplementedError
+
+
+class RateTraceSampler(BaseTraceSampler):
+    """Sample the trace by probability"""
+
+    def __init__(self, rate: float) -> None:
+        """
+        :param rate: The probability of sampling, in [0, 1]
+        """
+        if not 0 <= rate <= 1:
+            raise ValueError("rate must in [0, 1]")
+        self._rate: float = rate
+
+    def is_sample(self, target: str) -> bool:
+        return random.random() < self._rate
+
+
+class RateLimitTraceSampler(BaseTraceSampler):
+    """Sample up to `max_trace_per_second` traces per second(token bucket)"""
+
+    def __init__(self, max_trace_per_second: float) -> None:
+        """
+        :param max_trace_per_second: The maximum number of the traces sampled per second
+        """
+        if max_trace_per_second <= 0:
+            raise ValueError("max_trace_per_second must > 0")
+        self._rate: float = max_trace_per_second
+        self._max_token: float = max(max_trace_per_second, 1.0)
+        self._token: float = self._max_token
+        self._last_timestamp: float = time.time()
+
+    def is_sample(self, target: str) -> bool:
+        now: float = time.time()
+        token: float = min(self._max_token, self._token + (now - self._last_timestamp) * self._rate)
+        self._last_timestamp = now
+        if token < 1:
+            self._token = token
+            return False
+        self._token = token - 1
+        return True
+
+
+def sample_trace(header: dict, target: str, sampler: Optional[BaseTraceSampler]) -> bool:
+    """Get the sampling decision of the trace of the msg.
+
+    The decision is read from the msg header, or inherited from `trace_sample_context`, otherwise it is made by
+     the sampler(None is always sampled) and written to the msg header.
+    """
+    flag: Optional[int] = header.get(TRACE_SAMPLE_HEADER, None)
+    if flag is not None:
+        return bool(flag)
+    is_sample: Optional[bool] = trace_sample_context.get()
+    if is_sample is None:
+        is_sample = sampler is None or sampler.is_sample(target)
+    header[TRACE_SAMPLE_HEADER] = int(is_sample)
+    return is_sample
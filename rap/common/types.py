@@ -122,3 +122,33 @@ def is_type(source_type: Type, target_type: Union[Type, object]) -> bool:
     if not isinstance(parse_target_type, list):
         parse_target_type = [parse_target_type]
     return bool(set(parse_target_type) & set(parse_source_type))
+
+
+def gen_type_check_fn(source_type: Type) -> _Callable[[Any], bool]:
+    """Precompute the origin type of `source_type` and return a function,
+     which determines whether the type of the value is consistent with `source_type`, like `is_type`
+    >>> from typing import Dict, Optional
+    >>> assert gen_type_check_fn(Optional[Dict])({})
+    >>> assert gen_type_check_fn(Optional[Dict])(None)
+    >>> assert not gen_type_check_fn(Optional[Dict])(1)
+    """
+    try:
+        parse_source_type: Union[List[Type], Type] = parse_typing(source_type)
+    except ParseTypeError as e:
+        # Keep the same behavior as `is_type`, raise error when checking
+        parse_type_error: ParseTypeError = e
+
+        def _raise_error(value: Any) -> bool:
+            raise parse_type_error
+
+        return _raise_error
+
+    if not isinstance(parse_source_type, list):
+        parse_source_type = [parse_source_type]
+    # `-> None` is parsed as None, but the type of the value is NoneType
+    type_set: frozenset = frozenset(type(None) if i is None else i for i in parse_source_type)
+
+    def _type_check(value: Any) -> bool:
+        return type(value) in type_set
+
+    return _type_check
@@ -3,17 +3,20 @@ import random
 import string
 import time
 from enum import Enum, auto
-from typing import Any, Callable, Dict, Sequence, Tuple
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Sequence, Tuple
 
-from rap.common.types import is_type
+from rap.common.types import gen_type_check_fn, is_type
 
 __all__ = [
     "constant",
     "EventEnum",
     "RapFunc",
     "check_func_type",
+    "gen_param_handle",
     "gen_random_time_id",
     "parse_error",
+    "parse_target",
     "param_handle",
     "response_num_dict",
 ]
@@ -144,6 +147,62 @@ def param_handle(
     return new_param_list
 
 
+def gen_param_handle(
+    func_sig: inspect.Signature, check_type: bool = True
+) -> Callable[[Sequence[Any], Dict[str, Any]], Tuple[Any, ...]]:
+    """Precompute the type check function of each parameter and return a function like `param_handle`
+
+    If the func param are all positional-or-keyword param and the call only passes all the positional param,
+     it will skip `Signature.bind`
+    :param func_sig: func signature
+    :param check_type: If False, only bind the param and not check the param type
+    """
+    parameter_list: List[inspect.Parameter] = list(func_sig.parameters.values())
+    param_len: int = len(parameter_list)
+    is_simple: bool = all(i.kind is i.POSITIONAL_OR_KEYWORD for i in parameter_list)
+    check_fn_dict: Dict[str, Callable[[Any], bool]] = {}
+    if check_type:
+        check_fn_dict = {i.name: gen_type_check_fn(i.annotation) for i in parameter_list}
+    check_fn_list: List[Tuple[str, Callable[[Any], bool]]] = list(check_fn_dict.items())
+    # Like `check_func_type`, the default value of the param that is not passed is also checked,
+    #  the default value does not change, so only check it once here and check whether it is passed when calling
+    bad_default_name_list: List[str] = [
+        i.name
+        for i in parameter_list
+        if check_fn_dict and i.default is not i.empty and not check_fn_dict[i.name](i.default)
+    ]
+
+    def _raise_type_error(name: str, value: Any) -> None:
+        raise TypeError(f"{value} type must: {func_sig.parameters[name].annotation}")
+
+    def _param_handle(param_list: Sequence[Any], default_param_dict: Dict[str, Any]) -> Tuple[Any, ...]:
+        if is_simple and not default_param_dict and len(param_list) == param_len:
+            param_tuple: Tuple[Any, ...] = tuple(param_list)
+            for (name, check_fn), value in zip(check_fn_list, param_tuple):
+                if not check_fn(value):
+                    _raise_type_error(name, value)
+            return param_tuple
+
+        bound_arguments: inspect.BoundArguments = func_sig.bind(*param_list, **default_param_dict)
+        if check_fn_dict:
+            for name, value in bound_arguments.arguments.items():
+                if not check_fn_dict[name](value):
+                    _raise_type_error(name, value)
+            for name in bad_default_name_list:
+                if name not in bound_arguments.arguments:
+                    _raise_type_error(name, func_sig.parameters[name].default)
+        return bound_arguments.args
+
+    return _param_handle
+
+
+@lru_cache(maxsize=1024)
+def parse_target(target: str) -> Tuple[str, str, str]:
+    """parse target to (server name, group, func name), the result of the hot target will be cached"""
+    server_name, group, func_name = target.split("/")
+    return server_name, group, func_name
+
+
 class EventEnum(Enum):
     before_start = auto()
     after_start = auto()
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import socket
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from uuid import uuid4
+
+from rap.common.collect_statistics import Gauge
+
+if TYPE_CHECKING:
+    from aredis import StrictRedis, StrictRedisCluster
+
+    from rap.server.core import Server
+
+__all__ = ["AdmissionController"]
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class AdmissionController(object):
+    """Connection admission control, checked when the server accepts the conn and before the conn is initialized
+     (no conn id, sender or middleware), the rejected conn is closed directly.
+
+    The conn count and the accept rate(token bucket, global and per ip) are counted in the process, the check is O(1)
+     and does not access the shared store.
+    If `redis` is set, the per-ip conn count of the server is written to its own redis key(expired if the server does
+     not sync, e.g. crashed) every `sync_interval` seconds, and the per-ip conn count of the other servers(as of the
+     last sync) is added to the local count to check `ip_max_conn`.
+    """
+
+    def __init__(
+        self,
+        max_conn: Optional[int] = None,
+        ip_max_conn: Optional[int] = None,
+        accept_rate: Optional[float] = None,
+        accept_burst: Optional[int] = None,
+        ip_accept_rate: Optional[float] = None,
+        ip_accept_burst: Optional[int] = None,
+        max_ip_cnt: int = 100000,
+        redis: "Optional[Union[StrictRedis, StrictRedisCluster]]" = None,
+        sync_interval: float = 1,
+        namespace: str = "rap",
+        server_id: Optional[str] = None,
+        diff: int = 10,
+        prefix: str = "admission",
+    ):
+        """
+        :param max_conn: The maximum number of conn of the server
+        :param ip_max_conn: The maximum number of conn of each ip
+        :param accept_rate: The maximum number of conn accepted per second by the server
+        :param accept_burst: The maximum number of conn accepted at once by the server, default `accept_rate`
+        :param ip_accept_rate: The maximum number of conn accepted per second from each ip
+        :param ip_accept_burst: The maximum number of conn accepted at once from each ip, default `ip_accept_rate`
+        :param max_ip_cnt: The maximum number of ip token bucket, the least recently used bucket is dropped
+        :param redis: aredis client, aggregate the per-ip conn count of all servers
+        :param sync_interval: The interval(seconds) to aggregate the per-ip conn count to redis
+        :param namespace: redis key namespace
+        :param server_id: The id of the server in redis, default is the host name and a random id
+        :param diff: how many windows are a time period for the reject count metric
+        :param prefix: metric name prefix
+        """
+        if max_ip_cnt <= 0:
+            raise ValueError("max_ip_cnt must > 0")
+        self._max_conn: Optional[int] = max_conn
+        self._ip_max_conn: Optional[int] = ip_max_conn
+        self._accept_rate: Optional[float] = accept_rate
+        self._accept_burst: float = float(accept_burst or accept_rate or 0)
+        self._ip_accept_rate: Optional[float] = ip_accept_rate
+        self._ip_accept_burst: float = float(ip_accept_burst or ip_accept_rate or 0)
+        self._max_ip_cnt: int = max_ip_cnt
+
+        self._conn_cnt: int = 0
+        self._ip_conn_dict: Dict[str, int] = {}
+        # [token, last_timestamp]
+        self._token_list: List[float] = [self._accept_burst, time.time()]
+        self._ip_token_dict: "OrderedDict[str, List[float]]" = OrderedDict()
+
+        self._redis: "Optional[Union[StrictRedis, StrictRedisCluster]]" = redis
+        self._sync_interval: float = sync_interval
+        self._key_prefix: str = f"{namespace}:admission" if namespace else "admission"
+        self._server_id: str = server_id or f"{socket.gethostname()}:{uuid4().hex}"
+        # The ids of the alive servers, the score is the last sync timestamp
+        self._server_key: str = f"{self._key_prefix}:server"
+        self._ip_conn_key: str = self._gen_ip_conn_key(self._server_id)
+        # The key of the server that does not sync for `_expire` seconds is expired
+        self._expire: int = max(int(sync_interval * 3), 3)
+        self._sync_future: Optional[asyncio.Future] = None
+        # Whether the local conn count is changed after the last successful sync
+        self._is_dirty: bool = False
+        # The per-ip conn count of the other servers(as of the last sync)
+        self._shared_ip_conn_dict: Dict[str, int] = {}
+
+        self.reject_cnt_dict: Dict[str, int] = {"max_conn": 0, "ip_max_conn": 0, "accept_rate": 0, "ip_accept_rate": 0}
+        self.reject_cnt_gauge: Gauge = Gauge(f"{prefix}_reject_cnt", diff=diff)
+
+    ##############
+    # life cycle #
+    ##############
+    def start_event_handle(self, app: "Server") -> None:
+        app.window_statistics.registry_metric(self.reject_cnt_gauge)
+        if self._redis is not None and (self._sync_future is None or self._sync_future.done()):
+            self._sync_future = asyncio.ensure_future(self._sync_loop())
+
+    async def stop_event_handle(self, app: "Server") -> None:
+        if self._sync_future is not None and not self._sync_future.done():
+            self._sync_future.cancel()
+        self._sync_future = None
+        if self._redis is not None:
+            # The conns of the server are closed, remove its conn count instead of waiting for it to expire
+            try:
+                async with await self._redis.pipeline() as pipe:
+                    await pipe.delete(self._ip_conn_key)
+                    await pipe.zrem(self._server_key, self._server_id)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"{self.__class__.__name__} remove conn count error:{e}")
+
+    ########
+    # sync #
+    ########
+    def _gen_ip_conn_key(self, server_id: str) -> str:
+        return f"{self._key_prefix}:ip_conn:{server_id}"
+
+    async def _sync(self) -> None:
+        if self._redis is None:
+            return
+        now: float = time.time()
+        is_dirty: bool = self._is_dirty
+        self._is_dirty = False
+        try:
+            async with await self._redis.pipeline() as pipe:
+                # Write the absolute count(not the change), so the failed sync does not make the count drift
+                if is_dirty:
+                    await pipe.delete(self._ip_conn_key)
+                    if self._ip_conn_dict:
+                        await pipe.hmset(self._ip_conn_key, self._ip_conn_dict)
+                await pipe.expire(self._ip_conn_key, self._expire)
+                await pipe.zadd(self._server_key, now, self._server_id)
+                await pipe.zremrangebyscore(self._server_key, "-inf", now - self._expire)
+                await pipe.expire(self._server_key, self._expire)
+                await pipe.zrange(self._server_key, 0, -1)
+                result_list: list = await pipe.execute()
+
+            shared_ip_conn_dict: Dict[str, int] = {}
+            server_id_list: List[str] = [i.decode() for i in result_list[-1] if i.decode() != self._server_id]
+            if server_id_list:
+                async with await self._redis.pipeline() as pipe:
+                    for server_id in server_id_list:
+                        await pipe.hgetall(self._gen_ip_conn_key(server_id))
+                    for ip_conn_dict in await pipe.execute():
+                        for key, value in ip_conn_dict.items():
+                            ip: str = key.decode()
+                            shared_ip_conn_dict[ip] = shared_ip_conn_dict.get(ip, 0) + int(value)
+        except Exception:
+            # retry in the next sync
+            self._is_dirty = self._is_dirty or is_dirty
+            raise
+        self._shared_ip_conn_dict = shared_ip_conn_dict
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._sync_interval)
+            try:
+                await self._sync()
+            except Exception as e:
+                logger.warning(f"{self.__class__.__name__} sync conn count error:{e}")
+
+    #########
+    # admit #
+    #########
+    @staticmethod
+    def _take_token(token_list: List[float], rate: float, burst: float, now: float) -> bool:
+        token: float = min(burst, token_list[0] + (now - token_list[1]) * rate)
+        token_list[1] = now
+        if token < 1:
+            token_list[0] = token
+            return False
+        token_list[0] = token - 1
+        return True
+
+    def _take_ip_token(self, ip: str, now: float) -> bool:
+        token_list: Optional[List[float]] = self._ip_token_dict.get(ip, None)
+        if token_list is None:
+            token_list = [self._ip_accept_burst, now]
+            self._ip_token_dict[ip] = token_list
+            if len(self._ip_token_dict) > self._max_ip_cnt:
+                self._ip_token_dict.popitem(last=False)
+        else:
+            self._ip_token_dict.move_to_end(ip)
+        return self._take_token(token_list, self._ip_accept_rate, self._ip_accept_burst, now)  # type: ignore
+
+    def _reject(self, reason: str) -> bool:
+        self.reject_cnt_dict[reason] += 1
+        self.reject_cnt_gauge.increment()
+        return False
+
+    def admit(self, ip: str) -> bool:
+        """Judge whether to accept the conn of the ip, if True, `release` must be called when the conn is closed"""
+        if self._max_conn is not None and self._conn_cnt >= self._max_conn:
+            return self._reject("max_conn")
+        ip_conn_cnt: int = self._ip_conn_dict.get(ip, 0)
+        if self._ip_max_conn is not None:
+            if ip_conn_cnt + self._shared_ip_conn_dict.get(ip, 0) >= self._ip_max_conn:
+                return self._reject("ip_max_conn")
+        if self._accept_rate is not None or self._ip_accept_rate is not None:
+            now: float = time.time()
+            if self._ip_accept_rate is not None and not self._take_ip_token(ip, now):
+                return self._reject("ip_accept_rate")
+            if self._accept_rate is not None and not self._take_token(
+                self._token_list, self._accept_rate, self._accept_burst, now
+            ):
+                return self._reject("accept_rate")
+
+        self._conn_cnt += 1
+        self._ip_conn_dict[ip] = ip_conn_cnt + 1
+        self._is_dirty = True
+        return True
+
+    def release(self, ip: str) -> None:
+        """The accepted conn of the ip is closed"""
+        self._conn_cnt -= 1
+        ip_conn_cnt: int = self._ip_conn_dict.get(ip, 0) - 1
+        if ip_conn_cnt > 0:
+            self._ip_conn_dict[ip] = ip_conn_cnt
+        else:
+            self._ip_conn_dict.pop(ip, None)
+        self._is_dirty = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "conn_cnt": self._conn_cnt,
+            "ip_cnt": len(self._ip_conn_dict),
+            "reject_cnt": dict(self.reject_cnt_dict),
+        }
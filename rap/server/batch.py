@@ -0,0 +1,196 @@
+import asyncio
+import inspect
+import time
+from collections import deque
+from functools import partial, wraps
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from rap.common.asyncio_helper import get_event_loop
+from rap.common.collect_statistics import BucketHistogram
+
+__all__ = ["Batcher", "batched"]
+
+_BatchItem = Tuple[tuple, asyncio.Future, float]
+
+
+class Batcher(object):
+    """Collect the concurrent calls of the func(across all conns) into a batch, and call the batch func once.
+
+    The batch func is declared with the signature of a single call, but each param receives the list of values
+     of all calls in the batch(column-oriented, convenient for NumPy or vectorised code),
+     and it must return a list of results with the same length and order, an item of the list can be an exception,
+     the exception only belongs to the call at the same position.
+    The batch is called when it has `max_size` calls, or the oldest call has waited `max_wait_ms`,
+     or the earliest deadline(the `X-rap-deadline` header of the request) of the calls is reached.
+    If a call is cancelled(e.g. its run timeout or deadline expired), it is removed from the batch immediately,
+     so no call is held past its caller's deadline.
+    """
+
+    def __init__(
+        self,
+        func: Callable,
+        max_size: int = 64,
+        max_wait_ms: float = 2,
+        size_bucket_list: Optional[Sequence[float]] = None,
+        wait_ms_bucket_list: Optional[Sequence[float]] = None,
+    ):
+        """
+        :param func: batch func
+        :param max_size: The maximum number of calls in a batch
+        :param max_wait_ms: The maximum time(milliseconds) a call waits for the batch to be called
+        :param size_bucket_list: batch size histogram buckets, default is power of 2 up to max_size
+        :param wait_ms_bucket_list: wait time(milliseconds) histogram buckets, default is based on max_wait_ms
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must > 0")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must >= 0")
+        if inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func):
+            raise TypeError("batch func not support generator")
+        self._func: Callable = func
+        self._is_coroutine_func: bool = asyncio.iscoroutinefunction(func)
+        self._func_sig: inspect.Signature = inspect.signature(func)
+        self._param_cnt: int = len(self._func_sig.parameters)
+        self._max_size: int = max_size
+        self._max_wait: float = max_wait_ms / 1000
+
+        self._queue: Deque[_BatchItem] = deque()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_loop_time: float = 0.0
+        # Hold the running batch tasks, the event loop only keeps weak references to the tasks
+        self._task_set: Set[asyncio.Future] = set()
+
+        if size_bucket_list is None:
+            size_bucket_list = [2 ** i for i in range(max_size.bit_length())]
+            if size_bucket_list[-1] != max_size:
+                size_bucket_list.append(max_size)
+        if wait_ms_bucket_list is None:
+            wait_ms_bucket_list = [max_wait_ms * i / 4 for i in range(1, 5)] + [max_wait_ms * 2, max_wait_ms * 4]
+        self.batch_size_histogram: BucketHistogram = BucketHistogram(f"{func.__name__}_batch_size", size_bucket_list)
+        self.batch_wait_ms_histogram: BucketHistogram = BucketHistogram(
+            f"{func.__name__}_batch_wait_ms", wait_ms_bucket_list
+        )
+
+    async def call(self, *param: Any, deadline_timestamp: float = 0) -> Any:
+        """Add a call to the batch and wait for its result
+        :param param: the param of a single call
+        :param deadline_timestamp: The deadline timestamp of the call, the batch is called no later than it,
+          0 means no deadline
+        """
+        if len(param) < self._param_cnt:
+            bound: inspect.BoundArguments = self._func_sig.bind(*param)
+            bound.apply_defaults()
+            param = bound.args
+
+        loop: asyncio.AbstractEventLoop = get_event_loop()
+        now: float = loop.time()
+        future: asyncio.Future = loop.create_future()
+        self._queue.append((param, future, now))
+
+        if len(self._queue) >= self._max_size:
+            self._flush()
+        else:
+            flush_loop_time: float = now + self._max_wait
+            if deadline_timestamp:
+                flush_loop_time = min(flush_loop_time, now + deadline_timestamp - time.time())
+            self._schedule_flush(loop, flush_loop_time)
+        # If the caller is cancelled, the future is also cancelled and will be skipped by the batch
+        return await future
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, flush_loop_time: float) -> None:
+        if self._flush_handle is not None:
+            if self._flush_loop_time <= flush_loop_time:
+                return
+            self._flush_handle.cancel()
+        self._flush_loop_time = flush_loop_time
+        self._flush_handle = loop.call_at(flush_loop_time, self._flush)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        item_list: List[_BatchItem] = []
+        while self._queue and len(item_list) < self._max_size:
+            item: _BatchItem = self._queue.popleft()
+            if not item[1].done():
+                item_list.append(item)
+        if self._queue:
+            loop: asyncio.AbstractEventLoop = get_event_loop()
+            if len(self._queue) >= self._max_size:
+                loop.call_soon(self._flush)
+            else:
+                self._schedule_flush(loop, self._queue[0][2] + self._max_wait)
+        if item_list:
+            task: asyncio.Future = asyncio.ensure_future(self._run_batch(item_list))
+            self._task_set.add(task)
+            task.add_done_callback(self._task_set.discard)
+
+    async def _run_batch(self, item_list: List[_BatchItem]) -> None:
+        loop: asyncio.AbstractEventLoop = get_event_loop()
+        now: float = loop.time()
+        self.batch_size_histogram.observe(len(item_list))
+        for _, _, enqueue_loop_time in item_list:
+            self.batch_wait_ms_histogram.observe((now - enqueue_loop_time) * 1000)
+
+        column_list: List[list] = [list(column) for column in zip(*[item[0] for item in item_list])]
+        if not column_list:
+            column_list = [[] for _ in range(self._param_cnt)]
+        try:
+            if self._is_coroutine_func:
+                result_list: Any = await self._func(*column_list)
+            else:
+                result_list = await loop.run_in_executor(None, partial(self._func, *column_list))
+            if not isinstance(result_list, (list, tuple)) or len(result_list) != len(item_list):
+                raise ValueError(f"batch func {self._func.__name__} must return a list with the same length as param")
+        except Exception as e:
+            for _, future, _ in item_list:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(item_list, result_list):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_size": self._max_size,
+            "max_wait_ms": self._max_wait * 1000,
+            "pending": len(self._queue),
+            "batch_size": self.batch_size_histogram.to_dict(),
+            "batch_wait_ms": self.batch_wait_ms_histogram.to_dict(),
+        }
+
+
+def batched(max_size: int = 64, max_wait_ms: float = 2) -> Callable[[Callable], Callable]:
+    """Register the func as a micro-batching func, see `Batcher` for details.
+
+    >>> @batched(max_size=64, max_wait_ms=2)
+    ... def predict(x: float, y: float) -> float:
+    ...     return [i * j for i, j in zip(x, y)]
+
+    The client calls `predict(1.0, 2.0)` as usual and gets `2.0`, but the server calls `predict([1.0, ...], [2.0, ...])`
+
+    :param max_size: The maximum number of calls in a batch
+    :param max_wait_ms: The maximum time(milliseconds) a call waits for the batch to be called
+    """
+
+    def wrapper(func: Callable) -> Callable:
+        batcher: Batcher = Batcher(func, max_size=max_size, max_wait_ms=max_wait_ms)
+
+        @wraps(func)
+        async def _batched(*param: Any) -> Any:
+            return await batcher.call(*param)
+
+        setattr(_batched, "batcher", batcher)
+        return _batched
+
+    return wrapper
@@ -3,19 +3,29 @@ import logging
 import signal
 import ssl
 import threading
-from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Set
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Set, Union
 
 from rap.common import event
 from rap.common.asyncio_helper import Deadline
-from rap.common.cache import Cache
-from rap.common.collect_statistics import WindowStatistics
+from rap.common.cache import Cache, ExpireCache
+from rap.common.collect_statistics import HistogramStore, StageTimer, WindowStatistics
 from rap.common.conn import CloseConnException, ServerConnection
 from rap.common.exceptions import ServerError
+from rap.common.gc_controller import GCController
+from rap.common.loop_monitor import LoopMonitor
+from rap.common.memory import MemoryTracer, get_object_cnt_dict
+from rap.common.processor import ProcessorChain
+from rap.common.profiler import SamplingProfiler
 from rap.common.signal_broadcast import add_signal_handler, remove_signal_handler
+from rap.common.slow_request import SlowRequestRecorder
 from rap.common.snowflake import async_get_snowflake_id
 from rap.common.types import BASE_MSG_TYPE, READER_TYPE, WRITER_TYPE
-from rap.common.utils import EventEnum
+from rap.common.utils import EventEnum, constant
+from rap.server.admission import AdmissionController
+from rap.server.func_cache import CachePolicy
 from rap.server.model import Request, Response, ServerContext
+from rap.server.overload import OverloadController
 from rap.server.plugin.middleware.base import BaseConnMiddleware, BaseMiddleware
 from rap.server.plugin.processor.base import BaseProcessor
 from rap.server.receiver import Receiver
@@ -49,6 +59,16 @@ class Server(object):
         call_func_permission_fn: Optional[Callable[[Request], Awaitable[FuncModel]]] = None,
         window_statistics: Optional[WindowStatistics] = None,
         cache_interval: Optional[float] = None,
+        overload_controller: Optional[OverloadController] = None,
+        check_type: bool = True,
+        histogram_store: Optional[HistogramStore] = None,
+        admission_controller: Optional[AdmissionController] = None,
+        stage_timing: bool = False,
+        server_timing_header: bool = False,
+        profiler: Optional[SamplingProfiler] = None,
+        loop_monitor: Optional[LoopMonitor] = None,
+        gc_controller: Optional[GCController] = None,
+        slow_request_recorder: Optional[SlowRequestRecorder] = None,
     ):
         """
         :param server_name: server name
@@ -70,6 +90,22 @@ class Server(object):
         :param call_func_permission_fn: Check the permission to call the function
         :param window_statistics: Server window state
         :param cache_interval: Server cache interval seconds to clean up expired data
+        :param overload_controller: Shed new low-priority requests when the server is overloaded
+        :param check_type: Whether to check the param type and return value type of func when calling,
+          it can be turned off in trusted deployments
+        :param histogram_store: Store the latency histogram of each target and transport(client ip)
+        :param admission_controller: Limit the conn count and accept rate before the conn is initialized
+        :param stage_timing: Record the cost of each stage(queue, processor, permission, func, response_processor,
+          encode, drain) of the msg request to the histogram store, query by `registry/stage_timing`
+        :param server_timing_header: Whether to set the cost of the stages to the `server-timing` response header,
+          only applicable when `stage_timing` is True
+        :param profiler: The wall-clock stack sampler called by `registry/profile`, default `SamplingProfiler()`
+        :param loop_monitor: Monitor the event loop lag, the task count and the slow callbacks, and publish them to
+          the window statistics, query by `registry/stats`
+        :param gc_controller: Freeze the objects after the startup hooks, record the gc pause of each generation and
+          tune the gc threshold, query by `registry/stats`
+        :param slow_request_recorder: Record the msg request whose duration exceeds the threshold,
+          query by `registry/slow_request`, enable `stage_timing` to record the stage timings and the queueing time
         """
         self.server_name: str = server_name
         self.host: str = host
@@ -83,6 +119,7 @@ class Server(object):
         self._ping_sleep_time: int = ping_sleep_time
         self._server: Optional[asyncio.AbstractServer] = None
         self._connected_set: Set[ServerConnection] = set()
+        self._receiver_set: Set[Receiver] = set()
         self._run_event: asyncio.Event = asyncio.Event()
         self._run_event.set()
 
@@ -96,6 +133,7 @@ class Server(object):
 
         self._middleware_list: List[BaseMiddleware] = []
         self._processor_list: List[BaseProcessor] = []
+        self._processor_chain: ProcessorChain = ProcessorChain(BaseProcessor)
         self._server_event_dict: Dict[EventEnum, List[SERVER_EVENT_FN]] = {
             value: [] for value in EventEnum.__members__.values()
         }
@@ -107,11 +145,57 @@ class Server(object):
             self.load_processor(processor_list)
 
         self._call_func_permission_fn: Optional[Callable[[Request], Awaitable[FuncModel]]] = call_func_permission_fn
-        self.registry: RegistryManager = RegistryManager()
-        self.cache: Cache = Cache(interval=cache_interval)
+        self.registry: RegistryManager = RegistryManager(check_type=check_type)
+        self.cache: Cache = ExpireCache(interval=cache_interval)
         self.window_statistics: WindowStatistics = window_statistics or WindowStatistics(interval=60)
         if self.window_statistics is not None and self.window_statistics.is_closed:
             self.register_server_event(EventEnum.before_start, lambda _app: self.window_statistics.statistics_data())
+        self.loop_monitor: Optional[LoopMonitor] = loop_monitor
+        if self.loop_monitor:
+            self.register_server_event(
+                EventEnum.before_start, lambda _app: self.loop_monitor.start(self.window_statistics)  # type: ignore
+            )
+            self.register_server_event(EventEnum.after_end, lambda _app: self.loop_monitor.stop())  # type: ignore
+        self.gc_controller: Optional[GCController] = gc_controller
+        if self.gc_controller:
+            self.register_server_event(
+                EventEnum.before_start, lambda _app: self.gc_controller.start(self.window_statistics)  # type: ignore
+            )
+            self.register_server_event(EventEnum.after_end, lambda _app: self.gc_controller.stop())  # type: ignore
+        self.slow_request_recorder: Optional[SlowRequestRecorder] = slow_request_recorder
+        if self.slow_request_recorder:
+            self.register_server_event(
+                EventEnum.before_start,
+                lambda _app: self.slow_request_recorder.start(self.histogram_store),  # type: ignore
+            )
+            self.register_server_event(
+                EventEnum.after_end, lambda _app: self.slow_request_recorder.stop()  # type: ignore
+            )
+        self.overload_controller: Optional[OverloadController] = overload_controller
+        if self.overload_controller:
+            self.register_server_event(EventEnum.before_start, self.overload_controller.start_event_handle)
+            self.register_server_event(EventEnum.after_end, self.overload_controller.stop_event_handle)
+        self.histogram_store: HistogramStore = histogram_store or HistogramStore()
+        self.admission_controller: Optional[AdmissionController] = admission_controller
+        if self.admission_controller:
+            self.register_server_event(EventEnum.before_start, self.admission_controller.start_event_handle)
+            self.register_server_event(EventEnum.after_end, self.admission_controller.stop_event_handle)
+        self.stage_timing: bool = stage_timing
+        self.server_timing_header: bool = stage_timing and server_timing_header
+        self.register(self._get_stats, "stats", group="registry", is_private=True)
+        self.register(self._get_stage_timing, "stage_timing", group="registry", is_private=True)
+        self.register(self._get_slow_request, "slow_request", group="registry", is_private=True)
+        self.profiler: SamplingProfiler = profiler or SamplingProfiler()
+        self.register(self._profile, "profile", group="registry", is_private=True)
+        self.memory_tracer: MemoryTracer = MemoryTracer()
+        self.register_server_event(EventEnum.after_end, lambda _app: self.memory_tracer.stop())
+        self.register(self.memory_tracer.start, "tracemalloc_start", group="registry", is_private=True)
+        self.register(self.memory_tracer.stop, "tracemalloc_stop", group="registry", is_private=True)
+        self.register(self.memory_tracer.take_snapshot, "tracemalloc_snapshot", group="registry", is_private=True)
+        self.register(self.memory_tracer.top, "tracemalloc_top", group="registry", is_private=True)
+        self.register(self.memory_tracer.diff, "tracemalloc_diff", group="registry", is_private=True)
+        self.register(self.memory_tracer.to_dict, "tracemalloc_info", group="registry", is_private=True)
+        self.register(self._get_object_cnt, "object_cnt", group="registry", is_private=True)
 
     def register_server_event(self, event_enum: EventEnum, *event_handle_list: SERVER_EVENT_FN) -> None:
         """register server event handler
@@ -164,6 +248,94 @@ class Server(object):
 
             for event_type, server_event_handle_list in processor.server_event_dict.items():
                 self.register_server_event(event_type, *server_event_handle_list)
+        # The loaded conn also uses the new processor chain
+        self._processor_chain.reload(self._processor_list)
+
+    @property
+    def processor_chain(self) -> ProcessorChain:
+        return self._processor_chain
+
+    async def _get_stats(self, group: Optional[str] = None) -> dict:
+        """get the server stats, include the latency(ms) histogram(p50/p90/p99/p999) of each target and transport
+        :param group: histogram group, `target` or `transport`, default all
+        """
+        return {
+            "histogram": self.histogram_store.to_dict(group),
+            "window_statistics": self.window_statistics.statistics_dict,
+            "overload": self.overload_controller.to_dict() if self.overload_controller else {},
+            "admission": self.admission_controller.to_dict() if self.admission_controller else {},
+            "loop": self.loop_monitor.to_dict() if self.loop_monitor else {},
+            "gc": self.gc_controller.to_dict() if self.gc_controller else {},
+        }
+
+    async def _get_stage_timing(self, target: Optional[str] = None) -> dict:
+        """get the cost(ms) histogram(p50/p90/p99/p999) of each stage of the msg request, group by target and stage
+        :param target: msg request target, default all
+        """
+        return self.histogram_store.to_stage_dict(target)
+
+    async def _profile(
+        self, seconds: float = 5.0, frequency: int = 100, output: str = "collapsed", top_n: int = 20
+    ) -> Union[str, list]:
+        """Sample the stacks of the server by `SamplingProfiler.profile`,
+        the seconds must be less than the run timeout, otherwise the call times out before the profile finishes
+        """
+        if seconds >= self._run_timeout:
+            raise ValueError(f"seconds must < run_timeout({self._run_timeout}s)")
+        return await self.profiler.profile(seconds, frequency, output, top_n)
+
+    async def _get_slow_request(self, target: Optional[str] = None) -> list:
+        """get the msg requests whose duration exceeds the threshold, the latest one is the last
+        :param target: msg request target, default all
+        """
+        if not self.slow_request_recorder:
+            return []
+        return self.slow_request_recorder.get_record_list(target)
+
+    def _record_slow_request(
+        self, request: Request, response: Optional[Response], exc: Optional[Exception], duration: float
+    ) -> None:
+        exc_info: Optional[str] = None
+        if exc is not None:
+            exc_info = f"{type(exc).__name__}: {exc}"
+        elif response is not None:
+            if response.exc is not None:
+                exc_info = f"{type(response.exc).__name__}: {response.exc}"
+            elif isinstance(response.body, dict) and "exc_info" in response.body:
+                exc_info = f"{response.body.get('exc', '')}: {response.body['exc_info']}"
+        self.slow_request_recorder.record(  # type: ignore
+            request.target,
+            duration,
+            param=request.body.get("param", None) if isinstance(request.body, dict) else None,
+            peer=request.context.conn.peer_tuple,
+            stage_timer=request.stage_timer,
+            queue_stage_tuple=("queue",),
+            exc_info=exc_info,
+        )
+
+    async def _get_object_cnt(self, class_top_n: int = 0) -> dict:
+        """get the number of the rap internal objects(conn, context, channel, generator, cache entry),
+        it runs on the event loop, so the objects are not changed while counting
+        :param class_top_n: If > 0, also count the alive objects of the top N rap classes by gc(slow)
+        """
+        object_cnt_dict: dict = {
+            "conn": len(self._connected_set),
+            "context": 0,
+            "channel": 0,
+            "generator": 0,
+            "cache": len(self.cache),
+            "func_cache": sum(
+                len(func_model.func_cache)
+                for func_model in list(self.registry.func_dict.values())
+                if func_model.func_cache is not None
+            ),
+        }
+        for receiver in list(self._receiver_set):
+            for key, value in receiver.to_dict().items():
+                object_cnt_dict[key] += value
+        if class_top_n > 0:
+            object_cnt_dict["class"] = get_object_cnt_dict(top_n=class_top_n)
+        return object_cnt_dict
 
     def register(
         self,
@@ -172,6 +344,7 @@ class Server(object):
         group: Optional[str] = None,
         is_private: bool = False,
         doc: Optional[str] = None,
+        cache: Optional[CachePolicy] = None,
     ) -> None:
         """Register function with Server
         :param func: function
@@ -181,9 +354,11 @@ class Server(object):
           private functions are only allowed to be called by the local client,
           but rap does not impose any mandatory restrictions
         :param doc: Describe what the function does
+        :param cache: Cache the result of the function according to the policy(LRU+TTL),
+          only applicable to pure functions
         """
         func = getattr(func, "raw_func", func)
-        self.registry.register(func, name, group=group, is_private=is_private, doc=doc)
+        self.registry.register(func, name, group=group, is_private=is_private, doc=doc, cache=cache)
 
     @property
     def is_closed(self) -> bool:
@@ -215,6 +390,8 @@ class Server(object):
         )
         logger.info(f"server running on {self.host}:{self.port}. use ssl:{bool(self._ssl_context)}")
         await self.run_event_list(EventEnum.after_start)
+        if self.gc_controller:
+            self.gc_controller.freeze()
 
         # fix different loop event
         self._run_event.clear()
@@ -253,7 +430,7 @@ class Server(object):
             if not _conn.is_closed():
                 try:
                     await Sender(
-                        self, _conn, self._send_timeout, processor_list=self._processor_list  # type: ignore
+                        self, _conn, self._send_timeout, processor_chain=self._processor_chain  # type: ignore
                     ).send_event(event.ShutdownEvent({"close_timeout": self._close_timeout}))
                 except ConnectionError:
                     # conn may be closed
@@ -285,23 +462,34 @@ class Server(object):
 
     async def conn_handle(self, reader: READER_TYPE, writer: WRITER_TYPE) -> None:
         """Handle initialization and recycling of conn"""
-        conn: ServerConnection = ServerConnection(
-            reader, writer, pack_param=self._pack_param, unpack_param=self._unpack_param
-        )
-        conn.conn_id = str(await async_get_snowflake_id())
+        ip: str = ""
+        if self.admission_controller:
+            peer_tuple: Optional[tuple] = writer.get_extra_info("peername")
+            ip = peer_tuple[0] if peer_tuple else ""
+            if not self.admission_controller.admit(ip):
+                writer.close()
+                return
         try:
-            self._connected_set.add(conn)
-            await self._conn_handle(conn)
+            conn: ServerConnection = ServerConnection(
+                reader, writer, pack_param=self._pack_param, unpack_param=self._unpack_param
+            )
+            conn.conn_id = str(await async_get_snowflake_id())
             try:
-                conn.conn_future.result()
-            except Exception:
-                pass
+                self._connected_set.add(conn)
+                await self._conn_handle(conn)
+                try:
+                    conn.conn_future.result()
+                except Exception:
+                    pass
+            finally:
+                self._connected_set.remove(conn)
         finally:
-            self._connected_set.remove(conn)
+            if self.admission_controller:
+                self.admission_controller.release(ip)
 
     async def _conn_handle(self, conn: ServerConnection) -> None:
         """Receive or send messages by conn"""
-        sender: Sender = Sender(self, conn, self._send_timeout, processor_list=self._processor_list)  # type: ignore
+        sender: Sender = Sender(self, conn, self._send_timeout, processor_chain=self._processor_chain)  # type: ignore
         receiver: Receiver = Receiver(
             self,  # type: ignore
             conn,
@@ -309,12 +497,16 @@ class Server(object):
             sender,
             self._ping_fail_cnt,
             self._ping_sleep_time,
-            processor_list=self._processor_list,
+            processor_chain=self._processor_chain,
             call_func_permission_fn=self._call_func_permission_fn,
         )
+        self._receiver_set.add(receiver)
+        conn.conn_future.add_done_callback(lambda f: self._receiver_set.discard(receiver))
         recv_msg_handle_future_set: Set[asyncio.Future] = set()
 
-        async def recv_msg_handle(_request_msg: Optional[BASE_MSG_TYPE]) -> None:
+        async def recv_msg_handle(
+            _request_msg: Optional[BASE_MSG_TYPE], receive_time: float, receive_size: int
+        ) -> None:
             if _request_msg is None:
                 await sender.send_event(event.CloseConnEvent("request is empty"))
                 return
@@ -327,26 +519,45 @@ class Server(object):
                     context.app = self
                     context.conn = conn
                     context.correlation_id = correlation_id
-                request: Request = Request.from_msg(_request_msg, context=context)
+                request: Request = Request.from_msg(_request_msg, context=context, receive_time=receive_time)
+                request.size = receive_size
+                if self.stage_timing and request.msg_type == constant.MSG_REQUEST:
+                    request.stage_timer = StageTimer(receive_time)
+                    # The time from reading the msg to handling it(scheduling delay and request building)
+                    request.stage_timer.mark("queue")
             except Exception as closer_e:
                 logger.error(f"{conn.peer_tuple} send bad msg:{_request_msg}, error:{closer_e}")
                 await sender.send_event(event.CloseConnEvent("protocol error"))
                 await conn.await_close()
                 return
 
+            response: Optional[Response] = None
+            handle_exc: Optional[Exception] = None
             try:
-                response: Optional[Response] = await receiver.dispatch(request)
+                response = await receiver.dispatch(request)
                 await sender(response)
             except Exception as closer_e:
                 logging.exception("raw_request handle error e")
+                handle_exc = closer_e
                 await sender.response_exc(ServerError(str(closer_e)), context)
+            if request.msg_type == constant.MSG_REQUEST:
+                now: float = time.time()
+                duration: float = now - receive_time
+                self.histogram_store.observe("target", request.target, duration, now)
+                self.histogram_store.observe("transport", conn.peer_tuple[0], duration, now)
+                if request.stage_timer is not None:
+                    request.stage_timer.observe(self.histogram_store, request.target, now)
+                if self.slow_request_recorder and self.slow_request_recorder.is_slow(request.target, duration):
+                    self._record_slow_request(request, response, handle_exc, duration)
 
         while not conn.is_closed():
             try:
                 with Deadline(self._keep_alive):
                     request_msg: Optional[BASE_MSG_TYPE] = await conn.read()
                 # create future handle msg
-                future: asyncio.Future = asyncio.ensure_future(recv_msg_handle(request_msg))
+                future: asyncio.Future = asyncio.ensure_future(
+                    recv_msg_handle(request_msg, time.time(), conn.last_read_size)
+                )
                 future.add_done_callback(lambda f: recv_msg_handle_future_set.remove(f))
                 recv_msg_handle_future_set.add(future)
             except asyncio.TimeoutError:
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+import msgpack
+
+__all__ = ["CachePolicy", "FuncCache"]
+
+
+@dataclass
+class CachePolicy(object):
+    ttl: float = 60  # The expiration time(seconds) of the cached result
+    max_entries: int = 1024  # The maximum number of cached results, the least recently used result will be evicted
+    # Gen cache key by func param, default use the msgpack-encoded param
+    key: Optional[Callable[..., Hashable]] = None
+
+    def __post_init__(self) -> None:
+        if self.ttl <= 0:
+            raise ValueError("ttl must > 0")
+        if self.max_entries <= 0:
+            raise ValueError("max_entries must > 0")
+
+
+class FuncCache(object):
+    """Cache the result of the func by LRU+TTL, and concurrent misses for the same key share a single execution"""
+
+    def __init__(self, policy: CachePolicy) -> None:
+        self.policy: CachePolicy = policy
+        self._ttl: float = policy.ttl
+        self._max_entries: int = policy.max_entries
+        self._key_fn: Callable[..., Hashable] = policy.key or self._default_key
+        self._dict: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight_dict: Dict[Hashable, asyncio.Future] = {}
+
+        self.hit_cnt: int = 0
+        self.miss_cnt: int = 0
+        self.eviction_cnt: int = 0
+
+    @staticmethod
+    def _default_key(*param: Any) -> Hashable:
+        return msgpack.packb(param)
+
+    def gen_key(self, param: Sequence[Any]) -> Hashable:
+        return self._key_fn(*param)
+
+    def _get(self, key: Hashable) -> Tuple[bool, Any]:
+        try:
+            expire, value = self._dict[key]
+        except KeyError:
+            return False, None
+        if expire < time.time():
+            del self._dict[key]
+            return False, None
+        self._dict.move_to_end(key)
+        return True, value
+
+    def _set(self, key: Hashable, value: Any) -> None:
+        self._dict[key] = (time.time() + self._ttl, value)
+        self._dict.move_to_end(key)
+        while len(self._dict) > self._max_entries:
+            self._dict.popitem(last=False)
+            self.eviction_cnt += 1
+
+    async def _call(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value: Any = await fn()
+            if not isinstance(value, Exception):
+                self._set(key, value)
+            return value
+        finally:
+            self._inflight_dict.pop(key, None)
+
+    async def get_or_call(
+        self, param: Sequence[Any], fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None
+    ) -> Any:
+        """Get the result from cache, if not found, call fn and cache the result.
+        If fn returns an exception, the exception is not cached
+
+        The call runs in a task that is not owned by any caller, and the concurrent misses of the same key wait for it,
+         so the cancellation or timeout of a caller(including the first one) does not affect the other callers.
+        :param param: func param
+        :param fn: call func and return result(or exception)
+        :param timeout: The maximum time(seconds) that the caller waits for the result, if timeout,
+          raise asyncio.TimeoutError and the call continues running for the other callers
+        """
+        key: Hashable = self.gen_key(param)
+        is_hit, value = self._get(key)
+        if is_hit:
+            self.hit_cnt += 1
+            return value
+        self.miss_cnt += 1
+
+        inflight_future: Optional[asyncio.Future] = self._inflight_dict.get(key, None)
+        if inflight_future is None:
+            inflight_future = asyncio.ensure_future(self._call(key, fn))
+            self._inflight_dict[key] = inflight_future
+        # singleflight, each caller only cancels its own wait
+        return await asyncio.wait_for(asyncio.shield(inflight_future), timeout)
+
+    def invalidate(self, param: Optional[Sequence[Any]] = None) -> int:
+        """Remove the cached result of the param, if param is None, remove all cached results.
+        return the number of removed results"""
+        if param is None:
+            cnt: int = len(self._dict)
+            self._dict.clear()
+            return cnt
+        return 1 if self._dict.pop(self.gen_key(param), None) is not None else 0
+
+    def __len__(self) -> int:
+        return len(self._dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._dict),
+            "hit": self.hit_cnt,
+            "miss": self.miss_cnt,
+            "eviction": self.eviction_cnt,
+        }
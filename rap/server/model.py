@@ -1,15 +1,17 @@
 import logging
 import sys
+import time
 from types import TracebackType
 from typing import TYPE_CHECKING, Any, Optional
 
+from rap.common.collect_statistics import StageTimer
 from rap.common.conn import ServerConnection
 from rap.common.event import Event
 from rap.common.exceptions import BaseRapError, ServerError
 from rap.common.msg import BaseMsgProtocol
 from rap.common.state import Context
 from rap.common.types import BASE_MSG_TYPE, SERVER_MSG_TYPE
-from rap.common.utils import constant
+from rap.common.utils import constant, parse_target
 
 if TYPE_CHECKING:
     from rap.server.core import Server
@@ -35,6 +37,7 @@ class Request(ServerMsgProtocol):
         header: dict,
         body: Any,
         context: ServerContext,
+        receive_time: Optional[float] = None,
     ):
         assert correlation_id == context.correlation_id, "correlation_id error"
         self.msg_type: int = msg_type
@@ -42,6 +45,12 @@ class Request(ServerMsgProtocol):
         self.correlation_id: int = correlation_id
         self.header = header or {}
         self.context: ServerContext = context
+        # The timestamp when the msg was read from the conn, used to calculate the queueing delay
+        self.receive_time: float = receive_time or time.time()
+        # The size(bytes) of the msg read from the conn, 0 is unknown
+        self.size: int = 0
+        # Record the cost of each stage of the msg request, None is disabled
+        self.stage_timer: Optional[StageTimer] = None
 
         self.target: str = self.header.get("target", "")
         state_target: Optional[str] = self.context.get_value("target", None)
@@ -52,13 +61,13 @@ class Request(ServerMsgProtocol):
         else:
             raise ValueError(f"Can not found target from {correlation_id} request")
 
-        _, group, func_name = self.target.split("/")
+        _, group, func_name = parse_target(self.target)
         self.group: str = group
         self.func_name: str = func_name
 
     @classmethod
-    def from_msg(cls, msg: BASE_MSG_TYPE, context: ServerContext) -> "Request":
-        return cls(*msg, context=context)
+    def from_msg(cls, msg: BASE_MSG_TYPE, context: ServerContext, receive_time: Optional[float] = None) -> "Request":
+        return cls(*msg, context=context, receive_time=receive_time)
 
 
 class Response(ServerMsgProtocol):
@@ -83,6 +92,8 @@ class Response(ServerMsgProtocol):
             self.target = target
         self.exc: Optional[Exception] = exc
         self.tb: Optional[TracebackType] = tb
+        # The stage timer of the request, None is disabled
+        self.stage_timer: Optional[StageTimer] = None
 
     def set_exception(self, exc: Exception) -> None:
         if not isinstance(exc, Exception):
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from rap.common.asyncio_helper import get_event_loop
+from rap.common.collect_statistics import Gauge
+from rap.common.utils import constant
+from rap.server.model import Request
+
+if TYPE_CHECKING:
+    from rap.common.loop_monitor import LoopMonitor
+    from rap.server.core import Server
+
+__all__ = ["OverloadController"]
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class OverloadController(object):
+    """CoDel-style adaptive load shedding.
+
+    Every request records the time it was received from the conn, and the controller measures its queueing
+     delay(sojourn time) before dispatch. If the sojourn time stays above `target` for a whole `interval`
+     (that is, the minimum delay in the interval is above `target`), or the event loop lag exceeds `max_loop_lag`,
+     the server is considered overloaded and new low-priority requests are rejected immediately with `OverloadError`
+     instead of waiting until they time out.
+
+    If the server has `loop_monitor`, the event loop lag is read from it instead of the controller's own timer.
+    """
+
+    def __init__(
+        self,
+        target: float = 0.005,
+        interval: float = 0.1,
+        max_loop_lag: float = 0.1,
+        loop_lag_interval: float = 0.05,
+        shed_priority: int = 0,
+        priority_header: str = "X-rap-priority",
+        diff: int = 10,
+        prefix: str = "overload",
+    ):
+        """
+        :param target: Acceptable minimum queueing delay(seconds)
+        :param interval: If the queueing delay is above `target` for this duration(seconds), start shedding
+        :param max_loop_lag: If the event loop lag(seconds) exceeds this value, start shedding
+        :param loop_lag_interval: Event loop lag check interval(seconds)
+        :param shed_priority: Requests with priority less than or equal to this value can be shed
+        :param priority_header: Request header key that carries the request priority, default priority is 0
+        :param diff: how many windows are a time period for the shed count metric
+        :param prefix: metric name prefix
+        """
+        self._target: float = target
+        self._interval: float = interval
+        self._max_loop_lag: float = max_loop_lag
+        self._loop_lag_interval: float = loop_lag_interval
+        self._shed_priority: int = shed_priority
+        self._priority_header: str = priority_header
+
+        self._first_above_time: float = 0.0
+        self._dropping: bool = False
+        self._loop_lag_handle: Optional[asyncio.TimerHandle] = None
+        self._loop_lag_expected_time: float = 0.0
+        self._loop_monitor: Optional["LoopMonitor"] = None
+
+        self.sojourn_time: float = 0.0
+        self._loop_lag: float = 0.0
+        self.shed_cnt: int = 0
+        self.shed_cnt_gauge: Gauge = Gauge(f"{prefix}_shed_cnt", diff=diff)
+
+    ##############
+    # life cycle #
+    ##############
+    def start_event_handle(self, app: "Server") -> None:
+        app.window_statistics.registry_metric(self.shed_cnt_gauge)
+        if app.loop_monitor:
+            self._loop_monitor = app.loop_monitor
+            return
+        loop: asyncio.AbstractEventLoop = get_event_loop()
+        self._loop_lag_expected_time = loop.time() + self._loop_lag_interval
+        self._loop_lag_handle = loop.call_at(self._loop_lag_expected_time, self._check_loop_lag)
+
+    def stop_event_handle(self, app: "Server") -> None:
+        if self._loop_lag_handle:
+            self._loop_lag_handle.cancel()
+            self._loop_lag_handle = None
+
+    @property
+    def loop_lag(self) -> float:
+        if self._loop_monitor:
+            return self._loop_monitor.lag
+        return self._loop_lag
+
+    def _check_loop_lag(self) -> None:
+        loop: asyncio.AbstractEventLoop = get_event_loop()
+        now: float = loop.time()
+        self._loop_lag = max(now - self._loop_lag_expected_time, 0.0)
+        self._loop_lag_expected_time = now + self._loop_lag_interval
+        self._loop_lag_handle = loop.call_at(self._loop_lag_expected_time, self._check_loop_lag)
+
+    #########
+    # codel #
+    #########
+    def _update_sojourn_time(self, sojourn_time: float, now: float) -> None:
+        self.sojourn_time = sojourn_time
+        if sojourn_time < self._target:
+            # The queue has drained at least once in the interval, so it is a good queue
+            self._first_above_time = 0.0
+            if self._dropping:
+                logger.info("queueing delay below target, stop shedding")
+            self._dropping = False
+        elif not self._first_above_time:
+            self._first_above_time = now + self._interval
+        elif not self._dropping and now >= self._first_above_time:
+            logger.warning(f"queueing delay above {self._target}s for {self._interval}s, start shedding")
+            self._dropping = True
+
+    @property
+    def is_overload(self) -> bool:
+        return self._dropping or self.loop_lag > self._max_loop_lag
+
+    def _can_shed(self, request: Request) -> bool:
+        if request.msg_type == constant.MSG_REQUEST:
+            # The next value of the generator belongs to the call that has been accepted
+            if request.body.get("call_id", -1) != -1:
+                return False
+        elif request.msg_type == constant.CHANNEL_REQUEST:
+            if request.header.get("channel_life_cycle") != constant.DECLARE:
+                return False
+        else:
+            return False
+        try:
+            priority: int = int(request.header.get(self._priority_header, 0))
+        except (TypeError, ValueError):
+            # The header is set by the client, an invalid value falls back to the default priority
+            priority = 0
+        return priority <= self._shed_priority
+
+    def is_shed(self, request: Request) -> bool:
+        """Update the queueing delay by the request, and judge whether the request needs to be shed"""
+        now: float = time.time()
+        self._update_sojourn_time(now - request.receive_time, now)
+        if self.is_overload and self._can_shed(request):
+            self.shed_cnt += 1
+            self.shed_cnt_gauge.increment()
+            return True
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "is_overload": self.is_overload,
+            "sojourn_time": self.sojourn_time,
+            "loop_lag": self.loop_lag,
+            "shed_cnt": self.shed_cnt,
+        }
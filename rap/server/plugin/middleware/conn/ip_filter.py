@@ -1,10 +1,12 @@
-import ipaddress
+import asyncio
+import logging
 from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
 from aredis import StrictRedis, StrictRedisCluster
 
 from rap.common.conn import ServerConnection
 from rap.common.event import CloseConnEvent
+from rap.common.ip_network import IpNetworkSet, normalize_ip_network
 from rap.common.utils import EventEnum
 from rap.server.plugin.middleware.base import BaseConnMiddleware
 from rap.server.sender import Sender
@@ -14,6 +16,7 @@ if TYPE_CHECKING:
     from rap.server.types import SERVER_EVENT_FN
 
 
+logger: logging.Logger = logging.getLogger(__name__)
 _FilterIpType = Union[str, List, Tuple]
 
 
@@ -22,6 +25,10 @@ class IpFilterMiddleware(BaseConnMiddleware):
     feat:
         1. block ip
         2. allow ip
+
+    The rules(ip or CIDR network) are stored in redis, and each server caches them in the local `IpNetworkSet`,
+     so the conn check does not access redis. The local rules are reloaded when the version in redis is changed
+     (checked every `sync_interval` seconds), and the rules changed by this server take effect immediately.
     """
 
     def __init__(
@@ -30,19 +37,36 @@ class IpFilterMiddleware(BaseConnMiddleware):
         allow_ip_list: Optional[List[str]] = None,
         block_ip_list: Optional[List[str]] = None,
         namespace: str = "rap",
+        sync_interval: float = 5,
     ):
+        """
+        :param redis: aredis client
+        :param allow_ip_list: The ip(or CIDR network) list that is allowed to access
+        :param block_ip_list: The ip(or CIDR network) list that is not allowed to access
+        :param namespace: redis key namespace
+        :param sync_interval: The interval(seconds) to check the rule version in redis
+        """
         self._redis: Union[StrictRedis, StrictRedisCluster] = redis
         self.block_key: str = "ip_filter_middleware:block_ip"
         self.allow_key: str = "ip_filter_middleware:allow_ip"
+        self.version_key: str = "ip_filter_middleware:version"
         self.block_cnt: int = 0
         if namespace:
             self.block_key = f"{namespace}:{self.block_key}"
             self.allow_key = f"{namespace}:{self.allow_key}"
+            self.version_key = f"{namespace}:{self.version_key}"
 
         self._allow_ip_list: List[str] = allow_ip_list if allow_ip_list else []
         self._block_ip_list: List[str] = block_ip_list if block_ip_list else []
+        self._allow_ip_set: IpNetworkSet = IpNetworkSet()
+        self._block_ip_set: IpNetworkSet = IpNetworkSet()
+        self._version: Optional[bytes] = None
+        self._is_load: bool = False
+        self._sync_interval: float = sync_interval
+        self._sync_future: Optional[asyncio.Future] = None
         self.server_event_dict: Dict[EventEnum, List["SERVER_EVENT_FN"]] = {
-            EventEnum.before_start: [self.start_event_handle]
+            EventEnum.before_start: [self.start_event_handle],
+            EventEnum.after_end: [self.stop_event_handle],
         }
 
     async def start_event_handle(self, app: "Server") -> None:
@@ -58,22 +82,70 @@ class IpFilterMiddleware(BaseConnMiddleware):
         self.register(self._remove_block_ip)
         self.register(self._get_allow_ip)
         self.register(self._get_block_ip)
-        if self._allow_ip_list:
-            await self._add_allow_ip(self._allow_ip_list)
-        if self._block_ip_list:
-            await self._add_block_ip(self._block_ip_list)
+        try:
+            await self._sync()
+            if self._allow_ip_list:
+                await self._add_allow_ip(self._allow_ip_list)
+            if self._block_ip_list:
+                await self._add_block_ip(self._block_ip_list)
+        except Exception as e:
+            # The server can still start with the local rules
+            logger.warning(f"{self.__class__.__name__} load ip rule from redis error:{e}")
+            for ip in self.ip_handle(self._allow_ip_list):
+                self._allow_ip_set.add(ip)
+                self._block_ip_set.remove(ip)
+            for ip in self.ip_handle(self._block_ip_list):
+                self._block_ip_set.add(ip)
+                self._allow_ip_set.remove(ip)
+        if self._sync_future is None or self._sync_future.done():
+            self._sync_future = asyncio.ensure_future(self._sync_loop())
+
+    def stop_event_handle(self, app: "Server") -> None:
+        if self._sync_future is not None and not self._sync_future.done():
+            self._sync_future.cancel()
+        self._sync_future = None
+
+    async def _sync(self) -> None:
+        """reload the local rules if the rule version in redis is changed"""
+        version: Optional[bytes] = await self._redis.get(self.version_key)
+        if self._is_load and version == self._version:
+            return
+        async with await self._redis.pipeline() as pipe:
+            await pipe.smembers(self.allow_key)
+            await pipe.smembers(self.block_key)
+            allow_ip_set, block_ip_set = await pipe.execute()
+        self._allow_ip_set = IpNetworkSet([ip.decode() for ip in allow_ip_set])
+        self._block_ip_set = IpNetworkSet([ip.decode() for ip in block_ip_set])
+        self._version = version
+        self._is_load = True
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._sync_interval)
+            try:
+                await self._sync()
+            except Exception as e:
+                logger.warning(f"{self.__class__.__name__} sync ip rule error:{e}")
+
+    async def _incr_version(self, pipe: "StrictRedis") -> None:
+        await pipe.incr(self.version_key)
+        result_list: list = await pipe.execute()
+        version: int = int(result_list[-1])
+        if self._is_load and int(self._version or 0) + 1 == version:
+            # Only this change since the last sync, the local rules are up to date
+            self._version = str(version).encode()
+        else:
+            # The rules were changed by other servers in between, reload them
+            await self._sync()
 
     @staticmethod
     def ip_network_handle(ip: str) -> List[str]:
+        """The network is stored as CIDR(not expanded to hosts)
+
+        >>> IpFilterMiddleware.ip_network_handle('192.168.0.1/31')
+        ['192.168.0.0/31']
         """
-        >>> IpFilterMiddleware.ip_network_handle('192.168.0.0/31')
-        ['192.168.0.1', '192.168.0.2']
-        """
-        ip_list: List[str] = [ip]
-        if "/" in ip:
-            ip_network: Union[ipaddress.IPv4Network, ipaddress.IPv6Network] = ipaddress.ip_network(ip)
-            ip_list = [str(ip) for ip in ip_network.hosts()]
-        return ip_list
+        return [normalize_ip_network(ip)]
 
     def ip_handle(self, ip: _FilterIpType) -> List[str]:
         ip_list: List[str] = []
@@ -85,25 +157,39 @@ class IpFilterMiddleware(BaseConnMiddleware):
 
     async def _add_allow_ip(self, ip: _FilterIpType) -> None:
         ip_list: List[str] = self.ip_handle(ip)
+        for _ip in ip_list:
+            self._allow_ip_set.add(_ip)
+            self._block_ip_set.remove(_ip)
         async with await self._redis.pipeline() as pipe:
             await pipe.sadd(self.allow_key, ip_list[0], *ip_list[1:])
             await pipe.srem(self.block_key, ip_list[0], *ip_list[1:])
-            await pipe.execute()
+            await self._incr_version(pipe)
 
     async def _add_block_ip(self, ip: _FilterIpType) -> None:
         ip_list: List[str] = self.ip_handle(ip)
+        for _ip in ip_list:
+            self._block_ip_set.add(_ip)
+            self._allow_ip_set.remove(_ip)
         async with await self._redis.pipeline() as pipe:
             await pipe.sadd(self.block_key, ip_list[0], *ip_list[1:])
             await pipe.srem(self.allow_key, ip_list[0], *ip_list[1:])
-            await pipe.execute()
+            await self._incr_version(pipe)
 
     async def _remove_allow_ip(self, ip: _FilterIpType) -> None:
         ip_list: List[str] = self.ip_handle(ip)
-        await self._redis.srem(self.allow_key, ip_list[0], *ip_list[1:])
+        for _ip in ip_list:
+            self._allow_ip_set.remove(_ip)
+        async with await self._redis.pipeline() as pipe:
+            await pipe.srem(self.allow_key, ip_list[0], *ip_list[1:])
+            await self._incr_version(pipe)
 
     async def _remove_block_ip(self, ip: _FilterIpType) -> None:
         ip_list: List[str] = self.ip_handle(ip)
-        await self._redis.srem(self.block_key, ip_list[0], *ip_list[1:])
+        for _ip in ip_list:
+            self._block_ip_set.remove(_ip)
+        async with await self._redis.pipeline() as pipe:
+            await pipe.srem(self.block_key, ip_list[0], *ip_list[1:])
+            await self._incr_version(pipe)
 
     async def _get_allow_ip(self) -> List[str]:
         ip_list: List[str] = []
@@ -117,23 +203,20 @@ class IpFilterMiddleware(BaseConnMiddleware):
             ip_list.append(ip.decode())
         return ip_list
 
+    async def _block_conn(self, conn: ServerConnection) -> None:
+        self.block_cnt += 1
+        await Sender(self.app, conn).send_event(CloseConnEvent("not allowed to access"))
+        await conn.await_close()
+
     async def dispatch(self, conn: ServerConnection) -> None:
         ip: str = conn.peer_tuple[0]
-        enable_allow: bool = await self._redis.scard(self.allow_key) > 0
-        if enable_allow:
-            is_allow: int = await self._redis.sismember(self.allow_key, ip)
-            if not is_allow:
-                self.block_cnt += 1
-                await Sender(self.app, conn).send_event(CloseConnEvent("not allowed to access"))
-                await conn.await_close()
-                return
-        else:
-            is_block: int = await self._redis.sismember(self.block_key, ip)
-            if is_block:
-                self.block_cnt += 1
-                await Sender(self.app, conn).send_event(CloseConnEvent("not allowed to access"))
-                await conn.await_close()
+        if len(self._allow_ip_set) > 0:
+            if ip not in self._allow_ip_set:
+                await self._block_conn(conn)
                 return
+        elif ip in self._block_ip_set:
+            await self._block_conn(conn)
+            return
         await self.call_next(conn)
 
 
@@ -141,11 +224,8 @@ class IpBlockMiddleware(IpFilterMiddleware):
     """Only Block Ip"""
 
     async def dispatch(self, conn: ServerConnection) -> None:
-        is_block: int = await self._redis.sismember(self.block_key, conn.peer_tuple[0])
-        if is_block:
-            self.block_cnt += 1
-            await Sender(self.app, conn).send_event(CloseConnEvent("not allowed to access"))
-            await conn.await_close()
+        if conn.peer_tuple[0] in self._block_ip_set:
+            await self._block_conn(conn)
             return
         await self.call_next(conn)
 
@@ -154,10 +234,7 @@ class IpAllowMiddleware(IpFilterMiddleware):
     """Only Allow Ip"""
 
     async def dispatch(self, conn: ServerConnection) -> None:
-        is_allow: int = await self._redis.sismember(self.allow_key, conn.peer_tuple[0])
-        if not is_allow:
-            self.block_cnt += 1
-            await Sender(self.app, conn).send_event(CloseConnEvent("not allowed to access"))
-            await conn.await_close()
+        if conn.peer_tuple[0] not in self._allow_ip_set:
+            await self._block_conn(conn)
             return
         await self.call_next(conn)
@@ -1,38 +1,274 @@
+import json
 import logging
+import random
+import threading
 import time
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
 
-from rap.common.utils import constant
+import msgpack
+
+from rap.common.utils import EventEnum, constant
 from rap.server.model import Request, Response
 from rap.server.plugin.processor.base import BaseProcessor
 
+if TYPE_CHECKING:
+    from rap.server.core import Server
+    from rap.server.types import SERVER_EVENT_FN
+
+__all__ = ["AccessLog", "AccessProcessor"]
 logger: logging.Logger = logging.getLogger(__name__)
 
+# The fields of the access log entry
+ACCESS_LOG_FIELD_TUPLE: Tuple[str, ...] = (
+    "timestamp",
+    "host",
+    "target",
+    "msg_type",
+    "correlation_id",
+    "life_cycle",
+    "status_code",
+    "duration",
+    "request_size",
+)
+
+
+class AccessLog(object):
+    """Write the access log entries to the file in a background thread.
+
+    The entries are recorded into a preallocated ring buffer by the event loop(single producer), and the writer
+     thread(single consumer) serializes them in batches as JSON lines or msgpack, so the event loop is not blocked
+     by the file io. When the buffer is full, the new entries are dropped and counted by `drop_cnt`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        serializer: str = "json",
+        buffer_size: int = 65536,
+        batch_size: int = 1024,
+        flush_interval: float = 0.5,
+    ):
+        """
+        :param path: The path of the access log file, the entries are appended to the file
+        :param serializer: The format of the entry, `json`(JSON lines) or `msgpack`(a msgpack map per entry)
+        :param buffer_size: The maximum number of entries in the ring buffer
+        :param batch_size: Wake up the writer thread when the number of pending entries reaches this value
+        :param flush_interval: The maximum interval(seconds) to write the pending entries
+        """
+        if serializer not in ("json", "msgpack"):
+            raise ValueError(f"Not support serializer:{serializer}")
+        if buffer_size <= 0:
+            raise ValueError("buffer_size must > 0")
+        self._path: str = path
+        self._serializer: str = serializer
+        self._buffer_size: int = buffer_size
+        self._batch_size: int = min(batch_size, buffer_size)
+        self._flush_interval: float = flush_interval
+
+        self._buffer: List[Optional[tuple]] = [None] * buffer_size
+        # The index of the next entry to write(by the writer thread) and record(by the event loop)
+        self._head: int = 0
+        self._tail: int = 0
+        self._event: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._is_running: bool = False
+
+        self.record_cnt: int = 0
+        self.drop_cnt: int = 0
+        self.write_cnt: int = 0
+        self.write_error_cnt: int = 0
+
+    def record(self, entry: tuple) -> bool:
+        """Record the entry(the value of each field in `ACCESS_LOG_FIELD_TUPLE`), return False if it is dropped"""
+        tail: int = self._tail
+        pending_cnt: int = tail - self._head
+        if pending_cnt >= self._buffer_size:
+            self.drop_cnt += 1
+            return False
+        self._buffer[tail % self._buffer_size] = entry
+        self._tail = tail + 1
+        self.record_cnt += 1
+        if pending_cnt + 1 == self._batch_size:
+            self._event.set()
+        return True
+
+    def _pop_entry_list(self) -> List[tuple]:
+        head: int = self._head
+        tail: int = self._tail
+        entry_list: List[tuple] = []
+        for index in range(head, tail):
+            index %= self._buffer_size
+            entry_list.append(self._buffer[index])  # type: ignore
+            self._buffer[index] = None
+        self._head = tail
+        return entry_list
+
+    def _serialize(self, entry_list: List[tuple]) -> bytes:
+        if self._serializer == "json":
+            return "".join(
+                json.dumps(dict(zip(ACCESS_LOG_FIELD_TUPLE, entry)), default=str) + "\n" for entry in entry_list
+            ).encode()
+        return b"".join(msgpack.packb(dict(zip(ACCESS_LOG_FIELD_TUPLE, entry))) for entry in entry_list)
+
+    def _write(self, f: IO[bytes]) -> None:
+        entry_list: List[tuple] = self._pop_entry_list()
+        if not entry_list:
+            return
+        try:
+            f.write(self._serialize(entry_list))
+            f.flush()
+            self.write_cnt += len(entry_list)
+        except Exception as e:
+            self.write_error_cnt += len(entry_list)
+            logger.error(f"write access log error:{e}")
+
+    def _run(self) -> None:
+        with open(self._path, "ab") as f:
+            while self._is_running:
+                self._event.wait(self._flush_interval)
+                self._event.clear()
+                self._write(f)
+            self._write(f)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._is_running = True
+        self._thread = threading.Thread(target=self._run, name=f"{self.__class__.__name__}Writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer thread after writing the pending entries"""
+        if self._thread is None:
+            return
+        self._is_running = False
+        self._event.set()
+        self._thread.join()
+        self._thread = None
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "record_cnt": self.record_cnt,
+            "drop_cnt": self.drop_cnt,
+            "write_cnt": self.write_cnt,
+            "write_error_cnt": self.write_error_cnt,
+            "pending_cnt": self._tail - self._head,
+        }
+
 
 class AccessProcessor(BaseProcessor):
-    """print access log"""
+    """print access log
 
-    async def process_request(self, request: Request) -> Request:
-        host: str = request.header["host"]
+    If `access_log` is set, the entries are written by `AccessLog` in the background thread instead of the logger,
+     and the entries can be sampled by the status(the status code >= 400 is the error).
+    """
+
+    msg_type_set: Set[int] = {
+        constant.MSG_REQUEST,
+        constant.CHANNEL_REQUEST,
+        constant.MSG_RESPONSE,
+        constant.CHANNEL_RESPONSE,
+    }
+
+    def __init__(
+        self,
+        access_log: Optional[AccessLog] = None,
+        success_sample_rate: float = 1.0,
+        error_sample_rate: float = 1.0,
+    ) -> None:
+        """
+        :param access_log: The access log pipeline, if None, print the access log by the logger
+        :param success_sample_rate: The sample rate of the success entries(only for `access_log`), e.g. 0.01
+        :param error_sample_rate: The sample rate of the error entries(only for `access_log`)
+        """
+        self._access_log: Optional[AccessLog] = access_log
+        self._success_sample_rate: float = success_sample_rate
+        self._error_sample_rate: float = error_sample_rate
+        self.server_event_dict: Dict[EventEnum, List["SERVER_EVENT_FN"]] = {}
+        if access_log is not None:
+            self.server_event_dict = {
+                EventEnum.before_start: [self.start_event_handle],
+                EventEnum.after_end: [self.stop_event_handle],
+            }
+
+    def start_event_handle(self, app: "Server") -> None:
+        access_log: AccessLog = self._access_log  # type: ignore
+
+        async def _add_data_to_state(state_dict: dict) -> None:
+            state_dict[f"{self.__class__.__name__}:drop_cnt"] = access_log.drop_cnt
+
+        if self.app.window_statistics:
+            self.app.window_statistics.add_priority_callback(_add_data_to_state)
+        access_log.start()
+
+    def stop_event_handle(self, app: "Server") -> None:
+        self._access_log.stop()  # type: ignore
+
+    def _is_sample(self, status_code: int) -> bool:
+        sample_rate: float = self._error_sample_rate if status_code >= 400 else self._success_sample_rate
+        return sample_rate >= 1 or random.random() < sample_rate
+
+    def process_request(self, request: Request) -> Request:  # type: ignore
         if request.msg_type == constant.MSG_REQUEST:
             request.context.access_processor_start_time = time.time()
+            request.context.access_processor_request_size = request.size
         elif (
             request.msg_type == constant.CHANNEL_REQUEST
             and request.header.get("channel_life_cycle", "error") == constant.DECLARE
         ):
-            logger.info(f"host:{host} declare channel. group:{request.group} func:{request.func_name}")
+            if self._access_log is not None:
+                if self._is_sample(200):
+                    self._record(request, constant.DECLARE, 200, 0.0, request.size)
+            else:
+                host: str = request.header["host"]
+                logger.info(f"host:{host} declare channel. group:{request.group} func:{request.func_name}")
         return request
 
-    async def process_response(self, response: Response) -> Response:
-        host: str = response.header["host"]
+    def _record(self, msg: Any, life_cycle: str, status_code: int, duration: float, request_size: int) -> None:
+        self._access_log.record(  # type: ignore
+            (
+                time.time(),
+                # the client address
+                msg.context.conn.peer_tuple,
+                msg.target,
+                msg.msg_type,
+                msg.correlation_id,
+                life_cycle,
+                status_code,
+                duration,
+                request_size,
+            )
+        )
+
+    def process_response(self, response: Response) -> Response:  # type: ignore
         status_code: int = response.header["status_code"]
         if response.msg_type == constant.MSG_RESPONSE:
-            logger.info(
-                f"host:{host}, target: {response.target},"
-                f" time:{time.time() - response.context.access_processor_start_time }, status:{status_code >= 400}"
-            )
+            self._msg_response_handle(response, status_code)
         elif (
             response.msg_type == constant.CHANNEL_RESPONSE
             and response.header.get("channel_life_cycle", "error") == constant.DROP
         ):
-            logger.info(f"host:{host}, target: {response.target} drop")
+            if self._access_log is not None:
+                if self._is_sample(status_code):
+                    self._record(response, constant.DROP, status_code, 0.0, 0)
+            else:
+                logger.info(f"host:{response.header['host']}, target: {response.target} drop")
         return response
+
+    def process_exc(self, response: Response, exc: Exception) -> Tuple[Response, Exception]:  # type: ignore
+        if response.msg_type == constant.MSG_RESPONSE:
+            self._msg_response_handle(response, response.status_code)
+        return response, exc
+
+    def _msg_response_handle(self, response: Response, status_code: int) -> None:
+        start_time: Optional[float] = response.context.get_value("access_processor_start_time", None)
+        duration: float = time.time() - start_time if start_time is not None else 0.0
+        if self._access_log is not None:
+            if self._is_sample(status_code):
+                request_size: int = response.context.get_value("access_processor_request_size", 0)
+                self._record(response, "", status_code, duration, request_size)
+        else:
+            logger.info(
+                f"host:{response.header.get('host')}, target: {response.target},"
+                f" time:{duration}, status:{status_code >= 400}"
+            )
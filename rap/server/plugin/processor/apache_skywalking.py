@@ -1,3 +1,4 @@
+import time
 from traceback import format_tb
 from typing import Optional, Tuple
 
@@ -8,6 +9,7 @@ from skywalking.trace.span import Span
 from skywalking.trace.tags import Tag
 from skywalking.utils import filter
 
+from rap.common.trace_sampler import BaseTraceSampler, sample_trace, trace_sample_context
 from rap.common.utils import constant
 from rap.server.model import BaseMsgProtocol, Request, Response
 
@@ -34,8 +36,26 @@ class TagRapType(Tag):
 
 
 class SkywalkingProcessor(BaseProcessor):
-    def __init__(self, carrier_key_prefix: str = "X-Rap"):
+    def __init__(
+        self,
+        carrier_key_prefix: str = "X-Rap",
+        sampler: Optional[BaseTraceSampler] = None,
+        trace_error: bool = False,
+        trace_slow_time: Optional[float] = None,
+    ):
+        """
+        :param carrier_key_prefix: The prefix of the header key that carries the skywalking carrier
+        :param sampler: Decide whether to sample the trace at the edge, None is always sampled.
+            The span is not created for the unsampled trace, and the decision is propagated to the downstream
+        :param trace_error: Create the span for the error request of the unsampled trace
+        :param trace_slow_time: Create the span for the request of the unsampled trace that cost more than
+            this time(seconds)
+        """
         self._carrier_key_prefix = carrier_key_prefix
+        self._sampler: Optional[BaseTraceSampler] = sampler
+        self._trace_error: bool = trace_error
+        self._trace_slow_time: Optional[float] = trace_slow_time
+        self._is_trigger: bool = trace_error or trace_slow_time is not None
 
     def _create_span(self, msg: BaseMsgProtocol) -> Span:
         carrier: Carrier = Carrier()
@@ -53,17 +73,60 @@ class SkywalkingProcessor(BaseProcessor):
         span.tag(TagMsgType(msg.msg_type))
         return span
 
+    def _is_sample(self, request: Request) -> bool:
+        is_sample: Optional[bool] = request.context.get_value("trace_is_sample", None)
+        if is_sample is None:
+            is_sample = sample_trace(request.header, request.target, self._sampler)
+            request.context.trace_is_sample = is_sample
+        # The client called by the func inherits the decision
+        trace_sample_context.set(is_sample)
+        return is_sample
+
+    def _trigger_span(self, response: Response, exc: Optional[Exception] = None) -> None:
+        """Create the span of the unsampled trace when the request is error or slow"""
+        start_time: Optional[float] = response.context.get_value("trace_start_time", None)
+        if start_time is None:
+            return
+        status_code: int = response.status_code
+        is_error: bool = exc is not None or status_code >= 400
+        if not (self._trace_error and is_error) and not (
+            self._trace_slow_time is not None and time.time() - start_time >= self._trace_slow_time
+        ):
+            return
+        span: Span = get_context().new_entry_span(op=response.target)
+        span.start()
+        span.start_time = int(start_time * 1000)
+        span.layer = Layer.RPCFramework
+        span.component = Component.Unknown
+        span.tag(TagRapType("server"))
+        span.tag(TagCorrelationId(response.correlation_id))
+        span.tag(TagMsgType(response.msg_type))
+        span.tag(TagStatusCode(status_code))
+        span.error_occurred = is_error
+        if exc is not None:
+            span.logs = [
+                Log(items=[LogItem(key="Traceback", val=filter.sw_filter(target="".join(format_tb(response.tb))))])
+            ]
+        span.stop()
+
     async def process_request(self, request: Request) -> Request:
         if request.msg_type is constant.MSG_REQUEST and not request.context.get_value("span", None):
-            request.context.span = self._create_span(request)
+            if self._is_sample(request):
+                request.context.span = self._create_span(request)
+            elif self._is_trigger:
+                request.context.trace_start_time = time.time()
         elif request.msg_type is constant.CHANNEL_REQUEST and not request.context.get_value("span", None):
-            # A channel is a continuous activity that may involve the interaction of multiple coroutines
-            request.context.span = self._create_span(request)
+            if self._is_sample(request):
+                # A channel is a continuous activity that may involve the interaction of multiple coroutines
+                request.context.span = self._create_span(request)
         return request
 
     async def process_response(self, response: Response) -> Response:
         if response.msg_type is constant.MSG_RESPONSE:
-            span: Span = response.context.span
+            span: Optional[Span] = response.context.get_value("span", None)
+            if span is None:
+                self._trigger_span(response)
+                return response
             status_code: int = response.status_code
             span.tag(TagStatusCode(status_code))
             span.error_occurred = status_code >= 400
@@ -71,6 +134,7 @@ class SkywalkingProcessor(BaseProcessor):
         elif (
             response.msg_type is constant.CHANNEL_RESPONSE
             and response.header.get("channel_life_cycle", "error") == constant.DECLARE
+            and response.context.get_value("span", None)
         ):
             # The channel is created after receiving the request
             response.context.user_channel.add_done_callback(lambda f: response.context.span.stop())
@@ -87,4 +151,6 @@ class SkywalkingProcessor(BaseProcessor):
             ]
             if response.msg_type is not constant.CHANNEL_RESPONSE:
                 span.stop()
+        elif response.msg_type is constant.MSG_RESPONSE:
+            self._trigger_span(response, exc)
         return response, exc
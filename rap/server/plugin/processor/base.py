@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
 
 from rap.server.model import Request, Response
 
@@ -12,10 +12,14 @@ class BaseProcessor(object):
     """
     feat: Process the data of a certain process (usually used to read data and write data)
     ps: If you need to share data, please use `request.stats` and `response.stats`
+
+    The server only calls the hooks overridden by the processor, and the hook can be a sync func.
     """
 
     app: "Server"
     server_event_dict: Dict["EventEnum", List["SERVER_EVENT_FN"]] = {}
+    # The msg types(request and response) handled by the processor, None is all msg types
+    msg_type_set: Optional[Set[int]] = None
 
     def register(self, func: Callable, name: Optional[str] = None, group: Optional[str] = None) -> None:
         if not group:
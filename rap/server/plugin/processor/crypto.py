@@ -1,8 +1,9 @@
 import time
-from typing import TYPE_CHECKING, Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-from rap.common.crypto import Crypto
+from rap.common.crypto import Crypto, get_crypto_class
 from rap.common.exceptions import CryptoError, ParseError
+from rap.common.nonce_filter import BaseNonceFilter, NonceSetFilter
 from rap.common.utils import EventEnum, constant, gen_random_time_id
 from rap.server.model import Request, Response
 from rap.server.plugin.processor.base import BaseProcessor
@@ -20,13 +21,25 @@ class BaseCryptoProcessor(BaseProcessor):
         secret_dict: Dict[str, str],
         timeout: int = 60,
         nonce_timeout: int = 120,
+        nonce_filter: Optional[BaseNonceFilter] = None,
     ):
+        """
+        :param secret_dict: crypto key dict, eg{'key_id': 'xxxxxxxxxxxxxxxx'}
+        :param timeout: The maximum time(seconds) between the message is sent and received
+        :param nonce_timeout: The time(seconds) that the nonce of the received message is kept
+        :param nonce_filter: Store the nonce of the received message, default is `NonceSetFilter`,
+            `NonceBloomFilter` can be used to fix the memory usage when the message rate is high
+        """
         self._timeout: int = timeout
         self._nonce_timeout: int = nonce_timeout
-        self._nonce_key = f"{self.__class__.__name__}:nonce_key"
+        self._nonce_filter: BaseNonceFilter = (
+            nonce_filter if nonce_filter is not None else NonceSetFilter(ttl=nonce_timeout)
+        )
 
         self._key_dict: Dict[str, str] = {}
         self._crypto_dict: Dict[str, "Crypto"] = {}
+        # The crypto of other mode(e.g. gcm) is created when the client declares to use it
+        self._mode_crypto_dict: Dict[Tuple[str, str], "Crypto"] = {}
 
         self.server_event_dict: Dict[EventEnum, List["SERVER_EVENT_FN"]] = {
             EventEnum.before_start: [self.start_event_handle]
@@ -51,16 +64,28 @@ class BaseCryptoProcessor(BaseProcessor):
         """get crypto key in list"""
         return list(self._key_dict.keys())
 
+    def _pop_mode_crypto(self, key: str) -> None:
+        for mode_key in [mode_key for mode_key in self._mode_crypto_dict if mode_key[0] == key]:
+            self._mode_crypto_dict.pop(mode_key, None)
+
     def del_crypto_by_key_id(self, key_id: str) -> None:
         key: str = self._key_dict.get(key_id, "")
         if key:
             self._key_dict.pop(key, None)
             self._crypto_dict.pop(key, None)
+            self._pop_mode_crypto(key)
         return
 
-    def get_crypto_by_key_id(self, key_id: str) -> "Optional[Crypto]":
+    def get_crypto_by_key_id(self, key_id: str, mode: str = Crypto.mode) -> "Optional[Crypto]":
+        """get crypto by key id and crypto mode(cbc or gcm)"""
         key: str = self._key_dict.get(key_id, "")
-        return self._crypto_dict.get(key, None)
+        if not key or mode == Crypto.mode:
+            return self._crypto_dict.get(key, None)
+        crypto: Optional[Crypto] = self._mode_crypto_dict.get((key, mode), None)
+        if crypto is None:
+            crypto = get_crypto_class(mode)(key)
+            self._mode_crypto_dict[(key, mode)] = crypto
+        return crypto
 
     def get_crypto_by_key(self, key: str) -> "Optional[Crypto]":
         return self._crypto_dict.get(key, None)
@@ -71,6 +96,7 @@ class BaseCryptoProcessor(BaseProcessor):
             value: str = self._key_dict[key]
             del self._crypto_dict[value]
             del self._key_dict[key]
+            self._pop_mode_crypto(value)
 
     def modify_crypto_timeout(self, timeout: int) -> None:
         """modify crypto timeout param"""
@@ -79,6 +105,7 @@ class BaseCryptoProcessor(BaseProcessor):
     def modify_crypto_nonce_timeout(self, timeout: int) -> None:
         """modify crypto nonce timeout param"""
         self._nonce_timeout = timeout
+        self._nonce_filter.set_ttl(timeout)
 
     async def decrypt_request(self, request: Request) -> Request:
         """decrypt request body"""
@@ -97,11 +124,8 @@ class BaseCryptoProcessor(BaseProcessor):
                     nonce: str = request.body.get("nonce", "")
                     if not nonce:
                         raise ParseError(extra_msg="nonce param error")
-                    nonce = f"{self._nonce_key}:{nonce}"
-                    if nonce in self.app.cache:
+                    if not self._nonce_filter.add(nonce):
                         raise ParseError(extra_msg="nonce param error")
-                    else:
-                        self.app.cache.add(nonce, self._nonce_timeout)
                     request.body = request.body["body"]
 
                     # set share data
@@ -129,7 +153,12 @@ class CryptoProcessor(BaseCryptoProcessor):
         if request.msg_type == constant.CLIENT_EVENT and request.target.endswith(constant.DECLARE):
             crypto_id: str = request.body.get("crypto_id", "")
             if crypto_id:
-                crypto: Optional[Crypto] = self.get_crypto_by_key_id(crypto_id)
+                try:
+                    crypto: Optional[Crypto] = self.get_crypto_by_key_id(
+                        crypto_id, request.body.get("crypto_mode", Crypto.mode)
+                    )
+                except ValueError as e:
+                    raise CryptoError(str(e)) from e
                 if not crypto:
                     raise CryptoError(f"Can not found crypto_id:{crypto_id}")
                 try:
@@ -154,8 +183,11 @@ class AutoCryptoProcessor(BaseCryptoProcessor):
         self,
         timeout: int = 60,
         nonce_timeout: int = 120,
+        nonce_filter: Optional[BaseNonceFilter] = None,
     ):
-        super(AutoCryptoProcessor, self).__init__({}, timeout=timeout, nonce_timeout=nonce_timeout)
+        super(AutoCryptoProcessor, self).__init__(
+            {}, timeout=timeout, nonce_timeout=nonce_timeout, nonce_filter=nonce_filter
+        )
 
     async def process_request(self, request: Request) -> Request:
         if request.msg_type == constant.CLIENT_EVENT and request.target.endswith(constant.DECLARE):
@@ -164,7 +196,10 @@ class AutoCryptoProcessor(BaseCryptoProcessor):
             crypto_key: str = request.body.get("crypto_key", "")
             if not crypto_id or not crypto_key or not check_id:
                 raise CryptoError("crypto param error")
-            crypto: Crypto = Crypto(crypto_key)
+            try:
+                crypto: Crypto = get_crypto_class(request.body.get("crypto_mode", Crypto.mode))(crypto_key)
+            except ValueError as e:
+                raise CryptoError(str(e)) from e
             try:
                 request.context.check_id = crypto.decrypt_object(check_id)
             except Exception:
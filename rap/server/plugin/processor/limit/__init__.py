@@ -1,4 +1,13 @@
-from .backend import RedisCellBackend, RedisFixedWindowBackend, RedisTokenBucketBackend
+from .backend import (
+    MemoryGCRABackend,
+    MemorySlidingWindowBackend,
+    MemorySlidingWindowLogBackend,
+    MemoryTokenBucketBackend,
+    RedisCellBackend,
+    RedisFixedWindowBackend,
+    RedisLeaseBackend,
+    RedisTokenBucketBackend,
+)
 from .core import LimitProcessor, TooManyRequest
-from .rule import Rule
+from .rule import Match, Rule
 from .util import RULE_FUNC_RETURN_TYPE, RULE_FUNC_TYPE
@@ -1,2 +1,15 @@
 from .base import BaseLimitBackend
-from .redis import BaseRedisBackend, RedisCellBackend, RedisFixedWindowBackend, RedisTokenBucketBackend
+from .memory import (
+    BaseMemoryBackend,
+    MemoryGCRABackend,
+    MemorySlidingWindowBackend,
+    MemorySlidingWindowLogBackend,
+    MemoryTokenBucketBackend,
+)
+from .redis import (
+    BaseRedisBackend,
+    RedisCellBackend,
+    RedisFixedWindowBackend,
+    RedisLeaseBackend,
+    RedisTokenBucketBackend,
+)
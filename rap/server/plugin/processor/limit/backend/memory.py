@@ -0,0 +1,217 @@
+import time
+from abc import ABC
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, List, Optional
+
+from rap.server.plugin.processor.limit.backend.base import BaseLimitBackend
+from rap.server.plugin.processor.limit.rule import Rule
+
+__all__ = [
+    "BaseMemoryBackend",
+    "MemoryTokenBucketBackend",
+    "MemoryGCRABackend",
+    "MemorySlidingWindowBackend",
+    "MemorySlidingWindowLogBackend",
+]
+
+
+class _KeyState(object):
+    __slots__ = ("idle_timestamp", "block_timestamp", "value_list")
+
+    def __init__(self, value_list: List[Any]) -> None:
+        # After this time, the state is the same as the state of the new key, so it can be dropped
+        self.idle_timestamp: float = 0.0
+        self.block_timestamp: float = 0.0
+        self.value_list: List[Any] = value_list
+
+
+class BaseMemoryBackend(BaseLimitBackend, ABC):
+    """The limit state of each key is stored in the process, the check is sync and O(1), for per-instance limits.
+
+    The key table is ordered by the access time, the key whose state has been restored to the initial state(idle)
+     is dropped when accessing other keys, and the least recently used key is dropped when the table is full.
+    """
+
+    def __init__(self, max_key_cnt: int = 100000):
+        """
+        :param max_key_cnt: The maximum number of keys in the key table
+        """
+        if max_key_cnt <= 0:
+            raise ValueError("max_key_cnt must > 0")
+        self._max_key_cnt: int = max_key_cnt
+        self._key_dict: "OrderedDict[str, _KeyState]" = OrderedDict()
+
+    def _init_value_list(self, rule: Rule, now: float) -> List[Any]:
+        raise NotImplementedError
+
+    def _get_state(self, key: str, rule: Rule, now: float) -> _KeyState:
+        key_dict: "OrderedDict[str, _KeyState]" = self._key_dict
+        state: Optional[_KeyState] = key_dict.get(key, None)
+        if state is None:
+            state = _KeyState(self._init_value_list(rule, now))
+            key_dict[key] = state
+            if len(key_dict) > self._max_key_cnt:
+                key_dict.popitem(last=False)
+        else:
+            key_dict.move_to_end(key)
+
+        # drop the idle key at the head of the table(the least recently used key)
+        while key_dict:
+            head_key: str = next(iter(key_dict))
+            head_state: _KeyState = key_dict[head_key]
+            if head_state is state or head_state.idle_timestamp > now or head_state.block_timestamp > now:
+                break
+            key_dict.popitem(last=False)
+        return state
+
+    def _block_time_handle(self, key: str, rule: Rule, func: Callable[[_KeyState, float], bool]) -> bool:
+        now: float = time.time()
+        state: _KeyState = self._get_state(key, rule, now)
+        if state.block_timestamp > now:
+            return False
+        can_requests: bool = func(state, now)
+        if not can_requests and rule.block_time is not None:
+            state.block_timestamp = now + rule.block_time
+        return can_requests
+
+    def _expected_time(self, state: _KeyState, rule: Rule, now: float) -> float:
+        raise NotImplementedError
+
+    def expected_time(self, key: str, rule: Rule) -> float:
+        state: Optional[_KeyState] = self._key_dict.get(key, None)
+        if state is None:
+            return 0
+        now: float = time.time()
+        if state.block_timestamp > now:
+            return state.block_timestamp - now
+        return max(self._expected_time(state, rule, now), 0)
+
+
+class MemoryTokenBucketBackend(BaseMemoryBackend):
+    """Token bucket, the bucket starts with `rule.init_token` tokens, and adds `rule.rate` tokens per second,
+    up to `rule.max_token` tokens"""
+
+    def _init_value_list(self, rule: Rule, now: float) -> List[Any]:
+        # [token, last_timestamp]
+        return [float(rule.init_token or rule.max_token), now]
+
+    def can_requests(self, key: str, rule: Rule, token_num: int = 1) -> bool:
+        def _can_requests(state: _KeyState, now: float) -> bool:
+            value_list: List[Any] = state.value_list
+            token: float = min(rule.max_token, value_list[0] + (now - value_list[1]) * rule.rate)
+            can_requests: bool = token >= token_num
+            if can_requests:
+                token -= token_num
+            value_list[0] = token
+            value_list[1] = now
+            state.idle_timestamp = now + (rule.max_token - token) / rule.rate
+            return can_requests
+
+        return self._block_time_handle(key, rule, _can_requests)
+
+    def _expected_time(self, state: _KeyState, rule: Rule, now: float) -> float:
+        token: float = min(rule.max_token, state.value_list[0] + (now - state.value_list[1]) * rule.rate)
+        return (1 - token) / rule.rate
+
+
+class MemoryGCRABackend(BaseMemoryBackend):
+    """Generic cell rate algorithm(like redis-cell), each request advances the theoretical arrival time(tat)
+    by `1 / rule.rate`, and up to `rule.max_token` requests can arrive at once"""
+
+    def _init_value_list(self, rule: Rule, now: float) -> List[Any]:
+        # [theoretical arrival time]
+        return [now]
+
+    def can_requests(self, key: str, rule: Rule, token_num: int = 1) -> bool:
+        def _can_requests(state: _KeyState, now: float) -> bool:
+            emission_interval: float = 1 / rule.rate
+            new_tat: float = max(state.value_list[0], now) + emission_interval * token_num
+            if new_tat - now > emission_interval * rule.max_token:
+                return False
+            state.value_list[0] = new_tat
+            state.idle_timestamp = new_tat
+            return True
+
+        return self._block_time_handle(key, rule, _can_requests)
+
+    def _expected_time(self, state: _KeyState, rule: Rule, now: float) -> float:
+        emission_interval: float = 1 / rule.rate
+        return state.value_list[0] + emission_interval - now - emission_interval * rule.max_token
+
+
+class MemorySlidingWindowBackend(BaseMemoryBackend):
+    """Sliding window counter, allow `rule.gen_token` requests in `rule.total_second` seconds.
+    The count of the sliding window is estimated by the count of the current and previous fixed window"""
+
+    def _init_value_list(self, rule: Rule, now: float) -> List[Any]:
+        # [current window start timestamp, current window count, previous window count]
+        return [now - now % rule.total_second, 0, 0]
+
+    @staticmethod
+    def _slide(state: _KeyState, rule: Rule, now: float) -> float:
+        """slide the window to now, return the estimated count of the sliding window"""
+        value_list: List[Any] = state.value_list
+        window: float = rule.total_second
+        diff: float = now - value_list[0]
+        if diff >= window:
+            value_list[2] = value_list[1] if diff < window * 2 else 0
+            value_list[1] = 0
+            value_list[0] = now - now % window
+            diff = now - value_list[0]
+        return value_list[2] * (1 - diff / window) + value_list[1]
+
+    def can_requests(self, key: str, rule: Rule, token_num: int = 1) -> bool:
+        def _can_requests(state: _KeyState, now: float) -> bool:
+            if self._slide(state, rule, now) + token_num > rule.gen_token:
+                return False
+            state.value_list[1] += token_num
+            state.idle_timestamp = state.value_list[0] + rule.total_second * 2
+            return True
+
+        return self._block_time_handle(key, rule, _can_requests)
+
+    def _expected_time(self, state: _KeyState, rule: Rule, now: float) -> float:
+        value_list: List[Any] = state.value_list
+        count: float = self._slide(state, rule, now)
+        if count + 1 <= rule.gen_token:
+            return 0
+        if value_list[1] + 1 > rule.gen_token or not value_list[2]:
+            # need to wait for the next window
+            return value_list[0] + rule.total_second - now
+        # wait for the previous window to slide out enough
+        need_ratio: float = (rule.gen_token - 1 - value_list[1]) / value_list[2]
+        return value_list[0] + rule.total_second * (1 - need_ratio) - now
+
+
+class MemorySlidingWindowLogBackend(BaseMemoryBackend):
+    """Sliding window log, allow `rule.gen_token` requests in `rule.total_second` seconds.
+    It records the timestamp of each request(up to `rule.gen_token`), so it is accurate but uses more memory"""
+
+    def _init_value_list(self, rule: Rule, now: float) -> List[Any]:
+        timestamp_deque: Deque[float] = deque()
+        return [timestamp_deque]
+
+    @staticmethod
+    def _slide(state: _KeyState, rule: Rule, now: float) -> Deque[float]:
+        timestamp_deque: Deque[float] = state.value_list[0]
+        start_timestamp: float = now - rule.total_second
+        while timestamp_deque and timestamp_deque[0] <= start_timestamp:
+            timestamp_deque.popleft()
+        return timestamp_deque
+
+    def can_requests(self, key: str, rule: Rule, token_num: int = 1) -> bool:
+        def _can_requests(state: _KeyState, now: float) -> bool:
+            timestamp_deque: Deque[float] = self._slide(state, rule, now)
+            if len(timestamp_deque) + token_num > rule.gen_token:
+                return False
+            timestamp_deque.extend([now] * token_num)
+            state.idle_timestamp = now + rule.total_second
+            return True
+
+        return self._block_time_handle(key, rule, _can_requests)
+
+    def _expected_time(self, state: _KeyState, rule: Rule, now: float) -> float:
+        timestamp_deque: Deque[float] = self._slide(state, rule, now)
+        if len(timestamp_deque) < rule.gen_token:
+            return 0
+        return timestamp_deque[len(timestamp_deque) - rule.gen_token] + rule.total_second - now
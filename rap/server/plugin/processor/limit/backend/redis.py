@@ -1,13 +1,18 @@
 import asyncio
+import logging
 import time
 from abc import ABC
+from collections import OrderedDict
 from typing import Any, Awaitable, Callable, Coroutine, List, Optional, Union
 
 from aredis import StrictRedis, StrictRedisCluster  # type: ignore
 
 from rap.server.plugin.processor.limit.backend import BaseLimitBackend
+from rap.server.plugin.processor.limit.backend.memory import MemoryTokenBucketBackend
 from rap.server.plugin.processor.limit.rule import Rule
 
+logger: logging.Logger = logging.getLogger(__name__)
+
 
 class BaseRedisBackend(BaseLimitBackend, ABC):
     def __init__(self, redis: Union[StrictRedis, StrictRedisCluster]):
@@ -184,3 +189,224 @@ end
             return 0
 
         return _expected_time()
+
+
+class _Lease(object):
+    __slots__ = ("token", "lease_timestamp", "block_timestamp", "refill_future")
+
+    def __init__(self) -> None:
+        self.token: int = 0
+        self.lease_timestamp: float = 0.0
+        self.block_timestamp: float = 0.0
+        self.refill_future: Optional[asyncio.Future] = None
+
+
+class RedisLeaseBackend(BaseRedisBackend):
+    """The token bucket is stored in redis(the same rule for all nodes), but each node leases a batch of tokens
+     (`rule.max_token * lease_ratio`) at a time and serves the requests from the lease locally(sync check),
+     when the lease is lower than `refill_ratio`, it leases the next batch in the background.
+    The unused tokens of the lease are dropped after `lease_ttl`(default is the time to generate the lease tokens),
+     so the node can not use the tokens it leased a long time ago.
+
+    When redis is slow(timeout) or unavailable, the requests are checked by the `fallback_backend`(in-memory token
+     bucket of the same rule by default, it is per node) and redis is not called again in `retry_interval` seconds.
+    """
+
+    _lua_script = """
+local key = KEYS[1]
+local block_key = KEYS[2]
+local current_time = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local max_token = tonumber(ARGV[3])
+local init_token = tonumber(ARGV[4])
+local want_token = tonumber(ARGV[5])
+local block_time = tonumber(ARGV[6])
+local expire = tonumber(ARGV[7])
+if redis.call("exists", block_key) == 1 then
+    return -1
+end
+local tokens
+local bucket = redis.call("hmget", key, "last_time", "last_token")
+if bucket[1] == false or bucket[2] == false then
+    tokens = init_token
+else
+    tokens = math.min(tonumber(bucket[2]) + (current_time - tonumber(bucket[1])) * rate, max_token)
+end
+local grant_token = math.min(math.floor(tokens), want_token)
+redis.call("hmset", key, "last_time", current_time, "last_token", tokens - grant_token)
+redis.call("expire", key, expire)
+if grant_token == 0 and block_time > 0 then
+    redis.call("set", block_key, block_time, "EX", block_time)
+end
+return grant_token
+    """
+
+    def __init__(
+        self,
+        redis: Union[StrictRedis, StrictRedisCluster],
+        lease_ratio: float = 0.05,
+        refill_ratio: float = 0.5,
+        lease_ttl: Optional[float] = None,
+        timeout: float = 0.1,
+        retry_interval: float = 1,
+        fallback_backend: Optional[BaseLimitBackend] = None,
+        max_key_cnt: int = 100000,
+    ):
+        """
+        :param redis: redis client
+        :param lease_ratio: The ratio of `rule.max_token` leased at a time, at least 1 token
+        :param refill_ratio: Lease the next batch in the background when the lease is lower than this ratio
+        :param lease_ttl: The time(seconds) that the leased tokens can be used,
+            default is the time to generate the lease tokens(`lease size / rule.rate`)
+        :param timeout: The timeout(seconds) of the lease request
+        :param retry_interval: The time(seconds) not to call redis after the lease request fails
+        :param fallback_backend: The backend used when redis is unavailable, default is `MemoryTokenBucketBackend`
+        :param max_key_cnt: The maximum number of keys leased by the node
+        """
+        super(RedisLeaseBackend, self).__init__(redis)
+        if not 0 < lease_ratio <= 1:
+            raise ValueError("lease_ratio must in (0, 1]")
+        if not 0 <= refill_ratio < 1:
+            raise ValueError("refill_ratio must in [0, 1)")
+        self._lease_ratio: float = lease_ratio
+        self._refill_ratio: float = refill_ratio
+        self._lease_ttl: Optional[float] = lease_ttl
+        self._timeout: float = timeout
+        self._retry_interval: float = retry_interval
+        self._fallback_backend: BaseLimitBackend = (
+            fallback_backend if fallback_backend is not None else MemoryTokenBucketBackend()
+        )
+        self._max_key_cnt: int = max_key_cnt
+        self._lease_dict: "OrderedDict[str, _Lease]" = OrderedDict()
+        self._redis_fail_timestamp: float = 0.0
+
+    def _get_lease_size(self, rule: Rule) -> int:
+        return max(1, int(rule.max_token * self._lease_ratio))
+
+    def _get_lease(self, key: str) -> _Lease:
+        lease: Optional[_Lease] = self._lease_dict.get(key, None)
+        if lease is None:
+            lease = _Lease()
+            self._lease_dict[key] = lease
+            if len(self._lease_dict) > self._max_key_cnt:
+                self._lease_dict.popitem(last=False)
+        else:
+            self._lease_dict.move_to_end(key)
+        return lease
+
+    @property
+    def is_redis_available(self) -> bool:
+        return time.time() - self._redis_fail_timestamp > self._retry_interval
+
+    async def _refill(self, key: str, rule: Rule, lease: _Lease) -> None:
+        try:
+            grant_token: int = await asyncio.wait_for(
+                self._redis.eval(
+                    self._lua_script,
+                    2,
+                    key,
+                    f"{key}:block_time",
+                    time.time(),
+                    rule.rate,
+                    rule.max_token,
+                    rule.init_token,
+                    self._get_lease_size(rule),
+                    rule.block_time or 0,
+                    int(rule.total_second) * 2 or 1,
+                ),
+                self._timeout,
+            )
+        except Exception as e:
+            self._redis_fail_timestamp = time.time()
+            logger.warning(f"lease token from redis error: {e}, use fallback backend")
+            raise e
+        finally:
+            lease.refill_future = None
+        now: float = time.time()
+        if grant_token < 0:
+            # blocked by other node
+            lease.block_timestamp = now + (rule.block_time or 0)
+        elif grant_token > 0:
+            lease.token += grant_token
+            lease.lease_timestamp = now
+
+    def _start_refill(self, key: str, rule: Rule, lease: _Lease) -> asyncio.Future:
+        if lease.refill_future is None:
+            future: asyncio.Future = asyncio.ensure_future(self._refill(key, rule, lease))
+            # the exception of the background refill is logged in `_refill`
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            lease.refill_future = future
+        return lease.refill_future
+
+    async def _wait_refill(self, key: str, rule: Rule, lease: _Lease, token_num: int) -> bool:
+        if not self.is_redis_available:
+            return await self._fallback_can_requests(key, rule, token_num)
+        try:
+            await asyncio.shield(self._start_refill(key, rule, lease))
+        except Exception:
+            return await self._fallback_can_requests(key, rule, token_num)
+        if lease.token >= token_num:
+            lease.token -= token_num
+            return True
+        if rule.block_time is not None and lease.block_timestamp < time.time():
+            lease.block_timestamp = time.time() + rule.block_time
+        return False
+
+    async def _fallback_can_requests(self, key: str, rule: Rule, token_num: int) -> bool:
+        can_requests: Union[bool, Awaitable[bool]] = self._fallback_backend.can_requests(key, rule, token_num)
+        if asyncio.iscoroutine(can_requests):
+            can_requests = await can_requests  # type: ignore
+        return can_requests  # type: ignore
+
+    def can_requests(self, key: str, rule: Rule, token_num: int = 1) -> Union[bool, Coroutine[Any, Any, bool]]:
+        now: float = time.time()
+        lease: _Lease = self._get_lease(key)
+        if lease.block_timestamp > now:
+            return False
+        lease_size: int = self._get_lease_size(rule)
+        if lease.token and now - lease.lease_timestamp > (self._lease_ttl or lease_size / rule.rate):
+            lease.token = 0
+        if lease.token >= token_num:
+            lease.token -= token_num
+            if lease.token < lease_size * self._refill_ratio and self.is_redis_available:
+                self._start_refill(key, rule, lease)
+            return True
+        return self._wait_refill(key, rule, lease, token_num)
+
+    def expected_time(self, key: str, rule: Rule) -> Union[float, Coroutine[Any, Any, float]]:
+        now: float = time.time()
+        lease: Optional[_Lease] = self._lease_dict.get(key, None)
+        if lease is not None:
+            if lease.block_timestamp > now:
+                return lease.block_timestamp - now
+            if lease.token > 0:
+                return 0
+
+        async def _fallback_expected_time() -> float:
+            expected_time: Union[float, Awaitable[float]] = self._fallback_backend.expected_time(key, rule)
+            if asyncio.iscoroutine(expected_time):
+                expected_time = await expected_time  # type: ignore
+            return expected_time  # type: ignore
+
+        async def _expected_time() -> float:
+            if not self.is_redis_available:
+                return await _fallback_expected_time()
+
+            try:
+                # get the block time and the bucket by one round trip
+                pipeline: Any = await self._redis.pipeline(transaction=False)
+                await pipeline.ttl(f"{key}:block_time")
+                await pipeline.hmget(key, "last_time", "last_token")
+                block_ttl, (last_time, last_token) = await asyncio.wait_for(pipeline.execute(), self._timeout)
+            except Exception as e:
+                self._redis_fail_timestamp = time.time()
+                logger.warning(f"get expected time from redis error: {e}, use fallback backend")
+                return await _fallback_expected_time()
+            if block_ttl and block_ttl > 0:
+                return float(block_ttl)
+            if last_time is None or last_token is None:
+                return 0
+            token: float = min(float(last_token) + (time.time() - float(last_time)) * rule.rate, rule.max_token)
+            return max((1 - token) / rule.rate, 0)
+
+        return _expected_time()
@@ -1,38 +1,84 @@
 import inspect
-from typing import Awaitable, List, Tuple, Union
+from typing import Awaitable, Dict, List, Optional, Set, Tuple, Union
 
 from rap.common.exceptions import TooManyRequest
 from rap.common.utils import constant
 from rap.server.model import Request
 from rap.server.plugin.processor.base import BaseProcessor
 from rap.server.plugin.processor.limit.backend import BaseLimitBackend
-from rap.server.plugin.processor.limit.rule import Rule
+from rap.server.plugin.processor.limit.rule import Match, Rule
 from rap.server.plugin.processor.limit.util import RULE_FUNC_TYPE
 
+# (match or rule func, rule, limit key of match, is coroutine func)
+_RuleEntry = Tuple[Union[Match, RULE_FUNC_TYPE], Rule, str, bool]
+
 
 class LimitProcessor(BaseProcessor):
-    def __init__(self, backend: BaseLimitBackend, rule_list: List[Tuple[RULE_FUNC_TYPE, Rule]]):
+    # not limit client event
+    msg_type_set: Set[int] = {constant.MSG_REQUEST, constant.CHANNEL_REQUEST}
+
+    def __init__(
+        self,
+        backend: BaseLimitBackend,
+        rule_list: List[Tuple[Union[Match, RULE_FUNC_TYPE], Rule]],
+        max_target_cnt: int = 4096,
+    ):
+        """
+        :param backend: limit backend
+        :param rule_list: The rules are checked in order, the first matched rule is used.
+            The rule can be matched by `Match`(static criteria, indexed by target) or a func(called for each request,
+             return the limit key(None is not matched) and whether to ignore the limit)
+        :param max_target_cnt: The maximum number of targets in the candidate rule index
+        """
         self._backend: BaseLimitBackend = backend
-        self._rule_list: List[Tuple[RULE_FUNC_TYPE, Rule]] = rule_list
+        self._rule_list: List[Tuple[Union[Match, RULE_FUNC_TYPE], Rule]] = rule_list
+        self._max_target_cnt: int = max_target_cnt
+        self._key_prefix: str = f"rap:processor:{self.__class__.__name__}:"
+        self._target_rule_dict: Dict[str, List[_RuleEntry]] = {}
+
+    def _get_rule_entry_list(self, request: Request) -> List[_RuleEntry]:
+        """get the candidate rules of the request target(the rule func is always the candidate)"""
+        rule_entry_list: Optional[List[_RuleEntry]] = self._target_rule_dict.get(request.target, None)
+        if rule_entry_list is None:
+            rule_entry_list = []
+            for matcher, rule in self._rule_list:
+                if isinstance(matcher, Match):
+                    if matcher.match_target(request.group, request.func_name):
+                        rule_entry_list.append(
+                            (matcher, rule, self._key_prefix + (matcher.key or request.target), False)
+                        )
+                else:
+                    rule_entry_list.append((matcher, rule, "", inspect.iscoroutinefunction(matcher)))
+            if len(self._target_rule_dict) >= self._max_target_cnt:
+                self._target_rule_dict.clear()
+            self._target_rule_dict[request.target] = rule_entry_list
+        return rule_entry_list
 
     async def process_request(self, request: Request) -> Request:
-        # not limit client event
-        if request.msg_type in (constant.CLIENT_EVENT, constant.SERVER_EVENT):
-            return request
+        for matcher, rule, key, is_coroutine_func in self._get_rule_entry_list(request):
+            if isinstance(matcher, Match):
+                if matcher.msg_type is not None and matcher.msg_type != request.msg_type:
+                    continue
+                if matcher.header_dict and any(
+                    request.header.get(header_key, None) != value for header_key, value in matcher.header_dict.items()
+                ):
+                    continue
+                if matcher.is_ignore_limit:
+                    return request
+                break
 
-        for func, rule in self._rule_list:
-            if inspect.iscoroutinefunction(func):
-                key, is_ignore_limit = await func(request)  # type: ignore
+            if is_coroutine_func:
+                func_key, is_ignore_limit = await matcher(request)  # type: ignore
             else:
-                key, is_ignore_limit = func(request)
+                func_key, is_ignore_limit = matcher(request)
             if is_ignore_limit:
                 return request
-            if key:
+            if func_key:
+                key = self._key_prefix + func_key
                 break
         else:
             raise TooManyRequest()
 
-        key = f"rap:processor:{self.__class__.__name__}:{key}"
         can_requests: Union[bool, Awaitable[bool]] = self._backend.can_requests(key, rule)
         if inspect.isawaitable(can_requests):
             can_requests = await can_requests  # type: ignore
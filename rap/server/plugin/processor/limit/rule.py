@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import timedelta
-from typing import Optional
+from typing import Dict, Optional
 
 
 @dataclass
@@ -35,3 +35,23 @@ class Rule(object):
         # total_second: 60 gen_token: 1  = 1 req/m
         # total_second: 1  gen_token: 1000 = 1000 req/s = 1 req/ms
         self.rate = self.gen_token / self.total_second
+
+
+@dataclass
+class Match(object):
+    """Static match criteria of the limit rule, the criteria that is None matches any value.
+
+    LimitProcessor indexes the rules by target with the group and func_name criteria,
+     so only the candidate rules are checked for each request
+    """
+
+    group: Optional[str] = None
+    func_name: Optional[str] = None
+    msg_type: Optional[int] = None
+    header_dict: Optional[Dict[str, str]] = None  # The request header must contain these values
+
+    key: Optional[str] = None  # limit key, default is the target of the request
+    is_ignore_limit: bool = False
+
+    def match_target(self, group: str, func_name: str) -> bool:
+        return (self.group is None or self.group == group) and (self.func_name is None or self.func_name == func_name)
@@ -26,6 +26,7 @@ class MosProcessor(BaseProcessor):
         max_error_cnt: int = 100,
         max_request_cnt: int = 1000,
         max_response_cnt: int = 1000,
+        max_loop_lag: float = 0.1,
     ) -> None:
         """
         Provide the server's mos through the client's ping-pong
@@ -36,6 +37,8 @@ class MosProcessor(BaseProcessor):
         :param max_error_cnt: The maximum number of errors accepted within the server time window
         :param max_request_cnt: The maximum number of requests accepted within the server time window
         :param max_response_cnt: The maximum number of responses accepted within the server time window
+        :param max_loop_lag: The maximum p99 event loop lag(seconds) accepted by the server,
+          only applicable when the server has `loop_monitor`
         """
         self.request_online_counter: Counter = Counter(f"{prefix}_request_online")
         self.channel_online_cnt_counter: Counter = Counter(f"{prefix}_channel_online")
@@ -51,6 +54,7 @@ class MosProcessor(BaseProcessor):
         self._max_error_cnt: int = max_error_cnt
         self._max_request_cnt: int = max_request_cnt
         self._max_response_cnt: int = max_response_cnt
+        self._max_loop_lag: float = max_loop_lag
         self._run_cpu_percent: bool = False
         self._cpu_percent: float = psutil.cpu_percent()
 
@@ -59,6 +63,11 @@ class MosProcessor(BaseProcessor):
         if self._run_cpu_percent:
             get_event_loop().call_later(1, self._get_cpu_percent)
 
+    def _get_loop_lag_factor(self) -> float:
+        if not self.app.loop_monitor:
+            return 1.0
+        return max(1 - self.app.loop_monitor.lag_p99 / self._max_loop_lag, 0.0)
+
     def start_event_handle(self, app: "Server") -> None:
         self._run_cpu_percent = True
         self._get_cpu_percent()
@@ -99,6 +108,7 @@ class MosProcessor(BaseProcessor):
                 * (1 - (self.error_cnt_gauge.get_statistics_value() - self._max_error_cnt))
                 * (1 - (self.request_online_counter.get_statistics_value() - self._max_request_online))
                 * (1 - (self.channel_online_cnt_counter.get_statistics_value() - self._max_channel_online))
+                * self._get_loop_lag_factor()
             )
             if mos < 0:
                 mos = 0
@@ -1,10 +1,22 @@
+import asyncio
+import logging
 import socket
 import time
-from typing import TYPE_CHECKING, Dict, List, Tuple
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
 
-from prometheus_client import Counter, Gauge, Histogram, start_http_server  # type: ignore
+from prometheus_client import CollectorRegistry, Histogram, start_http_server  # type: ignore
+from prometheus_client.exposition import CONTENT_TYPE_LATEST, generate_latest  # type: ignore
+from prometheus_client.metrics_core import (  # type: ignore
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    HistogramMetricFamily,
+    Metric,
+)
+from prometheus_client.openmetrics.exposition import CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE  # type: ignore
+from prometheus_client.openmetrics.exposition import generate_latest as openmetrics_generate_latest  # type: ignore
 
-from rap.common.utils import EventEnum, constant
+from rap.common.utils import EventEnum, constant, parse_target
 from rap.server.model import Request, Response
 from rap.server.plugin.processor.base import BaseProcessor
 
@@ -12,64 +24,270 @@ if TYPE_CHECKING:
     from rap.server.core import Server
     from rap.server.types import SERVER_EVENT_FN
 
-
+__all__ = ["PrometheusProcessor"]
+logger: logging.Logger = logging.getLogger(__name__)
 label_list: List[str] = ["service", "host_name", "target", "group"]
+_MetricFamilyTuple = Tuple[
+    CounterMetricFamily,
+    CounterMetricFamily,
+    HistogramMetricFamily,
+    GaugeMetricFamily,
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    CounterMetricFamily,
+    CounterMetricFamily,
+]
+
+
+class _TargetMetric(object):
+    """The metric values of a target, only updated by the server event loop, so no lock is needed"""
 
-# normal request
-msg_request_count: "Counter" = Counter("msg_request_total", "Count of msg requests", label_list)
-msg_response_count: "Counter" = Counter("msg_response_total", "Count of msg response", label_list + ["status_code"])
-msg_request_time: "Histogram" = Histogram("msg_request_time", "Histogram of msg request time by target", label_list)
-msg_request_in_progress: "Gauge" = Gauge("msg_request_in_progress", "Gauge of current msg request", label_list)
-# channel
-channel_count: "Counter" = Counter("channel_request_total", "Count of channel request", label_list)
-channel_in_progress: "Gauge" = Gauge("channel_in_progress", "Gauge of current channel request", label_list)
-# total
-request_count: "Counter" = Counter("request_total", "Count of requests", label_list + ["msg_type"])
-response_count: "Counter" = Counter("response_total", "Count of response", label_list + ["msg_type", "status_code"])
+    __slots__ = (
+        "label_value_list",
+        "request_cnt_dict",
+        "response_cnt_dict",
+        "msg_request_cnt",
+        "msg_response_cnt_dict",
+        "msg_request_in_progress",
+        "msg_request_time_bucket_list",
+        "msg_request_time_sum",
+        "channel_cnt",
+        "channel_in_progress",
+    )
+
+    def __init__(self, label_value_list: List[str], bucket_cnt: int) -> None:
+        self.label_value_list: List[str] = label_value_list
+        # msg_type -> count
+        self.request_cnt_dict: Dict[int, int] = {}
+        # (msg_type, status_code) -> count
+        self.response_cnt_dict: Dict[Tuple[int, int], int] = {}
+        self.msg_request_cnt: int = 0
+        # status_code -> count
+        self.msg_response_cnt_dict: Dict[int, int] = {}
+        self.msg_request_in_progress: int = 0
+        # The count of each bucket(not cumulative)
+        self.msg_request_time_bucket_list: List[int] = [0] * bucket_cnt
+        self.msg_request_time_sum: float = 0.0
+        self.channel_cnt: int = 0
+        self.channel_in_progress: int = 0
 
 
 class PrometheusProcessor(BaseProcessor):
-    def __init__(self, prometheus_host: str, prometheus_port: int):
+    """Provide the server metrics to prometheus.
+
+    The metrics are accumulated in plain objects(one per target, created at first use) by the server event loop,
+     and converted to prometheus metrics when scraped, so the request path does not call `labels()` or take locks.
+    The metrics can be exposed by:
+        thread: the http server thread of prometheus_client(`start_http_server`)
+        http: a http listener on the event loop of the rap server
+        registry: the private func `metrics` of the rap server(group is `PrometheusProcessor`), return OpenMetrics text
+    """
+
+    def __init__(
+        self,
+        prometheus_host: str = "0.0.0.0",
+        prometheus_port: int = 8000,
+        expose_mode: str = "thread",
+        registry: Optional[CollectorRegistry] = None,
+        buckets: Tuple[float, ...] = Histogram.DEFAULT_BUCKETS,
+    ):
+        """
+        :param prometheus_host: The listen host of the metrics http server(thread and http mode)
+        :param prometheus_port: The listen port of the metrics http server(thread and http mode)
+        :param expose_mode: The mode to expose the metrics, `thread`, `http` or `registry`
+        :param registry: The prometheus registry that collects the metrics, default is a private registry of the
+          processor, so the processors of multiple servers in a process do not conflict.
+          Pass `prometheus_client.REGISTRY` to expose the metrics with the default process metrics
+        :param buckets: The upper bounds of the request time(seconds) histogram buckets
+        """
+        if expose_mode not in ("thread", "http", "registry"):
+            raise ValueError(f"Not support expose mode:{expose_mode}")
         self._prometheus_host: str = prometheus_host
         self._prometheus_port: int = prometheus_port
+        self._expose_mode: str = expose_mode
+        self._registry: CollectorRegistry = registry if registry is not None else CollectorRegistry()
+        self._bucket_list: List[float] = sorted(buckets)
+        if self._bucket_list[-1] != float("inf"):
+            self._bucket_list.append(float("inf"))
+        self._http_server: Optional[asyncio.AbstractServer] = None
+        self._is_registry: bool = False
+
         self.host_name: str = socket.gethostname()
+        self._target_metric_dict: Dict[str, _TargetMetric] = {}
         self.server_event_dict: Dict[EventEnum, List["SERVER_EVENT_FN"]] = {
-            EventEnum.before_start: [self.start_event_handle]
+            EventEnum.before_start: [self.start_event_handle],
+            EventEnum.after_end: [self.stop_event_handle],
         }
 
-    def start_event_handle(self, app: "Server") -> None:
-        start_http_server(self._prometheus_host, self._prometheus_port)
+    async def start_event_handle(self, app: "Server") -> None:
+        if not self._is_registry:
+            try:
+                self._registry.register(self)
+            except ValueError as e:
+                raise ValueError(
+                    f"{self.__class__.__name__} metrics are already registered in the prometheus registry,"
+                    f" use a different registry for each processor. error:{e}"
+                ) from e
+            self._is_registry = True
+        if self._expose_mode == "thread":
+            start_http_server(self._prometheus_port, addr=self._prometheus_host, registry=self._registry)
+        elif self._expose_mode == "http":
+            self._http_server = await asyncio.start_server(
+                self._http_handle, self._prometheus_host, self._prometheus_port
+            )
+        else:
+            self.register(self._metrics)
 
-    async def process_request(self, request: Request) -> Request:
-        label_list: list = [self.app.server_name, self.host_name, request.target]
-        request_count.labels(*label_list, request.msg_type).inc()
-        if request.msg_type == constant.MSG_REQUEST:
-            request.context.start_time = time.time()
-            msg_request_count.labels(*label_list).inc()
-            msg_request_in_progress.labels(*label_list).inc()
-        return request
+    async def stop_event_handle(self, app: "Server") -> None:
+        if self._http_server is not None:
+            self._http_server.close()
+            await self._http_server.wait_closed()
+            self._http_server = None
+        if self._is_registry:
+            self._registry.unregister(self)
+            self._is_registry = False
+
+    ##########
+    # expose #
+    ##########
+    def _metrics(self) -> str:
+        """get the metrics of the registry in OpenMetrics text format"""
+        return openmetrics_generate_latest(self._registry).decode()
 
-    async def process_response(self, response: Response) -> Response:
-        label_list: list = [self.app.server_name, self.host_name, response.target]
-        response_count.labels(*label_list, response.msg_type, response.status_code).inc()
+    async def _http_handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line: bytes = await reader.readline()
+            is_openmetrics: bool = False
+            while True:
+                line: bytes = await reader.readline()
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+                if line.lower().startswith(b"accept:") and b"application/openmetrics-text" in line:
+                    is_openmetrics = True
+            if not request_line.startswith(b"GET "):
+                writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            else:
+                if is_openmetrics:
+                    body: bytes = openmetrics_generate_latest(self._registry)
+                    content_type: str = OPENMETRICS_CONTENT_TYPE
+                else:
+                    body = generate_latest(self._registry)
+                    content_type = CONTENT_TYPE_LATEST
+                writer.write(
+                    (
+                        f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n"
+                        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                    ).encode()
+                    + body
+                )
+            await writer.drain()
+        except Exception as e:
+            logger.debug(f"prometheus http handle error:{e}")
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _gen_metric_family_tuple() -> _MetricFamilyTuple:
+        return (
+            CounterMetricFamily("msg_request", "Count of msg requests", labels=label_list),
+            CounterMetricFamily("msg_response", "Count of msg response", labels=label_list + ["status_code"]),
+            HistogramMetricFamily("msg_request_time", "Histogram of msg request time by target", labels=label_list),
+            GaugeMetricFamily("msg_request_in_progress", "Gauge of current msg request", labels=label_list),
+            CounterMetricFamily("channel_request", "Count of channel request", labels=label_list),
+            GaugeMetricFamily("channel_in_progress", "Gauge of current channel request", labels=label_list),
+            CounterMetricFamily("request", "Count of requests", labels=label_list + ["msg_type"]),
+            CounterMetricFamily("response", "Count of response", labels=label_list + ["msg_type", "status_code"]),
+        )
+
+    def describe(self) -> Iterator[Metric]:
+        """Called by the prometheus registry when registering, used to check the duplicated metric names"""
+        yield from self._gen_metric_family_tuple()
+
+    def collect(self) -> Iterator[Metric]:
+        """Called by the prometheus registry when scraping, convert the accumulated values to prometheus metrics"""
+        metric_family_tuple: _MetricFamilyTuple = self._gen_metric_family_tuple()
+        (
+            msg_request_count,
+            msg_response_count,
+            msg_request_time,
+            msg_request_in_progress,
+            channel_count,
+            channel_in_progress,
+            request_count,
+            response_count,
+        ) = metric_family_tuple
+        bound_list: List[str] = [str(bound) if bound != float("inf") else "+Inf" for bound in self._bucket_list]
+        # The registry may scrape in other thread, copy the dict to avoid it being changed while iterating
+        for target_metric in list(self._target_metric_dict.values()):
+            label_value_list: List[str] = target_metric.label_value_list
+            for msg_type, cnt in list(target_metric.request_cnt_dict.items()):
+                request_count.add_metric(label_value_list + [str(msg_type)], cnt)
+            for (msg_type, status_code), cnt in list(target_metric.response_cnt_dict.items()):
+                response_count.add_metric(label_value_list + [str(msg_type), str(status_code)], cnt)
+            for status_code, cnt in list(target_metric.msg_response_cnt_dict.items()):
+                msg_response_count.add_metric(label_value_list + [str(status_code)], cnt)
+            if target_metric.msg_request_cnt:
+                msg_request_count.add_metric(label_value_list, target_metric.msg_request_cnt)
+                msg_request_in_progress.add_metric(label_value_list, target_metric.msg_request_in_progress)
+                cumulative_cnt: int = 0
+                bucket_list: List[Tuple[str, float]] = []
+                for bound, cnt in zip(bound_list, list(target_metric.msg_request_time_bucket_list)):
+                    cumulative_cnt += cnt
+                    bucket_list.append((bound, cumulative_cnt))
+                msg_request_time.add_metric(label_value_list, bucket_list, target_metric.msg_request_time_sum)
+            if target_metric.channel_cnt:
+                channel_count.add_metric(label_value_list, target_metric.channel_cnt)
+                channel_in_progress.add_metric(label_value_list, target_metric.channel_in_progress)
+        yield from metric_family_tuple
+
+    ###########
+    # process #
+    ###########
+    def _get_target_metric(self, target: str) -> _TargetMetric:
+        target_metric: Optional[_TargetMetric] = self._target_metric_dict.get(target, None)
+        if target_metric is None:
+            _, group, _ = parse_target(target)
+            target_metric = _TargetMetric([self.app.server_name, self.host_name, target, group], len(self._bucket_list))
+            self._target_metric_dict[target] = target_metric
+        return target_metric
+
+    def _response_handle(self, response: Response) -> None:
+        target_metric: _TargetMetric = self._get_target_metric(response.target)
+        key: Tuple[int, int] = (response.msg_type, response.status_code)
+        target_metric.response_cnt_dict[key] = target_metric.response_cnt_dict.get(key, 0) + 1
         if response.msg_type == constant.MSG_RESPONSE:
-            msg_response_count.labels(*label_list, response.status_code).inc()
-            msg_request_in_progress.labels(*label_list).dec()
-            msg_request_time.labels(*label_list).observe(time.time() - response.context.start_time)
+            status_code: int = response.status_code
+            target_metric.msg_response_cnt_dict[status_code] = (
+                target_metric.msg_response_cnt_dict.get(status_code, 0) + 1
+            )
+            target_metric.msg_request_in_progress -= 1
+            start_time: Optional[float] = response.context.get_value("start_time", None)
+            if start_time is not None:
+                cost_time: float = time.time() - start_time
+                target_metric.msg_request_time_bucket_list[bisect_left(self._bucket_list, cost_time)] += 1
+                target_metric.msg_request_time_sum += cost_time
         elif response.msg_type == constant.CHANNEL_RESPONSE:
             life_cycle: str = response.header.get("channel_life_cycle", "error")
             if life_cycle == constant.DECLARE:
-                channel_count.labels(*label_list).inc()
-                channel_in_progress.labels(*label_list).inc()
+                target_metric.channel_cnt += 1
+                target_metric.channel_in_progress += 1
             elif life_cycle == constant.DROP:
-                channel_in_progress.labels(*label_list).dec()
+                target_metric.channel_in_progress -= 1
+
+    def process_request(self, request: Request) -> Request:  # type: ignore
+        target_metric: _TargetMetric = self._get_target_metric(request.target)
+        msg_type: int = request.msg_type
+        target_metric.request_cnt_dict[msg_type] = target_metric.request_cnt_dict.get(msg_type, 0) + 1
+        if msg_type == constant.MSG_REQUEST:
+            request.context.start_time = time.time()
+            target_metric.msg_request_cnt += 1
+            target_metric.msg_request_in_progress += 1
+        return request
+
+    def process_response(self, response: Response) -> Response:  # type: ignore
+        self._response_handle(response)
         return response
 
-    async def process_exc(self, response: Response, exc: Exception) -> Tuple[Response, Exception]:
-        label_list: list = [self.app.server_name, self.host_name, response.target]
-        response_count.labels(*label_list, response.msg_type, response.status_code).inc()
-        if response.msg_type == constant.MSG_RESPONSE:
-            msg_response_count.labels(*label_list, response.status_code).inc()
-            msg_request_in_progress.labels(*label_list).dec()
-            msg_request_time.labels(*label_list).observe(time.time() - response.context.start_time)
+    def process_exc(self, response: Response, exc: Exception) -> Tuple[Response, Exception]:  # type: ignore
+        self._response_handle(response)
         return response, exc
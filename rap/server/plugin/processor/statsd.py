@@ -1,8 +1,12 @@
+import asyncio
+import logging
 import socket
 from typing import TYPE_CHECKING, Dict, List, Optional
 
 from aio_statsd import StatsdClient
+from aio_statsd.protocol import StatsdProtocol
 
+from rap.common.cardinality import HyperLogLog
 from rap.common.utils import EventEnum, constant
 from rap.server.model import Request, Response
 from rap.server.plugin.processor.base import BaseProcessor
@@ -12,15 +16,41 @@ if TYPE_CHECKING:
     from rap.server.types import SERVER_EVENT_FN
 
 __all__ = ["StatsdClient", "StatsdProcessor"]
+logger: logging.Logger = logging.getLogger(__name__)
 
 
 class StatsdProcessor(BaseProcessor):
-    """Note: not test...
-    Provide internal data and send to statsd
+    """Provide internal data and send to statsd
+
+    The metrics are aggregated in the process and flushed every `flush_interval` seconds as multi-metric packets
+     (each packet is up to `max_packet_size` bytes), instead of sending a packet for each metric change.
+    The online hosts are counted by `HyperLogLog` and flushed as the gauge `online_host`(the number of the hosts
+     in the flush interval).
+    The metrics are encoded by the plain statsd protocol, so only `StatsdClient` is supported,
+     the clients of other protocols(e.g. `DogStatsdClient`, `TelegrafClient`) are rejected.
     """
 
-    def __init__(self, statsd_client: StatsdClient, namespace: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        statsd_client: StatsdClient,
+        namespace: Optional[str] = None,
+        flush_interval: float = 1,
+        max_packet_size: int = 1432,
+        host_precision: int = 10,
+    ) -> None:
+        """
+        :param statsd_client: aio_statsd client
+        :param namespace: metric key prefix, default `rap.server.{host name}`
+        :param flush_interval: The interval(seconds) to flush the aggregated metrics
+        :param max_packet_size: The maximum size of the multi-metric packet, it should not exceed the network MTU
+            (learn more: https://github.com/statsd/statsd/blob/master/docs/metric_types.md#multi-metric-packets)
+        :param host_precision: The precision of the online host HyperLogLog, it uses `2 ** host_precision` bytes
+        """
+        if not isinstance(statsd_client, StatsdClient):
+            raise TypeError(f"{self.__class__.__name__} only support {StatsdClient.__name__}, not {statsd_client}")
         self._statsd_client: StatsdClient = statsd_client
+        self._flush_interval: float = flush_interval
+        self._max_packet_size: int = max_packet_size
 
         self._namespace: str = namespace or f"rap.server.{socket.gethostname()}"
 
@@ -32,41 +62,128 @@ class StatsdProcessor(BaseProcessor):
         self._error_msg_key: str = f"{self._namespace}.msg.error"
         self._request_key: str = f"{self._namespace}.request"
         self._error_request_key: str = f"{self._namespace}.request.error"
+        self._online_host_key: str = f"{self._namespace}.online_host"
+
+        # key -> value, flushed as the statsd counter
+        self._counter_dict: Dict[str, int] = {}
+        # key -> change, flushed as the statsd gauge change(`+n|g` or `-n|g`)
+        self._gauge_delta_dict: Dict[str, int] = {
+            key: 0
+            for key in (
+                self._channel_key,
+                self._msg_key,
+                self._process_msg_key,
+                self._error_msg_key,
+                self._request_key,
+                self._error_request_key,
+            )
+        }
+        self._host_hll: HyperLogLog = HyperLogLog(host_precision)
+        self._has_host: bool = False
+        self._flush_future: Optional[asyncio.Future] = None
+        self.send_packet_cnt: int = 0
         self.server_event_dict: Dict[EventEnum, List["SERVER_EVENT_FN"]] = {
-            EventEnum.before_start: [self.start_event_handle]
+            EventEnum.before_start: [self.start_event_handle],
+            EventEnum.after_end: [self.stop_event_handle],
         }
 
     def start_event_handle(self, app: "Server") -> None:
         def upload_metric(stats_dict: dict) -> None:
             for key, values in stats_dict.items():
-                self._statsd_client.counter(f"{self._namespace}.{key}", values)
-            self._statsd_client.counter(self._channel_online_key, self._channel_online_cnt)
+                key = f"{self._namespace}.{key}"
+                self._counter_dict[key] = self._counter_dict.get(key, 0) + values
+            self._counter_dict[self._channel_online_key] = (
+                self._counter_dict.get(self._channel_online_key, 0) + self._channel_online_cnt
+            )
 
         if self.app.window_statistics:
             self.app.window_statistics.add_callback(upload_metric)
+        if self._flush_future is None or self._flush_future.done():
+            self._flush_future = asyncio.ensure_future(self._flush_loop())
+
+    def stop_event_handle(self, app: "Server") -> None:
+        if self._flush_future is not None and not self._flush_future.done():
+            self._flush_future.cancel()
+        self._flush_future = None
+        self.flush()
+
+    #########
+    # flush #
+    #########
+    def _pop_line_list(self) -> List[str]:
+        line_list: List[str] = []
+        for key, value in self._counter_dict.items():
+            line_list.append(StatsdProtocol().counter(key, value).msg)
+        self._counter_dict.clear()
+        for key, value in self._gauge_delta_dict.items():
+            if value > 0:
+                line_list.append(StatsdProtocol().increment(key, value).msg)
+            elif value < 0:
+                line_list.append(StatsdProtocol().decrement(key, -value).msg)
+            if value:
+                self._gauge_delta_dict[key] = 0
+        if self._has_host:
+            line_list.append(StatsdProtocol().gauge(self._online_host_key, self._host_hll.count()).msg)
+            self._host_hll.clear()
+            self._has_host = False
+        return line_list
+
+    def flush(self) -> None:
+        """Send the aggregated metrics as multi-metric packets"""
+        packet_line_list: List[str] = []
+        packet_size: int = 0
+        for line in self._pop_line_list():
+            # +1 is the newline between lines
+            if packet_line_list and packet_size + len(line) + 1 > self._max_packet_size:
+                self._send("\n".join(packet_line_list))
+                packet_line_list = []
+                packet_size = 0
+            packet_line_list.append(line)
+            packet_size += len(line) + 1
+        if packet_line_list:
+            self._send("\n".join(packet_line_list))
+
+    def _send(self, packet: str) -> None:
+        if self._statsd_client.is_closed:
+            return
+        self._statsd_client.send(packet)
+        self.send_packet_cnt += 1
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(f"{self.__class__.__name__} flush metric error:{e}")
 
-    async def process_request(self, request: Request) -> Request:
-        self._statsd_client.increment(self._request_key, 1)
+    ###########
+    # process #
+    ###########
+    def process_request(self, request: Request) -> Request:  # type: ignore
+        gauge_delta_dict: Dict[str, int] = self._gauge_delta_dict
+        gauge_delta_dict[self._request_key] += 1
         if request.msg_type == constant.MSG_REQUEST:
-            self._statsd_client.increment(self._msg_key, 1)
-            self._statsd_client.increment(self._process_msg_key, 1)
-        host: str = request.header["host"]
-        self._statsd_client.sets(f"{self._namespace}.online.{host}", 1)
+            gauge_delta_dict[self._msg_key] += 1
+            gauge_delta_dict[self._process_msg_key] += 1
+        self._host_hll.add(request.header["host"])
+        self._has_host = True
         return request
 
-    async def process_response(self, response: Response) -> Response:
+    def process_response(self, response: Response) -> Response:  # type: ignore
+        gauge_delta_dict: Dict[str, int] = self._gauge_delta_dict
         if response.msg_type == constant.MSG_RESPONSE:
-            self._statsd_client.decrement(self._process_msg_key, 1)
+            gauge_delta_dict[self._process_msg_key] -= 1
             if response.status_code >= 400:
                 # NOTE: Don't try to get the response body data
-                self._statsd_client.increment(self._error_msg_key, 1)
+                gauge_delta_dict[self._error_msg_key] += 1
         elif response.msg_type == constant.CHANNEL_RESPONSE:
             life_cycle: str = response.header.get("channel_life_cycle", "error")
             if life_cycle == constant.DECLARE:
                 self._channel_online_cnt += 1
-                self._statsd_client.increment(self._channel_key, 1)
+                gauge_delta_dict[self._channel_key] += 1
             elif life_cycle == constant.DROP:
                 self._channel_online_cnt -= 1
         elif response.msg_type == constant.SERVER_ERROR_RESPONSE:
-            self._statsd_client.increment(self._error_request_key, 1)
+            gauge_delta_dict[self._error_request_key] += 1
         return response
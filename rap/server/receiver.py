@@ -27,13 +27,14 @@ from rap.common.exceptions import (
     BaseRapError,
     ChannelError,
     FuncNotFoundError,
+    OverloadError,
     ParseError,
     ProtocolError,
     RpcRunTimeError,
     ServerError,
 )
-from rap.common.types import is_type
-from rap.common.utils import constant, param_handle, parse_error, response_num_dict
+from rap.common.processor import HOOK_FN_LIST, ProcessorChain
+from rap.common.utils import constant, parse_error, response_num_dict
 from rap.server.channel import Channel
 from rap.server.model import Request, Response, ServerContext
 from rap.server.plugin.processor.base import BaseProcessor
@@ -58,6 +59,7 @@ class Receiver(object):
         ping_sleep_time: int,
         call_func_permission_fn: Optional[Callable[[Request], Awaitable[FuncModel]]] = None,
         processor_list: Optional[List[BaseProcessor]] = None,
+        processor_chain: Optional[ProcessorChain] = None,
     ):
         """Receive and process messages from the client, and execute different logics according to the message type
         :param app: server
@@ -68,6 +70,7 @@ class Receiver(object):
         :param ping_sleep_time: ping message interval time
         :param call_func_permission_fn: Check the permission to call the private function
         :param processor_list: processor list
+        :param processor_chain: precomputed processor chain, if None, gen it by processor_list
         """
         self._app: "Server" = app
         self._conn: ServerConnection = conn
@@ -76,7 +79,7 @@ class Receiver(object):
         self.context_dict: Dict[int, ServerContext] = {}
         self._ping_sleep_time: int = ping_sleep_time
         self._ping_fail_cnt: int = ping_fail_cnt
-        self._processor_list: Optional[List[BaseProcessor]] = processor_list
+        self._processor_chain: ProcessorChain = processor_chain or ProcessorChain(BaseProcessor, processor_list)
         self._call_func_permission_fn: Callable[[Request], Awaitable[FuncModel]] = (
             call_func_permission_fn if call_func_permission_fn else self._default_call_fun_permission_fn
         )
@@ -92,6 +95,14 @@ class Receiver(object):
         self._generator_dict: Dict[int, Union[Generator, AsyncGenerator]] = {}
         self._channel_dict: Dict[int, Channel] = {}
 
+    def to_dict(self) -> Dict[str, int]:
+        """The number of the objects held by the conn"""
+        return {
+            "context": len(self.context_dict),
+            "channel": len(self._channel_dict),
+            "generator": len(self._generator_dict),
+        }
+
     async def _default_call_fun_permission_fn(self, request: Request) -> FuncModel:
         func_model: FuncModel = self._app.registry.get_func_model(
             request, constant.NORMAL_TYPE if request.msg_type == constant.MSG_REQUEST else constant.CHANNEL_TYPE
@@ -109,6 +120,7 @@ class Receiver(object):
 
         # gen response object
         response: "Response" = Response(msg_type=response_num, context=request.context)
+        response.stage_timer = request.stage_timer
         if "request_id" in request.header:
             response.header["request_id"] = request.header["request_id"]
         # response.header.update(request.header)
@@ -119,15 +131,22 @@ class Receiver(object):
             response.set_exception(ServerError("Illegal request"))
             return response
 
-        if self._processor_list:
+        if self._app.overload_controller and self._app.overload_controller.is_shed(request):
+            response.set_exception(OverloadError())
+            return response
+
+        hook_list: HOOK_FN_LIST = self._processor_chain.get_request_hook_list(request.msg_type)
+        if hook_list:
             try:
-                for processor in self._processor_list:
-                    request = await processor.process_request(request)
+                for hook, is_coroutine_func in hook_list:
+                    request = await hook(request) if is_coroutine_func else hook(request)
             except Exception as e:
                 if not isinstance(e, BaseRapError):
                     logger.exception(e)
                 response.set_exception(e)
                 return response
+        if request.stage_timer is not None:
+            request.stage_timer.mark("processor")
 
         try:
             dispatch_func: Callable = self.dispatch_func_dict[request.msg_type]
@@ -216,33 +235,55 @@ class Receiver(object):
             result = e
         return call_id, result
 
+    def _get_timeout(self, request: Request) -> float:
+        """The remaining time of the request deadline, if the request has no deadline, use run timeout"""
+        deadline_timestamp: float = request.header.get("X-rap-deadline", 0)
+        if deadline_timestamp:
+            return deadline_timestamp - time.time()
+        return self._run_timeout
+
+    async def _call_func(self, request: Request, func_model: FuncModel, param_tuple: tuple) -> Any:
+        """call func, return the result of the func or the exception raised by the func"""
+        if func_model.batcher is not None:
+            coroutine: Union[Awaitable, Coroutine] = func_model.batcher.call(
+                *param_tuple, deadline_timestamp=request.header.get("X-rap-deadline", 0)
+            )
+        elif func_model.is_coroutine_func:
+            coroutine = func_model.func(*param_tuple)
+        else:
+            coroutine = get_event_loop().run_in_executor(None, partial(func_model.func, *param_tuple))
+
+        try:
+            return await asyncio.wait_for(coroutine, self._get_timeout(request))
+        except asyncio.TimeoutError:
+            return RpcRunTimeError(f"Call {func_model.func.__name__} timeout")
+        except Exception as e:
+            return e
+
     async def _msg_handle(self, request: Request, call_id: int, func_model: FuncModel) -> Tuple[int, Exception]:
         """fun call handle"""
         param: list = request.body.get("param", [])
 
         # Check param type
         try:
-            param_tuple: tuple = param_handle(func_model.func_sig, param, {})
+            param_tuple: tuple = func_model.param_handle(param)
         except TypeError as e:
             raise ParseError(extra_msg=str(e))
 
         # called func
-        if asyncio.iscoroutinefunction(func_model.func):
-            coroutine: Union[Awaitable, Coroutine] = func_model.func(*param_tuple)
+        if func_model.func_cache is not None:
+            try:
+                result: Any = await func_model.func_cache.get_or_call(
+                    param_tuple,
+                    partial(self._call_func, request, func_model, param_tuple),
+                    timeout=self._get_timeout(request),
+                )
+            except asyncio.TimeoutError:
+                result = RpcRunTimeError(f"Call {func_model.func.__name__} timeout")
         else:
-            coroutine = get_event_loop().run_in_executor(None, partial(func_model.func, *param_tuple))
-
-        try:
-            deadline_timestamp: int = request.header.get("X-rap-deadline", 0)
-            if deadline_timestamp:
-                timeout: int = int(time.time() - deadline_timestamp)
-            else:
-                timeout = self._run_timeout
-            result: Any = await asyncio.wait_for(coroutine, timeout)
-        except asyncio.TimeoutError:
-            return call_id, RpcRunTimeError(f"Call {func_model.func.__name__} timeout")
-        except Exception as e:
-            return call_id, e
+            result = await self._call_func(request, func_model, param_tuple)
+        if isinstance(result, Exception):
+            return call_id, result
 
         # generator fun support
         if inspect.isgenerator(result) or inspect.isasyncgen(result):
@@ -261,6 +302,8 @@ class Receiver(object):
     async def msg_handle(self, request: Request, response: Response) -> Optional[Response]:
         """根据函数类型分发请求，以及会对函数结果进行封装"""
         func_model: FuncModel = await self._call_func_permission_fn(request)
+        if request.stage_timer is not None:
+            request.stage_timer.mark("permission")
 
         call_id: int = request.body.get("call_id", -1)
         if call_id in self._generator_dict:
@@ -269,6 +312,8 @@ class Receiver(object):
             new_call_id, result = await self._msg_handle(request, call_id, func_model)
         else:
             raise ProtocolError("Error call id")
+        if request.stage_timer is not None:
+            request.stage_timer.mark("func")
         response.body = {"call_id": new_call_id}
         if isinstance(result, StopAsyncIteration) or isinstance(result, StopIteration):
             response.status_code = 301
@@ -279,7 +324,7 @@ class Receiver(object):
                 response.body["exc"] = exc  # type: ignore
         else:
             response.body["result"] = result
-            if not is_type(func_model.return_type, type(result)):
+            if not func_model.check_return_type(result):
                 logger.warning(
                     f"{func_model.func} return type is {func_model.return_type}, but result type is {type(result)}"
                 )
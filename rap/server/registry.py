@@ -1,15 +1,18 @@
+import asyncio
 import importlib
 import inspect
 import logging
 import os
 from collections import OrderedDict
 from types import FunctionType
-from typing import Any, Callable, Dict, List, Optional, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
 
 from rap.common.channel import UserChannel
 from rap.common.exceptions import FuncNotFoundError, RegisteredError
-from rap.common.types import is_json_type
-from rap.common.utils import constant
+from rap.common.types import gen_type_check_fn, is_json_type
+from rap.common.utils import constant, gen_param_handle
+from rap.server.batch import Batcher
+from rap.server.func_cache import CachePolicy, FuncCache
 from rap.server.model import Request
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -24,12 +27,15 @@ class FuncModel(object):
         is_private: bool,
         doc: Optional[str] = None,
         func_name: Optional[str] = None,
+        check_type: bool = True,
+        cache_policy: Optional[CachePolicy] = None,
     ) -> None:
         self.func_sig = inspect.signature(func)
         self.group: str = group
         self.func_type: str = func_type
         self.func: Callable = func
-        self.is_gen_func: bool = inspect.isgenerator(func) or inspect.isasyncgenfunction(func)
+        self.is_gen_func: bool = inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+        self.is_coroutine_func: bool = asyncio.iscoroutinefunction(func)
         self.is_private: bool = is_private
         self.doc: str = doc or func.__doc__ or ""
         self.func_name: str = func_name or func.__name__
@@ -39,6 +45,15 @@ class FuncModel(object):
 
         if self.func_type == constant.CHANNEL_TYPE and self.is_gen_func:
             raise RegisteredError("Is not a legal function. is channel or gen func?")
+        self.func_cache: Optional[FuncCache] = None
+        if cache_policy:
+            if self.func_type == constant.CHANNEL_TYPE or self.is_gen_func:
+                raise RegisteredError(f"{self.func_name} is channel or gen func, can not cache result")
+            self.func_cache = FuncCache(cache_policy)
+        # the func decorated by `rap.server.batch.batched`
+        self.batcher: Optional[Batcher] = getattr(func, "batcher", None)
+        if self.batcher is not None and self.func_type == constant.CHANNEL_TYPE:
+            raise RegisteredError(f"{self.func_name} is channel func, can not batch call")
 
         for name, parameter in self.func_sig.parameters.items():
             if parameter.default is parameter.empty:
@@ -46,8 +61,27 @@ class FuncModel(object):
             else:
                 self.kwarg_dict[name] = parameter.default
 
+        # Precompute the param handle and the type check of the return value when registering,
+        #  so that the call does not need to parse the type hint each time
+        self._param_handle: Callable[[Sequence[Any], Dict[str, Any]], Tuple[Any, ...]] = gen_param_handle(
+            self.func_sig, check_type=check_type
+        )
+        self._return_type_check: Callable[[Any], bool] = (
+            gen_type_check_fn(self.return_type)
+            if check_type and self.func_type == constant.NORMAL_TYPE
+            else lambda value: True
+        )
+
+    def param_handle(self, param_list: Sequence[Any]) -> Tuple[Any, ...]:
+        """Check whether the parameter is legal and whether the parameter type is correct"""
+        return self._param_handle(param_list, {})
+
+    def check_return_type(self, value: Any) -> bool:
+        """Check whether the return value type is consistent with the func return type hint"""
+        return self._return_type_check(value)
+
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        func_info_dict: Dict[str, Any] = {
             "group": self.group,
             "func_type": self.func_type,
             "is_gen_func": self.is_gen_func,
@@ -55,18 +89,35 @@ class FuncModel(object):
             "doc": self.doc,
             "func_name": self.func_name,
         }
+        if self.func_cache is not None:
+            func_info_dict["cache"] = self.func_cache.to_dict()
+        if self.batcher is not None:
+            func_info_dict["batch"] = self.batcher.to_dict()
+        return func_info_dict
 
 
 class RegistryManager(object):
     """server func manager"""
 
-    def __init__(self) -> None:
+    def __init__(self, check_type: bool = True, max_target_cache_size: int = 1024) -> None:
+        """
+        :param check_type: If False, not check the param type and return value type of func when calling
+        :param max_target_cache_size: The maximum number of the raw target to func model cache of each func type
+        """
         self._cwd: str = os.getcwd()
+        self._check_type: bool = check_type
+        self._max_target_cache_size: int = max_target_cache_size
         self.func_dict: Dict[str, FuncModel] = dict()
+        # raw target -> func model, avoid gen func key on each request
+        self._target_func_model_dict: Dict[str, Dict[str, FuncModel]] = {
+            constant.NORMAL_TYPE: {},
+            constant.CHANNEL_TYPE: {},
+        }
 
         self.register(self._load, "load", group="registry", is_private=True)
         self.register(self._reload, "reload", group="registry", is_private=True)
         self.register(self.get_register_func_list, "list", group="registry", is_private=True)
+        self.register(self._invalidate_cache, "invalidate_cache", group="registry", is_private=True)
 
     @staticmethod
     def gen_key(group: str, name: str, type_: str) -> str:
@@ -89,13 +140,24 @@ class RegistryManager(object):
         return func_type
 
     def get_func_model(self, request: Request, func_type: str) -> FuncModel:
+        target_func_model_dict: Dict[str, FuncModel] = self._target_func_model_dict[func_type]
+        func_model: Optional[FuncModel] = target_func_model_dict.get(request.target, None)
+        if func_model is not None:
+            return func_model
+
         func_key: str = self.gen_key(request.group, request.func_name, func_type)
         if func_key not in self.func_dict:
             raise FuncNotFoundError(extra_msg=f"name: {request.func_name}")
 
-        func_model: FuncModel = self.func_dict[func_key]
+        func_model = self.func_dict[func_key]
+        if len(target_func_model_dict) < self._max_target_cache_size:
+            target_func_model_dict[request.target] = func_model
         return func_model
 
+    def _clear_target_cache(self) -> None:
+        for target_func_model_dict in self._target_func_model_dict.values():
+            target_func_model_dict.clear()
+
     def register(
         self,
         func: Callable,
@@ -103,6 +165,7 @@ class RegistryManager(object):
         group: Optional[str] = None,
         is_private: bool = False,
         doc: Optional[str] = None,
+        cache: Optional[CachePolicy] = None,
     ) -> None:
         """
         register func to manager
@@ -115,6 +178,7 @@ class RegistryManager(object):
                The root correlation_id is generally used for system components, and there are restrictions when calling.
         :param is_private: If the function is private, it will be restricted to call and cannot be overloaded
         :param doc: func doc, if not set, auto use python func doc
+        :param cache: If set, the result of the func will be cached according to the policy
         """
         if inspect.isfunction(func) or inspect.ismethod(func):
             name = name if name else func.__name__
@@ -146,8 +210,16 @@ class RegistryManager(object):
         if func_key in self.func_dict:
             raise RegisteredError(f"`{func_key}` Already register")
         self.func_dict[func_key] = FuncModel(
-            group=group, func_type=func_type, func_name=name, func=func, is_private=is_private, doc=doc
+            group=group,
+            func_type=func_type,
+            func_name=name,
+            func=func,
+            is_private=is_private,
+            doc=doc,
+            check_type=self._check_type,
+            cache_policy=cache,
         )
+        self._clear_target_cache()
         logger.debug(f"register `{func_key}` success")
 
     @staticmethod
@@ -213,12 +285,31 @@ class RegistryManager(object):
             if func_model.is_private:
                 raise RegisteredError(f"{func_key} reload fail, private func can not reload")
             self.func_dict[func_key] = FuncModel(
-                group=group, func_type=func_type, func_name=name, func=func, is_private=func_model.is_private, doc=doc
+                group=group,
+                func_type=func_type,
+                func_name=name,
+                func=func,
+                is_private=func_model.is_private,
+                doc=doc,
+                check_type=self._check_type,
+                cache_policy=func_model.func_cache.policy if func_model.func_cache else None,
             )
+            self._clear_target_cache()
             return f"reload {func_str} from {path} success"
         except Exception as e:
             raise RegisteredError(f"reload {func_str} from {path} fail, {str(e)}")
 
+    def _invalidate_cache(self, name: str, group: Optional[str] = None, param: Optional[tuple] = None) -> int:
+        """Invalidate the cached result of the func, if param is None, invalidate all cached results of the func.
+        return the number of invalidated results"""
+        func_key: str = self.gen_key(group or constant.DEFAULT_GROUP, name, constant.NORMAL_TYPE)
+        if func_key not in self.func_dict:
+            raise FuncNotFoundError(extra_msg=f"name: {name}")
+        func_cache: Optional[FuncCache] = self.func_dict[func_key].func_cache
+        if not func_cache:
+            raise RegisteredError(f"`{func_key}` not enable cache")
+        return func_cache.invalidate(param)
+
     def get_register_func_list(self) -> List[Dict[str, Union[str, bool]]]:
         """get func info which in registry"""
         register_list: List[Dict[str, Union[str, bool]]] = []
@@ -5,6 +5,7 @@ from uuid import uuid4
 from rap.common.asyncio_helper import Deadline
 from rap.common.conn import ServerConnection
 from rap.common.exceptions import IgnoreNextProcessor
+from rap.common.processor import HOOK_FN_LIST, ProcessorChain
 from rap.common.utils import constant
 from rap.server.model import Event, Response, ServerContext
 from rap.server.plugin.processor.base import BaseProcessor
@@ -24,19 +25,21 @@ class Sender(object):
         conn: ServerConnection,
         timeout: Optional[int] = None,
         processor_list: Optional[List[BaseProcessor]] = None,
+        processor_chain: Optional[ProcessorChain] = None,
     ):
         """
         :param app: rap server
         :param conn: rap server conn
         :param timeout: send data timeout
-        :param
+        :param processor_list: processor list
+        :param processor_chain: precomputed processor chain, if None, gen it by processor_list
         """
         self._app: "Server" = app
         self._max_correlation_id: int = 65535
         self._correlation_id: int = 2
         self._conn: ServerConnection = conn
         self._timeout: Optional[int] = timeout
-        self._processor_list: Optional[List[BaseProcessor]] = processor_list
+        self._processor_chain: ProcessorChain = processor_chain or ProcessorChain(BaseProcessor, processor_list)
 
     @staticmethod
     def header_handle(resp: Response) -> None:
@@ -54,26 +57,28 @@ class Sender(object):
         set_header_value("request_id", str(uuid4()), is_cover=resp.msg_type is constant.CHANNEL_RESPONSE)
 
     async def _processor_response_handle(self, resp: Response) -> Response:
-        if not self._processor_list:
-            return resp
         if not resp.exc:
+            hook_list: HOOK_FN_LIST = self._processor_chain.get_response_hook_list(resp.msg_type)
             try:
-                for processor in reversed(self._processor_list):
-                    resp = await processor.process_response(resp)
+                for hook, is_coroutine_func in hook_list:
+                    resp = await hook(resp) if is_coroutine_func else hook(resp)
             except IgnoreNextProcessor:
                 pass
             except Exception as e:
                 resp.set_exception(e)
         if resp.exc:
-            for processor in reversed(self._processor_list):
+            for hook, is_coroutine_func in self._processor_chain.get_exc_hook_list(resp.msg_type):
                 raw_resp: Response = resp
                 try:
-                    resp, resp.exc = await processor.process_exc(resp, resp.exc)  # type: ignore
+                    if is_coroutine_func:
+                        resp, resp.exc = await hook(resp, resp.exc)  # type: ignore
+                    else:
+                        resp, resp.exc = hook(resp, resp.exc)
                 except IgnoreNextProcessor:
                     break
                 except Exception as e:
                     logger.exception(
-                        f"processor:{processor.__class__.__name__} handle response:{resp.correlation_id} error:{e}"
+                        f"processor hook:{hook.__qualname__} handle response:{resp.correlation_id} error:{e}"
                     )
                     resp = raw_resp
         return resp
@@ -85,12 +90,16 @@ class Sender(object):
 
         self.header_handle(resp)
         resp = await self._processor_response_handle(resp)
+        if resp.stage_timer is not None:
+            resp.stage_timer.mark("response_processor")
+            if self._app.server_timing_header:
+                resp.header["server-timing"] = resp.stage_timer.to_header()
         logger.debug("resp: %s", resp)
         if not deadline:
             deadline = Deadline(self._timeout)
 
         with deadline:
-            await self._conn.write(resp.to_msg())
+            await self._conn.write(resp.to_msg(), resp.stage_timer)
         if resp.target.endswith(constant.EVENT_CLOSE_CONN):
             if not self._conn.is_closed():
                 self._conn.close()
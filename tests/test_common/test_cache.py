@@ -61,3 +61,61 @@ class TestCache:
         assert my_cache.get(no_expire_key) == value
         with pytest.raises(KeyError):
             my_cache.get(key)
+
+
+class TestExpireCache:
+    async def test_expire_not_by_insert_order(self, mocker: MockFixture) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        my_cache: cache.ExpireCache = cache.ExpireCache()
+        my_cache.add("long", 100, 1)
+        my_cache.add("short", 10, 2)
+        my_cache.add("no_expire", -1, 3)
+        # update the key expire does not depend on the order of the dict
+        my_cache.update_expire("long", 5)
+        assert my_cache.get_and_update_expire("short", 20) == 2
+
+        mocker.patch("time.time").return_value = 1600000006
+        assert my_cache.remove_expire_key() == 1
+        assert "long" not in my_cache._dict
+        mocker.patch("time.time").return_value = 1600000021
+        # expired key is not returned even if it has not been cleaned up
+        assert my_cache.get("short", None) is None
+        assert my_cache.get("no_expire") == 3
+        assert my_cache.get_and_update_expire("short", 10, "default") == "default"
+        assert "short" not in my_cache._dict
+        assert my_cache.to_dict()["expire"] == 2
+
+    async def test_stale_heap_entry(self) -> None:
+        my_cache: cache.ExpireCache = cache.ExpireCache()
+        my_cache.add("test", 10)
+        for _ in range(1000):
+            my_cache.update_expire("test", 10)
+        assert len(my_cache._heap) <= 2 * len(my_cache._dict) + 64
+
+    async def test_lru_eviction(self) -> None:
+        my_cache: cache.ExpireCache = cache.ExpireCache(max_entries=2)
+        my_cache.add("a", 10, 1)
+        my_cache.add("b", 10, 2)
+        assert my_cache.get("a") == 1
+        my_cache.add("c", 10, 3)
+        assert "b" not in my_cache
+        assert "a" in my_cache and "c" in my_cache
+        assert my_cache.to_dict()["eviction"] == 1
+
+        my_cache = cache.ExpireCache(max_bytes=1024)
+        for index in range(100):
+            my_cache.add(index, 10, b"0" * 100)
+        assert my_cache._bytes <= 1024
+        assert 0 < len(my_cache._dict) < 100
+        my_cache.pop(99)
+        assert my_cache._bytes == sum(my_cache._size_dict.values())
+
+    async def test_stats(self) -> None:
+        my_cache: cache.ThreadExpireCache = cache.ThreadExpireCache()
+        my_cache.add("test", 10, 1)
+        assert my_cache.get("test") == 1
+        assert my_cache.get("error_key", None) is None
+        assert list(my_cache.items()) == [("test", 1)]
+        stats_dict: dict = my_cache.to_dict()
+        assert stats_dict["hit"] == 1
+        assert stats_dict["miss"] == 1
@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+from rap.common.cardinality import HyperLogLog
+
+
+class TestHyperLogLog:
+    def test_small_cardinality(self) -> None:
+        hll: HyperLogLog = HyperLogLog()
+        assert hll.count() == 0
+        for _ in range(3):
+            for i in range(10):
+                hll.add(f"127.0.0.{i}")
+        # The str hash is randomized per process, two values may fall into the same register(about 4% at precision 10)
+        assert 9 <= hll.count() <= 10
+
+    @pytest.mark.parametrize("precision", [10, 14])
+    def test_large_cardinality(self, precision: int) -> None:
+        hll: HyperLogLog = HyperLogLog(precision)
+        for i in range(100000):
+            hll.add(i)
+        error: float = 1.04 / math.sqrt(1 << precision)
+        assert abs(hll.count() - 100000) / 100000 < error * 4
+
+        hll.clear()
+        assert hll.count() == 0
+
+    def test_precision(self) -> None:
+        with pytest.raises(ValueError):
+            HyperLogLog(3)
+        with pytest.raises(ValueError):
+            HyperLogLog(17)
@@ -1,10 +1,20 @@
 import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 from pytest_mock import MockFixture
 
 from rap.common.asyncio_helper import get_event_loop
-from rap.common.collect_statistics import Counter, Gauge, WindowStatistics
+from rap.common.collect_statistics import (
+    Counter,
+    Gauge,
+    HistogramStore,
+    LogLinearHistogram,
+    ThreadWindowStatistics,
+    WindowLogLinearHistogram,
+    WindowStatistics,
+)
 
 pytestmark = pytest.mark.asyncio
 
@@ -96,3 +106,116 @@ class TestCollectStatistics:
         assert assert_dict["new_value"] == 30
         assert assert_dict["counter_test_counter"] == 10
         assert assert_dict["gauge_test_gauge"] == 10
+
+    async def test_gauge_window_value(self, mocker: MockFixture) -> None:
+        timestamp: int = 1600000000
+        mocker.patch("time.time").return_value = timestamp
+        window_statistics: WindowStatistics = WindowStatistics(max_interval=10)
+        gauge_list: list = [Gauge(f"test_{i}", diff=i) for i in range(1, 11)]
+        value_dict_list: list = [{} for _ in gauge_list]
+        for gauge in gauge_list:
+            window_statistics.registry_metric(gauge)
+
+        for _ in range(500):
+            timestamp += random.choice([0, 0, 1, 1, 2, 3, 7, 14])
+            mocker.patch("time.time").return_value = timestamp
+            for gauge, value_dict in zip(gauge_list, value_dict_list):
+                value: int = random.randint(-3, 10)
+                gauge.increment(value)
+                value_dict[timestamp] = value_dict.get(timestamp, 0) + value
+                # the window value is the sum of the last `diff` seconds, not include the current second
+                assert gauge.get_value() == sum(
+                    value_dict.get(second, 0) for second in range(timestamp - gauge.diff, timestamp)
+                )
+
+    async def test_metric_slot(self, mocker: MockFixture) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        window_statistics: WindowStatistics = WindowStatistics()
+        counter_list: list = [Counter(f"test_{i}") for i in range(100)]
+        for counter in counter_list:
+            window_statistics.registry_metric(counter)
+            counter.increment(2)
+            counter.decrement()
+        assert [counter.slot for counter in counter_list] == list(range(100))
+        assert all([counter.get_value() == 1 for counter in counter_list])
+
+        window_statistics.drop_metric(counter_list[0].metric_cache_name)
+        with pytest.raises(RuntimeError):
+            counter_list[0].increment()
+        # reuse slot, and the data of slot is cleared
+        new_counter: Counter = Counter("new")
+        window_statistics.registry_metric(new_counter)
+        assert new_counter.slot == 0
+        assert new_counter.get_value() == 0
+        # counter value expire
+        mocker.patch("time.time").return_value = 1600000066
+        assert counter_list[1].get_value() == 0
+
+    async def test_thread_window_statistics(self) -> None:
+        window_statistics: ThreadWindowStatistics = ThreadWindowStatistics()
+        shared_counter: Counter = Counter("shared")
+        window_statistics.registry_metric(shared_counter)
+
+        def _run(index: int) -> None:
+            # register new metrics(grow the ring buffer) while the other threads read and write the metrics
+            gauge: Gauge = Gauge(f"test_{index}", diff=1)
+            window_statistics.registry_metric(gauge)
+            for _ in range(100):
+                gauge.increment()
+                gauge.get_value()
+                shared_counter.increment()
+                shared_counter.get_value()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(_run, range(64)))
+        assert shared_counter.get_value() == 6400
+        assert window_statistics._slot_capacity >= 65
+
+
+class TestHistogram:
+    def test_log_linear_histogram(self) -> None:
+        histogram: LogLinearHistogram = LogLinearHistogram(sub_bucket_bits=5)
+        value_list: list = [random.randint(0, 1000000) for _ in range(10000)]
+        for value in value_list:
+            histogram.record(value)
+        value_list.sort()
+        for percentile, value in zip([50, 90, 99, 99.9], histogram.get_percentile_list([50, 90, 99, 99.9])):
+            real_value: int = value_list[max(0, int(len(value_list) * percentile / 100) - 1)]
+            assert real_value <= value <= real_value * (1 + 1 / 16)
+        assert histogram.get_percentile(100) == histogram.max == value_list[-1]
+        assert histogram.min == value_list[0]
+        # small value is exact
+        histogram.reset()
+        histogram.record(3)
+        assert histogram.get_percentile(50) == 3
+
+    def test_merge(self) -> None:
+        histogram: LogLinearHistogram = LogLinearHistogram()
+        other_histogram: LogLinearHistogram = LogLinearHistogram()
+        for i in range(100):
+            histogram.record(i)
+            other_histogram.record(i + 100)
+        histogram.merge(other_histogram)
+        assert histogram.cnt == 200
+        assert histogram.min == 0 and histogram.max == 199
+        assert histogram.get_percentile(50) in range(99, 104)
+        with pytest.raises(ValueError):
+            histogram.merge(LogLinearHistogram(sub_bucket_bits=6))
+
+    def test_window_histogram(self) -> None:
+        histogram: WindowLogLinearHistogram = WindowLogLinearHistogram(window=60, slice_cnt=6)
+        histogram.record(1, now=1600000000)
+        histogram.record(2, now=1600000030)
+        assert histogram.snapshot(now=1600000055).cnt == 2
+        assert histogram.snapshot(now=1600000065).cnt == 1
+        assert histogram.snapshot(now=1600000200).cnt == 0
+
+    def test_histogram_store(self) -> None:
+        histogram_store: HistogramStore = HistogramStore(max_key_cnt=2)
+        for key in ["a", "b", "c"]:
+            histogram_store.observe("target", key, 0.0015)
+        stats_dict: dict = histogram_store.to_dict()
+        assert list(stats_dict["target"].keys()) == ["b", "c"]
+        assert stats_dict["target"]["b"]["count"] == 1
+        assert 1.5 <= stats_dict["target"]["b"]["p999"] <= 1.6
+        assert set(stats_dict["target"]["b"].keys()) == {"count", "mean", "min", "max", "p50", "p90", "p99", "p999"}
@@ -1,6 +1,8 @@
 import pytest
+from pytest_mock import MockerFixture
 
-from rap.common.crypto import Crypto
+from rap.common import crypto as crypto_module
+from rap.common.crypto import Crypto, GcmCrypto, get_crypto_class
 
 
 class TestCrypto:
@@ -23,3 +25,56 @@ class TestCrypto:
         encrypt_byte: bytes = crypto.encrypt_object(raw_obj)
         decrypt_obj: dict = crypto.decrypt_object(encrypt_byte)
         assert raw_obj == decrypt_obj
+
+
+class TestGcmCrypto:
+    def test_crypto_obj(self) -> None:
+        crypto: GcmCrypto = GcmCrypto("keyskeyskeyskeys")
+        raw_obj: dict = {"key": "test", "bytes": b"\x00\x01", "int": 1}
+
+        encrypt_byte: bytes = crypto.encrypt_object(raw_obj)
+        assert crypto.decrypt_object(encrypt_byte) == raw_obj
+        # random nonce per message
+        assert encrypt_byte != crypto.encrypt_object(raw_obj)
+        # binary data is smaller than hex data
+        assert len(encrypt_byte) < len(Crypto("keyskeyskeyskeys").encrypt_object({"key": "test", "int": 1}))
+
+        raw_str: str = "test_rap_crypto_text"
+        assert crypto.decrypt(crypto.encrypt(raw_str)) == raw_str
+
+    def test_tamper_data(self) -> None:
+        crypto: GcmCrypto = GcmCrypto("keyskeyskeyskeys")
+        encrypt_byte: bytearray = bytearray(crypto.encrypt_object({"key": "test"}))
+        encrypt_byte[13] ^= 1
+        with pytest.raises(ValueError):
+            crypto.decrypt_object(bytes(encrypt_byte))
+        with pytest.raises(ValueError):
+            crypto.decrypt_object(b"short")
+
+    def test_get_crypto_class(self) -> None:
+        assert get_crypto_class("cbc") is Crypto
+        assert get_crypto_class("gcm") is GcmCrypto
+        with pytest.raises(ValueError):
+            get_crypto_class("ecb")
+
+    def test_pycryptodome_only(self, mocker: MockerFixture) -> None:
+        # only the `crypto` extra(pycryptodome) is installed
+        mocker.patch.object(crypto_module, "AESGCM", None)
+        crypto: GcmCrypto = GcmCrypto("keyskeyskeyskeys")
+        assert crypto._aes_gcm is None
+        raw_obj: dict = {"key": "test", "bytes": b"\x00\x01", "int": 1}
+        assert crypto.decrypt_object(crypto.encrypt_object(raw_obj)) == raw_obj
+        encrypt_byte: bytearray = bytearray(crypto.encrypt_object(raw_obj))
+        encrypt_byte[13] ^= 1
+        with pytest.raises(ValueError):
+            crypto.decrypt_object(bytes(encrypt_byte))
+
+    def test_not_support_gcm(self, mocker: MockerFixture) -> None:
+        # pycrypto has no aes-gcm
+        mocker.patch.object(crypto_module, "AESGCM", None)
+        mocker.patch.object(crypto_module, "AES", mocker.MagicMock(spec=["MODE_CBC", "new"]))
+        with pytest.raises(ImportError):
+            get_crypto_class("gcm")
+        with pytest.raises(ImportError):
+            GcmCrypto("keyskeyskeyskeys")
+        assert get_crypto_class("cbc") is Crypto
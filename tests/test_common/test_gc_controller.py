@@ -0,0 +1,64 @@
+import asyncio
+import gc
+
+import pytest
+
+from rap.common.collect_statistics import WindowStatistics
+from rap.common.gc_controller import GCController
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestGCController:
+    async def test_pause(self) -> None:
+        origin_threshold: tuple = gc.get_threshold()
+        window_statistics: WindowStatistics = WindowStatistics(interval=1, max_interval=10)
+        gc_controller: GCController = GCController(freeze=False, threshold=(1000, 20, 20), interval=0.05)
+        gc_controller.start(window_statistics)
+        try:
+            assert gc.get_threshold() == (1000, 20, 20)
+            gc.collect(0)
+            gc.collect(2)
+            await asyncio.sleep(0.06)
+        finally:
+            gc_controller.stop()
+        assert not gc_controller.is_running
+        assert gc.get_threshold() == origin_threshold
+        assert gc_controller._gc_callback not in gc.callbacks
+
+        result_dict: dict = gc_controller.to_dict()
+        assert result_dict["collect_cnt"][0] >= 1
+        assert result_dict["collect_cnt"][2] >= 1
+        assert result_dict["pause"]["gen2"]["count"] >= 1
+        assert result_dict["pause"]["gen2"]["max"] > 0
+        assert gc_controller.pause_gauge_list[2].window_statistics is window_statistics
+
+    async def test_freeze(self) -> None:
+        gc_controller: GCController = GCController()
+        gc_controller.start()
+        try:
+            gc_controller.freeze()
+            assert gc_controller.freeze_cnt > 0
+            assert gc.get_freeze_count() == gc_controller.freeze_cnt
+        finally:
+            gc_controller.stop()
+        assert gc.get_freeze_count() == 0
+
+    async def test_auto_tune(self) -> None:
+        origin_threshold: tuple = gc.get_threshold()
+        gc_controller: GCController = GCController(
+            freeze=False, threshold=(1000, 10, 10), auto_tune=True, max_collect_per_second=1, max_threshold=4000
+        )
+        gc_controller.start()
+        try:
+            # The collections are too frequent, double the threshold up to the max threshold
+            for _ in range(3):
+                gc_controller._tune(10)
+            assert gc.get_threshold() == (4000, 10, 10)
+            # The pause is too long, halve the threshold
+            gc_controller._interval_max_pause = 1
+            gc_controller._tune(10)
+            assert gc.get_threshold() == (2000, 10, 10)
+        finally:
+            gc_controller.stop()
+        assert gc.get_threshold() == origin_threshold
@@ -0,0 +1,55 @@
+from rap.common.ip_network import IpNetworkSet, normalize_ip_network
+
+
+class TestIpNetwork:
+    def test_normalize_ip_network(self) -> None:
+        assert normalize_ip_network("192.168.0.1/16") == "192.168.0.0/16"
+        assert normalize_ip_network("192.168.0.1/32") == "192.168.0.1"
+        assert normalize_ip_network("::1/128") == "::1"
+        assert normalize_ip_network("2001:db8::1/32") == "2001:db8::/32"
+        assert normalize_ip_network("localhost") == "localhost"
+
+    def test_contains(self) -> None:
+        ip_network_set: IpNetworkSet = IpNetworkSet(["10.0.0.0/8", "192.168.1.0/24", "127.0.0.1", "2001:db8::/32"])
+        assert "10.255.0.1" in ip_network_set
+        assert "11.0.0.1" not in ip_network_set
+        assert "192.168.1.255" in ip_network_set
+        assert "192.168.2.1" not in ip_network_set
+        assert "127.0.0.1" in ip_network_set
+        assert "127.0.0.2" not in ip_network_set
+        assert "2001:db8:1::1" in ip_network_set
+        assert "2001:db9::1" not in ip_network_set
+        # ipv4 mapped ipv6
+        assert "::ffff:10.0.0.1" in ip_network_set
+        assert "::ffff:11.0.0.1" not in ip_network_set
+        # not ip
+        assert "localhost" not in ip_network_set
+        assert "" not in ip_network_set
+
+    def test_name(self) -> None:
+        ip_network_set: IpNetworkSet = IpNetworkSet(["localhost"])
+        assert "localhost" in ip_network_set
+        assert "127.0.0.1" not in ip_network_set
+
+    def test_add_and_remove(self) -> None:
+        ip_network_set: IpNetworkSet = IpNetworkSet()
+        ip_network_set.add("192.168.0.1/24")
+        ip_network_set.add("192.168.0.0/24")
+        ip_network_set.add("192.168.0.0/16")
+        assert len(ip_network_set) == 2
+        assert set(ip_network_set) == {"192.168.0.0/24", "192.168.0.0/16"}
+        assert "192.168.1.1" in ip_network_set
+
+        ip_network_set.remove("192.168.0.0/16")
+        assert "192.168.1.1" not in ip_network_set
+        assert "192.168.0.1" in ip_network_set
+        # remove the network that is not added
+        ip_network_set.remove("10.0.0.0/8")
+        ip_network_set.remove("192.168.0.5/24")
+        assert "192.168.0.1" not in ip_network_set
+        assert len(ip_network_set) == 0
+
+        ip_network_set.add("0.0.0.0/0")
+        assert "8.8.8.8" in ip_network_set
+        ip_network_set.clear()
+        assert "8.8.8.8" not in ip_network_set
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+
+from rap.common.collect_statistics import WindowStatistics
+from rap.common.loop_monitor import LoopMonitor
+
+pytestmark = pytest.mark.asyncio
+
+
+def block_loop(seconds: float) -> None:
+    end_time: float = time.time() + seconds
+    while time.time() < end_time:
+        pass
+
+
+class TestLoopMonitor:
+    async def test_lag(self) -> None:
+        window_statistics: WindowStatistics = WindowStatistics(interval=1, max_interval=10)
+        loop_monitor: LoopMonitor = LoopMonitor(interval=0.01, publish_interval=0.05, slow_callback_time=None)
+        loop_monitor.start(window_statistics)
+        try:
+            await asyncio.sleep(0.05)
+            asyncio.get_event_loop().call_soon(block_loop, 0.1)
+            await asyncio.sleep(0.1)
+        finally:
+            loop_monitor.stop()
+        assert not loop_monitor.is_running
+        assert loop_monitor.lag_max >= 0.09
+        assert loop_monitor.task_cnt >= 1
+        assert loop_monitor.lag_max_counter.get_value() == loop_monitor.lag_max * 1000
+        assert loop_monitor.task_cnt_counter.get_value() == loop_monitor.task_cnt
+        # The watchdog is not started, the slow callback is not captured
+        assert loop_monitor.slow_callback_cnt == 0
+        assert not loop_monitor.slow_callback_deque
+
+    async def test_slow_callback(self) -> None:
+        async def slow_task() -> None:
+            block_loop(0.2)
+
+        loop_monitor: LoopMonitor = LoopMonitor(interval=0.01, slow_callback_time=0.05)
+        loop_monitor.start()
+        try:
+            await asyncio.sleep(0.02)
+            await asyncio.ensure_future(slow_task())
+            await asyncio.sleep(0.02)
+        finally:
+            loop_monitor.stop()
+        result_dict: dict = loop_monitor.to_dict()
+        assert result_dict["slow_callback_cnt"] == 1
+        assert len(result_dict["slow_callback_list"]) == 1
+        slow_callback: dict = result_dict["slow_callback_list"][0]
+        assert slow_callback["duration"] >= 0.19
+        assert slow_callback["task"].endswith("slow_task")
+        assert any(stack.startswith("block_loop (") for stack in slow_callback["stack"])
@@ -0,0 +1,43 @@
+import tracemalloc
+
+import pytest
+
+from rap.common.memory import MemoryTracer, get_object_cnt_dict
+from rap.server.model import ServerContext
+
+
+class TestMemoryTracer:
+    def test_snapshot_diff(self) -> None:
+        memory_tracer: MemoryTracer = MemoryTracer(max_snapshot_cnt=2)
+        with pytest.raises(RuntimeError):
+            memory_tracer.take_snapshot("old")
+        assert memory_tracer.start()
+        try:
+            assert not memory_tracer.start()
+            assert set(memory_tracer.take_snapshot("old").keys()) == {"size", "count"}
+            leak_list: list = [bytearray(1024) for _ in range(1024)]
+            memory_tracer.take_snapshot("new")
+
+            diff_list: list = memory_tracer.diff("old", "new", top_n=1)
+            assert diff_list[0]["traceback"][0].startswith(__file__)
+            assert diff_list[0]["size_diff"] >= 1024 * 1024
+            assert diff_list[0]["count_diff"] >= 1024
+            top_list: list = memory_tracer.top("new", top_n=1)
+            assert len(top_list) == 1
+            assert top_list[0]["traceback"] == diff_list[0]["traceback"]
+            # take a temporary snapshot if the name is None
+            assert memory_tracer.top(top_n=1)[0]["size"] >= 1024 * 1024
+
+            memory_tracer.take_snapshot("other")
+            assert memory_tracer.to_dict()["snapshot_list"] == ["new", "other"]
+            with pytest.raises(KeyError):
+                memory_tracer.diff("old")
+            del leak_list
+        finally:
+            assert memory_tracer.stop()
+        assert not tracemalloc.is_tracing()
+        assert memory_tracer.to_dict()["snapshot_list"] == []
+
+    def test_object_cnt(self) -> None:
+        context_list: list = [ServerContext() for _ in range(10)]
+        assert get_object_cnt_dict()["rap.server.model.ServerContext"] >= len(context_list)
@@ -0,0 +1,64 @@
+import pytest
+from pytest_mock import MockFixture
+
+from rap.common.nonce_filter import BaseNonceFilter, NonceBloomFilter, NonceSetFilter
+
+
+class TestNonceFilter:
+    @pytest.mark.parametrize("nonce_filter_class", [NonceSetFilter, NonceBloomFilter])
+    def test_rotate(self, mocker: MockFixture, nonce_filter_class: type) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        nonce_filter: BaseNonceFilter = nonce_filter_class(ttl=60, bucket_cnt=4)
+        assert nonce_filter.add("a")
+        assert not nonce_filter.add("a")
+
+        mocker.patch("time.time").return_value = 1600000030
+        assert nonce_filter.add("b")
+        # nonce is kept at least ttl
+        mocker.patch("time.time").return_value = 1600000060
+        assert "a" in nonce_filter
+        mocker.patch("time.time").return_value = 1600000080
+        assert "a" not in nonce_filter
+        assert "b" in nonce_filter
+        # jump over all buckets
+        mocker.patch("time.time").return_value = 1600001000
+        assert "b" not in nonce_filter
+        assert nonce_filter.add("b")
+
+    def test_set_ttl(self, mocker: MockFixture) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        nonce_filter: NonceSetFilter = NonceSetFilter(ttl=30, bucket_cnt=4)
+        nonce_filter.add("a")
+        nonce_filter.set_ttl(60)
+        assert nonce_filter.ttl == 60
+        assert "a" in nonce_filter
+
+    def test_set_filter_max_nonce_cnt(self, mocker: MockFixture) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        nonce_filter: NonceSetFilter = NonceSetFilter(ttl=60, bucket_cnt=4, max_nonce_cnt=2)
+        assert nonce_filter.add("a")
+        assert nonce_filter.add("b")
+        # the filter is full, reject the new nonce
+        assert not nonce_filter.add("c")
+        assert "c" not in nonce_filter
+
+        # the oldest bucket is expired, the new nonce can be recorded
+        mocker.patch("time.time").return_value = 1600000080
+        assert nonce_filter.add("c")
+
+    def test_bloom_filter_error_rate(self) -> None:
+        nonce_filter: NonceBloomFilter = NonceBloomFilter(capacity=10000, error_rate=0.01)
+        for i in range(10000):
+            nonce_filter.add(i)
+        false_positive_cnt: int = sum([1 for i in range(10000, 20000) if i in nonce_filter])
+        assert false_positive_cnt < 10000 * 0.01 * 2
+
+    def test_bloom_filter_param_error(self) -> None:
+        with pytest.raises(ValueError):
+            NonceBloomFilter(capacity=0)
+        with pytest.raises(ValueError):
+            NonceBloomFilter(error_rate=1)
+        with pytest.raises(ValueError):
+            NonceSetFilter(bucket_cnt=1)
+        with pytest.raises(ValueError):
+            NonceSetFilter(max_nonce_cnt=0)
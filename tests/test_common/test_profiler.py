@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from rap.common.profiler import SamplingProfiler
+
+pytestmark = pytest.mark.asyncio
+
+
+def busy_loop(seconds: float) -> None:
+    end_time: float = time.time() + seconds
+    while time.time() < end_time:
+        pass
+
+
+async def wait_event(event: asyncio.Event) -> None:
+    await event.wait()
+
+
+class TestSamplingProfiler:
+    async def test_collapsed(self) -> None:
+        event: asyncio.Event = asyncio.Event()
+        task: asyncio.Future = asyncio.ensure_future(wait_event(event))
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        future: asyncio.Future = loop.run_in_executor(None, busy_loop, 0.3)
+        try:
+            collapsed: str = await SamplingProfiler().profile(0.2, 100)
+        finally:
+            event.set()
+            await task
+            await future
+        line_list: list = collapsed.split("\n")
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in line_list)
+        assert any(line.startswith("thread:") and "busy_loop" in line for line in line_list)
+        # The stack of the suspended task
+        assert any(line.startswith("task;wait_event") and "wait (" in line for line in line_list)
+
+    async def test_top(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        future: asyncio.Future = loop.run_in_executor(None, busy_loop, 0.3)
+        try:
+            top_list: list = await SamplingProfiler().profile(0.2, 100, "top", 3)
+        finally:
+            await future
+        assert len(top_list) == 3
+        assert top_list[0]["self"] >= top_list[1]["self"] >= top_list[2]["self"]
+        assert any(func_dict["func"].startswith("busy_loop") for func_dict in top_list)
+
+    async def test_one_profile_at_a_time(self) -> None:
+        profiler: SamplingProfiler = SamplingProfiler()
+        future: asyncio.Future = asyncio.ensure_future(profiler.profile(0.1))
+        await asyncio.sleep(0)
+        assert profiler.is_running
+        with pytest.raises(RuntimeError):
+            await profiler.profile(0.1)
+        await future
+        assert not profiler.is_running
+
+    async def test_cancel(self) -> None:
+        profiler: SamplingProfiler = SamplingProfiler()
+        future: asyncio.Future = asyncio.ensure_future(profiler.profile(5))
+        await asyncio.sleep(0.05)
+        assert profiler.is_running
+        # the sampling stops when the caller is cancelled(e.g. timeout), then the next profile can start
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(future, 0.05)
+        await asyncio.sleep(0.05)
+        assert not profiler.is_running
+        assert await profiler.profile(0.1)
+
+    def test_bounded_overhead(self) -> None:
+        # The sampler waits at least the cost of the sample(max_overhead=0.5), so the frequency is limited
+        profiler: SamplingProfiler = SamplingProfiler(max_overhead=0.5)
+        sample_cnt: int = profiler._run(0.2, 100000, None, {})
+        assert 0 < sample_cnt < 100000 * 0.2
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from rap.common.collect_statistics import HistogramStore, StageTimer
+from rap.common.slow_request import SlowRequestRecorder
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestSlowRequestRecorder:
+    async def test_record(self) -> None:
+        stage_timer: StageTimer = StageTimer(start_time=1.0)
+        stage_timer.stage_list = [("pick", 0.1), ("semaphore", 0.2), ("response_wait", 1.0)]
+        recorder: SlowRequestRecorder = SlowRequestRecorder(threshold=0.5, max_record_cnt=2)
+        assert not recorder.is_slow("test/default/demo", 0.4)
+        assert recorder.is_slow("test/default/demo", 0.5)
+        recorder.record(
+            "test/default/demo",
+            1.3,
+            param=[1, 2],
+            peer="localhost:9000",
+            stage_timer=stage_timer,
+            queue_stage_tuple=("pick", "semaphore"),
+            exc_info="TimeoutError: ",
+        )
+        recorder.record("test/default/demo1", 0.6)
+        recorder.record("test/default/demo2", 0.7)
+
+        assert recorder.record_cnt == 3
+        # The earliest one is dropped
+        assert [entry["target"] for entry in recorder.get_record_list()] == [
+            "test/default/demo1",
+            "test/default/demo2",
+        ]
+        recorder.record_deque.clear()
+        recorder.record("test/default/demo", 1.3, param=[1, 2], stage_timer=stage_timer, queue_stage_tuple=("pick",))
+        entry: dict = recorder.get_record_list("test/default/demo")[0]
+        assert entry["param_size"] == 3
+        assert entry["threshold"] == 0.5
+        assert entry["queue_time"] == 0.1
+        assert entry["stage"] == {"pick": 0.1, "semaphore": 0.2, "response_wait": 1.0}
+        assert entry["exc_info"] is None
+        assert recorder.get_record_list("test/default/demo1") == []
+
+    async def test_p99_threshold(self) -> None:
+        histogram_store: HistogramStore = HistogramStore()
+        for _ in range(100):
+            histogram_store.observe("target", "test/default/demo", 0.2)
+        for _ in range(10):
+            histogram_store.observe("target", "test/default/demo1", 0.2)
+        recorder: SlowRequestRecorder = SlowRequestRecorder(threshold=0.1, p99_multiple=2, refresh_interval=0.01)
+        recorder.start(histogram_store)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            recorder.stop()
+        assert 0.39 < recorder.get_threshold("test/default/demo") < 0.41
+        # Not enough samples, use the absolute threshold
+        assert recorder.get_threshold("test/default/demo1") == 0.1
+        assert not recorder.is_slow("test/default/demo", 0.3)
+
+    async def test_log(self, mocker: MockerFixture) -> None:
+        logger_mock = mocker.patch("rap.common.slow_request.logger")
+        recorder: SlowRequestRecorder = SlowRequestRecorder(is_log=True)
+        recorder.start(HistogramStore())
+        recorder.record("test/default/demo", 1.5, peer=("127.0.0.1", 9000))
+        recorder.stop()
+        logger_mock.warning.assert_called_once()
+        assert "test/default/demo" in logger_mock.warning.call_args[0][0]
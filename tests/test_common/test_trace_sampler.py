@@ -0,0 +1,50 @@
+import contextvars
+
+import pytest
+from pytest_mock import MockerFixture
+
+from rap.common.trace_sampler import (
+    TRACE_SAMPLE_HEADER,
+    RateLimitTraceSampler,
+    RateTraceSampler,
+    sample_trace,
+    trace_sample_context,
+)
+
+
+class TestTraceSampler:
+    def test_rate_sampler(self) -> None:
+        with pytest.raises(ValueError):
+            RateTraceSampler(1.1)
+        assert not any(RateTraceSampler(0).is_sample("test") for _ in range(100))
+        assert all(RateTraceSampler(1).is_sample("test") for _ in range(100))
+
+    def test_rate_limit_sampler(self, mocker: MockerFixture) -> None:
+        with pytest.raises(ValueError):
+            RateLimitTraceSampler(0)
+        mocker.patch("time.time").return_value = 1600000000.0
+        sampler: RateLimitTraceSampler = RateLimitTraceSampler(2)
+        assert [sampler.is_sample("test") for _ in range(3)] == [True, True, False]
+        mocker.patch("time.time").return_value = 1600000000.5
+        assert [sampler.is_sample("test") for _ in range(2)] == [True, False]
+
+    def test_sample_trace(self) -> None:
+        header: dict = {}
+        assert not sample_trace(header, "test", RateTraceSampler(0))
+        assert header[TRACE_SAMPLE_HEADER] == 0
+
+        # The decision of the upstream is not changed by the sampler
+        header = {TRACE_SAMPLE_HEADER: 1}
+        assert sample_trace(header, "test", RateTraceSampler(0))
+
+        header = {}
+        assert sample_trace(header, "test", None)
+        assert header[TRACE_SAMPLE_HEADER] == 1
+
+    def test_sample_trace_inherit_context(self) -> None:
+        def _sample_trace() -> bool:
+            trace_sample_context.set(False)
+            return sample_trace({}, "test", None)
+
+        assert not contextvars.copy_context().run(_sample_trace)
+        assert trace_sample_context.get() is None
@@ -3,6 +3,7 @@ from typing import Any
 
 import pytest
 from aredis import StrictRedis  # type: ignore
+from pytest_mock import MockerFixture
 
 from rap.client import Client
 from rap.common.conn import CloseConnException
@@ -153,3 +154,36 @@ class TestIpBlockMiddleware:
         with pytest.raises(CloseConnException):
             await client.start()
         await client.stop()
+
+    async def test_incr_version(self, mocker: MockerFixture) -> None:
+        middleware: IpFilterMiddleware = IpFilterMiddleware(StrictRedis.from_url("redis://localhost"))
+        sync_cnt: int = 0
+        version: int = 0
+
+        async def _sync() -> None:
+            nonlocal sync_cnt
+            sync_cnt += 1
+
+        async def _incr(key: str) -> None:
+            pass
+
+        async def _execute() -> list:
+            return [1, version]
+
+        mocker.patch.object(middleware, "_sync", side_effect=_sync)
+        pipe: Any = mocker.MagicMock()
+        pipe.incr.side_effect = _incr
+        pipe.execute.side_effect = _execute
+        middleware._is_load = True
+        middleware._version = b"1"
+
+        # only this change, no need to reload
+        version = 2
+        await middleware._incr_version(pipe)
+        assert middleware._version == b"2"
+        assert sync_cnt == 0
+        # other servers changed the rules in between
+        version = 4
+        await middleware._incr_version(pipe)
+        assert middleware._version == b"2"
+        assert sync_cnt == 1
@@ -0,0 +1,102 @@
+from typing import List, Set
+
+import pytest
+
+from rap.client import Client
+from rap.client.model import Request as ClientRequest
+from rap.client.processor.base import BaseProcessor as ClientBaseProcessor
+from rap.common.processor import ProcessorChain
+from rap.common.utils import constant
+from rap.server import Request, Response, Server
+from rap.server.plugin.processor.base import BaseProcessor
+
+pytestmark = pytest.mark.asyncio
+
+
+class NoopProcessor(BaseProcessor):
+    pass
+
+
+class RequestProcessor(BaseProcessor):
+    async def process_request(self, request: Request) -> Request:
+        return request
+
+
+class SyncResponseProcessor(BaseProcessor):
+    msg_type_set: Set[int] = {constant.MSG_RESPONSE}
+
+    def process_response(self, response: Response) -> Response:  # type: ignore
+        return response
+
+
+class TestProcessorChain:
+    def test_skip_not_override_hook(self) -> None:
+        request_processor: RequestProcessor = RequestProcessor()
+        response_processor: SyncResponseProcessor = SyncResponseProcessor()
+        processor_chain: ProcessorChain = ProcessorChain(
+            BaseProcessor, [NoopProcessor(), request_processor, response_processor]
+        )
+
+        assert processor_chain.get_request_hook_list(constant.MSG_REQUEST) == [
+            (request_processor.process_request, True)
+        ]
+        assert processor_chain.get_exc_hook_list(constant.MSG_RESPONSE) == []
+        assert processor_chain.get_response_hook_list(constant.MSG_RESPONSE) == [
+            (response_processor.process_response, False)
+        ]
+        # The msg type not handled by the processor
+        assert processor_chain.get_response_hook_list(constant.CHANNEL_RESPONSE) == []
+        assert processor_chain.get_response_hook_list(constant.SERVER_EVENT) == []
+        # unknown msg type
+        assert processor_chain.get_request_hook_list(-1) == [(request_processor.process_request, True)]
+
+    def test_hook_order(self) -> None:
+        processor_list: List[RequestProcessor] = [RequestProcessor(), RequestProcessor()]
+        processor_chain: ProcessorChain = ProcessorChain(BaseProcessor, processor_list)
+        assert [hook for hook, _ in processor_chain.get_request_hook_list(constant.MSG_REQUEST)] == [
+            processor.process_request for processor in processor_list
+        ]
+
+        processor_chain.reload(list(reversed(processor_list)))
+        assert [hook for hook, _ in processor_chain.get_request_hook_list(constant.MSG_REQUEST)] == [
+            processor.process_request for processor in reversed(processor_list)
+        ]
+
+    async def test_server_and_client_sync_hook(self) -> None:
+        server_msg_type_list: List[int] = []
+        client_msg_type_list: List[int] = []
+
+        class ServerProcessor(BaseProcessor):
+            msg_type_set: Set[int] = {constant.MSG_REQUEST, constant.MSG_RESPONSE}
+
+            def process_request(self, request: Request) -> Request:  # type: ignore
+                server_msg_type_list.append(request.msg_type)
+                return request
+
+            def process_response(self, response: Response) -> Response:  # type: ignore
+                server_msg_type_list.append(response.msg_type)
+                return response
+
+        class ClientProcessor(ClientBaseProcessor):
+            msg_type_set: Set[int] = {constant.MSG_REQUEST}
+
+            def process_request(self, request: ClientRequest) -> ClientRequest:  # type: ignore
+                client_msg_type_list.append(request.msg_type)
+                return request
+
+        async def demo(a: int) -> int:
+            return a
+
+        server: Server = Server("test", processor_list=[ServerProcessor()])
+        server.register(demo)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        client.load_processor([ClientProcessor()])
+        await client.start()
+        try:
+            assert 1 == await client.invoke_by_name("demo", [1])
+        finally:
+            await client.stop()
+            await server.shutdown()
+        assert server_msg_type_list == [constant.MSG_REQUEST, constant.MSG_RESPONSE]
+        assert client_msg_type_list == [constant.MSG_REQUEST]
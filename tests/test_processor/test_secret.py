@@ -7,10 +7,12 @@ from pytest_mock import MockerFixture
 
 from rap.client import Client
 from rap.client.processor import CryptoProcessor
+from rap.client.processor.crypto import AutoCryptoProcessor
 from rap.common.crypto import Crypto
 from rap.common.exceptions import CryptoError
 from rap.server import Server
 from rap.server.plugin.processor import CryptoProcessor as ServerCryptoProcessor
+from rap.server.plugin.processor.crypto import AutoCryptoProcessor as ServerAutoCryptoProcessor
 from tests.conftest import process_client  # type: ignore
 
 pytestmark = pytest.mark.asyncio
@@ -129,3 +131,42 @@ class TestServerCryptoProcess:
                 "load_aes_key_dict", [{"test1": "1234567890123456"}], group=middleware.__class__.__name__
             )
             await rap_client.invoke_by_name("remove_aes", ["test1"], group=middleware.__class__.__name__)
+
+
+class TestGcmCryptoProcess:
+    @pytest.mark.parametrize(
+        "server_processor, client_processor",
+        [
+            (
+                ServerCryptoProcessor({"test": "keyskeyskeyskeys"}),
+                CryptoProcessor("test", "keyskeyskeyskeys", crypto_mode="gcm"),
+            ),
+            (ServerAutoCryptoProcessor(), AutoCryptoProcessor(crypto_mode="gcm")),
+        ],
+    )
+    async def test_gcm_mode(self, server_processor: Any, client_processor: Any) -> None:
+        async def demo(a: int) -> int:
+            return a
+
+        server: Server = Server("test", processor_list=[server_processor])
+        server.register(demo)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        client.load_processor([client_processor])
+        await client.start()
+        try:
+            assert 1 == await client.invoke_by_name("demo", [1])
+            assert 2 == await client.invoke_by_name("demo", [2])
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+    async def test_not_support_mode(self) -> None:
+        server_processor: ServerCryptoProcessor = ServerCryptoProcessor({"test": "keyskeyskeyskeys"})
+        assert server_processor.get_crypto_by_key_id("test", "gcm") is server_processor.get_crypto_by_key_id(
+            "test", "gcm"
+        )
+        with pytest.raises(ValueError):
+            server_processor.get_crypto_by_key_id("test", "ecb")
+        server_processor.remove_aes("test")
+        assert not server_processor._mode_crypto_dict
@@ -0,0 +1,89 @@
+import json
+from pathlib import Path
+
+import msgpack
+import pytest
+
+from rap.client import Client
+from rap.server import Server
+from rap.server.plugin.processor.access import ACCESS_LOG_FIELD_TUPLE, AccessLog, AccessProcessor
+
+pytestmark = pytest.mark.asyncio
+
+
+def gen_entry(index: int) -> tuple:
+    return 1600000000.0, ("127.0.0.1", 8000), "test/default/demo", 201, index, "", 200, 0.1, 10
+
+
+class TestAccessLog:
+    def test_ring_buffer(self, tmp_path: Path) -> None:
+        path: str = str(tmp_path / "access.log")
+        access_log: AccessLog = AccessLog(path, buffer_size=2)
+        assert access_log.record(gen_entry(1))
+        assert access_log.record(gen_entry(2))
+        assert not access_log.record(gen_entry(3))
+        access_log.start()
+        access_log.stop()
+        assert access_log.record(gen_entry(4))
+        assert access_log.to_dict() == {
+            "record_cnt": 3,
+            "drop_cnt": 1,
+            "write_cnt": 2,
+            "write_error_cnt": 0,
+            "pending_cnt": 1,
+        }
+        with open(path) as f:
+            entry_list: list = [json.loads(line) for line in f]
+        assert [entry["correlation_id"] for entry in entry_list] == [1, 2]
+        assert entry_list[0] == {
+            "timestamp": 1600000000.0,
+            "host": ["127.0.0.1", 8000],
+            "target": "test/default/demo",
+            "msg_type": 201,
+            "correlation_id": 1,
+            "life_cycle": "",
+            "status_code": 200,
+            "duration": 0.1,
+            "request_size": 10,
+        }
+
+    def test_msgpack(self, tmp_path: Path) -> None:
+        path: str = str(tmp_path / "access.log")
+        access_log: AccessLog = AccessLog(path, serializer="msgpack", batch_size=1)
+        access_log.start()
+        for i in range(3):
+            access_log.record(gen_entry(i))
+        access_log.stop()
+        with open(path, "rb") as f:
+            entry_list: list = list(msgpack.Unpacker(f, raw=False))
+        assert [entry["correlation_id"] for entry in entry_list] == [0, 1, 2]
+        assert list(entry_list[0].keys()) == list(ACCESS_LOG_FIELD_TUPLE)
+
+    async def test_sample(self, tmp_path: Path) -> None:
+        async def sync_sum(a: int, b: int) -> int:
+            return a + b
+
+        path: str = str(tmp_path / "access.log")
+        access_log: AccessLog = AccessLog(path)
+        server: Server = Server(
+            "test", processor_list=[AccessProcessor(access_log, success_sample_rate=0, error_sample_rate=1)]
+        )
+        server.register(sync_sum)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            for _ in range(10):
+                assert 3 == await client.invoke_by_name("sync_sum", [1, 2])
+            with pytest.raises(Exception):
+                await client.invoke_by_name("sync_sum", [1, "a"])
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+        with open(path) as f:
+            entry_list: list = [json.loads(line) for line in f]
+        assert len(entry_list) == 1
+        assert entry_list[0]["target"] == "test/default/sync_sum"
+        assert entry_list[0]["status_code"] >= 400
+        assert entry_list[0]["request_size"] > 0
@@ -1,8 +1,9 @@
 import asyncio
-from typing import Any
+from typing import Any, Type
 
 import pytest
 from aredis import StrictRedis  # type: ignore
+from pytest_mock import MockFixture
 
 from rap.client import Client
 from rap.common.exceptions import ServerError, TooManyRequest
@@ -143,3 +144,213 @@ class TestLimit:
             assert 3 == await rap_client.invoke_by_name("sync_sum", [1, 2])
         with pytest.raises(TooManyRequest):
             assert 3 == await rap_client.invoke_by_name("sync_sum", [1, 2])
+
+
+class TestMemoryLimitBackend:
+    @pytest.mark.parametrize(
+        "backend_class",
+        [
+            limit.MemoryTokenBucketBackend,
+            limit.MemoryGCRABackend,
+            limit.MemorySlidingWindowBackend,
+            limit.MemorySlidingWindowLogBackend,
+        ],
+    )
+    def test_can_requests(self, mocker: MockFixture, backend_class: Type[limit.backend.BaseMemoryBackend]) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        backend: limit.backend.BaseMemoryBackend = backend_class()
+        # 2 req/s, token bucket and gcra allow 2 requests at once
+        rule: limit.Rule = limit.Rule(second=1, gen_token=2, max_token=2)
+        assert backend.expected_time("test", rule) == 0
+        assert backend.can_requests("test", rule)
+        assert backend.can_requests("test", rule)
+        assert not backend.can_requests("test", rule)
+        assert 0 < backend.expected_time("test", rule) <= 1
+        # other key is not affected
+        assert backend.can_requests("other", rule)
+
+        # the sliding window counter estimates the count by the previous window
+        mocker.patch("time.time").return_value = 1600000001.5
+        assert backend.can_requests("test", rule)
+
+    @pytest.mark.parametrize("backend_class", [limit.MemoryTokenBucketBackend, limit.MemorySlidingWindowBackend])
+    def test_block_time(self, mocker: MockFixture, backend_class: Type[limit.backend.BaseMemoryBackend]) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        backend: limit.backend.BaseMemoryBackend = backend_class()
+        rule: limit.Rule = limit.Rule(second=1, gen_token=1, max_token=1, block_time=10)
+        assert backend.can_requests("test", rule)
+        assert not backend.can_requests("test", rule)
+        assert backend.expected_time("test", rule) == 10
+        mocker.patch("time.time").return_value = 1600000005
+        assert not backend.can_requests("test", rule)
+        mocker.patch("time.time").return_value = 1600000011
+        assert backend.can_requests("test", rule)
+
+    def test_sliding_window_log(self, mocker: MockFixture) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        backend: limit.MemorySlidingWindowLogBackend = limit.MemorySlidingWindowLogBackend()
+        rule: limit.Rule = limit.Rule(second=10, gen_token=2)
+        assert backend.can_requests("test", rule)
+        mocker.patch("time.time").return_value = 1600000005
+        assert backend.can_requests("test", rule)
+        assert not backend.can_requests("test", rule)
+        assert backend.expected_time("test", rule) == 5
+        mocker.patch("time.time").return_value = 1600000010
+        assert backend.can_requests("test", rule)
+        assert not backend.can_requests("test", rule)
+
+    def test_key_table_bound(self, mocker: MockFixture) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        backend: limit.MemoryGCRABackend = limit.MemoryGCRABackend(max_key_cnt=10)
+        rule: limit.Rule = limit.Rule(second=1, gen_token=1, max_token=10)
+        for index in range(20):
+            backend.can_requests(str(index), rule)
+        assert len(backend._key_dict) == 10
+        assert "0" not in backend._key_dict
+
+        # idle key is dropped when accessing other keys
+        mocker.patch("time.time").return_value = 1600000002
+        backend.can_requests("test", rule)
+        assert list(backend._key_dict.keys()) == ["test"]
+
+    async def test_limit_processor(self) -> None:
+        async def demo() -> int:
+            return 1
+
+        def match_request(request: Request) -> limit.RULE_FUNC_RETURN_TYPE:
+            return request.func_name, False
+
+        limit_processor: limit.LimitProcessor = limit.LimitProcessor(
+            limit.MemoryTokenBucketBackend(), [(match_request, limit.Rule(second=10, gen_token=1, max_token=1))]
+        )
+        server: Server = Server("test", processor_list=[limit_processor])
+        server.register(demo)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            assert 1 == await client.invoke_by_name("demo")
+            with pytest.raises(TooManyRequest):
+                await client.invoke_by_name("demo")
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+
+class TestRedisLeaseBackend:
+    @staticmethod
+    def _mock_eval(mocker: MockFixture, backend: limit.RedisLeaseBackend, grant_token: int) -> Any:
+        async def _eval(*args: Any) -> int:
+            return grant_token
+
+        return mocker.patch.object(backend._redis, "eval", side_effect=_eval)
+
+    @staticmethod
+    async def _can_requests(backend: limit.RedisLeaseBackend, rule: limit.Rule) -> bool:
+        result: Any = backend.can_requests("test", rule)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    async def test_lease(self, mocker: MockFixture) -> None:
+        backend: limit.RedisLeaseBackend = limit.RedisLeaseBackend(StrictRedis.from_url("redis://localhost"))
+        eval_mock: Any = self._mock_eval(mocker, backend, 5)
+        # lease 100 * 0.05 = 5 tokens at a time
+        rule: limit.Rule = limit.Rule(second=1, gen_token=100, max_token=100)
+
+        # the first request waits for the lease, the others are checked by the lease synchronously
+        result: Any = backend.can_requests("test", rule)
+        assert asyncio.iscoroutine(result)
+        assert await result
+        for _ in range(99):
+            assert await self._can_requests(backend, rule)
+            await asyncio.sleep(0)
+        assert 0 < eval_mock.call_count <= 100 // 5 + 2
+        assert eval_mock.call_args[0][8] == 5
+
+    async def test_lease_empty(self, mocker: MockFixture) -> None:
+        backend: limit.RedisLeaseBackend = limit.RedisLeaseBackend(StrictRedis.from_url("redis://localhost"))
+        self._mock_eval(mocker, backend, 0)
+        rule: limit.Rule = limit.Rule(second=1, gen_token=1, max_token=1, block_time=5)
+        assert not await self._can_requests(backend, rule)
+        # blocked locally, no redis call
+        assert backend.can_requests("test", rule) is False
+        assert 0 < backend.expected_time("test", rule) <= 5  # type: ignore
+
+    async def test_redis_unavailable(self) -> None:
+        backend: limit.RedisLeaseBackend = limit.RedisLeaseBackend(
+            StrictRedis.from_url("redis://localhost:1"), retry_interval=60
+        )
+        rule: limit.Rule = limit.Rule(second=10, gen_token=1, max_token=1)
+        # use the fallback backend
+        assert await self._can_requests(backend, rule)
+        assert not backend.is_redis_available
+        assert not await self._can_requests(backend, rule)
+        expected_time: Any = backend.expected_time("test", rule)
+        assert 0 < await expected_time <= 10
+
+    async def test_expected_time_redis_error(self) -> None:
+        backend: limit.RedisLeaseBackend = limit.RedisLeaseBackend(
+            StrictRedis.from_url("redis://localhost:1"), retry_interval=60
+        )
+        rule: limit.Rule = limit.Rule(second=10, gen_token=1, max_token=1)
+        assert backend.is_redis_available
+        # the redis error is not raised, use the fallback backend
+        assert 0 == await backend.expected_time("test", rule)  # type: ignore
+        assert not backend.is_redis_available
+
+
+class TestLimitMatch:
+    async def test_match(self) -> None:
+        async def demo() -> int:
+            return 1
+
+        async def demo1() -> int:
+            return 1
+
+        async def not_limit() -> int:
+            return 1
+
+        def match_other_request(request: Request) -> limit.RULE_FUNC_RETURN_TYPE:
+            return request.func_name, False
+
+        limit_processor: limit.LimitProcessor = limit.LimitProcessor(
+            limit.MemoryTokenBucketBackend(),
+            [
+                (limit.Match(func_name="not_limit", is_ignore_limit=True), limit.Rule(second=1)),
+                (
+                    limit.Match(func_name="demo", header_dict={"user": "test"}, key="user_test"),
+                    limit.Rule(second=10, max_token=2),
+                ),
+                (limit.Match(group="default", func_name="demo"), limit.Rule(second=10, max_token=1)),
+                (limit.Match(group="other"), limit.Rule(second=10, max_token=1)),
+                (match_other_request, limit.Rule(second=10, max_token=1)),
+            ],
+        )
+        server: Server = Server("test", processor_list=[limit_processor])
+        server.register(demo)
+        server.register(demo1)
+        server.register(not_limit)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            for _ in range(3):
+                assert 1 == await client.invoke_by_name("not_limit")
+            assert 1 == await client.invoke_by_name("demo", header={"user": "test"})
+            assert 1 == await client.invoke_by_name("demo", header={"user": "test"})
+            with pytest.raises(TooManyRequest):
+                await client.invoke_by_name("demo", header={"user": "test"})
+            assert 1 == await client.invoke_by_name("demo")
+            with pytest.raises(TooManyRequest):
+                await client.invoke_by_name("demo")
+            # fallback to the rule func
+            assert 1 == await client.invoke_by_name("demo1")
+            with pytest.raises(TooManyRequest):
+                await client.invoke_by_name("demo1")
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+        # only the candidate rules of the target are indexed
+        assert [len(rule_list) for rule_list in limit_processor._target_rule_dict.values()] == [2, 3, 1]
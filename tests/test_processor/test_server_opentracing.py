@@ -0,0 +1,69 @@
+from typing import List
+
+import pytest
+from jaeger_client.reporter import InMemoryReporter
+from jaeger_client.sampler import ConstSampler
+from jaeger_client.tracer import Tracer
+from opentracing.scope_managers.contextvars import ContextVarsScopeManager
+
+from rap.client import Client
+from rap.client.processor.opentracing import TracingProcessor as ClientTracingProcessor
+from rap.common.trace_sampler import RateTraceSampler
+from rap.server import Server
+from rap.server.plugin.processor.opentracing import TracingProcessor
+
+pytestmark = pytest.mark.asyncio
+
+
+def gen_tracer(reporter: InMemoryReporter, is_sample: bool = False) -> Tracer:
+    return Tracer("test", reporter, ConstSampler(is_sample), scope_manager=ContextVarsScopeManager())
+
+
+async def sync_sum(a: int, b: int) -> int:
+    return a + b
+
+
+class TestTracingSample:
+    async def test_unsampled_trace_error(self) -> None:
+        reporter: InMemoryReporter = InMemoryReporter()
+        server: Server = Server(
+            "test",
+            processor_list=[TracingProcessor(gen_tracer(reporter), sampler=RateTraceSampler(0), trace_error=True)],
+        )
+        server.register(sync_sum)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            for _ in range(3):
+                assert 3 == await client.invoke_by_name("sync_sum", [1, 2])
+            # The span is not created for the unsampled trace
+            assert reporter.get_spans() == []
+
+            with pytest.raises(Exception):
+                await client.invoke_by_name("sync_sum", [1, "a"])
+            span_list: List = reporter.get_spans()
+            assert len(span_list) == 1
+            assert span_list[0].operation_name == "test/default/sync_sum"
+            assert span_list[0].is_sampled()
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+    async def test_propagate_sample_decision(self) -> None:
+        client_reporter: InMemoryReporter = InMemoryReporter()
+        server_reporter: InMemoryReporter = InMemoryReporter()
+        server: Server = Server("test", processor_list=[TracingProcessor(gen_tracer(server_reporter, True))])
+        server.register(sync_sum)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        client.load_processor([ClientTracingProcessor(gen_tracer(client_reporter, True), sampler=RateTraceSampler(0))])
+        await client.start()
+        try:
+            assert 3 == await client.invoke_by_name("sync_sum", [1, 2])
+            # The server follows the decision of the client
+            assert client_reporter.get_spans() == []
+            assert server_reporter.get_spans() == []
+        finally:
+            await client.stop()
+            await server.shutdown()
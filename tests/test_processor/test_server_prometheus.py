@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from prometheus_client import CollectorRegistry  # type: ignore
+from pytest_mock import MockerFixture
+
+from rap.client import Client
+from rap.server import Server
+from rap.server.plugin.processor.prometheus import PrometheusProcessor
+
+pytestmark = pytest.mark.asyncio
+
+
+async def sync_sum(a: int, b: int) -> int:
+    return a + b
+
+
+class TestPrometheus:
+    async def test_registry_expose(self) -> None:
+        registry: CollectorRegistry = CollectorRegistry()
+        processor: PrometheusProcessor = PrometheusProcessor(expose_mode="registry", registry=registry)
+        server: Server = Server("test", processor_list=[processor])
+        server.register(sync_sum)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            for _ in range(3):
+                assert 3 == await client.invoke_by_name("sync_sum", [1, 2])
+            metrics: str = await client.invoke_by_name("metrics", group=processor.__class__.__name__)
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+        label: str = f'group="default",host_name="{processor.host_name}",service="test",target="test/default/sync_sum"'
+        assert f"msg_request_total{{{label}}} 3.0" in metrics
+        assert (
+            f'msg_response_total{{group="default",host_name="{processor.host_name}",service="test",status_code="200",'
+            f'target="test/default/sync_sum"}} 3.0'
+        ) in metrics
+        assert f"msg_request_in_progress{{{label}}} 0.0" in metrics
+        assert (
+            f'msg_request_time_bucket{{group="default",host_name="{processor.host_name}",le="+Inf",service="test",'
+            f'target="test/default/sync_sum"}} 3.0'
+        ) in metrics
+        assert metrics.endswith("# EOF\n")
+        # unregister after the server is closed
+        assert registry.get_sample_value("msg_request_total", {}) is None
+        assert list(registry.collect()) == []
+
+    async def test_http_expose(self) -> None:
+        processor: PrometheusProcessor = PrometheusProcessor(
+            prometheus_host="localhost", prometheus_port=9001, expose_mode="http", registry=CollectorRegistry()
+        )
+        server: Server = Server("test", processor_list=[processor])
+        server.register(sync_sum)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            assert 3 == await client.invoke_by_name("sync_sum", [1, 2])
+            for accept, content_type in (
+                ("text/plain", "text/plain"),
+                ("application/openmetrics-text", "application/openmetrics-text"),
+            ):
+                reader, writer = await asyncio.open_connection("localhost", 9001)
+                writer.write(f"GET /metrics HTTP/1.1\r\nHost: localhost\r\nAccept: {accept}\r\n\r\n".encode())
+                response: str = (await reader.read()).decode()
+                writer.close()
+                assert response.startswith("HTTP/1.1 200 OK")
+                assert f"Content-Type: {content_type}" in response
+                assert "msg_request_total{" in response
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+    async def test_multi_processor(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(PrometheusProcessor, "register")
+        processor_1: PrometheusProcessor = PrometheusProcessor(expose_mode="registry")
+        processor_2: PrometheusProcessor = PrometheusProcessor(expose_mode="registry")
+        # each processor uses a private registry by default
+        await processor_1.start_event_handle(None)  # type: ignore
+        await processor_2.start_event_handle(None)  # type: ignore
+        processor_3: PrometheusProcessor = PrometheusProcessor(expose_mode="registry", registry=processor_1._registry)
+        with pytest.raises(ValueError):
+            await processor_3.start_event_handle(None)  # type: ignore
+        for processor in (processor_1, processor_2, processor_3):
+            await processor.stop_event_handle(None)  # type: ignore
@@ -2,6 +2,7 @@ import asyncio
 from typing import AsyncGenerator, Tuple
 
 import pytest
+from aio_statsd import DogStatsdClient
 from aredis import StrictRedis  # type: ignore
 
 from rap.client import Client
@@ -38,3 +39,34 @@ class TestStatsd:
             await rap_client.invoke_by_name("sync_sum", arg_param=[1, 2])
         finally:
             await statsd_client.close()
+
+    async def test_statsd_aggregation(self, udp_server: asyncio.Queue) -> None:
+        async def sync_sum(a: int, b: int) -> int:
+            return a + b
+
+        statsd_client: StatsdClient = StatsdClient(host="localhost", port=8125)
+        processor: StatsdProcessor = StatsdProcessor(statsd_client=statsd_client, namespace="test", flush_interval=0.1)
+        server: Server = Server("test", processor_list=[processor])
+        server.register(sync_sum)
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        try:
+            await statsd_client.connect()
+            await server.create_server()
+            await client.start()
+            for _ in range(10):
+                assert 3 == await client.invoke_by_name("sync_sum", [1, 2])
+            line_list: list = []
+            while sum(int(line[9:-2]) for line in line_list if line.startswith("test.msg:")) < 10:
+                line_list.extend((await asyncio.wait_for(udp_server.get(), 1)).decode().split("\n"))
+        finally:
+            await client.stop()
+            await server.shutdown()
+            await statsd_client.close()
+
+        assert "test.online_host:1|g" in line_list
+        # the packets of 10 requests are merged
+        assert processor.send_packet_cnt < 10
+
+    async def test_statsd_reject_other_protocol(self) -> None:
+        with pytest.raises(TypeError):
+            StatsdProcessor(statsd_client=DogStatsdClient(host="localhost", port=8125))  # type: ignore
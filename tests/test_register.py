@@ -1,11 +1,17 @@
-from typing import AsyncIterator
+import asyncio
+import time
+from typing import AsyncIterator, Optional
 
 import pytest
 
 from rap.client import Client
 from rap.common.exceptions import RegisteredError
+from rap.common.utils import constant
 from rap.server import Server
-from rap.server.registry import RegistryManager
+from rap.server.batch import Batcher, batched
+from rap.server.func_cache import CachePolicy, FuncCache
+from rap.server.model import Request, ServerContext
+from rap.server.registry import FuncModel, RegistryManager
 
 pytestmark = pytest.mark.asyncio
 registry: RegistryManager = RegistryManager()
@@ -157,3 +163,169 @@ class TestRegister:
         with pytest.raises(RuntimeError):
             async for i in demo1(10):
                 print(i)
+
+    async def test_register_func_not_check_type(self) -> None:
+        async def demo(a: int, b: int) -> str:
+            return a + b  # type: ignore
+
+        server: Server = Server("test", check_type=False)
+        server.register(demo)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}], check_type=False)
+        client_demo = client.register_func()(demo)
+        await client.start()
+        try:
+            assert "12" == await client_demo("1", "2")  # type: ignore
+            assert 3 == await client_demo(1, 2)
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+    async def test_target_cache(self) -> None:
+        def demo_target_cache(a: int) -> int:
+            return a
+
+        registry.register(demo_target_cache)
+        context: ServerContext = ServerContext()
+        context.correlation_id = 1
+        request: Request = Request(
+            constant.MSG_REQUEST, 1, {"target": "test/default/demo_target_cache"}, {"param": [1]}, context
+        )
+        func_model: FuncModel = registry.get_func_model(request, constant.NORMAL_TYPE)
+        assert func_model.func is demo_target_cache
+        assert registry.get_func_model(request, constant.NORMAL_TYPE) is func_model
+        assert func_model.param_handle([1]) == (1,)
+        assert func_model.check_return_type(1)
+        assert not func_model.check_return_type("1")
+        # register new func will clean target cache
+        registry.register(new_reload_sum)
+        assert registry._target_func_model_dict[constant.NORMAL_TYPE] == {}
+
+    async def test_register_func_cache(self) -> None:
+        call_cnt: int = 0
+
+        async def demo_cache(a: int) -> int:
+            nonlocal call_cnt
+            call_cnt += 1
+            await asyncio.sleep(0.1)
+            return a
+
+        async def demo_gen(a: int) -> AsyncIterator[int]:
+            yield a
+
+        server: Server = Server("test")
+        with pytest.raises(RegisteredError):
+            server.register(demo_gen, cache=CachePolicy())
+        server.register(demo_cache, cache=CachePolicy(ttl=10, max_entries=2))
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            # singleflight
+            assert [1, 1, 1] == await asyncio.gather(*[client.invoke_by_name("demo_cache", [1]) for _ in range(3)])
+            assert call_cnt == 1
+            assert 1 == await client.invoke_by_name("demo_cache", [1])
+            assert call_cnt == 1
+            # lru
+            await client.invoke_by_name("demo_cache", [2])
+            await client.invoke_by_name("demo_cache", [3])
+            assert call_cnt == 3
+            # invalidate
+            assert 1 == await client.invoke_by_name("invalidate_cache", ["demo_cache", None, [3]], group="registry")
+            await client.invoke_by_name("demo_cache", [3])
+            assert call_cnt == 4
+
+            func_cache: Optional[FuncCache] = server.registry["normal:default:demo_cache"].func_cache
+            assert func_cache is not None
+            assert func_cache.to_dict() == {"size": 2, "hit": 1, "miss": 6, "eviction": 1}
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+    async def test_func_cache_cancel_leader(self) -> None:
+        call_cnt: int = 0
+
+        async def demo_cache() -> int:
+            nonlocal call_cnt
+            call_cnt += 1
+            await asyncio.sleep(0.1)
+            return 1
+
+        func_cache: FuncCache = FuncCache(CachePolicy())
+        leader_future: asyncio.Future = asyncio.ensure_future(func_cache.get_or_call([1], demo_cache))
+        await asyncio.sleep(0.01)
+        waiter_future: asyncio.Future = asyncio.ensure_future(func_cache.get_or_call([1], demo_cache))
+        await asyncio.sleep(0.01)
+        # the cancellation of the first caller does not affect the waiter
+        leader_future.cancel()
+        assert 1 == await waiter_future
+        assert leader_future.cancelled()
+        assert call_cnt == 1
+        assert 1 == await func_cache.get_or_call([1], demo_cache)
+        assert call_cnt == 1
+
+        # the waiter timeout does not cancel the call
+        with pytest.raises(asyncio.TimeoutError):
+            await func_cache.get_or_call([2], demo_cache, timeout=0.01)
+        assert 1 == await func_cache.get_or_call([2], demo_cache)
+        assert call_cnt == 2
+
+    async def test_register_batched_func(self) -> None:
+        batch_param_list: list = []
+
+        @batched(max_size=4, max_wait_ms=20)
+        async def demo_batch(a: int, b: int = 1) -> int:
+            batch_param_list.append((a, b))
+            return [ValueError("a must >= 0") if i < 0 else i * j for i, j in zip(a, b)]  # type: ignore
+
+        server: Server = Server("test")
+        server.register(demo_batch)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            result_list: list = await asyncio.gather(
+                *[client.invoke_by_name("demo_batch", [i, 2]) for i in range(-1, 5)], return_exceptions=True
+            )
+            assert isinstance(result_list[0], ValueError)
+            assert result_list[1:] == [0, 2, 4, 6, 8]
+            # max_size is 4, the first batch is full, the second batch is called after max_wait_ms
+            assert batch_param_list == [([-1, 0, 1, 2], [2, 2, 2, 2]), ([3, 4], [2, 2])]
+
+            # default value
+            assert 3 == await client.invoke_by_name("demo_batch", [3])
+
+            batcher: Optional[Batcher] = server.registry["normal:default:demo_batch"].batcher
+            assert batcher is not None
+            batch_dict: dict = batcher.to_dict()
+            assert batch_dict["batch_size"]["count"] == 3
+            assert batch_dict["batch_size"]["bucket"] == {"1": 1, "2": 2, "4": 3, "inf": 3}
+            assert batch_dict["batch_wait_ms"]["count"] == 7
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+    async def test_batched_func_cancel(self) -> None:
+        call_size_list: list = []
+
+        @batched(max_size=4, max_wait_ms=50)
+        async def demo_batch(a: int) -> int:
+            call_size_list.append(len(a))  # type: ignore
+            return a
+
+        task: asyncio.Task = asyncio.ensure_future(demo_batch(1))
+        result: int = await asyncio.wait_for(demo_batch(2), 0.1)
+        assert result == 2
+        assert await task == 1
+        # the cancelled call is removed from the batch
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(demo_batch(3), 0.01)
+        assert 4 == await demo_batch(4)
+        assert call_size_list == [2, 1]
+        assert len(getattr(demo_batch, "batcher")) == 0
+        # the batch is called no later than the deadline of the call
+        batcher: Batcher = getattr(demo_batch, "batcher")
+        start_time: float = time.time()
+        assert 5 == await batcher.call(5, deadline_timestamp=start_time + 0.005)
+        assert time.time() - start_time < 0.04
+        assert call_size_list == [2, 1, 1]
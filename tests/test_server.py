@@ -1,14 +1,25 @@
 import asyncio
+import gc
+import time
+from typing import AsyncIterator, Optional
 
 import pytest
 from aredis import StrictRedis  # type: ignore
 from pytest_mock import MockerFixture
 
 from rap.client import Client
+from rap.client.model import Response
 from rap.common.asyncio_helper import Deadline
-from rap.common.exceptions import RpcRunTimeError
-from rap.common.utils import EventEnum
+from rap.common.exceptions import OverloadError, RpcRunTimeError
+from rap.common.gc_controller import GCController
+from rap.common.loop_monitor import LoopMonitor
+from rap.common.profiler import SamplingProfiler
+from rap.common.slow_request import SlowRequestRecorder
+from rap.common.utils import EventEnum, constant
 from rap.server import Server
+from rap.server.admission import AdmissionController
+from rap.server.model import Request, ServerContext
+from rap.server.overload import OverloadController
 from rap.server.plugin.middleware.conn.limit import ConnLimitMiddleware
 from rap.server.plugin.processor import CryptoProcessor as ServerCryptoProcessor
 from tests.conftest import AnyStringWith
@@ -109,10 +120,376 @@ class TestRequestHandle:
     async def test_request_dispatch_func_error(
         self, rap_server: Server, rap_client: Client, mocker: MockerFixture
     ) -> None:
-        mocker.patch("rap.server.receiver.param_handle").side_effect = Exception()
+        mocker.patch("rap.server.registry.FuncModel.param_handle").side_effect = Exception()
 
         with pytest.raises(RpcRunTimeError) as e:
             await rap_client.invoke_by_name("sync_sum", [1, 2])
 
         exec_msg = e.value.args[0]
         assert exec_msg == "Rpc run time error"
+
+
+class TestOverloadController:
+    @staticmethod
+    def _gen_request(body: dict, header: Optional[dict] = None, receive_time: Optional[float] = None) -> Request:
+        context: ServerContext = ServerContext()
+        context.correlation_id = 1
+        return Request(
+            constant.MSG_REQUEST,
+            1,
+            {"target": "/default/sync_sum", **(header or {})},
+            body,
+            context,
+            receive_time=receive_time,
+        )
+
+    def test_codel(self, mocker: MockerFixture) -> None:
+        controller: OverloadController = OverloadController(target=0.1, interval=1)
+        mocker.patch.object(controller, "shed_cnt_gauge")
+        mocker.patch("time.time").return_value = 1600000000
+        # sojourn time above target, but not for a whole interval
+        assert not controller.is_shed(self._gen_request({"call_id": -1}, receive_time=1599999999))
+        mocker.patch("time.time").return_value = 1600000001
+        assert controller.is_shed(self._gen_request({"call_id": -1}, receive_time=1600000000))
+        # generator call and high priority request not shed
+        assert not controller.is_shed(self._gen_request({"call_id": 1}, receive_time=1600000000))
+        assert not controller.is_shed(
+            self._gen_request({"call_id": -1}, header={"X-rap-priority": 1}, receive_time=1600000000)
+        )
+        assert not controller.is_shed(
+            self._gen_request({"call_id": -1}, header={"X-rap-priority": "1"}, receive_time=1600000000)
+        )
+        # invalid priority is the default priority
+        assert controller.is_shed(
+            self._gen_request({"call_id": -1}, header={"X-rap-priority": "high"}, receive_time=1600000000)
+        )
+        assert controller.is_shed(
+            self._gen_request({"call_id": -1}, header={"X-rap-priority": None}, receive_time=1600000000)
+        )
+        # queue drained
+        assert not controller.is_shed(self._gen_request({"call_id": -1}, receive_time=1600000001))
+        assert controller.shed_cnt == 3
+
+    async def test_shed_request(self) -> None:
+        async def sync_sum(a: int, b: int) -> int:
+            return a + b
+
+        controller: OverloadController = OverloadController(max_loop_lag=-1)
+        server: Server = Server("test", overload_controller=controller)
+        server.register(sync_sum)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            with pytest.raises(OverloadError):
+                await client.invoke_by_name("sync_sum", [1, 2])
+            assert 3 == await client.invoke_by_name("sync_sum", [1, 2], header={"X-rap-priority": 1})
+            assert controller.shed_cnt == 1
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+
+class TestAdmissionController:
+    def test_conn_cnt(self, mocker: MockerFixture) -> None:
+        controller: AdmissionController = AdmissionController(max_conn=3, ip_max_conn=2)
+        mocker.patch.object(controller, "reject_cnt_gauge")
+        assert controller.admit("127.0.0.1")
+        assert controller.admit("127.0.0.1")
+        assert not controller.admit("127.0.0.1")
+        assert controller.admit("127.0.0.2")
+        assert not controller.admit("127.0.0.3")
+        controller.release("127.0.0.1")
+        assert controller.admit("127.0.0.3")
+        controller.release("127.0.0.2")
+        assert controller.admit("127.0.0.1")
+        assert controller.to_dict() == {
+            "conn_cnt": 3,
+            "ip_cnt": 2,
+            "reject_cnt": {"max_conn": 1, "ip_max_conn": 1, "accept_rate": 0, "ip_accept_rate": 0},
+        }
+
+    def test_accept_rate(self, mocker: MockerFixture) -> None:
+        mocker.patch("time.time").return_value = 1600000000
+        controller: AdmissionController = AdmissionController(accept_rate=3, ip_accept_rate=1, ip_accept_burst=2)
+        mocker.patch.object(controller, "reject_cnt_gauge")
+        assert controller.admit("127.0.0.1")
+        assert controller.admit("127.0.0.1")
+        assert not controller.admit("127.0.0.1")
+        assert controller.admit("127.0.0.2")
+        assert not controller.admit("127.0.0.3")
+        mocker.patch("time.time").return_value = 1600000001
+        assert controller.admit("127.0.0.1")
+        assert not controller.admit("127.0.0.1")
+        assert controller.reject_cnt_dict == {"max_conn": 0, "ip_max_conn": 0, "accept_rate": 1, "ip_accept_rate": 2}
+
+    async def test_sync_error(self) -> None:
+        controller: AdmissionController = AdmissionController(
+            ip_max_conn=2, redis=StrictRedis.from_url("redis://localhost:1")
+        )
+        assert controller.admit("127.0.0.1")
+        controller.release("127.0.0.1")
+        assert controller.admit("127.0.0.1")
+        with pytest.raises(Exception):
+            await controller._sync()
+        # the conn count is synced next time
+        assert controller._is_dirty
+        # the error of removing the conn count is not raised when the server stops
+        await controller.stop_event_handle(None)  # type: ignore
+
+    def test_shared_conn_cnt(self, mocker: MockerFixture) -> None:
+        controller: AdmissionController = AdmissionController(ip_max_conn=3)
+        mocker.patch.object(controller, "reject_cnt_gauge")
+        # the conn count of the other servers is added to the local conn count
+        controller._shared_ip_conn_dict = {"127.0.0.1": 2}
+        assert controller.admit("127.0.0.1")
+        assert not controller.admit("127.0.0.1")
+        assert controller.admit("127.0.0.2")
+
+    async def test_reject_conn(self) -> None:
+        controller: AdmissionController = AdmissionController(ip_max_conn=1)
+        server: Server = Server("test", admission_controller=controller)
+        await server.create_server()
+        client_1: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        client_2: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        try:
+            await client_1.start()
+            with pytest.raises(ConnectionError):
+                await client_2.start()
+            assert controller.reject_cnt_dict["ip_max_conn"] == 1
+        finally:
+            await client_1.stop()
+            await client_2.stop()
+            await server.shutdown()
+        assert controller.to_dict()["conn_cnt"] == 0
+
+
+class TestServerStats:
+    async def test_latency_histogram(self) -> None:
+        async def demo_sleep(delay: float) -> float:
+            await asyncio.sleep(delay)
+            return delay
+
+        server: Server = Server("test")
+        server.register(demo_sleep)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            for _ in range(10):
+                await client.invoke_by_name("demo_sleep", [0.01])
+            stats_dict: dict = await client.invoke_by_name("stats", group="registry")
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+        target_stats_dict: dict = stats_dict["histogram"]["target"]["test/default/demo_sleep"]
+        assert target_stats_dict["count"] == 10
+        assert 10 <= target_stats_dict["p50"] <= target_stats_dict["p99"] <= target_stats_dict["max"]
+        assert stats_dict["histogram"]["transport"]["127.0.0.1"]["count"] >= 10
+
+        client_stats_dict: dict = client.histogram_store.to_dict()
+        assert client_stats_dict["target"]["test/default/demo_sleep"]["count"] == 10
+        assert client_stats_dict["transport"]["localhost:9000"]["p999"] >= 10
+
+    async def test_stage_timing(self) -> None:
+        async def demo_sleep(delay: float) -> float:
+            await asyncio.sleep(delay)
+            return delay
+
+        server: Server = Server("test", stage_timing=True, server_timing_header=True)
+        server.register(demo_sleep)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}], stage_timing=True)
+        await client.start()
+        try:
+            for _ in range(3):
+                response: Response = await client.request("demo_sleep", [0.01])
+            stage_dict: dict = await client.invoke_by_name(
+                "stage_timing", ["test/default/demo_sleep"], group="registry"
+            )
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+        server_timing: str = response.header["server-timing"]
+        assert [item.split(";")[0] for item in server_timing.split(", ")] == [
+            "queue",
+            "processor",
+            "permission",
+            "func",
+            "response_processor",
+        ]
+        server_stage_dict: dict = stage_dict["test/default/demo_sleep"]
+        assert list(server_stage_dict.keys()) == [
+            "queue",
+            "processor",
+            "permission",
+            "func",
+            "response_processor",
+            "encode",
+            "drain",
+        ]
+        assert server_stage_dict["func"]["count"] == 3
+        assert server_stage_dict["func"]["p50"] >= 10
+
+        client_stage_dict: dict = client.histogram_store.to_stage_dict()["test/default/demo_sleep"]
+        assert list(client_stage_dict.keys()) == [
+            "pick",
+            "semaphore",
+            "processor",
+            "encode",
+            "drain",
+            "response_wait",
+            "response_processor",
+        ]
+        assert client_stage_dict["response_wait"]["p50"] >= 10
+
+    def test_registry_func_run_on_loop(self) -> None:
+        # The sync registry func runs in the executor thread, but these funcs read the state changed by the loop
+        server: Server = Server("test")
+        for func in (server._get_stats, server._get_stage_timing, server._get_object_cnt, server._get_slow_request):
+            assert asyncio.iscoroutinefunction(func)
+
+    async def test_profile(self) -> None:
+        server: Server = Server("test", profiler=SamplingProfiler(max_seconds=0.1))
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            top_list: list = await client.invoke_by_name("profile", [0.1, 100, "top", 5], group="registry")
+            collapsed: str = await client.invoke_by_name("profile", [0.1, 100], group="registry")
+            # the default seconds is less than the run timeout
+            assert await client.invoke_by_name("profile", group="registry")
+            with pytest.raises(Exception) as e:
+                await client.invoke_by_name("profile", [30.0], group="registry")
+            assert "run_timeout" in str(e.value)
+        finally:
+            await client.stop()
+            await server.shutdown()
+        assert 0 < len(top_list) <= 5
+        assert set(top_list[0].keys()) == {"func", "self", "total"}
+        assert "thread:MainThread" in collapsed
+
+    async def test_memory_diagnose(self) -> None:
+        async def demo_gen() -> AsyncIterator[int]:
+            for i in range(3):
+                yield i
+
+        server: Server = Server("test")
+        server.register(demo_gen)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            assert await client.invoke_by_name("tracemalloc_start", group="registry")
+            await client.invoke_by_name("tracemalloc_snapshot", ["old"], group="registry")
+            async for _ in client.invoke_iterator(demo_gen)():
+                break
+            object_cnt_dict: dict = await client.invoke_by_name("object_cnt", [5], group="registry")
+            diff_list: list = await client.invoke_by_name(
+                "tracemalloc_diff", ["old", None, "lineno", 5], group="registry"
+            )
+            assert await client.invoke_by_name("tracemalloc_stop", group="registry")
+        finally:
+            await client.stop()
+            await server.shutdown()
+        assert object_cnt_dict["conn"] == 1
+        # The generator that is not exhausted is held by the server
+        assert object_cnt_dict["generator"] == 1
+        assert len(object_cnt_dict["class"]) == 5
+        assert len(diff_list) == 5
+        assert (await server._get_object_cnt())["conn"] == 0
+
+    async def test_loop_monitor(self) -> None:
+        async def demo_block(delay: float) -> float:
+            end_time: float = time.time() + delay
+            while time.time() < end_time:
+                pass
+            return delay
+
+        loop_monitor: LoopMonitor = LoopMonitor(interval=0.01, publish_interval=0.05, slow_callback_time=0.05)
+        controller: OverloadController = OverloadController()
+        server: Server = Server("test", loop_monitor=loop_monitor, overload_controller=controller)
+        server.register(demo_block)
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}], loop_monitor=LoopMonitor())
+        await client.start()
+        try:
+            assert client.loop_monitor and client.loop_monitor.is_running
+            await client.invoke_by_name("demo_block", [0.2])
+            await asyncio.sleep(0.1)
+            stats_dict: dict = await client.invoke_by_name("stats", group="registry")
+            assert controller.loop_lag == loop_monitor.lag
+        finally:
+            await client.stop()
+            await server.shutdown()
+        assert not loop_monitor.is_running
+        assert not client.loop_monitor.is_running
+        loop_dict: dict = stats_dict["loop"]
+        assert loop_dict["lag_max"] >= 150
+        assert loop_dict["task_cnt"] >= 1
+        assert loop_dict["slow_callback_cnt"] >= 1
+        assert any("demo_block" in stack for stack in loop_dict["slow_callback_list"][0]["stack"])
+
+    async def test_gc_controller(self) -> None:
+        server: Server = Server("test", gc_controller=GCController(threshold=(1000, 20, 20)))
+        await server.create_server()
+        client: Client = Client("test", [{"ip": "localhost", "port": "9000"}])
+        await client.start()
+        try:
+            assert gc.get_freeze_count() > 0
+            assert server.gc_controller.freeze_cnt > 0  # type: ignore
+            gc.collect()
+            stats_dict: dict = await client.invoke_by_name("stats", group="registry")
+        finally:
+            await client.stop()
+            await server.shutdown()
+        assert gc.get_freeze_count() == 0
+        assert tuple(stats_dict["gc"]["threshold"]) == (1000, 20, 20)
+        assert stats_dict["gc"]["pause"]["gen2"]["count"] >= 1
+
+    async def test_slow_request(self) -> None:
+        async def demo_sleep(delay: float) -> float:
+            await asyncio.sleep(delay)
+            if delay > 0.1:
+                raise ValueError("too slow")
+            return delay
+
+        server: Server = Server("test", stage_timing=True, slow_request_recorder=SlowRequestRecorder(threshold=0.05))
+        server.register(demo_sleep)
+        await server.create_server()
+        client: Client = Client(
+            "test",
+            [{"ip": "localhost", "port": "9000"}],
+            slow_request_recorder=SlowRequestRecorder(threshold=0.05),
+        )
+        await client.start()
+        try:
+            await client.invoke_by_name("demo_sleep", [0.01])
+            await client.invoke_by_name("demo_sleep", [0.06])
+            with pytest.raises(ValueError):
+                await client.invoke_by_name("demo_sleep", [0.11])
+            record_list: list = await client.invoke_by_name(
+                "slow_request", ["test/default/demo_sleep"], group="registry"
+            )
+        finally:
+            await client.stop()
+            await server.shutdown()
+
+        assert len(record_list) == 2
+        assert record_list[0]["duration"] >= 0.06
+        assert record_list[0]["peer"][0] == "127.0.0.1"
+        assert record_list[0]["param_size"] > 0
+        assert record_list[0]["queue_time"] == record_list[0]["stage"]["queue"]
+        assert record_list[0]["stage"]["func"] >= 0.06
+        assert record_list[0]["exc_info"] is None
+        assert "too slow" in record_list[1]["exc_info"]
+
+        client_record_list: list = client.slow_request_recorder.get_record_list()  # type: ignore
+        assert len(client_record_list) == 2
+        assert client_record_list[0]["peer"] == "localhost:9000"
+        # The client does not enable the stage timing
+        assert client_record_list[0]["stage"] == {}
+        assert client_record_list[0]["queue_time"] is None
+        assert "too slow" in client_record_list[1]["exc_info"]
@@ -9,7 +9,7 @@ from rap.common.cache import Cache
 from rap.common.event import Event
 from rap.common.exceptions import RPCError
 from rap.common.state import State
-from rap.common.utils import check_func_type
+from rap.common.utils import check_func_type, gen_param_handle
 
 pytestmark = pytest.mark.asyncio
 
@@ -67,6 +67,39 @@ class TestUtil:
         with pytest.raises(TypeError):
             check_func_type(inspect.signature(_demo), (1, "2"), {"c": 3})
 
+    def test_gen_param_handle(self) -> None:
+        def _demo(a: int, b: str, c: str = "") -> int:
+            return 0
+
+        param_handle = gen_param_handle(inspect.signature(_demo))
+        assert (1, "2") == param_handle((1, "2"), {})
+        assert (1, "2", "3") == param_handle((1, "2", "3"), {})
+        assert (1, "2", "3") == param_handle((1,), {"b": "2", "c": "3"})
+        with pytest.raises(TypeError):
+            param_handle((1, 2), {})
+        with pytest.raises(TypeError):
+            param_handle((1, "2"), {"c": 3})
+        with pytest.raises(TypeError):
+            param_handle((1,), {})
+
+        # the default value is checked like `check_func_type`
+        def _bad_default_demo(a: int, b: str = 0) -> int:  # type: ignore
+            return 0
+
+        param_handle = gen_param_handle(inspect.signature(_bad_default_demo))
+        assert (1, "2") == param_handle((1, "2"), {})
+        assert (1, "2") == param_handle((1,), {"b": "2"})
+        with pytest.raises(TypeError):
+            param_handle((1,), {})
+        with pytest.raises(TypeError):
+            check_func_type(inspect.signature(_bad_default_demo), (1,), {})
+
+        # only bind param
+        param_handle = gen_param_handle(inspect.signature(_demo), check_type=False)
+        assert (1, 2) == param_handle((1, 2), {})
+        with pytest.raises(TypeError):
+            param_handle((1,), {})
+
     async def test_cache(self) -> None:
         cache: Cache = Cache(1.5)
         cache.add("test1", 0.1)